@@ -0,0 +1,24 @@
+"""
+Townin LLM 단가표
+================
+
+CostTracker와 validation-mvp의 UsageMeter가 함께 쓰는 단일 단가표입니다.
+mlflow 없이도 import할 수 있도록 별도 모듈로 둡니다.
+
+사용 예시:
+    from llm_pricing import PRICING
+"""
+
+# 모델별 비용 (USD per 1K tokens)
+PRICING = {
+    "gpt-4o": {"input": 0.005, "output": 0.015},
+    "gpt-4-turbo": {"input": 0.01, "output": 0.03},
+    "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
+    "claude-3-opus": {"input": 0.015, "output": 0.075},
+    "claude-3-sonnet": {"input": 0.003, "output": 0.015},
+    "claude-3-haiku": {"input": 0.00025, "output": 0.00125},
+    "claude-3-haiku-20240307": {"input": 0.00025, "output": 0.00125},
+    "claude-3-5-sonnet-20241022": {"input": 0.003, "output": 0.015},
+    "claude-3-5-haiku-20241022": {"input": 0.0008, "output": 0.004},
+    "text-embedding-ada-002": {"input": 0.0001, "output": 0.0},
+}
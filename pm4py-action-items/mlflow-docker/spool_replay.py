@@ -0,0 +1,45 @@
+"""
+Townin MLflow 스풀 재전송
+========================
+
+OfflineSpool(SQLite)에 기록된 Run/메트릭/파라미터/태그/아티팩트를 추적
+서버로 일괄 전송합니다. 중단 후 다시 실행해도 이미 보낸 항목은 건너뜁니다.
+
+사용 예시:
+    python spool_replay.py --spool mlflow_spool.db
+    python spool_replay.py --spool mlflow_spool.db --tracking-uri https://mlflow-server-HASH.run.app
+    python spool_replay.py --spool mlflow_spool.db --stats
+"""
+
+import argparse
+
+from townin_mlflow_client import OfflineSpool, get_token_manager, replay_spool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an offline MLflow spool to a tracking server")
+    parser.add_argument("--spool", default="mlflow_spool.db", help="OfflineSpool SQLite 파일")
+    parser.add_argument("--tracking-uri", default=None, help="대상 서버 (기본: Run 기록 시점의 URI)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="한 번에 읽어 전송할 레코드 수")
+    parser.add_argument("--no-auth", action="store_true", help="Google Cloud 토큰 발급 생략 (로컬 서버/파일 저장소)")
+    parser.add_argument("--stats", action="store_true", help="대기 중인 항목 수만 출력")
+    args = parser.parse_args()
+
+    spool = OfflineSpool(args.spool)
+    try:
+        print(f"대기 중: {spool.stats()}")
+        if args.stats:
+            return
+
+        if not args.no_auth:
+            get_token_manager().start()
+
+        stats = replay_spool(spool, tracking_uri=args.tracking_uri, chunk_size=args.chunk_size)
+        print(f"재전송 완료: {stats}")
+        print(f"남은 항목: {spool.stats()}")
+    finally:
+        spool.close()
+
+
+if __name__ == "__main__":
+    main()
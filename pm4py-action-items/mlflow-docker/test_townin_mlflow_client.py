@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""
+TowninMLflowClient 로컬 저장소 테스트
+====================================
+
+추적 서버 없이 임시 디렉토리의 MLflow 파일 저장소로 클라이언트 API를
+확인합니다 (Google Cloud 인증은 끔).
+
+사용 예시:
+    python test_townin_mlflow_client.py
+    pytest test_townin_mlflow_client.py
+"""
+
+import os
+import gc
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# MLflow 3.x는 파일 저장소를 명시적으로 허용해야 사용 가능
+os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+
+import mlflow
+import townin_mlflow_client
+from townin_mlflow_client import (
+    ArtifactUploader,
+    BatchMetricLogger,
+    CostTracker,
+    ExperimentCache,
+    OfflineSpool,
+    RunCache,
+    TokenRefreshManager,
+    TowninMLflowClient,
+    get_token_manager,
+    replay_spool,
+)
+
+
+def _client(tmp: str, **kwargs) -> TowninMLflowClient:
+    kwargs.setdefault("experiment_cache", ExperimentCache())
+    return TowninMLflowClient(Path(tmp, "mlruns").as_uri(), customer_id="test", auto_auth=False, **kwargs)
+
+
+# ----------------------------------------------------------------------------
+# 실험 ID 캐시
+# ----------------------------------------------------------------------------
+
+def test_experiment_cache_resolves_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        first = client.create_experiment("cache_exp")
+        with client.start_tracked_run("cache_exp") as run:
+            assert run.info.experiment_id == first
+        stats = client.experiment_cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] >= 1, stats
+
+
+def test_experiment_cache_single_flight():
+    cache = ExperimentCache()
+    calls = {"create": 0}
+    barrier = threading.Barrier(8)
+
+    def create():
+        calls["create"] += 1
+        return "42"
+
+    def worker():
+        barrier.wait()
+        assert cache.get_or_create("uri", "exp", lambda: None, create) == "42"
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls["create"] == 1, calls
+
+
+def test_experiment_cache_invalidate():
+    cache = ExperimentCache()
+    cache.get_or_create("uri", "exp", lambda: "1", lambda: "unused")
+    cache.invalidate("uri", "exp")
+    assert cache.get_or_create("uri", "exp", lambda: "2", lambda: "unused") == "2"
+
+
+# ----------------------------------------------------------------------------
+# 토큰 갱신
+# ----------------------------------------------------------------------------
+
+class FakeCredentialProvider:
+    """호출 횟수를 세는 가짜 공급자 (lifetime초 뒤 만료되는 토큰 발급)"""
+
+    def __init__(self, lifetime: float = 3600.0, delay: float = 0.05):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)  # 다른 스레드가 동시에 만료를 감지하도록
+        return f"token-{self.calls}", time.time() + self.lifetime
+
+
+def test_token_single_flight():
+    provider = FakeCredentialProvider()
+    manager = TokenRefreshManager(provider, env_var="TEST_MLFLOW_TOKEN")
+    barrier = threading.Barrier(16)
+    tokens = []
+
+    def worker():
+        barrier.wait()
+        tokens.append(manager.token())
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert provider.calls == 1, provider.calls
+    assert set(tokens) == {"token-1"}, set(tokens)
+    assert os.environ["TEST_MLFLOW_TOKEN"] == "token-1"
+
+
+def test_token_refreshes_near_expiry():
+    # 수명이 갱신 여유보다 짧으면 매번 만료 임박으로 판단
+    provider = FakeCredentialProvider(lifetime=10.0, delay=0.0)
+    manager = TokenRefreshManager(provider, refresh_margin=60.0, env_var="TEST_MLFLOW_TOKEN")
+    assert manager.token() == "token-1"
+    assert manager.token() == "token-2"
+
+    fresh = FakeCredentialProvider(lifetime=3600.0, delay=0.0)
+    manager = TokenRefreshManager(fresh, refresh_margin=60.0, env_var="TEST_MLFLOW_TOKEN")
+    manager.token()
+    manager.token()
+    assert fresh.calls == 1 and manager.refresh_count == 1
+    assert manager.refresh(force=True) == "token-2"
+
+
+def test_client_shares_token_manager():
+    provider = FakeCredentialProvider(delay=0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = Path(tmp, "mlruns").as_uri()
+        clients = [
+            TowninMLflowClient(uri, customer_id=f"c{i}", credential_provider=provider)
+            for i in range(3)
+        ]
+    manager = get_token_manager(provider)
+    try:
+        assert all(c.token_manager is manager for c in clients)
+        assert provider.calls == 1, provider.calls
+    finally:
+        manager.stop()
+
+
+# ----------------------------------------------------------------------------
+# 명시적 Run과 ContextVar
+# ----------------------------------------------------------------------------
+
+def _evaluate_tenants(client: TowninMLflowClient, customers):
+    def evaluate(customer_id):
+        tenant = client.for_customer(customer_id)
+        assert TowninMLflowClient.current_run() is None
+        with tenant.start_tracked_run("tenant_eval", run_name=customer_id) as run:
+            assert TowninMLflowClient.current_run() is run
+            for step in range(5):
+                run.log_metric("score", int(customer_id[1:]) + step / 10, step=step)
+            run.set_tag("owner", customer_id)
+        assert TowninMLflowClient.current_run() is None
+        return run.run_id
+
+    # 파일 저장소는 동시 실험 생성 중 meta.yaml이 없는 디렉토리를 읽으므로 미리 생성
+    for customer_id in customers:
+        client.for_customer(customer_id).create_experiment("tenant_eval")
+
+    with ThreadPoolExecutor(4) as pool:
+        return dict(zip(customers, pool.map(evaluate, customers)))
+
+
+def _check_tenant_runs(client: TowninMLflowClient, run_ids):
+    for customer_id, run_id in run_ids.items():
+        run = client.mlflow_client.get_run(run_id)
+        assert run.info.status == "FINISHED", run.info.status
+        assert run.data.tags["customer_id"] == customer_id
+        assert run.data.tags["owner"] == customer_id
+        history = client.mlflow_client.get_metric_history(run_id, "score")
+        assert sorted(m.value for m in history) == [int(customer_id[1:]) + s / 10 for s in range(5)]
+
+
+def test_tracked_runs_are_isolated_per_thread():
+    customers = [f"c{i}" for i in range(8)]
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        run_ids = _evaluate_tenants(client, customers)
+        assert mlflow.active_run() is None  # 전역 fluent 상태는 건드리지 않음
+        _check_tenant_runs(client, run_ids)
+
+
+def test_tracked_runs_with_async_logging():
+    customers = [f"c{i}" for i in range(4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp, async_logging=True)
+        try:
+            run_ids = _evaluate_tenants(client, customers)
+            _check_tenant_runs(client, run_ids)
+            assert client.logging_stats()["dropped"] == 0
+        finally:
+            client.close()
+
+
+def test_failed_block_marks_run_failed():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        try:
+            with client.start_tracked_run("tenant_eval") as run:
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        assert TowninMLflowClient.current_run() is None
+        assert client.mlflow_client.get_run(run.run_id).info.status == "FAILED"
+
+
+# ----------------------------------------------------------------------------
+# 비동기 배치 로깅
+# ----------------------------------------------------------------------------
+
+class _FakeBatchClient:
+    """log_batch 호출을 기록하고 처음 fail_times번은 실패하는 MlflowClient 대역"""
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.batches = []
+
+    def log_batch(self, run_id, metrics=(), params=(), tags=()):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("tracking server unavailable")
+        self.batches.append((run_id, list(metrics), list(params), list(tags)))
+
+
+def _batch_logger(client, **kwargs) -> BatchMetricLogger:
+    # 워커가 스스로 플러시하지 않도록 간격을 길게 잡음
+    kwargs.setdefault("flush_interval", 60.0)
+    return BatchMetricLogger(client, **kwargs)
+
+
+def test_batch_flush_groups_runs_and_counts():
+    client = _FakeBatchClient()
+    batch_logger = _batch_logger(client)
+    try:
+        for step in range(1500):
+            batch_logger.log_metric("r1", "loss", step / 10, step=step)
+        batch_logger.log_param("r1", "lr", 0.1)
+        batch_logger.log_param("r1", "lr", 0.2)
+        batch_logger.set_tag("r2", "stage", "eval")
+        assert batch_logger.flush() == 1502
+    finally:
+        batch_logger.close()
+    # 요청당 메트릭 1000개 한도로 분할, 같은 파라미터 키는 마지막 값만
+    assert [(r, len(m)) for r, m, _, _ in client.batches] == [("r1", 1000), ("r1", 500), ("r2", 0)]
+    assert [p.value for _, _, params, _ in client.batches for p in params] == ["0.2"]
+    stats = batch_logger.stats()
+    assert stats["queued"] == 1503 and stats["flushed"] == 1502, stats
+    assert stats["batches"] == 3 and stats["dropped"] == 0 and stats["pending"] == 0, stats
+
+
+def test_batch_retries_failed_sends():
+    client = _FakeBatchClient(fail_times=2)
+    batch_logger = _batch_logger(client, max_retries=3)
+    try:
+        batch_logger.log_metric("r1", "loss", 1.0)
+        assert batch_logger.flush() == 0
+        assert batch_logger.stats()["pending"] == 1  # 큐 앞에 되돌림
+        assert batch_logger.flush() == 0
+        assert batch_logger.flush() == 1
+    finally:
+        batch_logger.close()
+    stats = batch_logger.stats()
+    assert stats["errors"] == 2 and stats["retried"] == 2, stats
+    assert stats["flushed"] == 1 and stats["dropped"] == 0, stats
+
+
+def test_batch_drops_after_max_retries():
+    client = _FakeBatchClient(fail_times=10)
+    batch_logger = _batch_logger(client, max_retries=1)
+    batch_logger.log_metric("r1", "loss", 1.0)
+    batch_logger.close()
+    stats = batch_logger.stats()
+    assert stats["errors"] == 2 and stats["dropped"] == 1 and stats["pending"] == 0, stats
+    assert client.batches == []
+
+
+def test_batch_queue_limit_counts_dropped():
+    batch_logger = _batch_logger(_FakeBatchClient(), max_queue_size=2)
+    try:
+        for i in range(5):
+            batch_logger.log_metric("r1", "loss", i)
+        assert batch_logger.stats()["dropped"] == 3
+    finally:
+        batch_logger.close()
+    batch_logger.log_metric("r1", "loss", 9.0)  # close() 뒤의 기록도 dropped
+    assert batch_logger.stats()["dropped"] == 4
+
+
+def test_abandoned_logger_flushed_at_exit():
+    client = _FakeBatchClient()
+    batch_logger = _batch_logger(client)
+    batch_logger.log_metric("r1", "loss", 1.0)
+    worker = batch_logger._worker
+    del batch_logger
+    gc.collect()
+    # close() 없이 버려져도 레지스트리가 잡고 있다가 종료 훅에서 플러시
+    townin_mlflow_client._close_open_batch_loggers()
+    assert [(r, len(m)) for r, m, _, _ in client.batches] == [("r1", 1)]
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert not townin_mlflow_client._open_batch_loggers
+
+
+# ----------------------------------------------------------------------------
+# 오프라인 스풀
+# ----------------------------------------------------------------------------
+
+def test_spool_routes_fluent_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp, spool_path=str(Path(tmp, "spool.db")))
+        note = Path(tmp, "note.txt")
+        note.write_text("spooled")
+        with client.start_run("spooled", run_name="offline") as run:
+            assert TowninMLflowClient.current_run() is run
+            client.log_param("chunk_size", 512)
+            client.log_metrics({"faithfulness": 0.9, "recall": 0.8}, step=1)
+            client.log_metric("faithfulness", 0.95, step=2)
+            client.set_tag("stage", "offline")
+            client.log_artifact(str(note))
+        client.close()
+
+        # 기록 중에는 서버에 실험도 Run도 생기지 않음
+        full_name = client._get_experiment_name("spooled")
+        assert client.mlflow_client.get_experiment_by_name(full_name) is None
+        assert mlflow.active_run() is None
+
+        stats = replay_spool(client.spool)
+        assert stats["runs_created"] == 1 and stats["runs_finished"] == 1, stats
+        remote_run_id = client.spool.conn.execute("SELECT remote_run_id FROM runs").fetchone()[0]
+        remote = client.mlflow_client.get_run(remote_run_id)
+        assert remote.data.params["chunk_size"] == "512"
+        assert remote.data.tags["stage"] == "offline"
+        assert len(client.mlflow_client.get_metric_history(remote_run_id, "faithfulness")) == 2
+        assert [a.path for a in client.mlflow_client.list_artifacts(remote_run_id)] == ["note.txt"]
+        client.spool.close()
+
+
+def test_spool_replay_skips_duplicates_after_crash():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp, spool_path=str(Path(tmp, "spool.db")))
+        spool = client.spool
+        with client.start_tracked_run("spooled") as run:
+            for step in range(10):
+                run.log_metric("loss", 1.0 / (step + 1), step=step)
+
+        # log_batch 성공 직후 replayed 기록 전에 중단된 상황
+        def crash(seqs):
+            raise KeyboardInterrupt
+
+        spool.mark_replayed = crash
+        try:
+            replay_spool(spool)
+        except KeyboardInterrupt:
+            pass
+        del spool.mark_replayed
+        assert spool.stats()["pending_records"] == 10
+
+        replay_spool(spool)
+        remote_run_id = spool.conn.execute("SELECT remote_run_id FROM runs").fetchone()[0]
+        history = client.mlflow_client.get_metric_history(remote_run_id, "loss")
+        assert len(history) == 10, len(history)
+        assert spool.stats() == {"pending_runs": 0, "pending_records": 0}
+        spool.close()
+
+
+def _committed_records(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_spool_commits_pending_records_at_exit():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "spool.db")
+        spool = OfflineSpool(str(path), commit_every=1000, commit_interval=3600)
+        local_id = spool.create_run("uri", "exp", "test")
+        spool.append(local_id, "metric", "loss", 0.5, step=1)
+        assert _committed_records(path) == 0  # commit_interval 안쪽: 아직 미커밋
+
+        # close()/end_run() 없이 종료되는 상황
+        townin_mlflow_client._close_open_spools()
+        assert _committed_records(path) == 1
+        assert spool not in townin_mlflow_client._open_spools
+        spool.close()  # 두 번 닫아도 무해
+
+
+# ----------------------------------------------------------------------------
+# 병렬 아티팩트 업로드
+# ----------------------------------------------------------------------------
+
+def _write_results(root: Path):
+    payload = json.dumps({"rows": list(range(1000))})
+    (root / "nested").mkdir(parents=True)
+    (root / "results.json").write_text(payload)
+    (root / "nested" / "copy.json").write_text(payload)
+    (root / "notes.txt").write_text("notes")
+
+
+def _artifact_paths(client: TowninMLflowClient, run_id: str, path: str = None):
+    paths = []
+    for artifact in client.mlflow_client.list_artifacts(run_id, path):
+        paths.extend(_artifact_paths(client, run_id, artifact.path) if artifact.is_dir else [artifact.path])
+    return sorted(paths)
+
+
+def test_uploader_default_uploads_everything():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        _write_results(Path(tmp, "out"))
+        with client.start_tracked_run("artifacts") as run:
+            stats = run.log_artifacts(str(Path(tmp, "out")), "eval")
+        assert stats["files"] == 3 and stats["skipped"] == 0, stats
+        assert _artifact_paths(client, run.run_id) == [
+            "eval/nested/copy.json", "eval/notes.txt", "eval/results.json"
+        ]
+
+
+def test_uploader_records_compressed_paths():
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp, "index.json")
+        client = _client(tmp)
+        client.artifact_uploader = ArtifactUploader(
+            client.mlflow_client, dedup="run", compress_json=True, compress_min_bytes=0, index_path=str(index_path)
+        )
+        _write_results(Path(tmp, "out"))
+        with client.start_tracked_run("artifacts") as run:
+            stats = run.log_artifacts(str(Path(tmp, "out")), "eval")
+            again = run.log_artifacts(str(Path(tmp, "out")), "eval")
+
+        assert stats["files"] == 2 and stats["skipped"] == 1 and stats["compressed"] == 1, stats
+        assert again["files"] == 0 and again["skipped"] == 3, again
+        uploaded = _artifact_paths(client, run.run_id)
+        assert uploaded == ["eval/_dedup_manifest.json", "eval/notes.txt", "eval/results.json.gz"], uploaded
+
+        # 인덱스와 매니페스트가 가리키는 경로는 모두 실제로 업로드된 파일
+        index = json.loads(index_path.read_text())
+        manifest_file = client.mlflow_client.download_artifacts(run.run_id, "eval/_dedup_manifest.json", tmp)
+        manifest = json.loads(Path(manifest_file).read_text())
+        for location in list(index.values()) + list(manifest.values()):
+            run_id, artifact = location.split("/", 1)
+            assert run_id == run.run_id and artifact in uploaded, location
+        assert manifest["nested/copy.json"] == f"{run.run_id}/eval/results.json.gz"
+
+        compressed = client.mlflow_client.download_artifacts(run.run_id, "eval/results.json.gz", tmp)
+        with gzip.open(compressed, "rt") as f:
+            assert json.load(f) == {"rows": list(range(1000))}
+
+
+# ----------------------------------------------------------------------------
+# Run 캐시 동기화
+# ----------------------------------------------------------------------------
+
+def test_sync_run_cache_does_not_create_experiments():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        cache = RunCache(str(Path(tmp, "runs.db")))
+        assert client.sync_run_cache("missing", cache) == 0
+        assert client.mlflow_client.get_experiment_by_name(client._get_experiment_name("missing")) is None
+        cache.close()
+
+
+def test_sync_run_cache_removes_deleted_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        cache = RunCache(str(Path(tmp, "runs.db")))
+        run_ids = []
+        for i in range(3):
+            with client.start_tracked_run("synced") as run:
+                run.log_metric("accuracy", i / 10)
+            run_ids.append(run.run_id)
+        experiment_id = client.create_experiment("synced")
+
+        assert client.sync_run_cache("synced", cache) == 3
+        assert cache.run_ids(experiment_id) == set(run_ids)
+
+        # 증분 동기화: 실험은 한 번만 조회하고 삭제된 Run은 캐시에서 제거
+        lookups = []
+        get_experiment_by_name = client.mlflow_client.get_experiment_by_name
+
+        def counting_lookup(name):
+            lookups.append(name)
+            return get_experiment_by_name(name)
+
+        client.mlflow_client.get_experiment_by_name = counting_lookup
+        client.mlflow_client.delete_run(run_ids[0])
+        client.sync_run_cache("synced", cache)
+        assert len(lookups) == 1, lookups
+        assert cache.run_ids(experiment_id) == set(run_ids[1:])
+
+        # gc로 서버에서 완전히 사라진 Run은 full 동기화에서 제거
+        cache.conn.execute(
+            "INSERT INTO runs SELECT 'purged', experiment_id, run_name, status, start_time, end_time, "
+            "metrics, params, tags FROM runs WHERE run_id = ?", (run_ids[1],)
+        )
+        cache.conn.commit()
+        client.sync_run_cache("synced", cache)
+        assert "purged" in cache.run_ids(experiment_id)
+        client.sync_run_cache("synced", cache, full=True)
+        assert cache.run_ids(experiment_id) == set(run_ids[1:])
+        cache.close()
+
+
+# ----------------------------------------------------------------------------
+# 대량 비용 집계
+# ----------------------------------------------------------------------------
+
+BULK_MODELS = ["claude-3-5-sonnet-20241022", "gpt-4o", "mystery-model", "claude-3-5-sonnet-20241022"]
+BULK_INPUT = [1200, 800, 500, 300]
+BULK_OUTPUT = [400, 200, 100, 50]
+BULK_TIMESTAMPS = [0, 1800, 3600, 3700]  # 두 시간 버킷에 걸침
+BULK_TENANTS = ["a", "a", "b", "b"]
+
+
+def test_bulk_costs_match_scalar_costs():
+    costs, unknown = CostTracker.bulk_costs(BULK_MODELS, BULK_INPUT, BULK_OUTPUT)
+    assert unknown == {"mystery-model": 1}, unknown
+    for model, cost, inp, out in zip(BULK_MODELS, costs, BULK_INPUT, BULK_OUTPUT):
+        if model == "mystery-model":
+            assert cost != cost  # NaN: 미등록 모델은 비용 합계에서 제외
+        else:
+            assert round(float(cost), 6) == CostTracker.calculate_cost(model, inp, out)
+
+
+def test_aggregate_usage_reports_unknown_models():
+    summary = CostTracker.aggregate_usage(
+        BULK_MODELS, BULK_INPUT, BULK_OUTPUT, timestamps=BULK_TIMESTAMPS, tenants=BULK_TENANTS
+    )
+    expected_total = sum(
+        CostTracker.calculate_cost(m, i, o)
+        for m, i, o in zip(BULK_MODELS, BULK_INPUT, BULK_OUTPUT) if m != "mystery-model"
+    )
+    assert summary["calls"] == 4
+    assert summary["unknown_models"] == {"mystery-model": 1}
+    assert abs(summary["total_cost_usd"] - expected_total) < 1e-6, summary["total_cost_usd"]
+
+    rows = {(r["model"], r["tenant"], r["bucket_start"]): r for r in summary["rows"]}
+    assert len(rows) == 4, sorted(rows)
+    assert rows[("mystery-model", "b", 3600)]["cost_usd"] is None
+    assert rows[("claude-3-5-sonnet-20241022", "a", 0)]["input_tokens"] == 1200
+    assert rows[("claude-3-5-sonnet-20241022", "b", 3600)]["calls"] == 1
+
+
+def test_log_bulk_usage_to_local_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        with client.start_run("bulk_usage") as run:
+            summary = CostTracker.log_bulk_usage(
+                client, BULK_MODELS, BULK_INPUT, BULK_OUTPUT, timestamps=BULK_TIMESTAMPS, tenants=BULK_TENANTS
+            )
+        data = client.mlflow_client.get_run(run.info.run_id).data
+        assert data.tags["llm_unknown_models"] == "mystery-model"
+        assert data.metrics["llm_unknown_model_calls"] == 1
+        assert data.metrics["llm_bulk_cost_usd"] == summary["total_cost_usd"]
+        assert "usage/b/mystery-model/cost_usd" not in data.metrics
+        assert data.metrics["usage/b/mystery-model/calls"] == 1
+
+        history = client.mlflow_client.get_metric_history(run.info.run_id, "usage/a/gpt-4o/calls")
+        assert [(m.step, m.timestamp) for m in history] == [(0, 0)]
+
+
+def test_log_bulk_usage_to_spool():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp, spool_path=str(Path(tmp, "spool.db")))
+        with client.start_run("bulk_usage"):
+            CostTracker.log_bulk_usage(client, BULK_MODELS, BULK_INPUT, BULK_OUTPUT, tenants=BULK_TENANTS)
+        replay_spool(client.spool)
+        remote_run_id = client.spool.conn.execute("SELECT remote_run_id FROM runs").fetchone()[0]
+        data = client.mlflow_client.get_run(remote_run_id).data
+        assert data.tags["llm_unknown_models"] == "mystery-model"
+        assert data.metrics["usage/a/claude-3-5-sonnet-20241022/calls"] == 1
+        client.spool.close()
+
+
+TESTS = [
+    test_experiment_cache_resolves_once,
+    test_experiment_cache_single_flight,
+    test_experiment_cache_invalidate,
+    test_token_single_flight,
+    test_token_refreshes_near_expiry,
+    test_client_shares_token_manager,
+    test_tracked_runs_are_isolated_per_thread,
+    test_tracked_runs_with_async_logging,
+    test_failed_block_marks_run_failed,
+    test_batch_flush_groups_runs_and_counts,
+    test_batch_retries_failed_sends,
+    test_batch_drops_after_max_retries,
+    test_batch_queue_limit_counts_dropped,
+    test_abandoned_logger_flushed_at_exit,
+    test_spool_routes_fluent_calls,
+    test_spool_replay_skips_duplicates_after_crash,
+    test_spool_commits_pending_records_at_exit,
+    test_uploader_default_uploads_everything,
+    test_uploader_records_compressed_paths,
+    test_sync_run_cache_does_not_create_experiments,
+    test_sync_run_cache_removes_deleted_runs,
+    test_bulk_costs_match_scalar_costs,
+    test_aggregate_usage_reports_unknown_models,
+    test_log_bulk_usage_to_local_store,
+    test_log_bulk_usage_to_spool,
+]
+
+
+def main():
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
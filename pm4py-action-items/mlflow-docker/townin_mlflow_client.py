@@ -25,41 +25,1394 @@ Townin MLflow Client - Production SaaS
 """
 
 import os
+import gzip
+import json
+import hashlib
+import tempfile
+import time
+import uuid
+import shutil
+import sqlite3
+import atexit
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
 import mlflow
-from mlflow.entities import Metric, Param
-from typing import Optional, Dict, Any, List
+from mlflow import MlflowClient
+from mlflow.entities import Metric, Param, RunTag, ViewType
+from mlflow.exceptions import MlflowException
+from typing import Optional, Dict, Any, List, Tuple, Callable, Union, Iterable, Iterator
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import google.auth
 from google.auth.transport.requests import Request
 
+from llm_pricing import PRICING as LLM_PRICING
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+# 비동기 배치 로깅
+# ============================================================================
+
+# 아직 닫히지 않은 로거: close() 전까지 강하게 참조해 프로세스 종료 시 남은 항목을 플러시
+_open_batch_loggers: "set[BatchMetricLogger]" = set()
+_open_batch_loggers_lock = threading.Lock()
+
+
+def _close_open_batch_loggers():
+    with _open_batch_loggers_lock:
+        batch_loggers = list(_open_batch_loggers)
+    for batch_logger in batch_loggers:
+        batch_logger.close()
+
+
+atexit.register(_close_open_batch_loggers)
+
+
+class BatchMetricLogger:
+    """
+    메트릭/파라미터/태그를 메모리에 버퍼링하고 MLflow batch API로 일괄 전송
+
+    log_* 호출은 큐에 넣기만 하고 즉시 반환합니다. 워커 스레드가 크기
+    (max_batch_size) 또는 시간(flush_interval) 기준으로 `log_batch`를
+    호출하며, Run 종료 및 프로세스 종료 시 남은 항목을 반드시 플러시합니다.
+    전송에 실패한 배치는 큐 앞에 다시 넣어 최대 max_retries번 재시도한 뒤에만
+    dropped로 집계합니다.
+
+    열린 로거는 close() 전까지 모듈 레지스트리가 참조하므로, close() 없이
+    버려진 로거도 프로세스 종료 훅에서 닫히며 남은 항목이 전송됩니다.
+    """
+
+    # MLflow log_batch 요청당 한도
+    MAX_METRICS_PER_BATCH = 1000
+    MAX_PARAMS_PER_BATCH = 100
+    MAX_TAGS_PER_BATCH = 100
+    MAX_ENTITIES_PER_BATCH = 1000
+
+    def __init__(
+        self,
+        client: MlflowClient,
+        flush_interval: float = 5.0,
+        max_batch_size: int = 1000,
+        max_queue_size: int = 100_000,
+        max_retries: int = 3
+    ):
+        """
+        Args:
+            client: 전송에 사용할 MlflowClient
+            flush_interval: 주기 플러시 간격 (초)
+            max_batch_size: 이 개수만큼 쌓이면 즉시 플러시
+            max_queue_size: 버퍼 최대 크기 (초과 항목은 dropped로 집계)
+            max_retries: 실패한 배치의 재전송 횟수 (이후 dropped로 집계)
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+
+        # (run_id, kind, entity, 실패 횟수)
+        self._queue: List[Tuple[str, str, Any, int]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stats = {"queued": 0, "flushed": 0, "dropped": 0, "batches": 0, "errors": 0, "retried": 0}
+
+        self._closed = False
+        self._retry_pending = False  # 직전 플러시 실패: 다음 전송은 flush_interval 뒤에
+        self._worker = threading.Thread(
+            target=self._run, name="mlflow-batch-logger", daemon=True
+        )
+        with _open_batch_loggers_lock:
+            _open_batch_loggers.add(self)
+        self._worker.start()
+
+    def _enqueue(self, run_id: str, kind: str, entity: Any):
+        with self._cond:
+            if self._closed or len(self._queue) >= self.max_queue_size:
+                self._stats["dropped"] += 1
+                return
+            self._queue.append((run_id, kind, entity, 0))
+            self._stats["queued"] += 1
+            if len(self._queue) >= self.max_batch_size:
+                self._cond.notify()
+
+    def log_metric(self, run_id: str, key: str, value: float, step: Optional[int] = None,
+                   timestamp: Optional[int] = None):
+        self._enqueue(run_id, "metric", Metric(key, float(value), timestamp or int(time.time() * 1000), step or 0))
+
+    def log_param(self, run_id: str, key: str, value: Any):
+        self._enqueue(run_id, "param", Param(key, str(value)))
+
+    def set_tag(self, run_id: str, key: str, value: Any):
+        self._enqueue(run_id, "tag", RunTag(key, str(value)))
+
+    def _run(self):
+        """워커 루프: 크기/시간 기준으로 플러시, close() 후 한 번 더 플러시하고 종료"""
+        while True:
+            with self._cond:
+                if not self._closed and (len(self._queue) < self.max_batch_size or self._retry_pending):
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:  # 워커는 전송 오류로 종료되지 않음
+                logger.warning(f"배치 로깅 플러시 실패: {e}")
+            if closed:
+                return
+
+    def _batches(self, items: List[Tuple[str, str, Any, int]]):
+        """run_id별로 묶고 MLflow 요청당 한도에 맞게 분할 (원본 항목 포함)"""
+        by_run: Dict[str, List[Tuple[str, str, Any, int]]] = {}
+        for item in items:
+            by_run.setdefault(item[0], []).append(item)
+
+        for run_id, entries in by_run.items():
+            metrics, params, tags, batch = [], {}, {}, []
+            for item in entries:
+                _, kind, entity, _ = item
+                full = (
+                    len(metrics) + len(params) + len(tags) >= self.MAX_ENTITIES_PER_BATCH
+                    or (kind == "metric" and len(metrics) >= self.MAX_METRICS_PER_BATCH)
+                    or (kind == "param" and len(params) >= self.MAX_PARAMS_PER_BATCH)
+                    or (kind == "tag" and len(tags) >= self.MAX_TAGS_PER_BATCH)
+                )
+                if full:
+                    yield run_id, metrics, list(params.values()), list(tags.values()), batch
+                    metrics, params, tags, batch = [], {}, {}, []
+                batch.append(item)
+                if kind == "metric":
+                    metrics.append(entity)
+                elif kind == "param":
+                    # 같은 키는 마지막 값만 전송 (배치 내 중복 키는 서버 오류)
+                    params[entity.key] = entity
+                else:
+                    tags[entity.key] = entity
+            if batch:
+                yield run_id, metrics, list(params.values()), list(tags.values()), batch
+
+    def flush(self) -> int:
+        """
+        버퍼의 모든 항목을 전송 (호출 스레드에서 동기 실행)
+
+        실패한 배치는 실패 횟수를 올려 큐 앞에 되돌리고, max_retries를
+        넘긴 항목만 dropped로 집계합니다.
+
+        Returns:
+            전송된 항목 수
+        """
+        with self._flush_lock:
+            with self._cond:
+                items, self._queue = self._queue, []
+            sent = 0
+            retry: List[Tuple[str, str, Any, int]] = []
+            for run_id, metrics, params, tags, batch in self._batches(items):
+                count = len(metrics) + len(params) + len(tags)
+                try:
+                    self.client.log_batch(run_id, metrics=metrics, params=params, tags=tags)
+                except Exception as e:
+                    again = [(r, k, ent, n + 1) for r, k, ent, n in batch if n < self.max_retries]
+                    lost = len(batch) - len(again)
+                    retry.extend(again)
+                    with self._cond:
+                        self._stats["errors"] += 1
+                        self._stats["retried"] += len(again)
+                        self._stats["dropped"] += lost
+                    logger.warning(f"log_batch 실패 (run {run_id}, 재시도 {len(again)}개, 손실 {lost}개): {e}")
+                    continue
+                sent += count
+                with self._cond:
+                    self._stats["flushed"] += count
+                    self._stats["batches"] += 1
+            with self._cond:
+                self._queue[:0] = retry
+                self._retry_pending = bool(retry)
+            return sent
+
+    def stats(self) -> Dict[str, int]:
+        """queued / flushed / dropped / batches / errors / retried 카운터와 현재 대기 수"""
+        with self._cond:
+            return {**self._stats, "pending": len(self._queue)}
+
+    def close(self):
+        """워커 종료 후 남은 항목 플러시 (실패 항목은 재시도 한도까지 다시 전송)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not threading.current_thread():
+            self._worker.join(timeout=self.flush_interval + 5)
+        with _open_batch_loggers_lock:
+            _open_batch_loggers.discard(self)
+        # 플러시마다 실패 횟수가 오르므로 max_retries + 1번이면 큐가 비워짐
+        for _ in range(self.max_retries + 1):
+            self.flush()
+            with self._cond:
+                if not self._queue:
+                    return
+
+
+class _FlushingRun:
+    """ActiveRun 래퍼: with 블록 종료 시 Run을 닫기 전에 버퍼를 플러시"""
+
+    def __init__(self, active_run, batch_logger: BatchMetricLogger):
+        self._active_run = active_run
+        self._batch_logger = batch_logger
+
+    def __getattr__(self, name):
+        return getattr(self._active_run, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._batch_logger.flush()
+        return self._active_run.__exit__(exc_type, exc_val, exc_tb)
+
+
+# ============================================================================
+# 실험 ID 캐시
+# ============================================================================
+
+class ExperimentCache:
+    """
+    (tracking URI, 네임스페이스 실험 이름) -> experiment_id TTL 캐시
+
+    프로세스 내 모든 클라이언트 인스턴스가 공유합니다. 키별 잠금으로 같은
+    실험을 동시에 조회/생성하는 스레드는 서버에 한 번만 요청합니다.
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0):
+        """
+        Args:
+            ttl_seconds: 캐시 항목 유효 시간 (초)
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        return None
+
+    def get_or_create(
+        self,
+        tracking_uri: str,
+        name: str,
+        resolve: Callable[[], Optional[str]],
+        create: Callable[[], str]
+    ) -> str:
+        """
+        캐시된 실험 ID 반환, 없거나 만료되면 조회 후 필요 시 생성
+
+        Args:
+            tracking_uri: MLflow 서버 URL
+            name: 네임스페이스가 적용된 실험 이름
+            resolve: 서버에서 실험 ID 조회 (없으면 None)
+            create: 실험 생성 후 ID 반환
+
+        Returns:
+            실험 ID
+        """
+        key = (tracking_uri, name)
+        with self._lock:
+            experiment_id = self._fresh(key)
+            if experiment_id:
+                return experiment_id
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 대기 중 다른 스레드가 채웠을 수 있음
+            with self._lock:
+                experiment_id = self._fresh(key)
+                if experiment_id:
+                    return experiment_id
+                self.misses += 1
+
+            experiment_id = resolve() or create()
+            with self._lock:
+                self._entries[key] = (experiment_id, time.monotonic() + self.ttl_seconds)
+            return experiment_id
+
+    def invalidate(self, tracking_uri: Optional[str] = None, name: Optional[str] = None):
+        """항목 제거 (인자 없으면 전체)"""
+        with self._lock:
+            for key in list(self._entries):
+                if (tracking_uri is None or key[0] == tracking_uri) and (name is None or key[1] == name):
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+_experiment_cache = ExperimentCache()
+
+
+# ============================================================================
+# 토큰 갱신
+# ============================================================================
+
+# (token, 만료 시각 epoch 초 또는 None)을 반환하는 자격 증명 공급자
+CredentialProvider = Callable[[], Tuple[str, Optional[float]]]
+
+
+def google_credential_provider() -> CredentialProvider:
+    """Google Cloud ADC 기반 공급자 (호출 시마다 토큰 갱신)"""
+    credentials, _ = google.auth.default()
+
+    def provide() -> Tuple[str, Optional[float]]:
+        credentials.refresh(Request())
+        expiry = credentials.expiry
+        # google-auth의 expiry는 naive UTC datetime
+        return credentials.token, expiry.replace(tzinfo=timezone.utc).timestamp() if expiry else None
+
+    return provide
+
+
+class TokenRefreshManager:
+    """
+    MLFLOW_TRACKING_TOKEN을 만료 전에 백그라운드에서 갱신
+
+    공급자별로 프로세스에 하나만 생성되어(get_token_manager) 모든 클라이언트
+    인스턴스가 공유합니다. 갱신은 잠금 + 재확인으로 한 번만 수행되므로 여러
+    스레드가 동시에 만료를 감지해도 공급자 호출은 한 번입니다.
+    """
+
+    def __init__(
+        self,
+        provider: CredentialProvider,
+        refresh_margin: float = 300.0,
+        default_lifetime: float = 3600.0,
+        retry_interval: float = 30.0,
+        env_var: str = "MLFLOW_TRACKING_TOKEN"
+    ):
+        """
+        Args:
+            provider: 자격 증명 공급자
+            refresh_margin: 만료 몇 초 전에 갱신할지
+            default_lifetime: 공급자가 만료 시각을 주지 않을 때 가정하는 수명 (초)
+            retry_interval: 갱신 실패 시 재시도 간격 (초)
+            env_var: 토큰을 기록할 환경 변수 (MLflow가 요청마다 읽음)
+        """
+        self.provider = provider
+        self.refresh_margin = refresh_margin
+        self.default_lifetime = default_lifetime
+        self.retry_interval = retry_interval
+        self.env_var = env_var
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+
+    def _needs_refresh(self) -> bool:
+        return self._token is None or time.time() >= self._expires_at - self.refresh_margin
+
+    def refresh(self, force: bool = False) -> str:
+        """
+        토큰 갱신 (이미 다른 스레드가 갱신했으면 그 결과 사용)
+
+        Returns:
+            유효한 토큰
+        """
+        with self._lock:
+            if not force and not self._needs_refresh():
+                return self._token
+            try:
+                token, expires_at = self.provider()
+            except Exception:
+                self.failure_count += 1
+                raise
+            self._token = token
+            self._expires_at = expires_at or time.time() + self.default_lifetime
+            self.refresh_count += 1
+            os.environ[self.env_var] = token
+            logger.info(f"MLflow 토큰 갱신 완료 (만료까지 {self._expires_at - time.time():.0f}초)")
+            return token
+
+    def token(self) -> str:
+        """유효한 토큰 반환 (만료 임박 시에만 잠금 후 갱신)"""
+        if self._needs_refresh():
+            return self.refresh()
+        return self._token
+
+    def start(self):
+        """최초 토큰 발급 후 백그라운드 갱신 스레드 시작 (중복 호출 무시)"""
+        self.token()
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="mlflow-token-refresh", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        delay = max(self._expires_at - self.refresh_margin - time.time(), 0.0)
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+                delay = max(self._expires_at - self.refresh_margin - time.time(), 1.0)
+            except Exception as e:  # 실패해도 기존 토큰은 만료 전까지 유효
+                logger.warning(f"토큰 갱신 실패, {self.retry_interval:.0f}초 후 재시도: {e}")
+                delay = self.retry_interval
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+
+
+_token_managers: Dict[Any, TokenRefreshManager] = {}
+_token_managers_lock = threading.Lock()
+
+
+def get_token_manager(provider: Optional[CredentialProvider] = None, **kwargs) -> TokenRefreshManager:
+    """
+    공급자별 프로세스 공유 TokenRefreshManager
+
+    Args:
+        provider: 자격 증명 공급자 (None이면 Google Cloud ADC)
+        **kwargs: 최초 생성 시 TokenRefreshManager 인자
+    """
+    key = provider or "google"
+    with _token_managers_lock:
+        manager = _token_managers.get(key)
+        if manager is None:
+            manager = TokenRefreshManager(provider or google_credential_provider(), **kwargs)
+            _token_managers[key] = manager
+        return manager
+
+
+# ============================================================================
+# 병렬 아티팩트 업로드
+# ============================================================================
+
+class ArtifactUploader:
+    """
+    디렉토리 아티팩트를 스레드 풀로 병렬 업로드
+
+    - 내용 해시(sha256) 기반 중복 제거 (선택): 같은 Run(dedup="run") 또는 같은
+      실험(dedup="experiment")에 이미 올린 내용은 건너뛰고, 건너뛴 파일의 기존
+      위치(실제 업로드된 경로, 압축 시 .json.gz)를 _dedup_manifest.json 에 기록.
+      기본값 "none"은 log_artifacts와 같이 모든 파일을 업로드
+    - 선택적으로 큰 JSON 결과 파일을 gzip 압축(.json.gz)하여 업로드
+    - 진행률/처리량 로깅
+
+    파일 단위로 병렬화합니다. 단일 대용량 파일의 분할 업로드는 아티팩트
+    저장소 설정(MLFLOW_ENABLE_MULTIPART_UPLOAD)을 따릅니다.
+    """
+
+    MANIFEST_NAME = "_dedup_manifest.json"
+
+    def __init__(
+        self,
+        client: MlflowClient,
+        max_workers: int = 8,
+        dedup: str = "none",
+        compress_json: bool = False,
+        compress_min_bytes: int = 64 * 1024,
+        index_path: Optional[str] = None,
+        progress_every: int = 50
+    ):
+        """
+        Args:
+            client: 업로드에 사용할 MlflowClient
+            max_workers: 동시 업로드 스레드 수
+            dedup: 중복 제거 범위 ("run" / "experiment" / "none")
+            compress_json: JSON 파일 gzip 압축 여부
+            compress_min_bytes: 이 크기 이상인 JSON만 압축
+            index_path: 업로드된 해시 인덱스를 보존할 JSON 파일 (프로세스 간 중복 제거)
+            progress_every: 이 파일 수마다 진행률 로깅
+        """
+        if dedup not in ("run", "experiment", "none"):
+            raise ValueError(f"dedup은 run / experiment / none 중 하나여야 합니다: {dedup}")
+        self.client = client
+        self.max_workers = max_workers
+        self.dedup = dedup
+        self.compress_json = compress_json
+        self.compress_min_bytes = compress_min_bytes
+        self.index_path = index_path
+        self.progress_every = progress_every
+
+        # "scope_id:sha256" -> "run_id/artifact 경로"
+        self._index: Dict[str, str] = {}
+        self._experiment_ids: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if index_path and os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _scope_id(self, run_id: str) -> str:
+        if self.dedup != "experiment":
+            return run_id
+        if run_id not in self._experiment_ids:
+            self._experiment_ids[run_id] = self.client.get_run(run_id).info.experiment_id
+        return self._experiment_ids[run_id]
+
+    def _should_compress(self, path: str) -> bool:
+        return self.compress_json and path.endswith(".json") and os.path.getsize(path) >= self.compress_min_bytes
+
+    def _compress(self, path: str, tmp_dir: str, rel_path: str) -> str:
+        target = os.path.join(tmp_dir, rel_path + ".gz")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(path, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        return target
+
+    def upload_dir(self, run_id: str, local_dir: str, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        디렉토리 전체를 병렬 업로드
+
+        Args:
+            run_id: 대상 Run ID
+            local_dir: 업로드할 로컬 디렉토리
+            artifact_path: Run 내 아티팩트 하위 경로
+
+        Returns:
+            files / skipped / compressed / bytes / seconds / mb_per_s
+        """
+        start = time.perf_counter()
+        files = []
+        for root, _, names in os.walk(local_dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, local_dir).replace(os.sep, "/")))
+
+        scope_id = self._scope_id(run_id) if self.dedup != "none" else None
+        stats = {"files": 0, "skipped": 0, "compressed": 0, "bytes": 0}
+        manifest: Dict[str, str] = {}
+        done = [0]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool, tempfile.TemporaryDirectory() as tmp_dir:
+            hashes = list(pool.map(self._sha256, [path for path, _ in files])) if scope_id else [None] * len(files)
+
+            uploads, added_keys = [], []
+            with self._lock:
+                for (path, rel_path), digest in zip(files, hashes):
+                    compress = self._should_compress(path)
+                    uploaded_rel = rel_path + ".gz" if compress else rel_path
+                    remote_path = f"{artifact_path}/{uploaded_rel}" if artifact_path else uploaded_rel
+                    if digest:
+                        key = f"{scope_id}:{digest}"
+                        existing = self._index.get(key)
+                        if existing:
+                            manifest[rel_path] = existing
+                            stats["skipped"] += 1
+                            continue
+                        self._index[key] = f"{run_id}/{remote_path}"
+                        added_keys.append(key)
+                    uploads.append((path, rel_path, compress))
+
+            def upload(item):
+                path, rel_path, compress = item
+                if compress:
+                    path = self._compress(path, tmp_dir, rel_path)
+                rel_dir = os.path.dirname(rel_path)
+                target_dir = "/".join(p for p in (artifact_path, rel_dir) if p) or None
+                self.client.log_artifact(run_id, path, artifact_path=target_dir)
+
+                size = os.path.getsize(path)
+                with self._lock:
+                    stats["files"] += 1
+                    stats["compressed"] += int(compress)
+                    stats["bytes"] += size
+                    done[0] += 1
+                    if done[0] % self.progress_every == 0:
+                        elapsed = time.perf_counter() - start
+                        logger.info(
+                            f"아티팩트 업로드 진행: {done[0]}/{len(uploads)} "
+                            f"({stats['bytes'] / 1e6 / max(elapsed, 1e-9):.1f}MB/s)"
+                        )
+
+            try:
+                list(pool.map(upload, uploads))
+            except Exception:
+                # 실패한 업로드가 인덱스에 남지 않도록 이번 호출분 제거
+                with self._lock:
+                    for key in added_keys:
+                        self._index.pop(key, None)
+                raise
+
+            if manifest:
+                manifest_path = os.path.join(tmp_dir, self.MANIFEST_NAME)
+                with open(manifest_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+                self.client.log_artifact(run_id, manifest_path, artifact_path=artifact_path)
+
+        if self.index_path:
+            with self._lock, open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["mb_per_s"] = round(stats["bytes"] / 1e6 / max(stats["seconds"], 1e-9), 2)
+        logger.info(
+            f"아티팩트 업로드 완료: {stats['files']}개 ({stats['bytes'] / 1e6:.1f}MB, {stats['mb_per_s']}MB/s), "
+            f"중복 건너뜀 {stats['skipped']}개, 압축 {stats['compressed']}개"
+        )
+        return stats
+
+
+# ============================================================================
+# 명시적 Run 핸들 (멀티테넌트 / 스레드 안전)
+# ============================================================================
+
+# 현재 스레드/asyncio 태스크의 RunHandle (with 블록 안에서만 설정)
+_current_run: ContextVar[Optional["RunHandle"]] = ContextVar("townin_mlflow_run", default=None)
+
+
+class RunHandle:
+    """
+    run_id로 직접 로깅하는 Run 핸들
+
+    MLflow fluent API의 전역 상태(tracking URI, 활성 실험/Run)를 사용하지
+    않으므로, 한 프로세스에서 여러 고객/평가 Run을 스레드나 태스크별로
+    동시에 진행해도 서로 간섭하지 않습니다.
+    """
+
+    def __init__(
+        self,
+        client: MlflowClient,
+        run,
+        customer_id: str,
+        batch_logger: Optional[BatchMetricLogger] = None,
+        uploader: Optional[ArtifactUploader] = None
+    ):
+        """
+        Args:
+            client: Run을 생성한 MlflowClient
+            run: MlflowClient.create_run 결과
+            customer_id: Run 소유 고객 ID
+            batch_logger: 지정 시 로깅을 버퍼링하여 일괄 전송
+            uploader: 지정 시 log_artifacts를 병렬 업로드
+        """
+        self.client = client
+        self.run = run
+        self.run_id = run.info.run_id
+        self.customer_id = customer_id
+        self._batch_logger = batch_logger
+        self._uploader = uploader
+        self._context_token = None
+        self.ended = False
+
+    @property
+    def info(self):
+        return self.run.info
+
+    def log_param(self, key: str, value: Any):
+        if self._batch_logger:
+            self._batch_logger.log_param(self.run_id, key, value)
+        else:
+            self.client.log_param(self.run_id, key, value)
+
+    def log_params(self, params: Dict[str, Any]):
+        if self._batch_logger:
+            for key, value in params.items():
+                self._batch_logger.log_param(self.run_id, key, value)
+        elif params:
+            self.client.log_batch(self.run_id, params=[Param(k, str(v)) for k, v in params.items()])
+
+    def log_metric(self, key: str, value: float, step: Optional[int] = None):
+        if self._batch_logger:
+            self._batch_logger.log_metric(self.run_id, key, value, step=step)
+        else:
+            self.client.log_metric(self.run_id, key, value, step=step)
+
+    def log_metrics(self, metrics: Dict[str, float], step: Optional[int] = None):
+        timestamp = int(time.time() * 1000)
+        if self._batch_logger:
+            for key, value in metrics.items():
+                self._batch_logger.log_metric(self.run_id, key, value, step=step, timestamp=timestamp)
+        elif metrics:
+            self.client.log_batch(self.run_id, metrics=[
+                Metric(k, float(v), timestamp, step or 0) for k, v in metrics.items()
+            ])
+
+    def set_tag(self, key: str, value: Any):
+        if self._batch_logger:
+            self._batch_logger.set_tag(self.run_id, key, value)
+        else:
+            self.client.set_tag(self.run_id, key, value)
+
+    def set_tags(self, tags: Dict[str, Any]):
+        if self._batch_logger:
+            for key, value in tags.items():
+                self._batch_logger.set_tag(self.run_id, key, value)
+        elif tags:
+            self.client.log_batch(self.run_id, tags=[RunTag(k, str(v)) for k, v in tags.items()])
+
+    def log_artifact(self, local_path: str, artifact_path: Optional[str] = None):
+        self.client.log_artifact(self.run_id, local_path, artifact_path=artifact_path)
+
+    def log_artifacts(self, local_dir: str, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+        """업로더가 있으면 병렬 업로드 후 통계 반환 (없으면 빈 dict)"""
+        if self._uploader:
+            return self._uploader.upload_dir(self.run_id, local_dir, artifact_path)
+        self.client.log_artifacts(self.run_id, local_dir, artifact_path=artifact_path)
+        return {}
+
+    def end(self, status: str = "FINISHED"):
+        """버퍼 플러시 후 Run 종료 (중복 호출 무시)"""
+        if self.ended:
+            return
+        if self._batch_logger:
+            self._batch_logger.flush()
+        self.client.set_terminated(self.run_id, status=status)
+        self.ended = True
+
+    def __enter__(self):
+        self._context_token = _current_run.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_run.reset(self._context_token)
+        self.end("FAILED" if exc_type else "FINISHED")
+        return False
+
+
+# ============================================================================
+# 오프라인 스풀 / 일괄 재전송
+# ============================================================================
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    local_id TEXT PRIMARY KEY,
+    tracking_uri TEXT NOT NULL,
+    experiment_name TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    run_name TEXT,
+    tags TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER,
+    status TEXT NOT NULL DEFAULT 'RUNNING',
+    remote_run_id TEXT,
+    replayed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    local_run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    step INTEGER NOT NULL DEFAULT 0,
+    timestamp INTEGER NOT NULL,
+    replayed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_records_pending ON records(local_run_id, replayed, seq);
+"""
+
+
+# 아직 닫히지 않은 스풀: 프로세스 종료 시 커밋되지 않은 기록을 커밋
+_open_spools: "set[OfflineSpool]" = set()
+_open_spools_lock = threading.Lock()
+
+
+def _close_open_spools():
+    with _open_spools_lock:
+        spools = list(_open_spools)
+    for spool in spools:
+        spool.close()
+
+
+atexit.register(_close_open_spools)
+
+
+class OfflineSpool:
+    """
+    추적 서버 대신 로컬 SQLite에 append-only로 기록하는 스풀
+
+    log_* 호출은 로컬 INSERT만 수행하고 commit_every건 또는 commit_interval초
+    마다 커밋합니다. close()나 end_run() 없이 프로세스가 끝나도 종료 훅이
+    남은 기록을 커밋합니다. 아티팩트는 기록 시점에 스풀 디렉토리로 복사됩니다.
+    나중에 replay_spool()로 서버에 일괄 전송합니다.
+    """
+
+    def __init__(self, path: str = "mlflow_spool.db", commit_every: int = 1000, commit_interval: float = 1.0):
+        """
+        Args:
+            path: SQLite 파일 경로 (아티팩트는 <path>.artifacts/ 에 복사)
+            commit_every: 이 건수마다 커밋
+            commit_interval: 마지막 커밋 후 이 시간(초)이 지나면 커밋
+        """
+        self.path = path
+        self.artifact_dir = Path(f"{path}.artifacts")
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SPOOL_SCHEMA)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self._closed = False
+        with _open_spools_lock:
+            _open_spools.add(self)
+
+    def _maybe_commit(self):
+        if self._uncommitted >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+            self.conn.commit()
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+
+    def close(self):
+        with _open_spools_lock:
+            _open_spools.discard(self)
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.conn.commit()
+            self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------------
+
+    def create_run(
+        self,
+        tracking_uri: str,
+        experiment_name: str,
+        customer_id: str,
+        run_name: Optional[str] = None,
+        tags: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        로컬 Run 생성
+
+        Returns:
+            로컬 Run ID (재전송 전까지의 식별자)
+        """
+        local_id = uuid.uuid4().hex
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO runs (local_id, tracking_uri, experiment_name, customer_id, run_name, tags, start_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (local_id, tracking_uri, experiment_name, customer_id, run_name,
+                 json.dumps(tags or {}, ensure_ascii=False), int(time.time() * 1000))
+            )
+            self.conn.commit()
+        return local_id
+
+    def append(self, local_run_id: str, kind: str, key: str, value: Any,
+               step: Optional[int] = None, timestamp: Optional[int] = None):
+        """metric / param / tag 한 건 기록"""
+        self.append_many(local_run_id, [(kind, key, value, step, timestamp)])
+
+    def append_many(self, local_run_id: str, entries: List[Tuple[str, str, Any, Optional[int], Optional[int]]]):
+        """(kind, key, value, step, timestamp) 여러 건 기록"""
+        now = int(time.time() * 1000)
+        rows = [
+            (local_run_id, kind, key, str(value), step or 0, timestamp or now)
+            for kind, key, value, step, timestamp in entries
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO records (local_run_id, kind, key, value, step, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._uncommitted += len(rows)
+            self._maybe_commit()
+
+    def add_artifact(self, local_run_id: str, local_path: str, artifact_path: Optional[str] = None):
+        """파일 또는 디렉토리를 스풀로 복사하고 기록 (원본이 바뀌어도 기록 시점 내용 유지)"""
+        source = Path(local_path)
+        target = self.artifact_dir / local_run_id / uuid.uuid4().hex[:8]
+        target.mkdir(parents=True, exist_ok=True)
+        if source.is_dir():
+            stored, kind = target / source.name, "artifact_dir"
+            shutil.copytree(source, stored)
+        else:
+            stored, kind = target / source.name, "artifact"
+            shutil.copy2(source, stored)
+        self.append(local_run_id, kind, artifact_path or "", str(stored))
+
+    def end_run(self, local_run_id: str, status: str = "FINISHED"):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE runs SET status = ?, end_time = ? WHERE local_id = ?",
+                (status, int(time.time() * 1000), local_run_id)
+            )
+            self.conn.commit()
+            self._uncommitted = 0
+
+    # ------------------------------------------------------------------
+    # 재전송용 조회
+    # ------------------------------------------------------------------
+
+    def pending_runs(self) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM runs WHERE replayed = 0 ORDER BY start_time").fetchall()
+
+    def pending_records(self, local_run_id: str, limit: int = 1000) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT * FROM records WHERE local_run_id = ? AND replayed = 0 ORDER BY seq LIMIT ?",
+                (local_run_id, limit)
+            ).fetchall()
+
+    def set_remote_run_id(self, local_run_id: str, remote_run_id: str):
+        with self._lock:
+            self.conn.execute("UPDATE runs SET remote_run_id = ? WHERE local_id = ?", (remote_run_id, local_run_id))
+            self.conn.commit()
+
+    def mark_replayed(self, seqs: List[int]):
+        with self._lock:
+            self.conn.executemany("UPDATE records SET replayed = 1 WHERE seq = ?", [(seq,) for seq in seqs])
+            self.conn.commit()
+
+    def mark_run_replayed(self, local_run_id: str):
+        with self._lock:
+            self.conn.execute("UPDATE runs SET replayed = 1 WHERE local_id = ?", (local_run_id,))
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            runs = self.conn.execute("SELECT COUNT(*) FROM runs WHERE replayed = 0").fetchone()[0]
+            records = self.conn.execute("SELECT COUNT(*) FROM records WHERE replayed = 0").fetchone()[0]
+        return {"pending_runs": runs, "pending_records": records}
+
+
+class SpooledRunHandle:
+    """RunHandle과 같은 인터페이스로 OfflineSpool에 기록하는 Run 핸들"""
+
+    def __init__(self, spool: OfflineSpool, local_run_id: str, customer_id: str):
+        self.spool = spool
+        self.run_id = local_run_id
+        self.customer_id = customer_id
+        self._context_token = None
+        self.ended = False
+
+    def log_param(self, key: str, value: Any):
+        self.spool.append(self.run_id, "param", key, value)
+
+    def log_params(self, params: Dict[str, Any]):
+        self.spool.append_many(self.run_id, [("param", k, v, None, None) for k, v in params.items()])
+
+    def log_metric(self, key: str, value: float, step: Optional[int] = None):
+        self.spool.append(self.run_id, "metric", key, float(value), step=step)
+
+    def log_metrics(self, metrics: Dict[str, float], step: Optional[int] = None):
+        self.spool.append_many(self.run_id, [("metric", k, float(v), step, None) for k, v in metrics.items()])
+
+    def set_tag(self, key: str, value: Any):
+        self.spool.append(self.run_id, "tag", key, value)
+
+    def set_tags(self, tags: Dict[str, Any]):
+        self.spool.append_many(self.run_id, [("tag", k, v, None, None) for k, v in tags.items()])
+
+    def log_artifact(self, local_path: str, artifact_path: Optional[str] = None):
+        self.spool.add_artifact(self.run_id, local_path, artifact_path)
+
+    def log_artifacts(self, local_dir: str, artifact_path: Optional[str] = None):
+        self.spool.add_artifact(self.run_id, local_dir, artifact_path)
+
+    def end(self, status: str = "FINISHED"):
+        if not self.ended:
+            self.spool.end_run(self.run_id, status)
+            self.ended = True
+
+    def __enter__(self):
+        self._context_token = _current_run.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_run.reset(self._context_token)
+        self.end("FAILED" if exc_type else "FINISHED")
+        return False
+
+
+def _logged_metrics(client: MlflowClient, remote_run_id: str, rows: List[sqlite3.Row]) -> set:
+    """rows의 메트릭 키에 대해 서버에 이미 기록된 (key, step, timestamp)"""
+    keys = {row["key"] for row in rows if row["kind"] == "metric"}
+    return {
+        (metric.key, metric.step, metric.timestamp)
+        for key in keys
+        for metric in client.get_metric_history(remote_run_id, key)
+    }
+
+
+def _replay_records(client: MlflowClient, remote_run_id: str, rows: List[sqlite3.Row], spool: OfflineSpool,
+                    logged: Optional[set] = None) -> int:
+    """
+    레코드를 log_batch 한도에 맞게 묶어 전송하고, 성공한 묶음만 replayed 처리
+
+    logged에 있는 (key, step, timestamp) 메트릭은 전송하지 않고 replayed 처리
+    합니다 (log_batch 성공 후 mark_replayed 전에 중단된 묶음의 중복 방지).
+    """
+    sent = 0
+    metrics, params, tags, seqs = [], {}, {}, []
+
+    def flush():
+        nonlocal sent, metrics, params, tags, seqs
+        if seqs:
+            if metrics or params or tags:  # 모두 중복으로 건너뛴 묶음은 전송 생략
+                client.log_batch(remote_run_id, metrics=metrics, params=list(params.values()), tags=list(tags.values()))
+            spool.mark_replayed(seqs)
+            sent += len(seqs)
+        metrics, params, tags, seqs = [], {}, {}, []
+
+    for row in rows:
+        kind = row["kind"]
+        if kind in ("artifact", "artifact_dir"):
+            flush()
+            upload = client.log_artifacts if kind == "artifact_dir" else client.log_artifact
+            upload(remote_run_id, row["value"], artifact_path=row["key"] or None)
+            spool.mark_replayed([row["seq"]])
+            sent += 1
+            continue
+
+        full = (
+            len(seqs) >= BatchMetricLogger.MAX_ENTITIES_PER_BATCH
+            or (kind == "metric" and len(metrics) >= BatchMetricLogger.MAX_METRICS_PER_BATCH)
+            or (kind == "param" and len(params) >= BatchMetricLogger.MAX_PARAMS_PER_BATCH)
+            or (kind == "tag" and len(tags) >= BatchMetricLogger.MAX_TAGS_PER_BATCH)
+        )
+        if full:
+            flush()
+        if kind == "metric":
+            if not logged or (row["key"], row["step"], row["timestamp"]) not in logged:
+                metrics.append(Metric(row["key"], float(row["value"]), row["timestamp"], row["step"]))
+        elif kind == "param":
+            params[row["key"]] = Param(row["key"], row["value"])
+        else:
+            tags[row["key"]] = RunTag(row["key"], row["value"])
+        seqs.append(row["seq"])
+
+    flush()
+    return sent
+
+
+def replay_spool(spool: OfflineSpool, tracking_uri: Optional[str] = None, chunk_size: int = 5000) -> Dict[str, int]:
+    """
+    스풀된 Run/레코드/아티팩트를 추적 서버로 일괄 전송
+
+    재실행해도 안전합니다: 서버 Run ID와 전송 완료 레코드가 스풀에 기록되므로
+    중단된 지점부터 이어서 전송하고, 이미 보낸 항목은 다시 보내지 않습니다.
+    전송 후 replayed 기록 전에 중단된 묶음은 이어서 전송할 때 서버의 메트릭
+    기록과 (key, step, timestamp)로 비교해 건너뜁니다 (파라미터/태그/아티팩트는
+    같은 값을 다시 보내도 결과가 같음).
+
+    Args:
+        spool: OfflineSpool
+        tracking_uri: 대상 서버 (None이면 Run 기록 시점의 URI)
+        chunk_size: 한 번에 읽어 전송할 레코드 수
+
+    Returns:
+        runs_created / runs_finished / records 카운터
+    """
+    clients: Dict[str, MlflowClient] = {}
+    experiments: Dict[Tuple[str, str], str] = {}
+    stats = {"runs_created": 0, "runs_finished": 0, "records": 0}
+
+    for run in spool.pending_runs():
+        uri = tracking_uri or run["tracking_uri"]
+        client = clients.get(uri) or clients.setdefault(uri, MlflowClient(tracking_uri=uri))
+
+        remote_run_id = run["remote_run_id"]
+        resumed = bool(remote_run_id)
+        if not remote_run_id:
+            key = (uri, run["experiment_name"])
+            if key not in experiments:
+                experiment = client.get_experiment_by_name(run["experiment_name"])
+                if experiment:
+                    experiments[key] = experiment.experiment_id
+                else:
+                    try:
+                        experiments[key] = client.create_experiment(run["experiment_name"])
+                    except MlflowException as e:
+                        if e.error_code != "RESOURCE_ALREADY_EXISTS":
+                            raise
+                        experiments[key] = client.get_experiment_by_name(run["experiment_name"]).experiment_id
+            remote = client.create_run(
+                experiments[key],
+                start_time=run["start_time"],
+                tags=json.loads(run["tags"]),
+                run_name=run["run_name"]
+            )
+            remote_run_id = remote.info.run_id
+            spool.set_remote_run_id(run["local_id"], remote_run_id)
+            stats["runs_created"] += 1
+
+        while True:
+            rows = spool.pending_records(run["local_id"], limit=chunk_size)
+            if not rows:
+                break
+            # 중복 가능성은 이전 실행이 마지막으로 보낸 묶음(대기 레코드의 맨 앞)뿐
+            logged = _logged_metrics(client, remote_run_id, rows) if resumed else None
+            resumed = False
+            stats["records"] += _replay_records(client, remote_run_id, rows, spool, logged)
+
+        # 아직 기록 중인 Run은 종료하지 않고 다음 재전송에서 이어서 처리
+        if run["status"] != "RUNNING":
+            client.set_terminated(remote_run_id, status=run["status"], end_time=run["end_time"])
+            spool.mark_run_replayed(run["local_id"])
+            stats["runs_finished"] += 1
+
+    logger.info(
+        f"스풀 재전송 완료: Run {stats['runs_created']}개 생성, {stats['runs_finished']}개 종료, "
+        f"레코드 {stats['records']}건"
+    )
+    return stats
+
+
+# ============================================================================
+# Run 검색 캐시
+# ============================================================================
+
+RUN_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    experiment_id TEXT NOT NULL,
+    run_name TEXT,
+    status TEXT,
+    start_time INTEGER,
+    end_time INTEGER,
+    metrics TEXT NOT NULL,
+    params TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_experiment ON runs(experiment_id, start_time);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    experiment_id TEXT PRIMARY KEY,
+    last_sync INTEGER NOT NULL
+);
+"""
+
+
+class RunCache:
+    """
+    Run 메타데이터(최신 메트릭/파라미터/태그) 로컬 SQLite 캐시
+
+    TowninMLflowClient.sync_run_cache()가 마지막 동기화 이후 시작/종료되었거나
+    아직 실행 중인 Run만 서버에서 가져와 갱신합니다. 대시보드와 교차 Run
+    분석은 서버 대신 이 캐시를 읽습니다.
+    """
+
+    def __init__(self, path: str = "mlflow_run_cache.db"):
+        """
+        Args:
+            path: SQLite 파일 경로
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(RUN_CACHE_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert(self, runs: Iterable) -> int:
+        """MLflow Run 엔티티 저장 (같은 run_id는 덮어씀)"""
+        rows = [
+            (
+                run.info.run_id,
+                run.info.experiment_id,
+                run.info.run_name,
+                run.info.status,
+                run.info.start_time,
+                run.info.end_time,
+                json.dumps(run.data.metrics),
+                json.dumps(run.data.params, ensure_ascii=False),
+                json.dumps(run.data.tags, ensure_ascii=False),
+            )
+            for run in runs
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO runs "
+                "(run_id, experiment_id, run_name, status, start_time, end_time, metrics, params, tags) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def delete(self, run_ids: Iterable[str]) -> int:
+        """삭제된 Run 제거"""
+        rows = [(run_id,) for run_id in run_ids]
+        with self._lock:
+            self.conn.executemany("DELETE FROM runs WHERE run_id = ?", rows)
+            self.conn.commit()
+        return len(rows)
+
+    def run_ids(self, experiment_id: str) -> set:
+        with self._lock:
+            rows = self.conn.execute("SELECT run_id FROM runs WHERE experiment_id = ?", (experiment_id,)).fetchall()
+        return {row["run_id"] for row in rows}
+
+    def last_sync(self, experiment_id: str) -> Optional[int]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_sync FROM sync_state WHERE experiment_id = ?", (experiment_id,)
+            ).fetchone()
+        return row["last_sync"] if row else None
+
+    def set_last_sync(self, experiment_id: str, timestamp_ms: int):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (experiment_id, last_sync) VALUES (?, ?)",
+                (experiment_id, timestamp_ms)
+            )
+            self.conn.commit()
+
+    def runs(self, experiment_id: str) -> List[Dict[str, Any]]:
+        """캐시된 Run 목록 (start_time 순)"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM runs WHERE experiment_id = ? ORDER BY start_time", (experiment_id,)
+            ).fetchall()
+        return [
+            {
+                "run_id": row["run_id"],
+                "run_name": row["run_name"],
+                "status": row["status"],
+                "start_time": row["start_time"],
+                "end_time": row["end_time"],
+                "metrics": json.loads(row["metrics"]),
+                "params": json.loads(row["params"]),
+                "tags": json.loads(row["tags"]),
+            }
+            for row in rows
+        ]
+
+    def columns(self, experiment_id: str, metrics: Optional[List[str]] = None,
+                params: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+        """
+        열 단위(컬럼형) 데이터: {"run_id": [...], "metrics.x": [...], "params.y": [...]}
+
+        Args:
+            experiment_id: 실험 ID
+            metrics: 포함할 메트릭 키 (None이면 전체)
+            params: 포함할 파라미터 키 (None이면 전체)
+        """
+        runs = self.runs(experiment_id)
+        if metrics is None:
+            metrics = sorted({key for run in runs for key in run["metrics"]})
+        if params is None:
+            params = sorted({key for run in runs for key in run["params"]})
+
+        data: Dict[str, List[Any]] = {
+            name: [run[name] for run in runs]
+            for name in ("run_id", "run_name", "status", "start_time", "end_time")
+        }
+        for key in metrics:
+            data[f"metrics.{key}"] = [run["metrics"].get(key) for run in runs]
+        for key in params:
+            data[f"params.{key}"] = [run["params"].get(key) for run in runs]
+        return data
+
+    def to_dataframe(self, experiment_id: str, metrics: Optional[List[str]] = None,
+                     params: Optional[List[str]] = None):
+        """columns()를 pandas DataFrame으로 반환"""
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("DataFrame 변환에는 pandas가 필요합니다: pip install pandas") from None
+        return pd.DataFrame(self.columns(experiment_id, metrics, params))
+
+    def export_parquet(self, experiment_id: str, path: str, metrics: Optional[List[str]] = None,
+                       params: Optional[List[str]] = None) -> int:
+        """
+        Parquet 파일로 내보내기 (pandas + pyarrow 필요)
+
+        Returns:
+            내보낸 Run 수
+        """
+        df = self.to_dataframe(experiment_id, metrics, params)
+        df.to_parquet(path, index=False)
+        return len(df)
+
+
 class TowninMLflowClient:
     """
     Townin 프로젝트를 위한 MLflow 클라이언트
 
     멀티테넌시를 지원하며, IAM 인증을 자동으로 처리합니다.
+
+    spool_path를 주면 start_run / start_tracked_run과 log_param(s) /
+    log_metric(s) / set_tag(s) / log_artifact(s) / log_model이 서버 대신
+    스풀에 기록됩니다 (replay_spool로 나중에 전송). 조회 API(get_experiment,
+    search_runs, iter_runs, sync_run_cache)는 스풀 모드에서도 서버를 호출합니다.
     """
 
     def __init__(
         self,
         tracking_uri: str,
         customer_id: str = "default",
-        auto_auth: bool = True
+        auto_auth: bool = True,
+        async_logging: bool = False,
+        flush_interval: float = 5.0,
+        max_batch_size: int = 1000,
+        experiment_cache: Optional[ExperimentCache] = None,
+        credential_provider: Optional[CredentialProvider] = None,
+        spool_path: Optional[str] = None,
+        artifact_uploader: Optional[ArtifactUploader] = None
     ):
         """
         Args:
             tracking_uri: MLflow 서버 URL (Cloud Run)
             customer_id: 고객 ID (데이터 격리용)
             auto_auth: 자동 인증 활성화 (Google Cloud IAM)
+            async_logging: log_* 호출을 버퍼링하여 백그라운드에서 일괄 전송
+            flush_interval: 비동기 로깅 플러시 간격 (초)
+            max_batch_size: 비동기 로깅 즉시 플러시 기준 항목 수
+            experiment_cache: 실험 ID 캐시 (기본: 프로세스 공유 캐시)
+            credential_provider: 토큰 공급자 (기본: Google Cloud ADC)
+            spool_path: 지정 시 Run 시작과 로깅을 서버 대신 이 SQLite 스풀에 기록
+                (replay_spool로 나중에 전송)
+            artifact_uploader: log_artifacts용 병렬 업로더 (기본: 8 스레드, 중복 제거 없음)
         """
         self.tracking_uri = tracking_uri
         self.customer_id = customer_id
         self.auto_auth = auto_auth
+        self.experiment_cache = experiment_cache or _experiment_cache
+        self.credential_provider = credential_provider
+        self.token_manager: Optional[TokenRefreshManager] = None
+
+        self.spool: Optional[OfflineSpool] = OfflineSpool(spool_path) if spool_path else None
+        self._spooled_run: Optional[SpooledRunHandle] = None
+
+        # 명시적 Run API 및 실험 조회용 (전역 tracking URI와 무관)
+        self.mlflow_client = MlflowClient(tracking_uri=self.tracking_uri)
+        self.artifact_uploader = artifact_uploader or ArtifactUploader(self.mlflow_client)
 
         # MLflow tracking URI 설정
         mlflow.set_tracking_uri(self.tracking_uri)
@@ -68,20 +1421,23 @@ class TowninMLflowClient:
         if self.auto_auth:
             self._setup_auth()
 
+        self._batch_logger: Optional[BatchMetricLogger] = None
+        if async_logging:
+            self._batch_logger = BatchMetricLogger(
+                self.mlflow_client,
+                flush_interval=flush_interval,
+                max_batch_size=max_batch_size
+            )
+
         logger.info(f"TowninMLflowClient 초기화 완료: {tracking_uri}")
         logger.info(f"Customer ID: {customer_id}")
 
     def _setup_auth(self):
-        """Google Cloud IAM 인증 설정"""
+        """Google Cloud IAM 인증 설정 (만료 전 자동 갱신)"""
         try:
-            credentials, project = google.auth.default()
-
-            # 토큰 갱신
-            if credentials.expired:
-                credentials.refresh(Request())
-
-            # 환경 변수에 토큰 설정 (MLflow가 사용)
-            os.environ["MLFLOW_TRACKING_TOKEN"] = credentials.token
+            # 프로세스 공유 매니저가 환경 변수의 토큰을 계속 갱신 (MLflow가 사용)
+            self.token_manager = get_token_manager(self.credential_provider)
+            self.token_manager.start()
 
             logger.info("Google Cloud 인증 성공")
 
@@ -118,29 +1474,61 @@ class TowninMLflowClient:
         Returns:
             생성된 실험 ID
         """
-        experiment_name = self._get_experiment_name(name)
-
         try:
-            # 이미 존재하는지 확인
-            experiment = mlflow.get_experiment_by_name(experiment_name)
-            if experiment:
-                logger.info(f"기존 실험 사용: {experiment_name} (ID: {experiment.experiment_id})")
-                return experiment.experiment_id
-
-            # 새 실험 생성
-            experiment_id = mlflow.create_experiment(
-                name=experiment_name,
-                artifact_location=artifact_location,
-                tags=tags or {}
-            )
-
-            logger.info(f"새 실험 생성: {experiment_name} (ID: {experiment_id})")
-            return experiment_id
-
+            return self._resolve_experiment_id(name, artifact_location, tags)
         except Exception as e:
             logger.error(f"실험 생성 실패: {e}")
             raise
 
+    def _lookup_experiment_id(self, experiment_name: str) -> Optional[str]:
+        experiment = self.mlflow_client.get_experiment_by_name(experiment_name)
+        return experiment.experiment_id if experiment else None
+
+    def _resolve_experiment_id(
+        self,
+        name: str,
+        artifact_location: Optional[str] = None,
+        tags: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        실험 ID 조회 (캐시 → 서버 조회 → 생성 순)
+
+        Args:
+            name: 실험 이름 (네임스페이스 적용 전)
+            artifact_location: 생성 시 아티팩트 저장 위치
+            tags: 생성 시 실험 태그
+
+        Returns:
+            실험 ID
+        """
+        experiment_name = self._get_experiment_name(name)
+
+        def create() -> str:
+            try:
+                experiment_id = self.mlflow_client.create_experiment(
+                    name=experiment_name,
+                    artifact_location=artifact_location,
+                    tags=tags or {}
+                )
+                logger.info(f"새 실험 생성: {experiment_name} (ID: {experiment_id})")
+                return experiment_id
+            except MlflowException as e:
+                # 다른 프로세스가 먼저 생성한 경우 그 실험을 사용
+                if e.error_code != "RESOURCE_ALREADY_EXISTS":
+                    raise
+                experiment_id = self._lookup_experiment_id(experiment_name)
+                if experiment_id is None:
+                    raise
+                logger.info(f"동시 생성된 실험 사용: {experiment_name} (ID: {experiment_id})")
+                return experiment_id
+
+        return self.experiment_cache.get_or_create(
+            self.tracking_uri,
+            experiment_name,
+            lambda: self._lookup_experiment_id(experiment_name),
+            create
+        )
+
     def start_run(
         self,
         experiment_name: str,
@@ -156,22 +1544,20 @@ class TowninMLflowClient:
             tags: Run 태그
 
         Returns:
-            MLflow ActiveRun 객체
+            MLflow ActiveRun 객체 (spool_path 지정 시 SpooledRunHandle)
 
         Example:
             with client.start_run("graphrag_test") as run:
                 client.log_param("chunk_size", 512)
                 client.log_metric("faithfulness", 0.92)
         """
-        full_experiment_name = self._get_experiment_name(experiment_name)
+        if self.spool is not None:
+            # 서버 호출 없이 스풀에 기록 (with 블록 종료 또는 end_run()으로 종료)
+            self._spooled_run = self.start_tracked_run(experiment_name, run_name=run_name, tags=tags)
+            return self._spooled_run
 
-        # 실험 존재 확인 및 생성
-        experiment = mlflow.get_experiment_by_name(full_experiment_name)
-        if not experiment:
-            self.create_experiment(experiment_name)
-
-        # 실험 설정
-        mlflow.set_experiment(full_experiment_name)
+        # 실험 ID는 캐시에서 조회 (없으면 생성)
+        experiment_id = self._resolve_experiment_id(experiment_name)
 
         # Run 시작
         default_tags = {
@@ -181,50 +1567,251 @@ class TowninMLflowClient:
         if tags:
             default_tags.update(tags)
 
-        return mlflow.start_run(run_name=run_name, tags=default_tags)
+        try:
+            active_run = mlflow.start_run(experiment_id=experiment_id, run_name=run_name, tags=default_tags)
+        except MlflowException:
+            # 캐시된 실험이 삭제되었을 수 있음: 무효화 후 한 번 재시도
+            self.experiment_cache.invalidate(self.tracking_uri, self._get_experiment_name(experiment_name))
+            experiment_id = self._resolve_experiment_id(experiment_name)
+            active_run = mlflow.start_run(experiment_id=experiment_id, run_name=run_name, tags=default_tags)
+        if self._batch_logger:
+            return _FlushingRun(active_run, self._batch_logger)
+        return active_run
+
+    def start_tracked_run(
+        self,
+        experiment_name: str,
+        run_name: Optional[str] = None,
+        tags: Optional[Dict[str, str]] = None
+    ) -> Union[RunHandle, SpooledRunHandle]:
+        """
+        전역 활성 Run을 건드리지 않는 명시적 Run 시작
+
+        스레드/태스크마다 독립된 Run을 진행할 때 사용합니다. with 블록 안에서는
+        current_run()으로 같은 태스크의 핸들을 조회할 수 있습니다.
+
+        Args:
+            experiment_name: 실험 이름
+            run_name: Run 이름 (선택)
+            tags: Run 태그
+
+        Returns:
+            RunHandle (spool_path 지정 시 SpooledRunHandle)
+
+        Example:
+            def evaluate(customer_id):
+                tenant = client.for_customer(customer_id)
+                with tenant.start_tracked_run("flyer_eval") as run:
+                    run.log_metric("accuracy", 0.91)
+
+            with ThreadPoolExecutor(8) as pool:
+                pool.map(evaluate, customer_ids)
+        """
+        default_tags = {
+            "customer_id": self.customer_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if tags:
+            default_tags.update(tags)
+
+        if self.spool is not None:
+            local_run_id = self.spool.create_run(
+                self.tracking_uri,
+                self._get_experiment_name(experiment_name),
+                self.customer_id,
+                run_name=run_name,
+                tags=default_tags
+            )
+            return SpooledRunHandle(self.spool, local_run_id, self.customer_id)
+
+        experiment_id = self._resolve_experiment_id(experiment_name)
+        run = self.mlflow_client.create_run(experiment_id, run_name=run_name, tags=default_tags)
+        return RunHandle(self.mlflow_client, run, self.customer_id, self._batch_logger, self.artifact_uploader)
+
+    @staticmethod
+    def current_run() -> Optional[Union[RunHandle, SpooledRunHandle]]:
+        """현재 스레드/태스크에서 with 블록으로 진입한 RunHandle"""
+        return _current_run.get()
+
+    def for_customer(self, customer_id: str) -> "TowninMLflowClient":
+        """
+        같은 연결(MlflowClient, 토큰, 캐시, 배치 로거)을 공유하는 다른 고객용 클라이언트
+
+        Args:
+            customer_id: 고객 ID
+
+        Returns:
+            customer_id만 다른 TowninMLflowClient
+        """
+        tenant = copy.copy(self)
+        tenant.customer_id = customer_id
+        return tenant
+
+    def end_run(self, status: str = "FINISHED"):
+        """버퍼를 플러시한 뒤 활성 Run 종료"""
+        if self.spool is not None:
+            if self._spooled_run is not None:
+                self._spooled_run.end(status)
+                self._spooled_run = None
+            return
+        self.flush()
+        mlflow.end_run(status=status)
+
+    def _run_active(self) -> bool:
+        if self.spool is not None:
+            return self._spooled_run is not None and not self._spooled_run.ended
+        return mlflow.active_run() is not None
+
+    def _spooled(self) -> Optional[SpooledRunHandle]:
+        """스풀 모드에서 start_run으로 시작한 Run (스풀 미사용 시 None)"""
+        if self.spool is None:
+            return None
+        if not self._run_active():
+            raise RuntimeError("활성 Run이 없습니다. start_run()을 먼저 호출하세요.")
+        return self._spooled_run
+
+    def _active_run_id(self) -> str:
+        run = mlflow.active_run()
+        if run is None:
+            raise RuntimeError("활성 Run이 없습니다. start_run()을 먼저 호출하세요.")
+        return run.info.run_id
+
+    def active_run_id(self) -> str:
+        """
+        호출 스레드의 Run ID
+
+        with 블록의 RunHandle / SpooledRunHandle을 우선하고, 없으면 스풀 모드의
+        start_run Run 또는 MLflow 활성 Run (스레드 로컬)을 사용합니다. 다른
+        스레드에서 같은 Run에 로깅하려면 이 값을 미리 받아 전달하세요.
+        """
+        handle = _current_run.get()
+        if handle is not None:
+            return handle.run_id
+        spooled = self._spooled()
+        return spooled.run_id if spooled is not None else self._active_run_id()
+
+    def flush(self) -> int:
+        """비동기 로깅 버퍼를 즉시 전송 (비활성 시 0)"""
+        return self._batch_logger.flush() if self._batch_logger else 0
+
+    def logging_stats(self) -> Dict[str, int]:
+        """비동기 로깅 카운터 (queued / flushed / dropped / batches / errors / pending)"""
+        return self._batch_logger.stats() if self._batch_logger else {}
+
+    def close(self):
+        """비동기 로깅 워커 종료 및 남은 항목 플러시 (스풀 커밋 포함)"""
+        if self._batch_logger:
+            self._batch_logger.close()
+        if self.spool is not None:
+            self.spool.commit()
 
     def log_param(self, key: str, value: Any):
         """파라미터 로깅"""
-        mlflow.log_param(key, value)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_param(key, value)
+        elif self._batch_logger:
+            self._batch_logger.log_param(self._active_run_id(), key, value)
+        else:
+            mlflow.log_param(key, value)
         logger.debug(f"Param logged: {key}={value}")
 
     def log_params(self, params: Dict[str, Any]):
         """여러 파라미터 일괄 로깅"""
-        mlflow.log_params(params)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_params(params)
+        elif self._batch_logger:
+            run_id = self._active_run_id()
+            for key, value in params.items():
+                self._batch_logger.log_param(run_id, key, value)
+        else:
+            mlflow.log_params(params)
         logger.debug(f"Params logged: {len(params)} items")
 
     def log_metric(self, key: str, value: float, step: Optional[int] = None):
         """메트릭 로깅"""
-        mlflow.log_metric(key, value, step=step)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_metric(key, value, step=step)
+        elif self._batch_logger:
+            self._batch_logger.log_metric(self._active_run_id(), key, value, step=step)
+        else:
+            mlflow.log_metric(key, value, step=step)
         logger.debug(f"Metric logged: {key}={value}")
 
     def log_metrics(self, metrics: Dict[str, float], step: Optional[int] = None):
         """여러 메트릭 일괄 로깅"""
-        mlflow.log_metrics(metrics, step=step)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_metrics(metrics, step=step)
+        elif self._batch_logger:
+            run_id = self._active_run_id()
+            timestamp = int(time.time() * 1000)
+            for key, value in metrics.items():
+                self._batch_logger.log_metric(run_id, key, value, step=step, timestamp=timestamp)
+        else:
+            mlflow.log_metrics(metrics, step=step)
         logger.debug(f"Metrics logged: {len(metrics)} items")
 
     def log_artifact(self, local_path: str, artifact_path: Optional[str] = None):
         """아티팩트 (파일) 로깅"""
-        mlflow.log_artifact(local_path, artifact_path=artifact_path)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_artifact(local_path, artifact_path)
+        else:
+            mlflow.log_artifact(local_path, artifact_path=artifact_path)
         logger.info(f"Artifact logged: {local_path}")
 
-    def log_artifacts(self, local_dir: str, artifact_path: Optional[str] = None):
-        """여러 아티팩트 (디렉토리) 로깅"""
-        mlflow.log_artifacts(local_dir, artifact_path=artifact_path)
+    def log_artifacts(self, local_dir: str, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        여러 아티팩트 (디렉토리) 병렬 로깅
+
+        Returns:
+            업로드 통계 (files / skipped / compressed / bytes / seconds / mb_per_s,
+            스풀 모드에서는 재전송 시 업로드하므로 빈 dict)
+        """
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.log_artifacts(local_dir, artifact_path)
+            return {}
+        stats = self.artifact_uploader.upload_dir(self._active_run_id(), local_dir, artifact_path)
         logger.info(f"Artifacts logged from: {local_dir}")
+        return stats
 
     def log_model(self, model, artifact_path: str, **kwargs):
-        """모델 로깅"""
-        mlflow.sklearn.log_model(model, artifact_path, **kwargs)
+        """모델 로깅 (스풀 모드에서는 save_model 결과를 아티팩트 디렉토리로 기록, 레지스트리 등록 제외)"""
+        spooled = self._spooled()
+        if spooled is not None:
+            with tempfile.TemporaryDirectory() as tmp:
+                model_dir = str(Path(tmp) / "model")
+                mlflow.sklearn.save_model(model, model_dir, **kwargs)
+                spooled.log_artifacts(model_dir, artifact_path)
+        else:
+            mlflow.sklearn.log_model(model, artifact_path, **kwargs)
         logger.info(f"Model logged: {artifact_path}")
 
     def set_tag(self, key: str, value: Any):
         """태그 설정"""
-        mlflow.set_tag(key, value)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.set_tag(key, value)
+        elif self._batch_logger:
+            self._batch_logger.set_tag(self._active_run_id(), key, value)
+        else:
+            mlflow.set_tag(key, value)
 
     def set_tags(self, tags: Dict[str, Any]):
         """여러 태그 일괄 설정"""
-        mlflow.set_tags(tags)
+        spooled = self._spooled()
+        if spooled is not None:
+            spooled.set_tags(tags)
+        elif self._batch_logger:
+            run_id = self._active_run_id()
+            for key, value in tags.items():
+                self._batch_logger.set_tag(run_id, key, value)
+        else:
+            mlflow.set_tags(tags)
 
     def get_experiment(self, name: str):
         """실험 정보 조회"""
@@ -259,20 +1846,152 @@ class TowninMLflowClient:
             max_results=max_results
         )
 
+    def iter_runs(
+        self,
+        experiment_name: str,
+        filter_string: str = "",
+        page_size: int = 1000,
+        order_by: Optional[List[str]] = None
+    ) -> Iterator:
+        """
+        조건에 맞는 모든 Run을 페이지 단위로 지연 조회 (max_results 제한 없음)
+
+        Args:
+            experiment_name: 실험 이름
+            filter_string: 필터 조건 (MLflow 쿼리 문법)
+            page_size: 페이지당 Run 수 (서버 최대 50000)
+            order_by: 정렬 조건
+
+        Yields:
+            MLflow Run 엔티티
+        """
+        experiment_id = self._lookup_experiment_id(self._get_experiment_name(experiment_name))
+        if experiment_id is None:
+            logger.warning(f"실험을 찾을 수 없음: {experiment_name}")
+            return
+        yield from self._iter_experiment_runs(experiment_id, filter_string, page_size, order_by)
+
+    def _iter_experiment_runs(
+        self,
+        experiment_id: str,
+        filter_string: str = "",
+        page_size: int = 1000,
+        order_by: Optional[List[str]] = None,
+        run_view_type: int = ViewType.ACTIVE_ONLY
+    ) -> Iterator:
+        page_token = None
+        while True:
+            page = self.mlflow_client.search_runs(
+                [experiment_id],
+                filter_string=filter_string,
+                run_view_type=run_view_type,
+                max_results=page_size,
+                order_by=order_by,
+                page_token=page_token
+            )
+            yield from page
+            page_token = page.token
+            if not page_token:
+                return
+
+    def sync_run_cache(
+        self,
+        experiment_name: str,
+        cache: RunCache,
+        overlap_seconds: float = 300.0,
+        page_size: int = 1000,
+        full: bool = False
+    ) -> int:
+        """
+        RunCache를 증분 갱신
+
+        첫 동기화는 전체를 가져오고, 이후에는 마지막 동기화 이후 시작되었거나
+        종료된 Run과 아직 RUNNING인 Run만 가져옵니다. MLflow 필터는 OR를
+        지원하지 않으므로 조건별로 조회한 뒤 run_id로 합쳐 upsert합니다.
+
+        삭제된(DELETED) Run은 매 동기화마다 캐시에서 제거합니다. gc로 완전히
+        삭제되어 서버에 남지 않은 Run은 full=True 동기화에서 제거됩니다.
+
+        Args:
+            experiment_name: 실험 이름 (없으면 생성하지 않고 0 반환)
+            cache: 대상 RunCache
+            overlap_seconds: 시계 차이를 고려해 마지막 동기화 시각보다 앞당겨 조회할 시간
+            page_size: 페이지당 Run 수
+            full: 전체를 다시 가져오고 서버에 없는 Run을 캐시에서 제거
+
+        Returns:
+            갱신 또는 제거된 Run 수
+        """
+        experiment_id = self._lookup_experiment_id(self._get_experiment_name(experiment_name))
+        if experiment_id is None:
+            logger.warning(f"실험을 찾을 수 없음: {experiment_name}")
+            return 0
+        synced_at = int(time.time() * 1000)
+        last_sync = cache.last_sync(experiment_id)
+
+        if last_sync is None or full:
+            filters = [""]
+        else:
+            since = last_sync - int(overlap_seconds * 1000)
+            filters = [
+                f"attributes.start_time > {since}",
+                f"attributes.end_time > {since}",
+                "attributes.status = 'RUNNING'",
+            ]
+
+        changed = {}
+        for filter_string in filters:
+            for run in self._iter_experiment_runs(experiment_id, filter_string, page_size=page_size):
+                changed[run.info.run_id] = run
+
+        if filters == [""]:
+            stale = cache.run_ids(experiment_id) - changed.keys()
+        else:
+            deleted = self._iter_experiment_runs(experiment_id, page_size=page_size, run_view_type=ViewType.DELETED_ONLY)
+            stale = {run.info.run_id for run in deleted} & cache.run_ids(experiment_id)
+        removed = cache.delete(stale)
+        updated = cache.upsert(changed.values())
+        cache.set_last_sync(experiment_id, synced_at)
+
+        logger.info(f"Run 캐시 동기화: {experiment_name} - {updated}개 갱신, {removed}개 제거")
+        return updated + removed
+
 
 # ============================================================================
 # LangChain 통합
 # ============================================================================
 
+class _SpanExportingRun:
+    """ActiveRun 래퍼: with 블록 종료 시 span 집계를 먼저 로깅"""
+
+    def __init__(self, active_run, tracker: "TowninLangChainTracker"):
+        self._active_run = active_run
+        self._tracker = tracker
+
+    def __getattr__(self, name):
+        return getattr(self._active_run, name)
+
+    def __enter__(self):
+        self._active_run.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._tracker.export_spans()
+        return self._active_run.__exit__(exc_type, exc_val, exc_tb)
+
+
 class TowninLangChainTracker(TowninMLflowClient):
     """
     LangChain 자동 추적을 위한 클라이언트
 
     LangChain 실행을 자동으로 MLflow에 로깅합니다.
+    tracer를 주면 (span_tracer.Tracer 등 export(exporter)를 가진 객체)
+    호출별 로깅 대신 Run 종료 시 단계별 지연 히스토그램을 한 번에 로깅합니다.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tracer=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.tracer = tracer
         self._setup_langchain_autolog()
 
     def _setup_langchain_autolog(self):
@@ -284,6 +2003,68 @@ class TowninLangChainTracker(TowninMLflowClient):
         except ImportError:
             logger.warning("mlflow.langchain을 사용하려면 'pip install mlflow[langchain]' 실행")
 
+    def start_run(self, *args, **kwargs):
+        """MLflow Run 시작 (tracer가 있으면 with 블록 종료 시 span 집계 로깅)"""
+        active_run = super().start_run(*args, **kwargs)
+        if self.tracer is not None:
+            return _SpanExportingRun(active_run, self)
+        return active_run
+
+    def end_run(self, status: str = "FINISHED"):
+        """span 집계를 로깅한 뒤 활성 Run 종료"""
+        self.export_spans()
+        super().end_run(status=status)
+
+    def export_spans(self) -> int:
+        """
+        tracer 집계를 비우고 활성 Run에 로깅
+
+        Returns:
+            로깅된 span 수
+        """
+        if self.tracer is None or not self._run_active():
+            return 0
+        rows = self.tracer.export(lambda rows: self.log_span_summary(self, rows))
+        return len(rows)
+
+    @classmethod
+    def log_span_summary(
+        cls,
+        client: TowninMLflowClient,
+        rows: List[Dict[str, Any]],
+        prefix: str = "span",
+        step: Optional[int] = None
+    ):
+        """
+        span 집계 결과를 한 번의 log_metrics 호출과 히스토그램 JSON 아티팩트로 로깅
+
+        Args:
+            client: TowninMLflowClient 인스턴스
+            rows: span별 집계 행 목록 (Tracer.export 결과)
+            prefix: 메트릭 이름 접두사
+            step: 스텝 번호 (시계열 추적용)
+        """
+        metrics = {}
+        for row in rows:
+            name = f"{prefix}/{row['span']}"
+            metrics[f"{name}/count"] = row["count"]
+            metrics[f"{name}/errors"] = row["errors"]
+            for key in ("mean_ms", "max_ms", "p50_ms", "p95_ms", "p99_ms"):
+                if row.get(key) is not None:
+                    metrics[f"{name}/{key}"] = row[key]
+
+        if not metrics:
+            return
+        client.log_metrics(metrics, step=step)
+
+        histograms = {row["span"]: row["histogram_us"] for row in rows}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"{prefix}_histograms.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"unit": "us_upper_bound", "spans": histograms}, f, ensure_ascii=False, indent=2)
+            client.log_artifact(path, artifact_path="spans")
+        logger.info(f"Span 집계 일괄 로깅: {len(rows)} spans, {len(metrics)} metrics")
+
 
 # ============================================================================
 # 비용 추적 Wrapper
@@ -296,16 +2077,11 @@ class CostTracker:
     OpenAI, Anthropic 등의 API 사용량을 추적하고 MLflow에 로깅합니다.
     """
 
-    # 모델별 비용 (USD per 1K tokens)
-    PRICING = {
-        "gpt-4o": {"input": 0.005, "output": 0.015},
-        "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-        "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
-        "claude-3-opus": {"input": 0.015, "output": 0.075},
-        "claude-3-sonnet": {"input": 0.003, "output": 0.015},
-        "claude-3-haiku": {"input": 0.00025, "output": 0.00125},
-        "text-embedding-ada-002": {"input": 0.0001, "output": 0.0},
-    }
+    # 모델별 비용 (USD per 1K tokens) — llm_pricing.py 단일 단가표
+    PRICING = LLM_PRICING
+
+    # 단가 미등록 모델 (경고는 모델당 한 번만)
+    _warned_models: set = set()
 
     @classmethod
     def calculate_cost(
@@ -325,7 +2101,12 @@ class CostTracker:
         Returns:
             비용 (USD)
         """
-        pricing = cls.PRICING.get(model, {"input": 0, "output": 0})
+        pricing = cls.PRICING.get(model)
+        if pricing is None:
+            if model not in cls._warned_models:
+                cls._warned_models.add(model)
+                logger.warning(f"단가 미등록 모델: {model} (비용 0으로 계산)")
+            pricing = {"input": 0, "output": 0}
         cost = (
             (input_tokens / 1000) * pricing["input"] +
             (output_tokens / 1000) * pricing["output"]
@@ -364,6 +2145,261 @@ class CostTracker:
 
         logger.info(f"LLM 비용 로깅: {model} - ${cost:.6f}")
 
+    @classmethod
+    def log_usage_summary(
+        cls,
+        client: TowninMLflowClient,
+        rows: List[Dict[str, Any]],
+        step: Optional[int] = None,
+        run_id: Optional[str] = None
+    ):
+        """
+        UsageMeter 집계 결과를 한 번의 log_metrics 호출로 로깅
+
+        단가 미등록 모델(비용 0으로 집계됨)은 llm_unknown_models 태그로 남습니다.
+
+        Args:
+            client: TowninMLflowClient 인스턴스
+            rows: (model, stage, tenant)별 집계 행 목록
+            step: 스텝 번호 (시계열 추적용)
+            run_id: 대상 Run (None이면 호출 스레드의 활성 Run; 백그라운드
+                스레드에서 로깅할 때는 반드시 지정)
+        """
+        metrics = {}
+        unknown_models = set()
+        for row in rows:
+            if not row.get("priced", row["model"] in cls.PRICING):
+                unknown_models.add(row["model"])
+            prefix = f"usage/{row['tenant']}/{row['stage']}/{row['model']}"
+            metrics[f"{prefix}/calls"] = row["calls"]
+            metrics[f"{prefix}/input_tokens"] = row["input_tokens"]
+            metrics[f"{prefix}/output_tokens"] = row["output_tokens"]
+            metrics[f"{prefix}/cost_usd"] = row["cost_usd"]
+            metrics[f"{prefix}/latency_ms_avg"] = row["latency_ms_avg"]
+            if row.get("latency_ms_p95") not in (None, float("inf")):
+                metrics[f"{prefix}/latency_ms_p95"] = row["latency_ms_p95"]
+
+        tags = {"llm_unknown_models": ",".join(sorted(unknown_models))[:5000]} if unknown_models else {}
+        if run_id is not None:
+            timestamp = int(time.time() * 1000)
+            cls._log_to_run(client, run_id, [
+                Metric(key, float(value), timestamp, step or 0) for key, value in metrics.items()
+            ], tags)
+        else:
+            if metrics:
+                client.log_metrics(metrics, step=step)
+            if tags:
+                client.set_tags(tags)
+        if metrics:
+            logger.info(f"LLM 사용량 일괄 로깅: {len(rows)} groups, {len(metrics)} metrics")
+
+    @staticmethod
+    def _log_to_run(client: TowninMLflowClient, run_id: str, metrics: List[Metric], tags: Dict[str, str]):
+        """활성 Run과 무관하게 run_id로 로깅 (스풀 / 비동기 로거 / log_batch 순)"""
+        if client.spool is not None:
+            client.spool.append_many(run_id, [("metric", m.key, m.value, m.step, m.timestamp) for m in metrics])
+            client.spool.append_many(run_id, [("tag", k, v, None, None) for k, v in tags.items()])
+        elif client._batch_logger:
+            for metric in metrics:
+                client._batch_logger.log_metric(run_id, metric.key, metric.value, step=metric.step, timestamp=metric.timestamp)
+            for key, value in tags.items():
+                client._batch_logger.set_tag(run_id, key, value)
+        else:
+            limit = BatchMetricLogger.MAX_METRICS_PER_BATCH
+            for i in range(0, len(metrics), limit):
+                client.mlflow_client.log_batch(run_id, metrics=metrics[i:i + limit])
+            if tags:
+                client.mlflow_client.log_batch(run_id, tags=[RunTag(k, v) for k, v in tags.items()])
+
+    # ------------------------------------------------------------------
+    # 대량 사용량 (로그 재처리 등): numpy 벡터 연산
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _numpy():
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("대량 비용 계산에는 numpy가 필요합니다: pip install numpy") from None
+        return np
+
+    @classmethod
+    def _price_vectors(cls, np, model_names):
+        """고유 모델별 (입력, 출력) 단가 배열; 미등록 모델은 NaN"""
+        input_price = np.array([cls.PRICING.get(m, {}).get("input", np.nan) for m in model_names], dtype=np.float64)
+        output_price = np.array([cls.PRICING.get(m, {}).get("output", np.nan) for m in model_names], dtype=np.float64)
+        return input_price, output_price
+
+    @staticmethod
+    def _epoch_seconds(np, timestamps):
+        """epoch 초(숫자) / datetime64 / ISO 문자열 배열 -> int64 epoch 초"""
+        ts = np.asarray(timestamps)
+        if ts.dtype.kind in "iuf":
+            return ts.astype(np.int64)
+        return ts.astype("datetime64[s]").astype(np.int64)
+
+    @classmethod
+    def bulk_costs(cls, models, input_tokens, output_tokens):
+        """
+        호출별 비용을 한 번에 계산
+
+        Args:
+            models: 모델 이름 배열
+            input_tokens / output_tokens: 토큰 수 배열 (models와 같은 길이)
+
+        Returns:
+            (비용 배열 USD, 미등록 모델별 호출 수); 미등록 모델 호출의 비용은 NaN
+        """
+        np = cls._numpy()
+        model_names, model_idx = np.unique(np.asarray(models, dtype=str), return_inverse=True)
+        return cls._costs_by_index(np, model_names, model_idx.ravel(), input_tokens, output_tokens)
+
+    @classmethod
+    def _costs_by_index(cls, np, model_names, model_idx, input_tokens, output_tokens):
+        input_price, output_price = cls._price_vectors(np, model_names)
+        costs = (
+            np.asarray(input_tokens, dtype=np.float64) / 1000 * input_price[model_idx] +
+            np.asarray(output_tokens, dtype=np.float64) / 1000 * output_price[model_idx]
+        )
+
+        unknown = np.isnan(input_price)
+        calls = np.bincount(model_idx, minlength=len(model_names))
+        return costs, {str(m): int(n) for m, n in zip(model_names[unknown], calls[unknown])}
+
+    @classmethod
+    def aggregate_usage(
+        cls,
+        models,
+        input_tokens,
+        output_tokens,
+        timestamps=None,
+        tenants=None,
+        bucket_seconds: int = 3600
+    ) -> Dict[str, Any]:
+        """
+        대량 사용 기록을 (model, tenant, 시간 버킷)별로 집계
+
+        Args:
+            models: 모델 이름 배열
+            input_tokens / output_tokens: 토큰 수 배열
+            timestamps: 호출 시각 배열 (epoch 초 / datetime64 / ISO 문자열, None = 버킷 1개)
+            tenants: 고객 ID 배열 (None = "default")
+            bucket_seconds: 시간 버킷 크기 (초)
+
+        Returns:
+            rows (집계 행), calls, total_cost_usd (등록 모델만),
+            unknown_models (미등록 모델별 호출 수)
+        """
+        np = cls._numpy()
+        model_names, model_idx = np.unique(np.asarray(models, dtype=str), return_inverse=True)
+        model_idx = model_idx.ravel()
+        n = len(model_idx)
+        if n == 0:
+            return {"rows": [], "calls": 0, "total_cost_usd": 0.0, "unknown_models": {}}
+        costs, unknown_models = cls._costs_by_index(np, model_names, model_idx, input_tokens, output_tokens)
+
+        if tenants is None:
+            tenant_names, tenant_idx = np.array(["default"]), np.zeros(n, dtype=np.int64)
+        else:
+            tenant_names, tenant_idx = np.unique(np.asarray(tenants, dtype=str), return_inverse=True)
+        if timestamps is None:
+            bucket_keys, bucket_idx = np.array([0], dtype=np.int64), np.zeros(n, dtype=np.int64)
+        else:
+            buckets = cls._epoch_seconds(np, timestamps) // bucket_seconds
+            bucket_keys, bucket_idx = np.unique(buckets, return_inverse=True)
+
+        # (model, tenant, bucket)을 하나의 정수 키로 합쳐 한 번에 그룹화
+        n_tenants, n_buckets = len(tenant_names), len(bucket_keys)
+        group_code = (model_idx.astype(np.int64) * n_tenants + tenant_idx.ravel()) * n_buckets + bucket_idx.ravel()
+        groups, group_idx = np.unique(group_code, return_inverse=True)
+        group_idx = group_idx.ravel()
+
+        known = ~np.isnan(costs)
+        calls = np.bincount(group_idx)
+        input_sum = np.bincount(group_idx, weights=np.asarray(input_tokens, dtype=np.float64))
+        output_sum = np.bincount(group_idx, weights=np.asarray(output_tokens, dtype=np.float64))
+        cost_sum = np.bincount(group_idx, weights=np.where(known, costs, 0.0))
+
+        rows = []
+        for g, code in enumerate(groups.tolist()):
+            rest, b = divmod(code, n_buckets)
+            m, t = divmod(rest, n_tenants)
+            model = str(model_names[m])
+            rows.append({
+                "model": model,
+                "tenant": str(tenant_names[t]),
+                "bucket_start": int(bucket_keys[b]) * bucket_seconds if timestamps is not None else None,
+                "calls": int(calls[g]),
+                "input_tokens": int(input_sum[g]),
+                "output_tokens": int(output_sum[g]),
+                "cost_usd": None if model in unknown_models else round(float(cost_sum[g]), 6),
+            })
+
+        if unknown_models:
+            logger.warning(f"단가 미등록 모델 {len(unknown_models)}개, "
+                           f"{sum(unknown_models.values())} calls 비용 제외: {sorted(unknown_models)}")
+
+        return {
+            "rows": rows,
+            "calls": n,
+            "total_cost_usd": round(float(cost_sum.sum()), 6),
+            "unknown_models": unknown_models,
+        }
+
+    @classmethod
+    def log_bulk_usage(
+        cls,
+        client: TowninMLflowClient,
+        models,
+        input_tokens,
+        output_tokens,
+        timestamps=None,
+        tenants=None,
+        bucket_seconds: int = 3600
+    ) -> Dict[str, Any]:
+        """
+        대량 사용 기록을 집계해 한 번에 로깅
+
+        버킷별 집계는 usage/{tenant}/{model}/* 메트릭으로, 버킷 시작 시각을
+        timestamp로 하는 시계열이 됩니다. 미등록 모델은 llm_unknown_models
+        태그와 llm_unknown_model_calls 메트릭으로 남습니다.
+
+        Args:
+            client: TowninMLflowClient 인스턴스 (활성 Run 필요)
+            (나머지는 aggregate_usage와 동일)
+
+        Returns:
+            aggregate_usage 결과
+        """
+        summary = cls.aggregate_usage(models, input_tokens, output_tokens, timestamps, tenants, bucket_seconds)
+        run_id = client.active_run_id()
+        now = int(time.time() * 1000)
+
+        metrics = []
+        for row in summary["rows"]:
+            prefix = f"usage/{row['tenant']}/{row['model']}"
+            if row["bucket_start"] is None:
+                timestamp, step = now, 0
+            else:
+                timestamp, step = row["bucket_start"] * 1000, row["bucket_start"] // bucket_seconds
+            values = {"calls": row["calls"], "input_tokens": row["input_tokens"], "output_tokens": row["output_tokens"]}
+            if row["cost_usd"] is not None:
+                values["cost_usd"] = row["cost_usd"]
+            metrics.extend(Metric(f"{prefix}/{key}", float(value), timestamp, step) for key, value in values.items())
+
+        metrics.append(Metric("llm_bulk_calls", float(summary["calls"]), now, 0))
+        metrics.append(Metric("llm_bulk_cost_usd", summary["total_cost_usd"], now, 0))
+        metrics.append(Metric("llm_unknown_model_calls", float(sum(summary["unknown_models"].values())), now, 0))
+
+        tags = {}
+        if summary["unknown_models"]:
+            tags["llm_unknown_models"] = ",".join(sorted(summary["unknown_models"]))[:5000]
+        cls._log_to_run(client, run_id, metrics, tags)
+
+        logger.info(f"LLM 대량 사용량 로깅: {summary['calls']} calls -> {len(summary['rows'])} groups, "
+                    f"{len(metrics)} metrics, ${summary['total_cost_usd']:.4f}")
+        return summary
+
 
 # ============================================================================
 # 사용 예시
@@ -11,53 +11,77 @@ import os
 import json
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from anthropic import Anthropic
 from google.cloud import vision
 from PIL import Image
 import base64
+from prompt_budget import PromptBudget, PromptBudgetExceeded, estimate_tokens
+from product_catalog import ProductCatalog
+from usage_meter import UsageMeter, get_default_meter
+from span_tracer import Tracer, get_tracer
+from model_router import ModelRouter, STRONG_MODEL
 
 load_dotenv()
 
 class FlyerAIPipeline:
-    def __init__(self):
+    def __init__(self, meter: UsageMeter = None, tracer: Tracer = None, router: ModelRouter = None):
         self.anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
         self.vision_client = vision.ImageAnnotatorClient()
+        self.meter = meter or get_default_meter()
+        self.tracer = tracer or get_tracer()
+        self.router = router
+        self.last_route = None
         self.total_cost = 0.0
+        self.prompt_budget = PromptBudget()
+        self._template_tokens = estimate_tokens(self._build_prompt(""))
+        self.last_token_plan = None
 
-    def process_flyer(self, image_path: str) -> Dict:
+    def process_flyer(self, image_path: str, store: Optional[Dict] = None) -> Dict:
         """
         Main pipeline: Image → Vision AI → OCR → LLM → Structured JSON
+
+        Args:
+            image_path: flyer image
+            store: optional {"store_id", "lat", "lng"} of the issuing store,
+                carried into the result for the product catalog
         """
         print(f"\n{'='*60}")
         print(f"Processing: {Path(image_path).name}")
         print(f"{'='*60}")
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
-        # Stage 1: Vision AI - Detect layout and crop product regions
-        print("\n[Stage 1] Vision AI: Detecting product regions...")
-        image_data = self._load_image(image_path)
+        with self.tracer.span("flyer"):
+            # Stage 1: Vision AI - Detect layout and crop product regions
+            print("\n[Stage 1] Vision AI: Detecting product regions...")
+            with self.tracer.span("load_image"):
+                image_data = self._load_image(image_path)
 
-        # Stage 2: OCR - Extract Korean text
-        print("[Stage 2] OCR: Extracting Korean text...")
-        ocr_text = self._extract_text_ocr(image_path)
-        print(f"  → Extracted {len(ocr_text)} characters")
+            # Stage 2: OCR - Extract Korean text
+            print("[Stage 2] OCR: Extracting Korean text...")
+            with self.tracer.span("ocr"):
+                ocr_text = self._extract_text_ocr(image_path)
+            print(f"  → Extracted {len(ocr_text)} characters")
 
-        # Stage 3: LLM Structuring - Parse into JSON
-        print("[Stage 3] LLM: Structuring product data...")
-        structured_data = self._structure_with_llm(ocr_text, image_data)
+            # Stage 3: LLM Structuring - Parse into JSON
+            print("[Stage 3] LLM: Structuring product data...")
+            with self.tracer.span("llm_structuring"):
+                structured_data = self._structure_with_llm(ocr_text, image_data)
 
         # Calculate metrics
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
 
         result = {
             "filename": Path(image_path).name,
             "processing_time_seconds": round(processing_time, 2),
             "products": structured_data,
             "ocr_text_length": len(ocr_text),
-            "estimated_cost_usd": round(self.total_cost, 4)
+            "estimated_input_tokens": self.last_token_plan["estimated_input_tokens"] if self.last_token_plan else 0,
+            "estimated_cost_usd": round(self.total_cost, 4),
+            "route": self.last_route,
+            "store": store
         }
 
         print(f"\n✓ Completed in {processing_time:.2f}s")
@@ -91,10 +115,9 @@ class FlyerAIPipeline:
             return texts[0].description  # Full text
         return ""
 
-    def _structure_with_llm(self, ocr_text: str, image_data: str) -> List[Dict]:
-        """Use Claude 3.5 Sonnet to structure OCR text into product JSON"""
-
-        prompt = f"""You are a Korean retail product data extraction expert.
+    def _build_prompt(self, ocr_text: str) -> str:
+        """Structuring prompt with the (compacted) OCR text embedded"""
+        return f"""You are a Korean retail product data extraction expert.
 
 OCR Text from a Korean retail flyer:
 {ocr_text}
@@ -121,25 +144,66 @@ Rules:
 5. Return valid JSON array ONLY (no markdown, no explanation)
 """
 
-        # Call Claude 3.5 Sonnet
-        message = self.anthropic_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=2000,
-            temperature=0,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
+    def _structure_with_llm(self, ocr_text: str, image_data: str) -> List[Dict]:
+        """Use Claude (routed model, or Claude 3.5 Sonnet) to structure OCR text into product JSON"""
+
+        # Pre-flight: compact OCR text and split if it would overflow the budget
+        try:
+            plan = self.prompt_budget.plan(ocr_text, self._template_tokens)
+        except PromptBudgetExceeded as e:
+            print(f"  ⚠ Skipping LLM call: {e}")
+            self.last_token_plan = None
+            return []
+
+        self.last_token_plan = plan
+        print(f"  → Pre-call estimate: ~{plan['estimated_input_tokens']} input tokens "
+              f"(OCR ~{plan['raw_tokens']} → ~{plan['compacted_tokens']} after compaction, "
+              f"{len(plan['chunks'])} call(s))")
+
+        def structure(model: str = STRONG_MODEL, stage: str = "flyer_structuring") -> List[Dict]:
+            products = []
+            for chunk in plan["chunks"]:
+                products.extend(self._call_llm(self._build_prompt(chunk), model=model, stage=stage))
+            return products
+
+        if self.router is None:
+            self.last_route = None
+            return structure()
+
+        # Easy flyers go to the cheap model; low-confidence answers are re-run
+        routed = self.router.structure(ocr_text, structure)
+        self.last_route = {k: routed[k] for k in ("route", "model", "escalated", "confidence", "reason")}
+        escalated = ", escalated" if routed["escalated"] else ""
+        print(f"  → Route: {routed['route']} ({routed['model']}{escalated}; {routed['reason']}, "
+              f"confidence {routed['confidence']:.2f})")
+        return routed["products"]
+
+    def _call_llm(self, prompt: str, model: str = STRONG_MODEL, stage: str = "flyer_structuring") -> List[Dict]:
+        """Single structuring call; returns parsed products or [] on bad JSON"""
+
+        call_start = time.perf_counter()
+        with self.tracer.span("llm_call"):
+            message = self.anthropic_client.messages.create(
+                model=model,
+                max_tokens=2000,
+                temperature=0,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }]
+            )
+
+        # Account tokens/cost/latency in the shared usage meter
+        self.total_cost += self.meter.record_message(
+            message, time.perf_counter() - call_start, stage=stage
         )
 
-        # Estimate cost (Claude 3.5 Sonnet: $3/M input, $15/M output)
-        input_tokens = message.usage.input_tokens
-        output_tokens = message.usage.output_tokens
-        cost = (input_tokens / 1_000_000 * 3) + (output_tokens / 1_000_000 * 15)
-        self.total_cost += cost
+        with self.tracer.span("parse"):
+            return self._parse_products(message.content[0].text)
 
-        # Parse JSON response
-        response_text = message.content[0].text.strip()
+    def _parse_products(self, response_text: str) -> List[Dict]:
+        """Parse the model's JSON array (tolerates a markdown code fence)"""
+        response_text = response_text.strip()
 
         # Remove markdown code blocks if present
         if response_text.startswith("```"):
@@ -187,8 +251,8 @@ Rules:
 def main():
     """Run flyer AI validation on test dataset"""
 
-    # Initialize pipeline
-    pipeline = FlyerAIPipeline()
+    # Initialize pipeline (easy flyers are routed to the cheaper model)
+    pipeline = FlyerAIPipeline(router=ModelRouter())
 
     # Test flyers directory
     test_dir = Path("test_flyers")
@@ -204,6 +268,15 @@ def main():
         print("⚠ Warning: ground_truth.json not found. Accuracy calculation will be skipped.")
         ground_truth_data = {}
 
+    # Load issuing store locations (needed for nearby price search)
+    stores_path = Path("stores.json")
+    if stores_path.exists():
+        with open(stores_path) as f:
+            stores = json.load(f)
+    else:
+        print("⚠ Warning: stores.json not found. Catalog prices will have no store location.")
+        stores = {}
+
     # Process all test flyers
     all_results = []
     accuracy_scores = []
@@ -221,7 +294,7 @@ def main():
 
     for image_path in image_files:
         # Process flyer
-        result = pipeline.process_flyer(str(image_path))
+        result = pipeline.process_flyer(str(image_path), store=stores.get(image_path.name))
         all_results.append(result)
 
         # Calculate accuracy if ground truth exists
@@ -229,6 +302,8 @@ def main():
         if filename in ground_truth_data:
             accuracy = pipeline.calculate_accuracy(result, ground_truth_data[filename])
             result["accuracy"] = accuracy
+            if result["route"]:
+                pipeline.router.record_accuracy(result["route"]["route"], accuracy["accuracy_percent"])
             accuracy_scores.append(accuracy["accuracy_percent"])
             print(f"  Accuracy: {accuracy['accuracy_percent']}% (Precision: {accuracy['precision']}%, Recall: {accuracy['recall']}%)")
 
@@ -237,6 +312,15 @@ def main():
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(all_results, f, ensure_ascii=False, indent=2)
 
+    # Deduplicate products into the local catalog (price history across flyers)
+    catalog = ProductCatalog(str(results_dir / "product_catalog.db"))
+    try:
+        for result in all_results:
+            catalog.upsert_flyer(result, store=result.get("store"))
+        catalog_stats = catalog.stats()
+    finally:
+        catalog.close()
+
     # Generate summary report
     summary = {
         "total_flyers": len(all_results),
@@ -244,6 +328,8 @@ def main():
         "total_products_found": sum(len(r["products"]) for r in all_results),
         "total_cost_usd": round(pipeline.total_cost, 4),
         "avg_cost_per_flyer": round(pipeline.total_cost / len(all_results), 4),
+        # Calls to models without pricing are not in total_cost_usd
+        "unpriced_calls": pipeline.meter.unpriced_calls(),
     }
 
     if accuracy_scores:
@@ -260,6 +346,9 @@ def main():
     print(f"Avg Processing Time: {summary['avg_processing_time']}s")
     print(f"Total Cost: ${summary['total_cost_usd']}")
     print(f"Avg Cost per Flyer: ${summary['avg_cost_per_flyer']}")
+    if summary["unpriced_calls"]:
+        print(f"⚠ Cost excludes unpriced models: {summary['unpriced_calls']}")
+    print(f"Catalog: {catalog_stats['products']} unique products, {catalog_stats['price_observations']} price observations")
 
     if accuracy_scores:
         print(f"\nAccuracy Metrics:")
@@ -288,6 +377,17 @@ def main():
     else:
         print("❌ FAIL: Too expensive (>$0.10)")
 
+    # Per-route cost / latency / accuracy
+    pipeline.router.print_stats()
+    summary["routes"] = pipeline.router.stats()
+
+    # Per-stage latency (flyer/ocr, flyer/llm_structuring/llm_call, ...)
+    pipeline.tracer.print_report()
+    summary["stage_latency"] = {
+        row["span"]: {k: row[k] for k in ("count", "mean_ms", "p50_ms", "p95_ms", "max_ms")}
+        for row in pipeline.tracer.snapshot()
+    }
+
     # Save summary
     summary_file = results_dir / "summary_report.json"
     with open(summary_file, "w", encoding="utf-8") as f:
@@ -296,6 +396,7 @@ def main():
     print(f"\n📄 Results saved to:")
     print(f"  - {output_file}")
     print(f"  - {summary_file}")
+    print(f"  - {results_dir / 'product_catalog.db'}")
     print("="*60)
 
 
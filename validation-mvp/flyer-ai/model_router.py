@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Adaptive Model Routing for Flyer Structuring
+Sends easy flyers to a cheaper/faster model and escalates to the larger
+model only when the cheap answer fails or looks incomplete
+
+Difficulty signals (computed before any API call):
+  - OCR tokens after compaction (prompt_budget)
+  - rule extractor coverage: share of price mentions the regex extractor
+    can pair with a product name
+
+An answer is accepted when it parses to a product list whose prices cover
+the rule-extracted prices (confidence >= min_confidence); otherwise the
+flyer is re-run on the strong route. Cost and latency per route come from
+the shared UsageMeter (stage "flyer_structuring/<route>"); accuracy is
+added by callers that have ground truth.
+
+Usage:
+    python model_router.py                # offline: routing + cost estimate on MOCK_OCR_SAMPLES
+    python model_router.py --live         # call both routes (needs ANTHROPIC_API_KEY)
+    python model_router.py --max-easy-tokens 300 --min-coverage 0.9
+"""
+
+import re
+import os
+import json
+import argparse
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from prompt_budget import compact_ocr_text, estimate_tokens
+from product_catalog import parse_price
+from structuring_prompt import build_prompt
+from usage_meter import UsageMeter, get_default_meter
+
+FAST_MODEL = "claude-3-haiku-20240307"
+STRONG_MODEL = "claude-3-5-sonnet-20241022"
+
+STAGE = "flyer_structuring"
+
+PRICE_RE = re.compile(r"(\d{1,3}(?:,\d{3})+|\d+)\s*원")
+# Reference prices, not products of their own
+ORIGINAL_PRICE_CUES = ("정상가", "판매가", "소비자가")
+NAME_STRIP_RE = re.compile(r"^[\s\-•·*()\[\]]+|[\s\-•·*:(\[]+$")
+
+
+def rule_extract(ocr_text: str) -> Dict:
+    """
+    Regex product/price extraction (no API call)
+
+    A price's product name is the text before it on the same line, or the
+    previous unpriced line ("LG 그램 노트북\\n1,290,000원").
+
+    Returns:
+        {"products": [{"product_name", "price"}], "price_mentions": int,
+         "coverage": float}
+    """
+    products, mentions = [], 0
+    previous = ""
+    for line in compact_ocr_text(ocr_text).splitlines():
+        line = line.strip()
+        matches = list(PRICE_RE.finditer(line))
+        if not matches:
+            previous = line
+            continue
+        if any(cue in line for cue in ORIGINAL_PRICE_CUES):
+            continue
+
+        start = 0
+        for match in matches:
+            mentions += 1
+            name = NAME_STRIP_RE.sub("", line[start:match.start()])
+            if not name and start == 0:
+                name = previous
+            if name:
+                products.append({"product_name": name, "price": parse_price(match.group(1))})
+            start = match.end()
+        previous = ""
+
+    return {
+        "products": products,
+        "price_mentions": mentions,
+        "coverage": round(len(products) / mentions, 3) if mentions else 0.0,
+    }
+
+
+def answer_confidence(products: Optional[List[Dict]], rules: Dict) -> float:
+    """
+    How far a model answer can be trusted, in [0, 1]
+
+    Share of rule-extracted prices found in the answer, scaled by the share
+    of answer items that have both a name and a price. An empty or failed
+    parse scores 0.
+    """
+    if not products or not isinstance(products, list):
+        return 0.0
+    valid = [p for p in products if isinstance(p, dict) and p.get("product_name") and parse_price(p.get("price"))]
+    completeness = len(valid) / len(products)
+
+    rule_prices = {p["price"] for p in rules["products"]}
+    if not rule_prices:
+        return round(completeness, 3)
+    answer_prices = {parse_price(p.get("price")) for p in valid}
+    return round(len(rule_prices & answer_prices) / len(rule_prices) * completeness, 3)
+
+
+class ModelRouter:
+    """
+    Chooses the structuring model per flyer and escalates low-confidence answers
+
+    Args:
+        fast_model / strong_model: model per route
+        max_easy_tokens: compacted OCR tokens above which a flyer is hard
+        min_coverage: rule extractor coverage required for the fast route
+        max_easy_products: rule-extracted products above which a flyer is hard
+        min_confidence: answer confidence below which the fast answer is
+            re-run on the strong model
+        meter: UsageMeter that the structuring calls record into
+    """
+
+    ROUTES = ("fast", "strong")
+
+    def __init__(
+        self,
+        fast_model: str = FAST_MODEL,
+        strong_model: str = STRONG_MODEL,
+        max_easy_tokens: int = 600,
+        min_coverage: float = 0.8,
+        max_easy_products: int = 15,
+        min_confidence: float = 0.75,
+        meter: UsageMeter = None
+    ):
+        self.models = {"fast": fast_model, "strong": strong_model}
+        self.max_easy_tokens = max_easy_tokens
+        self.min_coverage = min_coverage
+        self.max_easy_products = max_easy_products
+        self.min_confidence = min_confidence
+        self.meter = meter or get_default_meter()
+
+        self._decisions = defaultdict(int)
+        self._escalations = defaultdict(int)
+        self._accepted = defaultdict(int)
+        self._accuracy = defaultdict(list)
+
+    @staticmethod
+    def stage(route: str) -> str:
+        """UsageMeter stage the calls of a route are recorded under"""
+        return f"{STAGE}/{route}"
+
+    def classify(self, ocr_text: str) -> Dict:
+        """Pick the initial route from pre-call signals"""
+        rules = rule_extract(ocr_text)
+        tokens = estimate_tokens(compact_ocr_text(ocr_text))
+
+        if tokens > self.max_easy_tokens:
+            route, reason = "strong", f"long OCR text (~{tokens} tokens)"
+        elif rules["coverage"] < self.min_coverage:
+            route, reason = "strong", f"low rule coverage ({rules['coverage']:.0%})"
+        elif len(rules["products"]) > self.max_easy_products:
+            route, reason = "strong", f"many products ({len(rules['products'])})"
+        else:
+            route, reason = "fast", "short text, rules cover the prices"
+
+        return {"route": route, "reason": reason, "ocr_tokens": tokens, "rules": rules}
+
+    def structure(self, ocr_text: str, call: Callable[[str, str], Optional[List[Dict]]]) -> Dict:
+        """
+        Structure one flyer with routing and escalation
+
+        Args:
+            ocr_text: raw OCR text
+            call: call(model, stage) -> parsed products (None / [] on failure);
+                it is expected to record usage into the meter under `stage`
+
+        Returns:
+            {"products", "route", "model", "escalated", "confidence",
+             "reason", "ocr_tokens", "rule_coverage"}
+        """
+        decision = self.classify(ocr_text)
+        route = decision["route"]
+        self._decisions[route] += 1
+
+        products = call(self.models[route], self.stage(route))
+        confidence = answer_confidence(products, decision["rules"])
+        escalated = False
+
+        if route == "fast" and confidence < self.min_confidence:
+            self._escalations["fast"] += 1
+            escalated, route = True, "strong"
+            products = call(self.models[route], self.stage(route))
+            confidence = answer_confidence(products, decision["rules"])
+        self._accepted[route] += 1
+
+        return {
+            "products": products or [],
+            "route": route,
+            "model": self.models[route],
+            "escalated": escalated,
+            "confidence": confidence,
+            "reason": decision["reason"],
+            "ocr_tokens": decision["ocr_tokens"],
+            "rule_coverage": decision["rules"]["coverage"],
+        }
+
+    def record_accuracy(self, route: str, score: float):
+        """Add a ground-truth accuracy score (percent) for an answer accepted on `route`"""
+        self._accuracy[route].append(score)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-route decisions / escalations plus cost and latency from the meter"""
+        usage = defaultdict(lambda: {"calls": 0, "cost_usd": 0.0, "latency_ms_sum": 0.0, "latency_ms_p95": None})
+        for row in self.meter.snapshot():
+            for route in self.ROUTES:
+                if row["stage"] == self.stage(route):
+                    u = usage[route]
+                    u["calls"] += row["calls"]
+                    u["cost_usd"] += row["cost_usd"]
+                    u["latency_ms_sum"] += row["latency_ms_avg"] * row["calls"]
+                    u["latency_ms_p95"] = max(filter(None, [u["latency_ms_p95"], row["latency_ms_p95"]]), default=None)
+
+        report = {}
+        for route in self.ROUTES:
+            u, scores = usage[route], self._accuracy[route]
+            report[route] = {
+                "model": self.models[route],
+                "routed": self._decisions[route],
+                "accepted": self._accepted[route],
+                "escalated": self._escalations[route],
+                "calls": u["calls"],
+                "cost_usd": round(u["cost_usd"], 6),
+                "latency_ms_avg": round(u["latency_ms_sum"] / u["calls"], 1) if u["calls"] else None,
+                "latency_ms_p95": u["latency_ms_p95"],
+                "avg_accuracy": round(sum(scores) / len(scores), 2) if scores else None,
+            }
+        return report
+
+    def print_stats(self):
+        print("\n=== Model Routes ===")
+        for route, s in self.stats().items():
+            accuracy = f" accuracy={s['avg_accuracy']}%" if s["avg_accuracy"] is not None else ""
+            latency = f" avg={s['latency_ms_avg']}ms" if s["latency_ms_avg"] is not None else ""
+            print(f"  {route} ({s['model']}): routed={s['routed']} accepted={s['accepted']} "
+                  f"escalated={s['escalated']} calls={s['calls']} cost=${s['cost_usd']:.4f}{latency}{accuracy}")
+
+
+def evaluate_offline(router: ModelRouter, samples: List[Dict], template_tokens: int) -> Dict:
+    """
+    Routing decisions and estimated cost on recorded samples (no API calls)
+
+    Output tokens are estimated from the ground-truth JSON. A fast-routed
+    sample whose ground truth itself scores below min_confidence would be
+    escalated even when answered correctly; its cost counts both routes.
+    """
+    rows = []
+    for sample in samples:
+        decision = router.classify(sample["ocr_text"])
+        truth_prices = {parse_price(p["price"]) for p in sample["ground_truth"]}
+        rule_prices = {p["price"] for p in decision["rules"]["products"]}
+
+        input_tokens = decision["ocr_tokens"] + template_tokens
+        output_tokens = estimate_tokens(json.dumps(sample["ground_truth"], ensure_ascii=False))
+        cost = {
+            route: router.meter.calculate_cost(model, input_tokens, output_tokens)
+            for route, model in router.models.items()
+        }
+        truth_confidence = answer_confidence(sample["ground_truth"], decision["rules"])
+        false_escalation = decision["route"] == "fast" and truth_confidence < router.min_confidence
+        routed_cost = cost["fast"] + cost["strong"] if false_escalation else cost[decision["route"]]
+        rows.append({
+            "name": sample["name"],
+            "route": decision["route"],
+            "reason": decision["reason"],
+            "ocr_tokens": decision["ocr_tokens"],
+            "rule_coverage": decision["rules"]["coverage"],
+            "rule_price_recall": round(len(truth_prices & rule_prices) / len(truth_prices), 3) if truth_prices else None,
+            "truth_confidence": truth_confidence,
+            "false_escalation": false_escalation,
+            "routed_cost_usd": round(routed_cost, 6),
+            "strong_cost_usd": round(cost["strong"], 6),
+        })
+
+    routed = sum(r["routed_cost_usd"] for r in rows)
+    strong = sum(r["strong_cost_usd"] for r in rows)
+    return {
+        "samples": rows,
+        "false_escalations": sum(1 for r in rows if r["false_escalation"]),
+        "fast_share": round(sum(1 for r in rows if r["route"] == "fast") / len(rows), 3) if rows else 0.0,
+        "routed_cost_usd": round(routed, 6),
+        "strong_only_cost_usd": round(strong, 6),
+        "estimated_savings": round(1 - routed / strong, 3) if strong else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate adaptive model routing on MOCK_OCR_SAMPLES")
+    parser.add_argument("--live", action="store_true", help="call the models (needs ANTHROPIC_API_KEY)")
+    parser.add_argument("--max-easy-tokens", type=int, default=600)
+    parser.add_argument("--min-coverage", type=float, default=0.8)
+    parser.add_argument("--min-confidence", type=float, default=0.75)
+    args = parser.parse_args()
+
+    from test_llm_structuring import MOCK_OCR_SAMPLES, LLMStructuringTester
+
+    meter = UsageMeter()
+    router = ModelRouter(
+        max_easy_tokens=args.max_easy_tokens,
+        min_coverage=args.min_coverage,
+        min_confidence=args.min_confidence,
+        meter=meter,
+    )
+
+    print("=" * 70)
+    print(f"Model Routing - {'Live' if args.live else 'Offline'} Evaluation (MOCK_OCR_SAMPLES)")
+    print("=" * 70)
+
+    if not args.live:
+        report = evaluate_offline(router, MOCK_OCR_SAMPLES, estimate_tokens(build_prompt("")))
+        for r in report["samples"]:
+            print(f"  {r['name']}: {r['route']} ({r['reason']}) "
+                  f"rules={r['rule_coverage']:.0%} price recall={r['rule_price_recall']:.0%} "
+                  f"truth confidence={r['truth_confidence']:.2f} "
+                  f"${r['routed_cost_usd']:.5f} vs ${r['strong_cost_usd']:.5f}")
+        print(f"\n✓ Fast route share: {report['fast_share']:.0%}")
+        if report["false_escalations"]:
+            print(f"⚠ {report['false_escalations']} correct answer(s) would be escalated "
+                  f"(truth confidence < {router.min_confidence})")
+        print(f"✓ Estimated cost: ${report['routed_cost_usd']:.5f} routed vs "
+              f"${report['strong_only_cost_usd']:.5f} strong-only ({report['estimated_savings']:.0%} saved)")
+        return
+
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("\n❌ ANTHROPIC_API_KEY not found in environment")
+        print("   Please set it: export ANTHROPIC_API_KEY='your-key-here'")
+        return
+
+    tester = LLMStructuringTester(api_key, meter=meter)
+
+    for sample in MOCK_OCR_SAMPLES:
+        def call(model: str, stage: str) -> Optional[List[Dict]]:
+            result = tester.structure_text(sample["ocr_text"], model=model, stage=stage)
+            return result["products"] if result["success"] else None
+
+        result = router.structure(sample["ocr_text"], call)
+        accuracy = tester.calculate_accuracy(result["products"], sample["ground_truth"])
+        router.record_accuracy(result["route"], accuracy["f1_score"])
+        escalated = " (escalated)" if result["escalated"] else ""
+        print(f"  {sample['name']}: {result['route']}{escalated} "
+              f"confidence={result['confidence']} F1={accuracy['f1_score']}%")
+
+    router.print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Townin Product Catalog - Local Store for Extracted Flyer Products
+Deduplicates products across flyers/weeks and keeps per-store price history
+
+Backed by SQLite with an inverted index over normalized name tokens,
+brand and unit, so lookups never re-scan the extracted JSON dumps.
+
+Usage:
+    python product_catalog.py --input results/extracted_products.json
+    python product_catalog.py --query 삼겹살 --lat 37.50 --lng 127.03
+"""
+
+import re
+import json
+import math
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable
+
+DEFAULT_DB_PATH = "results/product_catalog.db"
+
+# Brands seen in Korean retail flyers (first match in the name wins)
+KNOWN_BRANDS = [
+    "삼성", "lg", "애플", "설화수", "라네즈", "메디힐", "이니스프리", "bbq", "bhc",
+    "교촌", "스타벅스", "cj", "오뚜기", "농심", "풀무원", "동원", "해태", "롯데",
+]
+
+# Unit strings as written on flyers → canonical unit
+UNIT_ALIASES = {
+    "원": "ea",
+    "개": "ea",
+    "원/개": "ea",
+    "원/kg": "kg",
+    "kg": "kg",
+    "원/100g": "100g",
+    "100g": "100g",
+}
+
+HANGUL_WORD_RE = re.compile(r"^[가-힣]+$")
+NON_WORD_RE = re.compile(r"[^\w+]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    norm_key TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    brand TEXT,
+    unit TEXT,
+    category TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS product_tokens (
+    token TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    PRIMARY KEY (token, product_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS prices (
+    product_id INTEGER NOT NULL,
+    flyer TEXT NOT NULL,
+    store_id TEXT,
+    lat REAL,
+    lng REAL,
+    price INTEGER NOT NULL,
+    original_price INTEGER,
+    promotion TEXT,
+    observed_at TEXT NOT NULL,
+    flyer_week TEXT NOT NULL,
+    PRIMARY KEY (product_id, flyer, flyer_week)
+);
+CREATE INDEX IF NOT EXISTS idx_prices_product_price ON prices (product_id, price);
+CREATE INDEX IF NOT EXISTS idx_prices_geo ON prices (lat, lng);
+"""
+
+# Catalogs created before prices were keyed by flyer week: one row per
+# (product, flyer), so only the latest week survived
+MIGRATE_PRICES_V1 = """
+ALTER TABLE prices RENAME TO prices_v1;
+DROP INDEX IF EXISTS idx_prices_product_price;
+DROP INDEX IF EXISTS idx_prices_geo;
+""" + SCHEMA + """
+INSERT INTO prices
+    (product_id, flyer, store_id, lat, lng, price, original_price, promotion, observed_at, flyer_week)
+SELECT product_id, flyer, store_id, lat, lng, price, original_price, promotion, observed_at,
+       strftime('%Y-%W', observed_at)
+FROM prices_v1;
+DROP TABLE prices_v1;
+"""
+
+# Brands were stored as given before they were lowercased like search filters
+NORMALIZE_BRANDS = """
+UPDATE products SET brand = lower(brand) WHERE brand <> lower(brand);
+INSERT OR IGNORE INTO product_tokens (token, product_id)
+    SELECT lower(token), product_id FROM product_tokens WHERE token LIKE 'brand:%' AND token <> lower(token);
+DELETE FROM product_tokens WHERE token LIKE 'brand:%' AND token <> lower(token);
+"""
+
+# Same format as SQLite strftime('%Y-%W'): year and Monday-based week
+FLYER_WEEK_FORMAT = "%Y-%W"
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return " ".join(NON_WORD_RE.sub(" ", (name or "").lower()).split())
+
+
+def normalize_unit(unit: Optional[str]) -> str:
+    """Map flyer unit strings (원, 원/kg, ...) to a canonical unit"""
+    unit = (unit or "").replace(" ", "").lower()
+    return UNIT_ALIASES.get(unit, unit or "ea")
+
+
+def normalize_brand(brand: Optional[str]) -> Optional[str]:
+    """Lowercase and collapse whitespace (KNOWN_BRANDS and search filters are lowercase)"""
+    return " ".join((brand or "").lower().split()) or None
+
+
+def detect_brand(normalized_name: str) -> Optional[str]:
+    for brand in KNOWN_BRANDS:
+        if brand in normalized_name:
+            return brand
+    return None
+
+
+def tokenize(normalized_name: str) -> List[str]:
+    """
+    Index tokens for a normalized name
+
+    Hangul words are indexed as syllable bigrams so that "김치찌개" also
+    matches "김치찌개용"; other words (latin, digits) are indexed whole.
+    """
+    tokens = set()
+    for word in normalized_name.split():
+        if HANGUL_WORD_RE.match(word) and len(word) > 2:
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.add(word)
+    return sorted(tokens)
+
+
+def parse_price(value) -> Optional[int]:
+    """'9,900' / '9900' / 9900 → 9900; None if there is no number"""
+    if value is None:
+        return None
+    digits = re.sub(r"[^\d]", "", str(value))
+    return int(digits) if digits else None
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class ProductCatalog:
+    """
+    Deduplicated product catalog with price history
+
+    A product is identified by (normalized name, canonical unit), so the
+    same item in different flyers/weeks collapses onto one product_id.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(prices)")}
+        if columns and "flyer_week" not in columns:
+            self.conn.executescript(MIGRATE_PRICES_V1)
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.executescript(NORMALIZE_BRANDS)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_flyer(
+        self,
+        flyer_result: Dict,
+        store: Optional[Dict] = None,
+        observed_at: Optional[str] = None
+    ) -> int:
+        """
+        Bulk upsert all products of one `FlyerAIPipeline.process_flyer` result
+
+        Prices are kept per flyer week: the same flyer file processed again
+        in the same week replaces that week's prices, a new week appends.
+
+        Args:
+            flyer_result: {"filename": ..., "products": [...], "store": {...}}
+            store: {"store_id", "lat", "lng"} of the issuing store (defaults
+                to flyer_result["store"]; needed for cheapest_nearby)
+            observed_at: ISO timestamp (defaults to now)
+
+        Returns:
+            Number of price observations written
+        """
+        store = store or flyer_result.get("store") or {}
+        observed_at = observed_at or datetime.now().isoformat(timespec="seconds")
+        flyer = flyer_result.get("filename", "unknown")
+        flyer_week = datetime.fromisoformat(observed_at).strftime(FLYER_WEEK_FORMAT)
+
+        rows = []
+        for product in flyer_result.get("products", []):
+            price = parse_price(product.get("price"))
+            name = normalize_name(product.get("product_name", ""))
+            if price is None or not name:
+                continue
+            unit = normalize_unit(product.get("unit"))
+            rows.append({
+                "norm_key": f"{name}|{unit}",
+                "display_name": product.get("product_name", "").strip(),
+                "brand": normalize_brand(product.get("brand")) or detect_brand(name),
+                "unit": unit,
+                "category": product.get("category"),
+                "name": name,
+                "price": price,
+                "original_price": parse_price(product.get("original_price")),
+                "promotion": product.get("promotion"),
+            })
+
+        if not rows:
+            return 0
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO products (norm_key, display_name, brand, unit, category, first_seen, last_seen)
+                VALUES (:norm_key, :display_name, :brand, :unit, :category, :observed_at, :observed_at)
+                ON CONFLICT(norm_key) DO UPDATE SET
+                    last_seen = MAX(last_seen, excluded.last_seen),
+                    brand = COALESCE(products.brand, excluded.brand),
+                    category = COALESCE(products.category, excluded.category)
+            """, [{**r, "observed_at": observed_at} for r in rows])
+
+            ids = self._product_ids([r["norm_key"] for r in rows])
+
+            token_rows = []
+            for r in rows:
+                product_id = ids[r["norm_key"]]
+                extra = [f"brand:{r['brand']}"] if r["brand"] else []
+                extra.append(f"unit:{r['unit']}")
+                token_rows.extend((t, product_id) for t in tokenize(r["name"]) + extra)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO product_tokens (token, product_id) VALUES (?, ?)",
+                token_rows
+            )
+
+            self.conn.executemany("""
+                INSERT INTO prices
+                    (product_id, flyer, store_id, lat, lng, price, original_price, promotion, observed_at, flyer_week)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(product_id, flyer, flyer_week) DO UPDATE SET
+                    store_id = excluded.store_id,
+                    lat = excluded.lat,
+                    lng = excluded.lng,
+                    price = excluded.price,
+                    original_price = excluded.original_price,
+                    promotion = excluded.promotion,
+                    observed_at = excluded.observed_at
+            """, [
+                (ids[r["norm_key"]], flyer, store.get("store_id"), store.get("lat"), store.get("lng"),
+                 r["price"], r["original_price"], r["promotion"], observed_at, flyer_week)
+                for r in rows
+            ])
+
+        return len(rows)
+
+    def _product_ids(self, norm_keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(set(norm_keys))
+        ids = {}
+        # SQLite caps bound parameters; 500 stays well below every default
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row in self.conn.execute(
+                f"SELECT norm_key, product_id FROM products WHERE norm_key IN ({placeholders})", batch
+            ):
+                ids[row["norm_key"]] = row["product_id"]
+        return ids
+
+    def search(self, query: str, brand: Optional[str] = None, unit: Optional[str] = None) -> List[Dict]:
+        """Products whose index contains every query token (plus brand/unit filters)"""
+        tokens = tokenize(normalize_name(query))
+        if brand:
+            tokens.append(f"brand:{normalize_brand(brand)}")
+        if unit:
+            tokens.append(f"unit:{normalize_unit(unit)}")
+        if not tokens:
+            return []
+
+        placeholders = ",".join("?" * len(tokens))
+        rows = self.conn.execute(f"""
+            SELECT p.* FROM products p
+            JOIN (
+                SELECT product_id FROM product_tokens
+                WHERE token IN ({placeholders})
+                GROUP BY product_id
+                HAVING COUNT(*) = ?
+            ) m ON m.product_id = p.product_id
+            ORDER BY p.display_name
+        """, [*tokens, len(set(tokens))]).fetchall()
+        return [dict(r) for r in rows]
+
+    def price_history(self, product_id: int) -> List[Dict]:
+        """All price observations of a product, oldest first"""
+        rows = self.conn.execute("""
+            SELECT flyer, store_id, lat, lng, price, original_price, promotion, observed_at
+            FROM prices WHERE product_id = ?
+            ORDER BY observed_at
+        """, (product_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def cheapest_nearby(
+        self,
+        query: str,
+        lat: float,
+        lng: float,
+        radius_km: float = 3.0,
+        limit: int = 10
+    ) -> List[Dict]:
+        """
+        Cheapest current offers for matching products within `radius_km`
+
+        A lat/lng bounding box is applied in SQL (uses idx_prices_geo);
+        exact distances are computed only for the surviving rows.
+        """
+        product_ids = [p["product_id"] for p in self.search(query)]
+        if not product_ids:
+            return []
+
+        dlat = radius_km / 111.0
+        dlng = radius_km / (111.0 * max(math.cos(math.radians(lat)), 1e-6))
+        placeholders = ",".join("?" * len(product_ids))
+
+        # Latest observation per (product, store) only
+        rows = self.conn.execute(f"""
+            SELECT pr.*, p.display_name, p.unit FROM prices pr
+            JOIN products p ON p.product_id = pr.product_id
+            WHERE pr.product_id IN ({placeholders})
+              AND pr.lat BETWEEN ? AND ? AND pr.lng BETWEEN ? AND ?
+              AND pr.observed_at = (
+                  SELECT MAX(observed_at) FROM prices x
+                  WHERE x.product_id = pr.product_id AND x.store_id IS pr.store_id
+              )
+            ORDER BY pr.price
+        """, [*product_ids, lat - dlat, lat + dlat, lng - dlng, lng + dlng]).fetchall()
+
+        offers = []
+        for row in rows:
+            distance = haversine_km(lat, lng, row["lat"], row["lng"])
+            if distance <= radius_km:
+                offers.append({**dict(row), "distance_km": round(distance, 2)})
+                if len(offers) >= limit:
+                    break
+        return offers
+
+    def stats(self) -> Dict:
+        return {
+            "products": self.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0],
+            "price_observations": self.conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0],
+            "index_tokens": self.conn.execute("SELECT COUNT(*) FROM product_tokens").fetchone()[0],
+        }
+
+
+def main():
+    """Ingest extracted flyer products and/or query the catalog"""
+    parser = argparse.ArgumentParser(description="Townin product catalog")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--input", help="extracted_products.json from flyer_pipeline.py")
+    parser.add_argument("--stores", help="stores.json mapping flyer filename to store_id/lat/lng "
+                                         "(for results without a store)")
+    parser.add_argument("--query", help="product name to search")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lng", type=float)
+    parser.add_argument("--radius-km", type=float, default=3.0)
+    args = parser.parse_args()
+
+    catalog = ProductCatalog(args.db)
+
+    try:
+        if args.input:
+            with open(args.input, encoding="utf-8") as f:
+                flyer_results = json.load(f)
+            stores = {}
+            if args.stores:
+                with open(args.stores, encoding="utf-8") as f:
+                    stores = json.load(f)
+            written = sum(
+                catalog.upsert_flyer(r, store=r.get("store") or stores.get(r.get("filename")))
+                for r in flyer_results
+            )
+            print(f"✓ Upserted {written} price observations from {len(flyer_results)} flyers")
+
+        if args.query:
+            if args.lat is not None and args.lng is not None:
+                offers = catalog.cheapest_nearby(args.query, args.lat, args.lng, args.radius_km)
+                print(f"\nCheapest '{args.query}' within {args.radius_km}km: {len(offers)} offer(s)")
+                for o in offers:
+                    print(f"  {o['display_name']} - {o['price']:,}원 @ {o['store_id']} ({o['distance_km']}km)")
+            else:
+                for p in catalog.search(args.query):
+                    history = catalog.price_history(p["product_id"])
+                    prices = [h["price"] for h in history]
+                    print(f"  {p['display_name']} [{p['unit']}] - {len(history)} obs, "
+                          f"min {min(prices):,}원 / max {max(prices):,}원")
+
+        stats = catalog.stats()
+        print(f"\nCatalog: {stats['products']} products, {stats['price_observations']} prices, "
+              f"{stats['index_tokens']} index entries")
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Prompt Token Budgeting for Flyer Structuring
+Compacts raw OCR text and estimates prompt tokens before calling the LLM
+
+Usage:
+    python prompt_budget.py --input ocr_dump.txt
+"""
+
+import re
+import argparse
+from collections import Counter
+from typing import List, Dict
+
+# Claude 3.5 Sonnet context is far larger, but flyer prompts above this size
+# are almost always OCR noise and only add latency and cost.
+DEFAULT_MAX_INPUT_TOKENS = 4000
+
+# Words that mark a line as product/price related even without digits
+PRODUCT_CUES = (
+    "원", "할인", "특가", "정상가", "세일", "행사", "증정", "무료", "세트",
+    "반값", "균일가", "kg", "ml", "개입", "매입",
+)
+
+HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+WHITESPACE_RE = re.compile(r"[ \t　\xa0]+")
+DIGIT_RE = re.compile(r"\d")
+
+
+class PromptBudgetExceeded(Exception):
+    """Raised when OCR text cannot be fitted into the token budget"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough pre-flight token count (no API call)
+
+    Hangul syllables tokenize at roughly one token each, while Latin text,
+    digits and punctuation average about four characters per token.
+    """
+    if not text:
+        return 0
+    hangul = len(HANGUL_RE.findall(text))
+    other = len(text) - hangul
+    return hangul + (other + 3) // 4
+
+
+def _has_product_cue(line: str) -> bool:
+    return bool(DIGIT_RE.search(line)) or any(cue in line for cue in PRODUCT_CUES)
+
+
+def compact_ocr_text(ocr_text: str, repeat_threshold: int = 3, context_lines: int = 2) -> str:
+    """
+    Shrink OCR text before it is embedded in the prompt
+
+    1. Fold runs of spaces/tabs, strip each line and drop empty lines
+    2. Keep boilerplate once: a line repeated `repeat_threshold`+ times is
+       collapsed only if neither it nor a neighbouring line has digits
+       (store banners, footers). Repeated promo or price lines ("1+1",
+       "9,900원") and lines next to a price are always kept.
+    3. Drop lines with no digits or product cues only when they are more
+       than `context_lines` lines away from any line that has them
+       (product names and descriptions sit right around the price)
+    """
+    lines = [WHITESPACE_RE.sub(" ", line).strip() for line in ocr_text.splitlines()]
+    lines = [line for line in lines if line]
+
+    priced = [_has_product_cue(line) for line in lines]
+    digits = [bool(DIGIT_RE.search(line)) for line in lines]
+    counts = Counter(lines)
+    seen = set()
+    kept = []
+    for i, line in enumerate(lines):
+        near = any(priced[max(0, i - context_lines):i + context_lines + 1])
+        if not near:
+            continue
+
+        if counts[line] >= repeat_threshold and not any(digits[max(0, i - 1):i + 2]):
+            if line in seen:
+                continue
+            seen.add(line)
+        kept.append(line)
+
+    return "\n".join(kept)
+
+
+def split_ocr_text(ocr_text: str, max_tokens: int) -> List[str]:
+    """
+    Split OCR text on line boundaries into chunks of at most `max_tokens`
+
+    Raises:
+        PromptBudgetExceeded: if a single line is larger than the budget
+    """
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for line in ocr_text.splitlines():
+        line_tokens = estimate_tokens(line) + 1  # newline
+        if line_tokens > max_tokens:
+            raise PromptBudgetExceeded(
+                f"Single OCR line needs ~{line_tokens} tokens (budget {max_tokens})"
+            )
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class PromptBudget:
+    """
+    Plans LLM calls for one flyer so the prompt stays within budget
+
+    The prompt template is measured once; the OCR text gets whatever is left.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: int = DEFAULT_MAX_INPUT_TOKENS,
+        allow_split: bool = True,
+        max_chunks: int = 4,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.allow_split = allow_split
+        self.max_chunks = max_chunks
+
+    def plan(self, ocr_text: str, template_tokens: int) -> Dict:
+        """
+        Compact OCR text and decide how many LLM calls are needed
+
+        Returns:
+            {"chunks": [...], "raw_tokens": int, "compacted_tokens": int,
+             "estimated_input_tokens": int}
+
+        Raises:
+            PromptBudgetExceeded: if the text overflows and cannot be split
+        """
+        compacted = compact_ocr_text(ocr_text)
+        raw_tokens = estimate_tokens(ocr_text)
+        compacted_tokens = estimate_tokens(compacted)
+        text_budget = self.max_input_tokens - template_tokens
+
+        if text_budget <= 0:
+            raise PromptBudgetExceeded(
+                f"Prompt template alone needs ~{template_tokens} tokens (budget {self.max_input_tokens})"
+            )
+
+        if compacted_tokens <= text_budget:
+            chunks = [compacted]
+        elif not self.allow_split:
+            raise PromptBudgetExceeded(
+                f"OCR text needs ~{compacted_tokens} tokens (budget {text_budget})"
+            )
+        else:
+            chunks = split_ocr_text(compacted, text_budget)
+            if len(chunks) > self.max_chunks:
+                raise PromptBudgetExceeded(
+                    f"OCR text needs {len(chunks)} LLM calls (limit {self.max_chunks})"
+                )
+
+        return {
+            "chunks": chunks,
+            "raw_tokens": raw_tokens,
+            "compacted_tokens": compacted_tokens,
+            "estimated_input_tokens": sum(estimate_tokens(c) + template_tokens for c in chunks),
+        }
+
+
+def main():
+    """Report token savings of OCR compaction for a text dump"""
+    parser = argparse.ArgumentParser(description="Estimate prompt tokens for OCR text")
+    parser.add_argument("--input", required=True, help="OCR text file")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        ocr_text = f.read()
+
+    compacted = compact_ocr_text(ocr_text)
+    raw_tokens = estimate_tokens(ocr_text)
+    compacted_tokens = estimate_tokens(compacted)
+    saved = (1 - compacted_tokens / raw_tokens) * 100 if raw_tokens else 0
+
+    print(f"Raw OCR text:       {len(ocr_text)} chars, ~{raw_tokens} tokens")
+    print(f"Compacted OCR text: {len(compacted)} chars, ~{compacted_tokens} tokens")
+    print(f"Saved: {saved:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
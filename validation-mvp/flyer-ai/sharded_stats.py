@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Per-thread Sharded Aggregates
+Shared plumbing for UsageMeter and Tracer
+
+Every thread records into its own Shard, so the hot path only takes an
+uncontended lock; readers merge the shards when a snapshot or flush is
+taken. Shards of exited threads are folded into one retired shard so
+short-lived worker threads don't pile up.
+
+Usage:
+    shards = ShardSet(Stats)          # Stats needs a merge(other) method
+    shard = shards.local()
+    with shard.lock:
+        shard.data[key].add(value)
+
+    for shard in shards.all():
+        with shard.lock:
+            data = shard.swap()
+"""
+
+import threading
+import weakref
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class Shard:
+    """Per-thread buffer; its lock is only contended during a flush"""
+
+    def __init__(self, factory: Callable):
+        self.lock = threading.Lock()
+        self.factory = factory
+        self.data: Dict = defaultdict(factory)
+        self._owner = weakref.ref(threading.current_thread())
+
+    def swap(self) -> Dict:
+        """Replace the buffer with an empty one and return the old one (hold `lock`)"""
+        data, self.data = self.data, defaultdict(self.factory)
+        return data
+
+    def orphaned(self) -> bool:
+        """True once the owning thread has exited (nothing writes here anymore)"""
+        owner = self._owner()
+        return owner is None or not owner.is_alive()
+
+
+class ShardSet:
+    """
+    One Shard per thread plus a retired shard for threads that have exited
+
+    Args:
+        factory: creates an empty aggregate; aggregates must support merge(other)
+    """
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self._local = threading.local()
+        self._shards: List[Shard] = []
+        self._lock = threading.Lock()
+        self._retired = Shard(factory)
+
+    def local(self) -> Shard:
+        """The calling thread's shard (created on first use)"""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = Shard(self.factory)
+            with self._lock:
+                self._retire_orphans()
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def all(self) -> List[Shard]:
+        """Live shards plus the retired one, after folding in exited threads"""
+        with self._lock:
+            self._retire_orphans()
+            return self._shards + [self._retired]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._shards)
+
+    def _retire_orphans(self):
+        """Merge shards of exited threads into `_retired` (caller holds _lock)"""
+        live = []
+        for shard in self._shards:
+            if not shard.orphaned():
+                live.append(shard)
+                continue
+            with shard.lock:
+                data = shard.swap()
+            with self._retired.lock:
+                for key, value in data.items():
+                    self._retired.data[key].merge(value)
+        self._shards = live
+
+
+def percentile_ms(buckets: List[int], q: float, bounds: Sequence[float]) -> Optional[float]:
+    """Upper bound (ms) of the bucket holding the q-th percentile; inf past the last bound"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            return float(bounds[i]) if i < len(bounds) else float("inf")
+    return float("inf")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Hot-path Span Tracer
+Nanosecond stage timers with sampling and in-memory latency histograms
+
+Spans nest per thread ("flyer/llm_structuring/llm_call") and are aggregated
+into log2 histograms in per-thread shards, like UsageMeter, so timing a
+stage costs two perf_counter_ns() calls and an uncontended lock. Nothing is
+sent per call; aggregated histograms are exported once (e.g. to MLflow at
+run end via `mlflow_exporter`). The MLflow client is only imported by
+`mlflow_exporter`, so scripts that just time stages don't load it.
+
+Usage:
+    tracer = get_tracer()
+    with tracer.span("ocr"):
+        text = run_ocr(image)
+
+    @tracer.traced("parse")
+    def parse(text): ...
+
+    tracer.print_report()
+    tracer.export(mlflow_exporter(client))
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from sharded_stats import ShardSet, percentile_ms
+
+# Bucket i holds durations below 2**i µs; the last bucket is open-ended (~1.1h)
+NUM_BUCKETS = 32
+BUCKET_BOUNDS_MS = tuple((2 ** i) / 1000 for i in range(NUM_BUCKETS))
+
+
+class _SpanStats:
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "errors", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.errors = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, duration_ns: int, failed: bool):
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        if failed:
+            self.errors += 1
+        self.buckets[min((duration_ns // 1000).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def merge(self, other: "_SpanStats"):
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.errors += other.errors
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+
+
+class Tracer:
+    """
+    Aggregating span tracer
+
+    Args:
+        sample_rate: share of root spans that are timed (children follow
+            their root's decision, so sampled traces are complete)
+        enabled: master switch; a disabled tracer yields immediately
+    """
+
+    def __init__(self, sample_rate: float = 1.0, enabled: bool = True):
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+
+        self._local = threading.local()
+        self._shards = ShardSet(_SpanStats)
+
+    def _stack(self) -> List[Optional[str]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as `name`, nested under the current span"""
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        if stack:
+            # None marks an unsampled trace: children are skipped too
+            path = None if stack[-1] is None else f"{stack[-1]}/{name}"
+        else:
+            path = name if self.sample_rate >= 1.0 or random.random() < self.sample_rate else None
+
+        stack.append(path)
+        failed = False
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            duration = time.perf_counter_ns() - start
+            stack.pop()
+            if path is not None:
+                shard = self._shards.local()
+                with shard.lock:
+                    shard.data[path].add(duration, failed)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator form of span() (defaults to the function name)"""
+        def decorator(fn):
+            span_name = name or fn.__name__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _merged(self, drain: bool) -> Dict[str, _SpanStats]:
+        merged: Dict[str, _SpanStats] = defaultdict(_SpanStats)
+        for shard in self._shards.all():
+            with shard.lock:
+                data = shard.swap() if drain else shard.data
+            for path, stats in data.items():
+                merged[path].merge(stats)
+        return merged
+
+    def _to_rows(self, merged: Dict[str, _SpanStats]) -> List[Dict]:
+        rows = []
+        for path, stats in sorted(merged.items()):
+            rows.append({
+                "span": path,
+                "count": stats.count,
+                # Root sampling thins every span equally
+                "estimated_calls": round(stats.count / self.sample_rate) if self.sample_rate > 0 else stats.count,
+                "errors": stats.errors,
+                "mean_ms": round(stats.total_ns / stats.count / 1e6, 3) if stats.count else 0.0,
+                "min_ms": round((stats.min_ns or 0) / 1e6, 3),
+                "max_ms": round(stats.max_ns / 1e6, 3),
+                "p50_ms": percentile_ms(stats.buckets, 0.50, BUCKET_BOUNDS_MS),
+                "p95_ms": percentile_ms(stats.buckets, 0.95, BUCKET_BOUNDS_MS),
+                "p99_ms": percentile_ms(stats.buckets, 0.99, BUCKET_BOUNDS_MS),
+                "histogram_us": {f"<{2 ** i}": n for i, n in enumerate(stats.buckets) if n},
+            })
+        return rows
+
+    def snapshot(self) -> List[Dict]:
+        """Aggregates since creation / the last export, without draining"""
+        return self._to_rows(self._merged(drain=False))
+
+    def export(self, exporter: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
+        """Drain aggregates and hand them to the exporter in one call"""
+        rows = self._to_rows(self._merged(drain=True))
+        if rows and exporter is not None:
+            exporter(rows)
+        return rows
+
+    def print_report(self):
+        rows = self.snapshot()
+        if not rows:
+            return
+        print("\n=== Stage Latency ===")
+        for row in rows:
+            depth = row["span"].count("/")
+            label = "  " * depth + row["span"].rsplit("/", 1)[-1]
+            print(f"  {label}: n={row['count']} mean={row['mean_ms']}ms "
+                  f"p50≤{row['p50_ms']}ms p95≤{row['p95_ms']}ms max={row['max_ms']}ms")
+
+
+def mlflow_exporter(client, prefix: str = "span") -> Callable[[List[Dict]], None]:
+    """Exporter that logs span aggregates to the active run in one batch"""
+    # Importing usage_meter also puts the MLflow client directory on sys.path
+    from usage_meter import MLFLOW_CLIENT_DIR
+    try:
+        from townin_mlflow_client import TowninLangChainTracker
+    except ImportError as e:  # mlflow / google-auth are optional for the validation scripts
+        raise ImportError(f"townin_mlflow_client could not be imported from {MLFLOW_CLIENT_DIR}: {e}") from e
+
+    def _export(rows: List[Dict]):
+        TowninLangChainTracker.log_span_summary(client, rows, prefix=prefix)
+
+    return _export
+
+
+_default_tracer: Optional[Tracer] = None
+_default_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer shared by all pipelines"""
+    global _default_tracer
+    if _default_tracer is None:
+        with _default_lock:
+            if _default_tracer is None:
+                _default_tracer = Tracer()
+    return _default_tracer
+
+
+def set_tracer(tracer: Tracer):
+    """Replace the shared tracer (e.g. one with sampling)"""
+    global _default_tracer
+    with _default_lock:
+        _default_tracer = tracer
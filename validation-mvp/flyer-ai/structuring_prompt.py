@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Flyer Structuring Prompt
+The product-extraction prompt shared by test_llm_structuring and the model
+router (which sizes its template without calling the API)
+"""
+
+
+def build_prompt(ocr_text: str) -> str:
+    """Structuring prompt for one OCR text"""
+    return f"""You are a Korean retail product data extraction expert.
+
+OCR Text from a Korean retail flyer:
+{ocr_text}
+
+Extract ALL products mentioned in this flyer and return a JSON array with the following structure:
+
+[
+  {{
+    "product_name": "제품명 (Korean)",
+    "price": "가격 (숫자만, 예: 9900)",
+    "unit": "단위 (예: 원, 개, kg)",
+    "original_price": "할인 전 가격 (if applicable, else null)",
+    "promotion": "프로모션 (예: 1+1, 2+1, 50% 할인, null if none)",
+    "description": "간단한 설명 (1-2 sentences)",
+    "category": "카테고리 (예: 식품, 화장품, 전자제품)"
+  }}
+]
+
+Rules:
+1. Extract ONLY products with clear prices
+2. If price is range (예: 5,000-10,000), use middle value
+3. Understand Korean promotions: "1+1" (buy 1 get 1), "2+1", "반값" (half price), "~% 할인" (discount)
+4. If original_price not mentioned, set to null
+5. Return valid JSON array ONLY (no markdown, no explanation)
+"""
@@ -6,8 +6,11 @@ Tests Claude's ability to structure Korean product data from raw text
 
 import os
 import json
+import time
 from pathlib import Path
 from anthropic import Anthropic
+from structuring_prompt import build_prompt
+from usage_meter import UsageMeter, get_default_meter
 
 # Mock OCR text samples (realistic Korean flyer text)
 MOCK_OCR_SAMPLES = [
@@ -126,43 +129,21 @@ MOCK_OCR_SAMPLES = [
 
 
 class LLMStructuringTester:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, meter: UsageMeter = None):
         self.client = Anthropic(api_key=api_key)
+        self.meter = meter or get_default_meter()
         self.total_cost = 0.0
 
-    def structure_text(self, ocr_text: str) -> list:
+    def structure_text(self, ocr_text: str, model: str = "claude-3-5-sonnet-20241022",
+                       stage: str = "structuring_test") -> list:
         """Use Claude to structure OCR text into product JSON"""
 
-        prompt = f"""You are a Korean retail product data extraction expert.
-
-OCR Text from a Korean retail flyer:
-{ocr_text}
-
-Extract ALL products mentioned in this flyer and return a JSON array with the following structure:
-
-[
-  {{
-    "product_name": "제품명 (Korean)",
-    "price": "가격 (숫자만, 예: 9900)",
-    "unit": "단위 (예: 원, 개, kg)",
-    "original_price": "할인 전 가격 (if applicable, else null)",
-    "promotion": "프로모션 (예: 1+1, 2+1, 50% 할인, null if none)",
-    "description": "간단한 설명 (1-2 sentences)",
-    "category": "카테고리 (예: 식품, 화장품, 전자제품)"
-  }}
-]
-
-Rules:
-1. Extract ONLY products with clear prices
-2. If price is range (예: 5,000-10,000), use middle value
-3. Understand Korean promotions: "1+1" (buy 1 get 1), "2+1", "반값" (half price), "~% 할인" (discount)
-4. If original_price not mentioned, set to null
-5. Return valid JSON array ONLY (no markdown, no explanation)
-"""
+        prompt = build_prompt(ocr_text)
 
         try:
+            call_start = time.perf_counter()
             message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+                model=model,
                 max_tokens=2000,
                 temperature=0,
                 messages=[{
@@ -171,10 +152,12 @@ Rules:
                 }]
             )
 
-            # Calculate cost
+            # Calculate cost (shared usage meter)
             input_tokens = message.usage.input_tokens
             output_tokens = message.usage.output_tokens
-            cost = (input_tokens / 1_000_000 * 3) + (output_tokens / 1_000_000 * 15)
+            cost = self.meter.record_message(
+                message, time.perf_counter() - call_start, stage=stage
+            )
             self.total_cost += cost
 
             # Parse response
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Model Router Test
+Checks the regex rule extractor, answer confidence scoring and the
+fast → strong escalation with a scripted model call (no API calls)
+
+Usage:
+    python test_model_router.py
+    pytest test_model_router.py
+"""
+
+from model_router import FAST_MODEL, STRONG_MODEL, ModelRouter, answer_confidence, evaluate_offline, rule_extract
+from prompt_budget import estimate_tokens
+from structuring_prompt import build_prompt
+from usage_meter import UsageMeter
+
+EASY_FLYER = """
+이마트 주말특가!
+삼겹살 100g 1,980원
+LG 그램 노트북
+1,290,000원
+"""
+
+PRICING = {FAST_MODEL: {"input": 0.00025, "output": 0.00125}, STRONG_MODEL: {"input": 0.003, "output": 0.015}}
+
+EASY_ANSWER = [
+    {"product_name": "삼겹살 100g", "price": "1980"},
+    {"product_name": "LG 그램 노트북", "price": "1290000"},
+]
+
+
+def _router(**kwargs) -> ModelRouter:
+    return ModelRouter(meter=UsageMeter(pricing=PRICING), **kwargs)
+
+
+def _scripted_call(router: ModelRouter, answers):
+    """call(model, stage) returning answers[model] and recording usage like the real callers"""
+    calls = []
+
+    def call(model, stage):
+        calls.append(model)
+        router.meter.record(model, 400, 100, latency_s=0.2, stage=stage)
+        return answers.get(model)
+
+    return call, calls
+
+
+def test_rule_extract_pairs_names_and_prices():
+    rules = rule_extract(EASY_FLYER + "정상가 1,500,000원\n")
+    assert rules["products"] == [
+        {"product_name": "삼겹살 100g", "price": 1980},
+        {"product_name": "LG 그램 노트북", "price": 1290000},
+    ]
+    # reference prices ("정상가") are neither products nor mentions
+    assert rules["price_mentions"] == 2 and rules["coverage"] == 1.0
+
+
+def test_rule_extract_coverage_counts_unnamed_prices():
+    rules = rule_extract("가격 미정\n9,900원 4,000원")
+    assert [p["price"] for p in rules["products"]] == [9900]
+    assert rules["price_mentions"] == 2 and rules["coverage"] == 0.5
+    assert rule_extract("가격 문의") == {"products": [], "price_mentions": 0, "coverage": 0.0}
+
+
+def test_answer_confidence():
+    rules = rule_extract(EASY_FLYER)
+    assert answer_confidence(EASY_ANSWER, rules) == 1.0
+    assert answer_confidence(EASY_ANSWER[:1], rules) == 0.5
+    # one of two items has no price: half complete
+    assert answer_confidence(EASY_ANSWER + [{"product_name": "덤"}], rules) == round(2 / 3, 3)
+    assert answer_confidence(None, rules) == 0.0 and answer_confidence([], rules) == 0.0
+    # nothing to compare against: completeness only
+    assert answer_confidence(EASY_ANSWER, {"products": []}) == 1.0
+
+
+def test_classify_routes():
+    router = _router()
+    assert router.classify(EASY_FLYER)["route"] == "fast"
+    assert router.classify("가격 미정\n9,900원 4,000원")["reason"].startswith("low rule coverage")
+    assert _router(max_easy_tokens=5).classify(EASY_FLYER)["reason"].startswith("long OCR text")
+    assert _router(max_easy_products=1).classify(EASY_FLYER)["reason"].startswith("many products")
+
+
+def test_confident_fast_answer_is_accepted():
+    router = _router()
+    call, calls = _scripted_call(router, {FAST_MODEL: EASY_ANSWER})
+    result = router.structure(EASY_FLYER, call)
+    assert calls == [FAST_MODEL]
+    assert result["route"] == "fast" and not result["escalated"] and result["confidence"] == 1.0
+
+
+def test_low_confidence_fast_answer_escalates():
+    router = _router()
+    call, calls = _scripted_call(router, {FAST_MODEL: EASY_ANSWER[:1], STRONG_MODEL: EASY_ANSWER})
+    result = router.structure(EASY_FLYER, call)
+    assert calls == [FAST_MODEL, STRONG_MODEL]
+    assert result["route"] == "strong" and result["model"] == STRONG_MODEL and result["escalated"]
+    assert result["products"] == EASY_ANSWER
+
+    stats = router.stats()
+    assert stats["fast"]["routed"] == 1 and stats["fast"]["escalated"] == 1 and stats["fast"]["accepted"] == 0
+    assert stats["strong"]["accepted"] == 1 and stats["strong"]["calls"] == 1
+    assert stats["fast"]["cost_usd"] < stats["strong"]["cost_usd"]
+
+
+def test_failed_fast_call_escalates():
+    router = _router()
+    call, calls = _scripted_call(router, {STRONG_MODEL: EASY_ANSWER})
+    assert router.structure(EASY_FLYER, call)["escalated"]
+    assert calls == [FAST_MODEL, STRONG_MODEL]
+
+
+def test_strong_route_is_not_escalated():
+    router = _router(max_easy_tokens=5)
+    call, calls = _scripted_call(router, {})
+    result = router.structure(EASY_FLYER, call)
+    assert calls == [STRONG_MODEL] and result["products"] == [] and not result["escalated"]
+
+
+def test_evaluate_offline_estimates_savings():
+    router = _router()
+    samples = [{"name": "easy", "ocr_text": EASY_FLYER, "ground_truth": EASY_ANSWER}]
+    report = evaluate_offline(router, samples, estimate_tokens(build_prompt("")))
+    assert report["fast_share"] == 1.0 and report["false_escalations"] == 0
+    assert 0 < report["routed_cost_usd"] < report["strong_only_cost_usd"]
+    assert report["samples"][0]["rule_price_recall"] == 1.0
+
+
+def main():
+    tests = [
+        test_rule_extract_pairs_names_and_prices,
+        test_rule_extract_coverage_counts_unnamed_prices,
+        test_answer_confidence,
+        test_classify_routes,
+        test_confident_fast_answer_is_accepted,
+        test_low_confidence_fast_answer_escalates,
+        test_failed_fast_call_escalates,
+        test_strong_route_is_not_escalated,
+        test_evaluate_offline_estimates_savings,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Product Catalog Test
+Checks that weekly flyers append price history, that store locations
+reach the nearby price search and that brand filters ignore case
+
+Usage:
+    python test_product_catalog.py
+    pytest test_product_catalog.py
+"""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from product_catalog import ProductCatalog
+
+STORE = {"store_id": "emart_gangnam", "lat": 37.4979, "lng": 127.0276}
+
+
+def _flyer(price: int) -> dict:
+    return {"filename": "weekly.jpg", "products": [{"product_name": "삼겹살 500g", "price": price}]}
+
+
+def _catalog(tmp: str) -> ProductCatalog:
+    return ProductCatalog(str(Path(tmp) / "catalog.db"))
+
+
+def test_weekly_flyers_append_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = _catalog(tmp)
+        catalog.upsert_flyer(_flyer(12900), store=STORE, observed_at="2026-10-12T09:00:00")
+        catalog.upsert_flyer(_flyer(11900), store=STORE, observed_at="2026-10-19T09:00:00")
+        product_id = catalog.search("삼겹살")[0]["product_id"]
+        prices = sorted(h["price"] for h in catalog.price_history(product_id))
+        catalog.close()
+    assert prices == [11900, 12900], prices
+
+
+def test_same_week_reprocess_replaces():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = _catalog(tmp)
+        catalog.upsert_flyer(_flyer(12900), store=STORE, observed_at="2026-10-19T09:00:00")
+        catalog.upsert_flyer(_flyer(11900), store=STORE, observed_at="2026-10-20T09:00:00")
+        observations = catalog.stats()["price_observations"]
+        catalog.close()
+    assert observations == 1, observations
+
+
+def test_store_location_reaches_nearby_search():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = _catalog(tmp)
+        result = dict(_flyer(12900), store=STORE)
+        catalog.upsert_flyer(result)
+        offers = catalog.cheapest_nearby("삼겹살", 37.498, 127.028, radius_km=1.0)
+        catalog.close()
+    assert offers and offers[0]["store_id"] == "emart_gangnam", offers
+
+
+def test_migrates_single_row_prices():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / "catalog.db"))
+        conn.executescript("""
+            CREATE TABLE prices (
+                product_id INTEGER NOT NULL, flyer TEXT NOT NULL, store_id TEXT,
+                lat REAL, lng REAL, price INTEGER NOT NULL, original_price INTEGER,
+                promotion TEXT, observed_at TEXT NOT NULL,
+                PRIMARY KEY (product_id, flyer)
+            );
+            INSERT INTO prices VALUES (1, 'weekly.jpg', NULL, NULL, NULL, 9900, NULL, NULL, '2026-10-05T09:00:00');
+        """)
+        conn.close()
+        catalog = _catalog(tmp)
+        rows = catalog.conn.execute("SELECT price, flyer_week FROM prices").fetchall()
+        catalog.close()
+    assert [tuple(r) for r in rows] == [(9900, "2026-40")], rows
+
+
+def test_explicit_brand_matches_any_case():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = _catalog(tmp)
+        flyer = {"filename": "weekly.jpg", "products": [{"product_name": "햇반 210g", "brand": "CJ", "price": 4980}]}
+        catalog.upsert_flyer(flyer, store=STORE)
+        lower = catalog.search("햇반", brand="cj")
+        upper = catalog.search("햇반", brand="CJ")
+        catalog.close()
+    assert len(lower) == 1 and lower == upper, (lower, upper)
+    assert lower[0]["brand"] == "cj"
+
+
+def test_existing_brand_tokens_are_lowercased():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = _catalog(tmp)
+        catalog.upsert_flyer(_flyer(12900), store=STORE)
+        catalog.conn.execute("UPDATE products SET brand = 'CJ'")
+        catalog.conn.execute("INSERT INTO product_tokens SELECT 'brand:CJ', product_id FROM products")
+        catalog.conn.commit()
+        catalog.close()
+
+        catalog = _catalog(tmp)
+        found = catalog.search("삼겹살", brand="cj")
+        catalog.close()
+    assert len(found) == 1 and found[0]["brand"] == "cj", found
+
+
+def main():
+    tests = [
+        test_weekly_flyers_append_history,
+        test_same_week_reprocess_replaces,
+        test_store_location_reaches_nearby_search,
+        test_migrates_single_row_prices,
+        test_explicit_brand_matches_any_case,
+        test_existing_brand_tokens_are_lowercased,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
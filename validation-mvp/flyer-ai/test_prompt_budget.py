@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Prompt Budget Test
+Checks that OCR compaction keeps product names, descriptions and prices
+while dropping boilerplate
+
+Usage:
+    python test_prompt_budget.py
+    pytest test_prompt_budget.py
+"""
+
+from prompt_budget import PromptBudget, compact_ocr_text, estimate_tokens
+
+FLYER_TEXT = """
+이마트 주말특가!
+이마트 주말특가!
+이마트 주말특가!
+
+삼겹살
+신선한 국내산 돼지고기
+12,900원
+1+1
+
+목살
+제주산 흑돼지
+15,900원
+1+1
+
+생수 2L
+990원
+1+1
+
+매장 안내
+영업시간 안내
+주차는 지하 주차장 이용
+고객센터 문의 바랍니다
+이용해 주셔서 감사합니다
+행복한 쇼핑 되세요
+이마트 주말특가!
+"""
+
+
+def test_names_and_prices_survive():
+    """Product names two lines above their price and every price line are kept"""
+    compacted = compact_ocr_text(FLYER_TEXT)
+    lines = compacted.splitlines()
+    for expected in ["삼겹살", "신선한 국내산 돼지고기", "12,900원", "목살", "15,900원", "생수 2L", "990원"]:
+        assert expected in lines, f"{expected!r} dropped"
+
+
+def test_repeated_promo_lines_kept():
+    """Repeated "1+1" lines belong to different products and are not collapsed"""
+    lines = compact_ocr_text(FLYER_TEXT).splitlines()
+    assert lines.count("1+1") == 3
+
+
+def test_boilerplate_collapsed():
+    """Repeated banners are kept once and text far from any price is dropped"""
+    lines = compact_ocr_text(FLYER_TEXT).splitlines()
+    assert lines.count("이마트 주말특가!") == 1
+    assert "고객센터 문의 바랍니다" not in lines
+    assert "주차는 지하 주차장 이용" not in lines
+
+
+def test_compaction_saves_tokens():
+    raw, compacted = estimate_tokens(FLYER_TEXT), estimate_tokens(compact_ocr_text(FLYER_TEXT))
+    assert compacted < raw
+
+
+def test_plan_keeps_products():
+    plan = PromptBudget().plan(FLYER_TEXT, template_tokens=400)
+    assert len(plan["chunks"]) == 1
+    assert "삼겹살" in plan["chunks"][0]
+
+
+def main():
+    tests = [
+        test_names_and_prices_survive,
+        test_repeated_promo_lines_kept,
+        test_boilerplate_collapsed,
+        test_compaction_saves_tokens,
+        test_plan_keeps_products,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Span Tracer Test
+Checks span nesting, sampling, draining exports, retirement of shards left by
+exited threads and that importing the tracer does not load the MLflow client
+
+Usage:
+    python test_span_tracer.py
+    pytest test_span_tracer.py
+"""
+
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from sharded_stats import percentile_ms
+from span_tracer import Tracer
+
+
+def _by_span(rows):
+    return {row["span"]: row for row in rows}
+
+
+def test_nested_spans_and_errors():
+    tracer = Tracer()
+    for fail in (False, True):
+        try:
+            with tracer.span("flyer"):
+                with tracer.span("ocr"):
+                    if fail:
+                        raise ValueError("bad image")
+        except ValueError:
+            pass
+    rows = _by_span(tracer.snapshot())
+    assert set(rows) == {"flyer", "flyer/ocr"}
+    assert rows["flyer/ocr"]["count"] == 2 and rows["flyer/ocr"]["errors"] == 1
+    assert rows["flyer"]["p50_ms"] <= rows["flyer"]["p99_ms"]
+
+
+def test_traced_decorator():
+    tracer = Tracer()
+
+    @tracer.traced()
+    def parse(text):
+        return text.upper()
+
+    assert parse("a") == "A"
+    assert _by_span(tracer.snapshot())["parse"]["count"] == 1
+
+
+def test_unsampled_trace_skips_children():
+    tracer = Tracer(sample_rate=0.0)
+    with tracer.span("flyer"):
+        with tracer.span("ocr"):
+            pass
+    assert tracer.snapshot() == []
+
+
+def test_export_drains_once():
+    tracer = Tracer()
+    with tracer.span("stage"):
+        pass
+    exported = []
+    assert len(tracer.export(exported.append)) == 1
+    assert len(exported) == 1 and exported[0][0]["span"] == "stage"
+    assert tracer.export(exported.append) == [] and len(exported) == 1
+
+
+def test_exited_thread_shards_retired():
+    tracer = Tracer()
+
+    def work():
+        for _ in range(10):
+            with tracer.span("worker"):
+                pass
+
+    for _ in range(3):
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    rows = _by_span(tracer.snapshot())
+    assert rows["worker"]["count"] == 120
+    assert len(tracer._shards) == 0  # every worker exited; counts live in the retired shard
+
+
+def test_percentile_ms():
+    assert percentile_ms([0, 0, 0], 0.5, (1.0, 2.0)) is None
+    assert percentile_ms([1, 1, 2], 0.5, (1.0, 2.0)) == 2.0
+    assert percentile_ms([1, 1, 2], 0.99, (1.0, 2.0)) == float("inf")
+
+
+def test_import_does_not_load_mlflow():
+    code = (
+        "import logging, sys\n"
+        "import span_tracer\n"
+        "heavy = [m for m in ('mlflow', 'google.auth', 'townin_mlflow_client', 'usage_meter') if m in sys.modules]\n"
+        "print(heavy, logging.getLogger().handlers)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).resolve().parent,
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert out == "[] []", out
+
+
+def main():
+    tests = [
+        test_nested_spans_and_errors,
+        test_traced_decorator,
+        test_unsampled_trace_skips_children,
+        test_export_drains_once,
+        test_exited_thread_shards_retired,
+        test_percentile_ms,
+        test_import_does_not_load_mlflow,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
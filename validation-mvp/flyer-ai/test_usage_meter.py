@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Usage Meter Test
+Checks that concurrent records are counted exactly once, that flush/close
+hand everything to the sink, and that the MLflow sink logs to the run that
+created it even from the meter's background thread
+
+Usage:
+    python test_usage_meter.py
+    pytest test_usage_meter.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from usage_meter import UsageMeter, mlflow_sink
+
+# MLflow 3.x only writes to a file store when explicitly allowed
+os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+
+MODEL = "claude-3-5-sonnet-20241022"
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, rows):
+        self.batches.append(rows)
+
+    def calls(self) -> int:
+        return sum(row["calls"] for rows in self.batches for row in rows)
+
+
+def _record_in_threads(meter: UsageMeter, threads: int = 8, per_thread: int = 500):
+    def work():
+        for _ in range(per_thread):
+            meter.record(MODEL, 100, 20, latency_s=0.2, stage="structuring")
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+def test_concurrent_records_flush_once():
+    sink = ListSink()
+    meter = UsageMeter(sink=sink, flush_interval=0)
+    _record_in_threads(meter)
+    rows = meter.flush()
+    assert sink.calls() == 4000, sink.calls()
+    assert rows[0]["input_tokens"] == 400000 and rows[0]["priced"]
+    assert meter.flush() == []
+    assert meter.snapshot()[0]["calls"] == 4000
+    assert abs(meter.total_cost() - 4000 * (0.1 * 0.003 + 0.02 * 0.015)) < 1e-6
+
+
+def test_close_flushes_pending():
+    sink = ListSink()
+    meter = UsageMeter(sink=sink, flush_interval=60)
+    meter.record(MODEL, 100, 20)
+    meter.close()
+    assert sink.calls() == 1, sink.batches
+
+
+def test_unknown_models_reported_once():
+    meter = UsageMeter()
+    _record_in_threads(meter, threads=4, per_thread=50)
+    for _ in range(3):
+        assert meter.record("mystery-model", 100, 20) == 0.0
+    assert meter.unknown_models == {"mystery-model"}
+    assert meter.unpriced_calls() == {"mystery-model": 3}
+
+
+def _mlflow_client(tmp: str, **kwargs):
+    from townin_mlflow_client import ExperimentCache, TowninMLflowClient
+
+    return TowninMLflowClient(
+        Path(tmp, "mlruns").as_uri(), auto_auth=False, experiment_cache=ExperimentCache(), **kwargs
+    )
+
+
+def _check_sink_run(async_logging: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _mlflow_client(tmp, async_logging=async_logging)
+        with client.start_run("usage") as run:
+            meter = UsageMeter(sink=mlflow_sink(client), flush_interval=0.05)
+            meter.record(MODEL, 100, 20, stage="structuring")
+            meter.record("mystery-model", 10, 5, stage="structuring")
+            time.sleep(0.3)  # let the worker thread flush on its own
+            meter.close()
+        client.close()
+
+        data = client.mlflow_client.get_run(run.info.run_id).data
+        runs = client.mlflow_client.search_runs([run.info.experiment_id])
+    assert data.metrics[f"usage/default/structuring/{MODEL}/calls"] == 1, sorted(data.metrics)
+    assert data.tags["llm_unknown_models"] == "mystery-model"
+    assert [r.info.run_id for r in runs] == [run.info.run_id], "usage went to a stray run"
+
+
+def test_mlflow_sink_logs_to_creating_run():
+    _check_sink_run(async_logging=False)
+
+
+def test_mlflow_sink_with_async_logging():
+    _check_sink_run(async_logging=True)
+
+
+def main():
+    tests = [
+        test_concurrent_records_flush_once,
+        test_close_flushes_pending,
+        test_unknown_models_reported_once,
+        test_mlflow_sink_logs_to_creating_run,
+        test_mlflow_sink_with_async_logging,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
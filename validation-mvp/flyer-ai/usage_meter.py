@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Shared LLM Usage Meter
+Thread-safe token / cost / latency accounting for every LLM call
+
+Each thread records into its own shard (an uncontended lock), so concurrent
+pipelines never serialize on a global lock; shards are merged only when a
+snapshot or flush is taken. Aggregates are keyed by (model, stage, tenant)
+and can be flushed periodically in one batch to MLflow via `CostTracker`.
+
+Usage:
+    meter = get_default_meter()
+    cost = meter.record("claude-3-5-sonnet-20241022", 1200, 400,
+                        latency_s=2.1, stage="structuring")
+"""
+
+import atexit
+import sys
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Callable, Tuple
+
+from sharded_stats import ShardSet, percentile_ms
+
+# The MLflow client and the shared pricing table live next to the MLflow server
+MLFLOW_CLIENT_DIR = Path(__file__).resolve().parents[2] / "pm4py-action-items" / "mlflow-docker"
+if str(MLFLOW_CLIENT_DIR) not in sys.path:
+    sys.path.append(str(MLFLOW_CLIENT_DIR))
+
+# USD per 1K tokens — the table CostTracker.PRICING points to
+from llm_pricing import PRICING as DEFAULT_PRICING
+
+try:
+    from townin_mlflow_client import CostTracker
+    _COST_TRACKER_ERROR = None
+except ImportError as e:  # mlflow / google-auth are optional for the validation scripts
+    CostTracker = None
+    _COST_TRACKER_ERROR = e
+
+# Latency histogram bucket upper bounds (ms); last bucket is open-ended
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+AggregateKey = Tuple[str, str, str]
+
+
+class _Aggregate:
+    __slots__ = ("calls", "input_tokens", "output_tokens", "cost_usd", "latency_ms_sum", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.latency_ms_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def merge(self, other: "_Aggregate"):
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost_usd += other.cost_usd
+        self.latency_ms_sum += other.latency_ms_sum
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+
+
+class UsageMeter:
+    """
+    Aggregates LLM usage by (model, stage, tenant)
+
+    Args:
+        tenant: default tenant (customer_id) for calls that don't pass one
+        pricing: USD per 1K tokens per model (defaults to llm_pricing.PRICING,
+            shared with CostTracker); unknown models cost 0 and are reported
+        sink: callable receiving aggregate rows on flush
+        flush_interval: seconds between background flushes (needs a sink)
+    """
+
+    def __init__(
+        self,
+        tenant: str = "default",
+        pricing: Optional[Dict[str, Dict[str, float]]] = None,
+        sink: Optional[Callable[[List[Dict]], None]] = None,
+        flush_interval: float = 30.0
+    ):
+        self.tenant = tenant
+        self.pricing = DEFAULT_PRICING if pricing is None else pricing
+        self.sink = sink
+        self.flush_interval = flush_interval
+
+        self._shards = ShardSet(_Aggregate)
+        # Totals already handed to the sink (kept for snapshot())
+        self._flushed: Dict[AggregateKey, _Aggregate] = defaultdict(_Aggregate)
+        self._flush_lock = threading.Lock()
+        self.unknown_models = set()
+        self._unknown_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._worker = None
+        if sink is not None and flush_interval > 0:
+            self._worker = threading.Thread(target=self._flush_loop, name="usage-meter-flush", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def calculate_cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        pricing = self.pricing.get(model)
+        if pricing is None:
+            with self._unknown_lock:
+                first = model not in self.unknown_models
+                self.unknown_models.add(model)
+            if first:
+                print(f"  ⚠ No pricing for model '{model}'; its calls are counted at $0")
+            return 0.0
+        return (input_tokens / 1000) * pricing["input"] + (output_tokens / 1000) * pricing["output"]
+
+    def record(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency_s: float = 0.0,
+        stage: str = "llm",
+        tenant: Optional[str] = None
+    ) -> float:
+        """Record one LLM call; returns its cost in USD"""
+        cost = self.calculate_cost(model, input_tokens, output_tokens)
+        latency_ms = latency_s * 1000
+        bucket = bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+
+        shard = self._shards.local()
+        with shard.lock:
+            agg = shard.data[(model, stage, tenant or self.tenant)]
+            agg.calls += 1
+            agg.input_tokens += input_tokens
+            agg.output_tokens += output_tokens
+            agg.cost_usd += cost
+            agg.latency_ms_sum += latency_ms
+            agg.buckets[bucket] += 1
+        return cost
+
+    def record_message(self, message, latency_s: float, stage: str = "llm", tenant: Optional[str] = None) -> float:
+        """Record an Anthropic `messages.create` response"""
+        return self.record(
+            message.model,
+            message.usage.input_tokens,
+            message.usage.output_tokens,
+            latency_s=latency_s,
+            stage=stage,
+            tenant=tenant
+        )
+
+    def _drain(self) -> Dict[AggregateKey, _Aggregate]:
+        """Swap out every shard's buffer and merge them"""
+        merged: Dict[AggregateKey, _Aggregate] = defaultdict(_Aggregate)
+        for shard in self._shards.all():
+            with shard.lock:
+                data = shard.swap()
+            for key, agg in data.items():
+                merged[key].merge(agg)
+        return merged
+
+    def _to_rows(self, aggregates: Dict[AggregateKey, _Aggregate]) -> List[Dict]:
+        rows = []
+        for (model, stage, tenant), agg in sorted(aggregates.items()):
+            rows.append({
+                "model": model,
+                "stage": stage,
+                "tenant": tenant,
+                "calls": agg.calls,
+                "input_tokens": agg.input_tokens,
+                "output_tokens": agg.output_tokens,
+                "cost_usd": round(agg.cost_usd, 6),
+                "priced": model in self.pricing,
+                "latency_ms_avg": round(agg.latency_ms_sum / agg.calls, 1) if agg.calls else 0.0,
+                "latency_ms_p50": percentile_ms(agg.buckets, 0.50, LATENCY_BUCKETS_MS),
+                "latency_ms_p95": percentile_ms(agg.buckets, 0.95, LATENCY_BUCKETS_MS),
+                "latency_buckets": list(agg.buckets),
+            })
+        return rows
+
+    def flush(self) -> List[Dict]:
+        """Hand the usage recorded since the last flush to the sink"""
+        with self._flush_lock:
+            pending = self._drain()
+            for key, agg in pending.items():
+                self._flushed[key].merge(agg)
+        rows = self._to_rows(pending)
+        if rows and self.sink is not None:
+            self.sink(rows)
+        return rows
+
+    def snapshot(self) -> List[Dict]:
+        """Cumulative totals since creation (flushed + pending), without draining"""
+        totals: Dict[AggregateKey, _Aggregate] = defaultdict(_Aggregate)
+        with self._flush_lock:
+            for key, agg in self._flushed.items():
+                totals[key].merge(agg)
+            for shard in self._shards.all():
+                with shard.lock:
+                    for key, agg in shard.data.items():
+                        totals[key].merge(agg)
+        return self._to_rows(totals)
+
+    def total_cost(self) -> float:
+        return round(sum(row["cost_usd"] for row in self.snapshot()), 6)
+
+    def unpriced_calls(self) -> Dict[str, int]:
+        """Calls per model that had no pricing (excluded from total_cost)"""
+        calls: Dict[str, int] = defaultdict(int)
+        for row in self.snapshot():
+            if not row["priced"]:
+                calls[row["model"]] += row["calls"]
+        return dict(calls)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:  # never kill the worker on a sink error
+                print(f"  ⚠ Usage flush failed: {e}")
+
+    def close(self):
+        """Stop the background worker and flush what is left"""
+        self._stop.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=self.flush_interval)
+        self.flush()
+
+
+def mlflow_sink(client, run_id: Optional[str] = None) -> Callable[[List[Dict]], None]:
+    """
+    Sink that logs aggregate rows to one run via CostTracker
+
+    The run is fixed when the sink is created (default: the caller's active
+    run) because flushes happen on the meter's worker thread, where MLflow's
+    thread-local active run is not set.
+    """
+    if CostTracker is None:
+        raise ImportError(
+            f"townin_mlflow_client could not be imported from {MLFLOW_CLIENT_DIR}: {_COST_TRACKER_ERROR}"
+        )
+    run_id = run_id or client.active_run_id()
+
+    def _sink(rows: List[Dict]):
+        CostTracker.log_usage_summary(client, rows, run_id=run_id)
+
+    return _sink
+
+
+_default_meter: Optional[UsageMeter] = None
+_default_lock = threading.Lock()
+
+
+def get_default_meter() -> UsageMeter:
+    """Process-wide meter shared by all pipelines"""
+    global _default_meter
+    if _default_meter is None:
+        with _default_lock:
+            if _default_meter is None:
+                _default_meter = UsageMeter()
+    return _default_meter
+
+
+def set_default_meter(meter: UsageMeter):
+    """Replace the shared meter (e.g. one with an MLflow sink)"""
+    global _default_meter
+    with _default_lock:
+        _default_meter = meter
+
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Async Query Layer
+Serves recommendation / multi-hop / location-safety requests concurrently
+
+Concurrent requests for different users are collected for a few
+milliseconds and sent as ONE `UNWIND $user_ids` query, so N in-flight
+requests cost one round-trip instead of N. A semaphore caps the number of
+queries in flight against the pool.
+
+Usage:
+    python async_graph.py --requests 5000 --concurrency 200
+    python async_graph.py --requests 5000 --concurrency 200 --no-batching
+    python async_graph.py --user-key id --kind multi_hop
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from neo4j import AsyncGraphDatabase
+
+from graph_client import DEFAULT_AUTH, DEFAULT_URI, POOL_CONFIG
+from graph_loader import validate_identifier
+from graph_queries import get_query, render
+
+load_dotenv()
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class _MicroBatcher:
+    """
+    Groups per-user requests into one UNWIND query
+
+    The first request opens a window of `window_ms`; everything arriving
+    before it closes (or until `max_batch_size` ids) shares one query.
+    Duplicate user ids in a window are queried once.
+    """
+
+    def __init__(self, client: "AsyncGraphClient", query: str, window_ms: float, max_batch_size: int):
+        self.client = client
+        self.query = query
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references: the loop only keeps weak ones to running tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_ids = 0
+
+    def submit(self, user_id: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(user_id, []).append(future)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Send the open window now and wait for every batch in flight"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, pending: Dict[str, List[asyncio.Future]]):
+        self.batches += 1
+        self.batched_ids += len(pending)
+        try:
+            records = await self.client.run_read(self.query, user_ids=list(pending))
+            by_user = {record["uid"]: record["rows"] for record in records}
+            for user_id, futures in pending.items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(by_user.get(user_id, []))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+class AsyncGraphClient:
+    """
+    asyncio API over the Neo4j async driver
+
+    Args:
+        uri / auth: connection (defaults as in graph_client)
+        user_key: User id property ("user_id" or "id")
+        max_concurrency: queries in flight at once
+        batch_window_ms: how long to collect user ids per batch
+        max_batch_size: user ids per UNWIND query (1 disables batching)
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        auth: Optional[Tuple[str, str]] = None,
+        user_key: str = "user_id",
+        max_concurrency: int = 32,
+        batch_window_ms: float = 2.0,
+        max_batch_size: int = 256,
+        database: Optional[str] = None
+    ):
+        self.uri = uri or os.getenv("NEO4J_URI", DEFAULT_URI)
+        self.auth = auth or (
+            os.getenv("NEO4J_USERNAME", DEFAULT_AUTH[0]),
+            os.getenv("NEO4J_PASSWORD", DEFAULT_AUTH[1]),
+        )
+        self.user_key = validate_identifier(user_key)
+        self.database = database
+        self.driver = AsyncGraphDatabase.driver(self.uri, auth=self.auth, **POOL_CONFIG)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        key = self.user_key
+        self._recommendations = _MicroBatcher(
+            self, render("recommendation_batch", key=key), batch_window_ms, max_batch_size)
+        self._multi_hop = _MicroBatcher(
+            self, render("multi_hop_batch", key=key), batch_window_ms, max_batch_size)
+        self._safety_inflight: Optional[asyncio.Future] = None
+        self.queries = 0
+
+    async def close(self):
+        await self._recommendations.drain()
+        await self._multi_hop.drain()
+        await self.driver.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _session(self):
+        if self.database:
+            return self.driver.session(database=self.database)
+        return self.driver.session()
+
+    async def run_read(self, query: str, **params) -> List[Dict]:
+        """Managed read transaction, bounded by the concurrency limit"""
+        async def work(tx):
+            result = await tx.run(query, **params)
+            return await result.data()
+
+        async with self._semaphore:
+            self.queries += 1
+            async with self._session() as session:
+                return await session.execute_read(work)
+
+    # ------------------------------------------------------------------
+    # Request API
+    # ------------------------------------------------------------------
+
+    async def recommendations(self, user_id: str) -> List[Dict]:
+        """Rows of the `insurance_recommendation` query for one user"""
+        return await self._recommendations.submit(user_id)
+
+    async def multi_hop(self, user_id: str) -> List[Dict]:
+        """Rows of the `multi_hop_reasoning` query for one user"""
+        return await self._multi_hop.submit(user_id)
+
+    async def location_safety(self) -> List[Dict]:
+        """`location_safety` rows; concurrent callers share one query"""
+        if self._safety_inflight is None:
+            self._safety_inflight = asyncio.ensure_future(self.run_read(get_query("location_safety")["cypher"]))
+            self._safety_inflight.add_done_callback(lambda _: setattr(self, "_safety_inflight", None))
+        return await asyncio.shield(self._safety_inflight)
+
+    async def sample_user_ids(self, limit: int) -> List[str]:
+        records = await self.run_read(render("sample_users", key=self.user_key), limit=limit)
+        return [record["uid"] for record in records if record["uid"] is not None]
+
+    def stats(self) -> Dict[str, Any]:
+        batchers = {"recommendations": self._recommendations, "multi_hop": self._multi_hop}
+        return {
+            "queries": self.queries,
+            **{
+                f"{name}_avg_batch": round(b.batched_ids / b.batches, 1) if b.batches else 0.0
+                for name, b in batchers.items()
+            },
+        }
+
+
+async def run_load(
+    client: AsyncGraphClient,
+    user_ids: List[str],
+    total_requests: int,
+    concurrency: int,
+    kind: str = "recommendations",
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` workers issuing `total_requests` in total"""
+    rng = random.Random(seed)
+    plan = [rng.choice(user_ids) for _ in range(total_requests)]
+    latencies: List[float] = []
+    errors = 0
+
+    async def call(user_id: str):
+        if kind == "multi_hop":
+            return await client.multi_hop(user_id)
+        if kind == "location_safety":
+            return await client.location_safety()
+        return await client.recommendations(user_id)
+
+    async def worker():
+        nonlocal errors
+        while plan:
+            user_id = plan.pop()
+            start = time.perf_counter()
+            try:
+                await call(user_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "kind": kind,
+        "requests": total_requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "qps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        **client.stats(),
+    }
+
+
+async def _main(args):
+    client = AsyncGraphClient(
+        user_key=args.user_key,
+        max_concurrency=args.max_in_flight,
+        batch_window_ms=args.window_ms,
+        max_batch_size=1 if args.no_batching else args.batch_size,
+    )
+    async with client:
+        user_ids = await client.sample_user_ids(args.sample_users)
+        if not user_ids:
+            print("❌ No users found - run setup_neo4j.py or test_graphrag_pipeline.py first")
+            return 1
+        print(f"✓ Sampled {len(user_ids)} user ids ({'no batching' if args.no_batching else f'batch ≤{args.batch_size}'})")
+
+        report = await run_load(client, user_ids, args.requests, args.concurrency, kind=args.kind)
+
+    print("\n=== Async Load Test ===")
+    print(f"  {report['kind']}: {report['requests']} requests, concurrency {report['concurrency']}")
+    print(f"  QPS: {report['qps']:,}  p50: {report['p50_ms']}ms  p99: {report['p99_ms']}ms  max: {report['max_ms']}ms")
+    print(f"  Neo4j queries: {report['queries']}  errors: {report['errors']}")
+    if report["kind"] != "location_safety":
+        print(f"  Avg users per query: {report[report['kind'] + '_avg_batch']}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async GraphRAG load generator")
+    parser.add_argument("--kind", default="recommendations",
+                        choices=["recommendations", "multi_hop", "location_safety"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100, help="concurrent clients")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="Neo4j queries in flight")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--no-batching", action="store_true")
+    parser.add_argument("--user-key", default="user_id", help="User id property (user_id or id)")
+    parser.add_argument("--sample-users", type=int, default=10000)
+    args = parser.parse_args()
+
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    exit(main())
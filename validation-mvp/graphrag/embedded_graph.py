@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Embedded Graph Engine
+In-process stand-in for Neo4j: typed node tables + CSR adjacency per
+relationship type, answering the fixed GraphRAG traversals natively
+
+EmbeddedGraph implements the BulkGraphLoader interface (merge_nodes,
+merge_relationships, ...), so TowninGraphSetup and SyntheticGraphGenerator
+can populate it exactly as they populate Neo4j. Adjacency is appended while
+loading and frozen into CSR arrays on the first traversal.
+
+Usage:
+    python embedded_graph.py --users 1000000            # setup_neo4j data
+    python embedded_graph.py --users 1000000 --synthetic
+    python embedded_graph.py --compare                  # vs live Neo4j
+"""
+
+import time
+import random
+import argparse
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from graph_loader import DEFAULT_CHUNK_SIZE, validate_identifier
+
+
+def _asc(value) -> Tuple[bool, Any]:
+    """Cypher ORDER BY key: nulls sort last ascending, first descending"""
+    return (value is None, value if value is not None else 0)
+
+
+class _NodeTable:
+    """All nodes of one label; rows are property dicts addressed by position"""
+
+    __slots__ = ("label", "rows", "_indexes")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.rows: List[Dict] = []
+        # prop -> value -> row position (int) or positions (list) if not unique
+        self._indexes: Dict[str, Dict[Any, Any]] = {}
+
+    def _index_add(self, index: Dict, value, i: int):
+        current = index.get(value)
+        if current is None:
+            index[value] = i
+        elif isinstance(current, list):
+            current.append(i)
+        else:
+            index[value] = [current, i]
+
+    def _index_remove(self, index: Dict, value, i: int):
+        current = index.get(value)
+        if isinstance(current, list):
+            current.remove(i)
+            if len(current) == 1:
+                index[value] = current[0]
+        elif current == i:
+            del index[value]
+
+    def index(self, prop: str) -> Dict[Any, Any]:
+        """Hash index on `prop`, built on first use and maintained afterwards"""
+        index = self._indexes.get(prop)
+        if index is None:
+            index = {}
+            for i, row in enumerate(self.rows):
+                value = row.get(prop)
+                if value is not None:
+                    self._index_add(index, value, i)
+            self._indexes[prop] = index
+        return index
+
+    def find(self, prop: str, value) -> List[int]:
+        hit = self.index(prop).get(value)
+        if hit is None:
+            return []
+        return hit if isinstance(hit, list) else [hit]
+
+    def create(self, row: Dict) -> int:
+        i = len(self.rows)
+        self.rows.append(dict(row))
+        for prop, index in self._indexes.items():
+            value = row.get(prop)
+            if value is not None:
+                self._index_add(index, value, i)
+        return i
+
+    def update(self, i: int, row: Dict):
+        """SET n += row"""
+        current = self.rows[i]
+        for prop, index in self._indexes.items():
+            if prop in row and row[prop] != current.get(prop):
+                if current.get(prop) is not None:
+                    self._index_remove(index, current[prop], i)
+                if row[prop] is not None:
+                    self._index_add(index, row[prop], i)
+        current.update(row)
+
+
+class _RelationshipSet:
+    """
+    Edges of one (type, start label, end label)
+
+    Appended as parallel arrays while loading; `freeze()` builds CSR
+    offsets/targets and collapses duplicate (start, end) pairs (MERGE).
+    """
+
+    __slots__ = ("src", "dst", "props", "offsets", "targets", "edge_props", "frozen")
+
+    def __init__(self):
+        self.src = array("i")
+        self.dst = array("i")
+        self.props: List[Optional[Dict]] = []
+        self.offsets = array("i")
+        self.targets = array("i")
+        self.edge_props: List[Optional[Dict]] = []
+        self.frozen = False
+
+    def add(self, src: int, dst: int, props: Optional[Dict]):
+        self.src.append(src)
+        self.dst.append(dst)
+        self.props.append(dict(props) if props else None)
+        self.frozen = False
+
+    def freeze(self, num_sources: int) -> int:
+        """Build CSR (counting sort by start node); returns duplicates removed"""
+        counts = array("i", bytes(4 * (num_sources + 1)))
+        for s in self.src:
+            counts[s + 1] += 1
+        for i in range(num_sources):
+            counts[i + 1] += counts[i]
+
+        cursor = array("i", counts[:-1])
+        order = array("i", bytes(4 * len(self.src)))
+        for e, s in enumerate(self.src):
+            order[cursor[s]] = e
+            cursor[s] += 1
+
+        offsets = array("i", [0])
+        targets = array("i")
+        edge_props: List[Optional[Dict]] = []
+        duplicates = 0
+        for s in range(num_sources):
+            start, end = counts[s], counts[s + 1]
+            if end - start == 1:
+                e = order[start]
+                targets.append(self.dst[e])
+                edge_props.append(self.props[e])
+            elif end > start:
+                seen: Dict[int, int] = {}
+                for e in order[start:end]:
+                    d = self.dst[e]
+                    if d in seen:
+                        duplicates += 1
+                        if self.props[e]:
+                            pos = seen[d]
+                            edge_props[pos] = {**(edge_props[pos] or {}), **self.props[e]}
+                        continue
+                    seen[d] = len(targets)
+                    targets.append(d)
+                    edge_props.append(self.props[e])
+            offsets.append(len(targets))
+
+        # Keep the deduplicated edges as the new append log
+        self.src = array("i", (s for s in range(num_sources) for _ in range(offsets[s + 1] - offsets[s])))
+        self.dst = array("i", targets)
+        self.props = list(edge_props)
+        self.offsets, self.targets, self.edge_props = offsets, targets, edge_props
+        self.frozen = True
+        return duplicates
+
+    def neighbours(self, i: int) -> Iterator[int]:
+        if i + 1 >= len(self.offsets):
+            return iter(())
+        return iter(self.targets[self.offsets[i]:self.offsets[i + 1]])
+
+    def __len__(self):
+        return len(self.dst)
+
+
+class EmbeddedGraph:
+    """
+    In-memory property graph with the BulkGraphLoader write interface
+
+    Args:
+        user_key: User id property ("id" for setup_neo4j data, "user_id"
+            for the pipeline test graph)
+        chunk_size: kept for loader compatibility (callers batch by it)
+    """
+
+    def __init__(self, user_key: str = "user_id", chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.user_key = validate_identifier(user_key)
+        self.chunk_size = chunk_size
+        self.clear()
+
+    def clear(self):
+        self.tables: Dict[str, _NodeTable] = {}
+        self.relationships: Dict[Tuple[str, str, str], _RelationshipSet] = {}
+        self.stats = {
+            "nodes_created": 0,
+            "relationships_created": 0,
+            "properties_set": 0,
+            "batches": 0,
+            "seconds": 0.0,
+        }
+
+    def table(self, label: str) -> _NodeTable:
+        table = self.tables.get(label)
+        if table is None:
+            table = self.tables[label] = _NodeTable(validate_identifier(label))
+        return table
+
+    # ------------------------------------------------------------------
+    # BulkGraphLoader interface
+    # ------------------------------------------------------------------
+
+    def merge_nodes(self, label: str, key: str, rows: Iterable[Dict]) -> Dict:
+        """MERGE nodes on `key` and set all other row properties"""
+        start = time.perf_counter()
+        table = self.table(label)
+        created = properties = 0
+        for row in rows:
+            hits = table.find(key, row[key])
+            if hits:
+                for i in hits:
+                    table.update(i, row)
+            else:
+                table.create(row)
+                created += 1
+            properties += len(row)
+        return self._account(start, nodes_created=created, properties_set=properties)
+
+    def create_nodes(self, label: str, rows: Iterable[Dict]) -> Dict:
+        start = time.perf_counter()
+        table = self.table(label)
+        created = properties = 0
+        for row in rows:
+            table.create(row)
+            created += 1
+            properties += len(row)
+        return self._account(start, nodes_created=created, properties_set=properties)
+
+    def merge_relationships(
+        self,
+        rel_type: str,
+        start_label: str,
+        start_key: str,
+        end_label: str,
+        end_key: str,
+        rows: Iterable[Dict]
+    ) -> Dict:
+        """MERGE relationships between existing nodes (rows: start, end, props)"""
+        start = time.perf_counter()
+        validate_identifier(rel_type)
+        starts, ends = self.table(start_label), self.table(end_label)
+        rels = self.relationships.get((rel_type, start_label, end_label))
+        if rels is None:
+            rels = self.relationships[(rel_type, start_label, end_label)] = _RelationshipSet()
+
+        created = 0
+        for row in rows:
+            props = row.get("props")
+            for a in starts.find(start_key, row["start"]):
+                for b in ends.find(end_key, row["end"]):
+                    rels.add(a, b, props)
+                    created += 1
+        return self._account(start, relationships_created=created)
+
+    def _account(self, start: float, **counters) -> Dict:
+        totals = {"nodes_created": 0, "relationships_created": 0, "properties_set": 0, **counters}
+        for key, value in totals.items():
+            self.stats[key] += value
+        self.stats["batches"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        return totals
+
+    def report(self) -> Dict:
+        seconds = self.stats["seconds"] or 1e-9
+        return {
+            **self.stats,
+            "seconds": round(self.stats["seconds"], 3),
+            "nodes_per_second": round(self.stats["nodes_created"] / seconds, 1),
+            "relationships_per_second": round(self.stats["relationships_created"] / seconds, 1),
+        }
+
+    def print_report(self):
+        r = self.report()
+        print(f"✓ Embedded load: {r['nodes_created']} nodes, {r['relationships_created']} relationships "
+              f"in {r['seconds']}s")
+        print(f"  Throughput: {r['nodes_per_second']:,} nodes/s, {r['relationships_per_second']:,} rels/s")
+
+    # ------------------------------------------------------------------
+    # Adjacency
+    # ------------------------------------------------------------------
+
+    def freeze(self) -> float:
+        """Build CSR for every relationship set with pending edges"""
+        start = time.perf_counter()
+        for (rel_type, start_label, _), rels in self.relationships.items():
+            if not rels.frozen:
+                self.stats["relationships_created"] -= rels.freeze(len(self.table(start_label).rows))
+        return time.perf_counter() - start
+
+    def out(self, rel_type: str, start_label: str, i: int, end_label: str) -> Iterator[int]:
+        rels = self.relationships.get((rel_type, start_label, end_label))
+        if rels is None:
+            return iter(())
+        if not rels.frozen:
+            self.freeze()
+        return rels.neighbours(i)
+
+    def _users(self, user_id: str) -> List[int]:
+        return self.table("User").find(self.user_key, user_id)
+
+    # ------------------------------------------------------------------
+    # Fixed traversals (same rows as the query catalogue)
+    # ------------------------------------------------------------------
+
+    def insurance_recommendation(self, user_id: str) -> List[Dict]:
+        users, locations = self.table("User"), self.table("Location")
+        risks, products = self.table("RiskFactor"), self.table("InsuranceProduct")
+
+        rows = []
+        for u in self._users(user_id):
+            user = users.rows[u]
+            for li in self.out("LIVES_IN", "User", u, "Location"):
+                location = locations.rows[li]
+                for ri in self.out("HAS_RISK", "Location", li, "RiskFactor"):
+                    risk = risks.rows[ri]
+                    for pi in self.out("COVERED_BY", "RiskFactor", ri, "InsuranceProduct"):
+                        product = products.rows[pi]
+                        rows.append({
+                            "user": user.get(self.user_key),
+                            "age_group": user.get("age_group"),
+                            "location": location.get("name"),
+                            "risk_type": risk.get("type"),
+                            "severity": risk.get("severity"),
+                            "product_name": product.get("name"),
+                            "category": product.get("category"),
+                            "premium": product.get("monthly_premium"),
+                        })
+
+        # ORDER BY r.severity DESC, p.monthly_premium ASC
+        rows.sort(key=lambda row: _asc(row["premium"]))
+        rows.sort(key=lambda row: _asc(row["severity"]), reverse=True)
+        return rows
+
+    def multi_hop_reasoning(self, user_id: str) -> List[Dict]:
+        users, risks, products = self.table("User"), self.table("RiskFactor"), self.table("InsuranceProduct")
+
+        groups: Dict[Tuple, Dict] = {}
+        for u in self._users(user_id):
+            user = users.rows[u]
+            for ri in self.out("EXPOSED_TO", "User", u, "RiskFactor"):
+                risk = risks.rows[ri]
+                for pi in self.out("COVERED_BY", "RiskFactor", ri, "InsuranceProduct"):
+                    product = products.rows[pi]
+                    key = (user.get(self.user_key), user.get("age_group"), user.get("family_type"), risk.get("description"))
+                    group = groups.get(key)
+                    if group is None:
+                        group = groups[key] = {
+                            "user": key[0],
+                            "age_group": key[1],
+                            "family_type": key[2],
+                            "risk_description": key[3],
+                            "recommended_products": [],
+                        }
+                    group["recommended_products"].append({
+                        "product": product.get("name"),
+                        "category": product.get("category"),
+                        "premium": product.get("monthly_premium"),
+                        "coverage": product.get("coverage_amount"),
+                    })
+        return list(groups.values())
+
+    def location_safety(self) -> List[Dict]:
+        locations, risks = self.table("Location"), self.table("RiskFactor")
+
+        rows = []
+        for li, location in enumerate(locations.rows):
+            location_risks = [risks.rows[ri] for ri in self.out("HAS_RISK", "Location", li, "RiskFactor")]
+            rows.append({
+                "location": location.get("name"),
+                "safety_score": location.get("safety_score"),
+                "cctv_count": location.get("cctv_count"),
+                "crime_rate": location.get("crime_rate"),
+                "risk_count": len(location_risks),
+                # OPTIONAL MATCH miss still collects one all-null map
+                "risks": [{"type": r.get("type"), "severity": r.get("severity")} for r in location_risks]
+                         or [{"type": None, "severity": None}],
+            })
+        rows.sort(key=lambda row: _asc(row["safety_score"]), reverse=True)
+        return rows
+
+    def flood_zone_users(self) -> int:
+        """count(u) over User-LIVES_IN->Location-HAS_RISK->RiskFactor{type:'flood'}"""
+        risks = self.table("RiskFactor")
+        flood_paths = [
+            sum(1 for ri in self.out("HAS_RISK", "Location", li, "RiskFactor") if risks.rows[ri].get("type") == "flood")
+            for li in range(len(self.table("Location").rows))
+        ]
+        return sum(
+            flood_paths[li]
+            for u in range(len(self.table("User").rows))
+            for li in self.out("LIVES_IN", "User", u, "Location")
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Same keys as TowninGraphSetup.verify_data"""
+        self.freeze()
+        return {
+            "users": len(self.table("User").rows),
+            "locations": len(self.table("Location").rows),
+            "products": len(self.table("InsuranceProduct").rows),
+            "relationships": sum(len(rels) for rels in self.relationships.values()),
+            "flood_users": self.flood_zone_users(),
+        }
+
+    # ------------------------------------------------------------------
+    # Neo4j interop
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_neo4j(cls, client, user_key: str = "user_id") -> "EmbeddedGraph":
+        """Copy a live Neo4j graph (via GraphClient) for correctness checks"""
+        graph = cls(user_key=user_key)
+        nodes = client.read(
+            "MATCH (n) RETURN elementId(n) AS eid, labels(n)[0] AS label, properties(n) AS props",
+            name="embedded_export_nodes",
+        )
+        positions = {}
+        for node in nodes:
+            table = graph.table(node["label"])
+            positions[node["eid"]] = (node["label"], table.create(node["props"]))
+
+        edges = client.read(
+            "MATCH (a)-[r]->(b) RETURN elementId(a) AS src, elementId(b) AS dst, "
+            "type(r) AS type, properties(r) AS props",
+            name="embedded_export_edges",
+        )
+        for edge in edges:
+            (start_label, a), (end_label, b) = positions[edge["src"]], positions[edge["dst"]]
+            key = (edge["type"], start_label, end_label)
+            rels = graph.relationships.get(key)
+            if rels is None:
+                rels = graph.relationships[key] = _RelationshipSet()
+            rels.add(a, b, edge["props"])
+
+        graph.stats["nodes_created"] = len(nodes)
+        graph.stats["relationships_created"] = len(edges)
+        graph.freeze()
+        return graph
+
+
+def _normalize(rows: List[Dict]) -> List[str]:
+    """Order-insensitive comparison form (collect() order is unspecified)"""
+    normalized = []
+    for row in rows:
+        row = dict(row)
+        for key, value in row.items():
+            if isinstance(value, list):
+                row[key] = sorted(value, key=repr)
+        normalized.append(repr(sorted(row.items())))
+    return sorted(normalized)
+
+
+def compare_with_neo4j(graph: EmbeddedGraph, client, user_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Run the catalogue queries on Neo4j and the embedded engine side by side
+
+    Uses the catalogue Cypher as-is, so the graph must use `user_id` keys
+    (the test_graphrag_pipeline.py sample graph).
+    """
+    from graph_queries import get_query
+
+    checks = {
+        "insurance_recommendation": graph.insurance_recommendation,
+        "multi_hop_reasoning": graph.multi_hop_reasoning,
+    }
+    report = {}
+    for name, native in checks.items():
+        cypher = get_query(name)["cypher"]
+        mismatches = [
+            uid for uid in user_ids
+            if _normalize(client.read(cypher, name=name, user_id=uid)) != _normalize(native(uid))
+        ]
+        report[name] = {"checked": len(user_ids), "mismatches": mismatches}
+
+    expected = client.read(get_query("location_safety")["cypher"], name="location_safety")
+    report["location_safety"] = {
+        "checked": 1,
+        "mismatches": [] if _normalize(expected) == _normalize(graph.location_safety()) else ["*"],
+    }
+    return report
+
+
+def _time_calls(fn, args_list: List[Tuple]) -> Dict[str, float]:
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {
+        "avg_us": round(sum(latencies) / len(latencies), 1),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedded GraphRAG engine benchmark")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--synthetic", action="store_true", help="use SyntheticGraphGenerator data")
+    parser.add_argument("--queries", type=int, default=1000, help="sampled users per traversal")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", action="store_true", help="copy the live Neo4j graph and compare results")
+    args = parser.parse_args()
+
+    if args.compare:
+        from graph_client import get_client
+
+        client = get_client()
+        try:
+            graph = EmbeddedGraph.from_neo4j(client, user_key="user_id")
+            user_ids = [row["user_id"] for row in client.read("MATCH (u:User) RETURN u.user_id AS user_id")]
+            report = compare_with_neo4j(graph, client, [uid for uid in user_ids if uid is not None])
+        finally:
+            client.close()
+        print("\n=== Embedded vs Neo4j ===")
+        for name, result in report.items():
+            status = "✓" if not result["mismatches"] else "❌"
+            print(f"  {status} {name}: {result['checked']} checked, {len(result['mismatches'])} mismatches")
+        return
+
+    random.seed(args.seed)
+    graph = EmbeddedGraph(user_key="id", chunk_size=50_000)
+    start = time.perf_counter()
+    if args.synthetic:
+        from synthetic_graph import SyntheticGraphGenerator
+
+        SyntheticGraphGenerator(num_users=args.users, seed=args.seed).load(graph)
+    else:
+        from setup_neo4j import TowninGraphSetup
+
+        TowninGraphSetup(store=graph).populate_sample_data(num_users=args.users)
+    load_seconds = time.perf_counter() - start
+    freeze_seconds = graph.freeze()
+
+    print(f"\n✓ Loaded {args.users:,} users in {load_seconds:.1f}s (CSR build {freeze_seconds:.2f}s)")
+    counts = graph.counts()
+    print(f"  Nodes: users={counts['users']:,} locations={counts['locations']} products={counts['products']}")
+    print(f"  Relationships: {counts['relationships']:,}  flood-zone users: {counts['flood_users']:,}")
+
+    rng = random.Random(args.seed)
+    user_ids = [graph.table("User").rows[rng.randrange(counts["users"])]["id"] for _ in range(args.queries)]
+
+    print("\n=== Traversal latency ===")
+    for name, fn in [("insurance_recommendation", graph.insurance_recommendation),
+                     ("multi_hop_reasoning", graph.multi_hop_reasoning)]:
+        timing = _time_calls(fn, [(uid,) for uid in user_ids])
+        print(f"  {name}: avg {timing['avg_us']}µs  p99 {timing['p99_us']}µs")
+    timing = _time_calls(graph.location_safety, [()] * 100)
+    print(f"  location_safety: avg {timing['avg_us']}µs  p99 {timing['p99_us']}µs")
+    start = time.perf_counter()
+    graph.flood_zone_users()
+    print(f"  flood_zone_users (full scan): {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
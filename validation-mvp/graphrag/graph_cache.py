@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - In-process Reference Graph Cache
+Serves the Location→Risk and Risk→Product hops from memory
+
+The reference dimensions (Locations, RiskFactors, InsuranceProducts and
+their HAS_RISK / COVERED_BY edges) are tiny and rarely change, so they are
+loaded once into CSR adjacency arrays. Only the per-user edges (LIVES_IN,
+EXPOSED_TO) are fetched from Neo4j, in a single round-trip per request.
+
+Invalidation:
+  - TTL: the snapshot is reloaded after `ttl_seconds`
+  - version: writers call `bump_reference_version(driver)` after changing
+    reference data; readers compare versions every `version_check_seconds`
+
+Usage:
+    cache = ReferenceGraphCache(driver)
+    cache.recommend_by_location("user_002")
+    print(cache.metrics())
+"""
+
+import time
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from graph_loader import validate_identifier
+
+VERSION_QUERY = """
+OPTIONAL MATCH (v:CacheVersion {name: 'reference'})
+RETURN coalesce(v.version, 0) AS version
+"""
+
+BUMP_VERSION_QUERY = """
+MERGE (v:CacheVersion {name: 'reference'})
+SET v.version = coalesce(v.version, 0) + 1
+RETURN v.version AS version
+"""
+
+# Explicit label: labels(n)[0] is arbitrary for nodes carrying extra labels
+NODES_QUERY = """
+MATCH (n)
+WHERE n:Location OR n:RiskFactor OR n:InsuranceProduct
+RETURN elementId(n) AS eid,
+       CASE WHEN n:Location THEN 'Location'
+            WHEN n:RiskFactor THEN 'RiskFactor'
+            ELSE 'InsuranceProduct' END AS label,
+       properties(n) AS props
+"""
+
+EDGES_QUERY = """
+MATCH (a)-[e:HAS_RISK|COVERED_BY]->(b)
+RETURN type(e) AS type, elementId(a) AS src, elementId(b) AS dst,
+       coalesce(e.weight, e.coverage_match, 1.0) AS weight
+"""
+
+USER_EDGES_QUERY = """
+MATCH (u:User {{{key}: $user_id}})
+RETURN properties(u) AS user,
+       [(u)-[:LIVES_IN]->(l:Location) | elementId(l)] AS locations,
+       [(u)-[ex:EXPOSED_TO]->(r:RiskFactor) |
+            {{risk: elementId(r), confidence: coalesce(ex.inference_confidence, 1.0)}}] AS exposures
+"""
+
+COUNTERS = ("hits", "misses", "reloads", "version_checks", "user_queries")
+
+
+class _CSR:
+    """Compressed sparse rows: neighbours of i are targets[offsets[i]:offsets[i+1]]"""
+
+    __slots__ = ("offsets", "targets", "weights")
+
+    def __init__(self, num_sources: int, edges: List[Tuple[int, int, float]]):
+        edges.sort()
+        self.offsets = array("i", [0] * (num_sources + 1))
+        self.targets = array("i", (dst for _, dst, _ in edges))
+        self.weights = array("d", (w for _, _, w in edges))
+        for src, _, _ in edges:
+            self.offsets[src + 1] += 1
+        for i in range(num_sources):
+            self.offsets[i + 1] += self.offsets[i]
+
+    def neighbours(self, i: int) -> List[Tuple[int, float]]:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.targets[start:end], self.weights[start:end]))
+
+
+class _Snapshot:
+    """Immutable reference graph; swapped atomically on reload"""
+
+    def __init__(self, nodes: List[Dict], edges: List[Dict], version: int):
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        self.locations: List[Dict] = []
+        self.risks: List[Dict] = []
+        self.products: List[Dict] = []
+        self.index: Dict[str, Tuple[str, int]] = {}
+
+        by_label = {"Location": self.locations, "RiskFactor": self.risks, "InsuranceProduct": self.products}
+        for node in nodes:
+            bucket = by_label.get(node["label"])
+            if bucket is None:
+                continue
+            self.index[node["eid"]] = (node["label"], len(bucket))
+            bucket.append(node["props"])
+
+        has_risk, covered_by = [], []
+        for edge in edges:
+            src, dst = self.index.get(edge["src"]), self.index.get(edge["dst"])
+            if src is None or dst is None:
+                continue
+            if edge["type"] == "HAS_RISK" and src[0] == "Location" and dst[0] == "RiskFactor":
+                has_risk.append((src[1], dst[1], float(edge["weight"])))
+            elif edge["type"] == "COVERED_BY" and src[0] == "RiskFactor" and dst[0] == "InsuranceProduct":
+                covered_by.append((src[1], dst[1], float(edge["weight"])))
+
+        self.location_risks = _CSR(len(self.locations), has_risk)
+        self.risk_products = _CSR(len(self.risks), covered_by)
+
+
+class ReferenceGraphCache:
+    """
+    Client-side cache of the reference subgraph
+
+    Args:
+        driver: neo4j driver
+        user_key: User id property ("user_id" or "id")
+        ttl_seconds: maximum snapshot age
+        version_check_seconds: how often to compare the CacheVersion node
+    """
+
+    def __init__(
+        self,
+        driver,
+        user_key: str = "user_id",
+        ttl_seconds: float = 600.0,
+        version_check_seconds: float = 10.0,
+        database: Optional[str] = None
+    ):
+        self.driver = driver
+        self.user_key = validate_identifier(user_key)
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.database = database
+
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_version_check = 0.0
+        self._lock = threading.Lock()
+        # Per-thread counters, summed in metrics(): the hit path takes no lock
+        self._local = threading.local()
+        self._thread_counters: List[Dict[str, int]] = []
+        self._counters_lock = threading.Lock()
+
+    def _session(self):
+        if self.database:
+            return self.driver.session(database=self.database)
+        return self.driver.session()
+
+    def _count(self, name: str):
+        counters = getattr(self._local, "counters", None)
+        if counters is None:
+            counters = self._local.counters = dict.fromkeys(COUNTERS, 0)
+            with self._counters_lock:
+                self._thread_counters.append(counters)
+        counters[name] += 1
+
+    def _counter_totals(self) -> Dict[str, int]:
+        totals = dict.fromkeys(COUNTERS, 0)
+        with self._counters_lock:
+            thread_counters = list(self._thread_counters)
+        for counters in thread_counters:
+            for name, value in counters.items():
+                totals[name] += value
+        return totals
+
+    # ------------------------------------------------------------------
+    # Snapshot management
+    # ------------------------------------------------------------------
+
+    def _load(self) -> _Snapshot:
+        with self._session() as session:
+            version = session.run(VERSION_QUERY).single()["version"]
+            nodes = [record.data() for record in session.run(NODES_QUERY)]
+            edges = [record.data() for record in session.run(EDGES_QUERY)]
+        self._count("reloads")
+        return _Snapshot(nodes, edges, version)
+
+    def _current_version(self) -> int:
+        self._count("version_checks")
+        with self._session() as session:
+            return session.run(VERSION_QUERY).single()["version"]
+
+    def snapshot(self) -> _Snapshot:
+        """Current snapshot, reloading on TTL expiry or version change"""
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is not None and now - snap.loaded_at < self.ttl_seconds:
+            if now - self._last_version_check < self.version_check_seconds:
+                self._count("hits")
+                return snap
+
+        with self._lock:
+            snap = self._snapshot
+            now = time.monotonic()
+            stale = snap is None or now - snap.loaded_at >= self.ttl_seconds
+            if not stale and now - self._last_version_check >= self.version_check_seconds:
+                self._last_version_check = now
+                stale = self._current_version() != snap.version
+            if stale:
+                self._count("misses")
+                self._snapshot = snap = self._load()
+                self._last_version_check = time.monotonic()
+            else:
+                self._count("hits")
+            return snap
+
+    def invalidate(self):
+        """Drop the snapshot; the next request reloads it"""
+        with self._lock:
+            self._snapshot = None
+
+    # ------------------------------------------------------------------
+    # Local hops
+    # ------------------------------------------------------------------
+
+    def risks_for_location(self, location_eid: str) -> List[Tuple[Dict, float]]:
+        snap = self.snapshot()
+        label, i = snap.index[location_eid]
+        return [(snap.risks[r], w) for r, w in snap.location_risks.neighbours(i)]
+
+    def products_for_risk(self, risk_eid: str) -> List[Tuple[Dict, float]]:
+        snap = self.snapshot()
+        label, i = snap.index[risk_eid]
+        return [(snap.products[p], w) for p, w in snap.risk_products.neighbours(i)]
+
+    # ------------------------------------------------------------------
+    # Recommendation queries (one Neo4j round-trip each)
+    # ------------------------------------------------------------------
+
+    def _user_edges(self, user_id: str) -> Optional[Dict]:
+        self._count("user_queries")
+        with self._session() as session:
+            record = session.run(
+                USER_EDGES_QUERY.format(key=self.user_key), user_id=user_id
+            ).single()
+        return record.data() if record else None
+
+    def _snapshot_for(self, eids: List[str]) -> _Snapshot:
+        """Snapshot that knows every referenced node (reloads once if not)"""
+        snap = self.snapshot()
+        if any(eid not in snap.index for eid in eids):
+            self.invalidate()
+            snap = self.snapshot()
+        return snap
+
+    def recommend_by_location(self, user_id: str) -> List[Dict]:
+        """Same rows as the `insurance_recommendation` catalogue query"""
+        user = self._user_edges(user_id)
+        if not user:
+            return []
+        snap = self._snapshot_for(user["locations"])
+
+        rows = []
+        for location_eid in user["locations"]:
+            if location_eid not in snap.index:
+                continue
+            _, li = snap.index[location_eid]
+            location = snap.locations[li]
+            for ri, _ in snap.location_risks.neighbours(li):
+                risk = snap.risks[ri]
+                for pi, _ in snap.risk_products.neighbours(ri):
+                    product = snap.products[pi]
+                    rows.append({
+                        "user": user_id,
+                        "age_group": user["user"].get("age_group"),
+                        "location": location.get("name", location.get("grid_cell")),
+                        "risk_type": risk.get("type"),
+                        "severity": risk.get("severity"),
+                        "product_name": product.get("name"),
+                        "category": product.get("category"),
+                        "premium": product.get("monthly_premium"),
+                    })
+
+        # ORDER BY r.severity DESC, p.monthly_premium ASC
+        rows.sort(key=lambda r: r["premium"] if r["premium"] is not None else float("inf"))
+        rows.sort(key=lambda r: r["severity"] or "", reverse=True)
+        return rows
+
+    def recommend_by_exposure(self, user_id: str) -> List[Dict]:
+        """Same rows as the `multi_hop_reasoning` catalogue query"""
+        user = self._user_edges(user_id)
+        if not user:
+            return []
+        snap = self._snapshot_for([e["risk"] for e in user["exposures"]])
+
+        rows = []
+        for exposure in user["exposures"]:
+            if exposure["risk"] not in snap.index:
+                continue
+            _, ri = snap.index[exposure["risk"]]
+            risk = snap.risks[ri]
+            if not snap.risk_products.neighbours(ri):
+                continue
+            rows.append({
+                "user": user_id,
+                "age_group": user["user"].get("age_group"),
+                "family_type": user["user"].get("family_type"),
+                "risk_description": risk.get("description"),
+                "recommended_products": [
+                    {
+                        "product": snap.products[pi].get("name"),
+                        "category": snap.products[pi].get("category"),
+                        "premium": snap.products[pi].get("monthly_premium"),
+                        "coverage": snap.products[pi].get("coverage_amount"),
+                    }
+                    for pi, _ in snap.risk_products.neighbours(ri)
+                ],
+            })
+        return rows
+
+    def metrics(self) -> Dict:
+        counters = self._counter_totals()
+        lookups = counters["hits"] + counters["misses"]
+        snap = self._snapshot
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "version": snap.version if snap else None,
+            "snapshot_age_seconds": round(time.monotonic() - snap.loaded_at, 1) if snap else None,
+        }
+
+
+def bump_reference_version(driver) -> int:
+    """Call after changing Locations/RiskFactors/Products or their edges"""
+    with driver.session() as session:
+        return session.run(BUMP_VERSION_QUERY).single()["version"]
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Shared Neo4j Client
+One pooled driver per process, managed transactions with retry, batched
+queries and per-query latency metrics
+
+Used by setup_neo4j.py, test_graphrag_pipeline.py and serving code instead
+of each opening its own `GraphDatabase.driver`.
+
+Usage:
+    client = get_client()
+    rows = client.read("MATCH (u:User {user_id: $id}) RETURN u", id="user_002")
+    counts = client.batch_scalars({"users": "MATCH (u:User) RETURN count(u)"})
+    print(client.metrics())
+"""
+
+import os
+import time
+import random
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+load_dotenv()
+
+DEFAULT_URI = "bolt://localhost:7687"
+DEFAULT_AUTH = ("neo4j", "test1234")
+
+# Pool settings tuned for many short recommendation queries
+POOL_CONFIG = {
+    "max_connection_pool_size": 50,
+    "connection_acquisition_timeout": 30.0,
+    "max_connection_lifetime": 3600,
+    "liveness_check_timeout": 60.0,
+    "keep_alive": True,
+}
+
+RETRYABLE_ERRORS = (ServiceUnavailable, SessionExpired, TransientError)
+
+
+class GraphClient:
+    """
+    Pooled Neo4j access for all GraphRAG scripts
+
+    Args:
+        uri / auth: connection (defaults: NEO4J_URI / NEO4J_USERNAME /
+            NEO4J_PASSWORD env vars, then the local docker defaults)
+        database: target database (None = server default)
+        max_retries: extra attempts on connection-level failures; transient
+            errors inside a transaction are already retried by the driver
+        latency_window: per-query samples kept for percentiles
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        auth: Optional[Tuple[str, str]] = None,
+        database: Optional[str] = None,
+        max_retries: int = 3,
+        latency_window: int = 1000,
+        **pool_config
+    ):
+        self.uri = uri or os.getenv("NEO4J_URI", DEFAULT_URI)
+        self.auth = auth or (
+            os.getenv("NEO4J_USERNAME", DEFAULT_AUTH[0]),
+            os.getenv("NEO4J_PASSWORD", DEFAULT_AUTH[1]),
+        )
+        self.database = database
+        self.max_retries = max_retries
+
+        self.driver = GraphDatabase.driver(self.uri, auth=self.auth, **{**POOL_CONFIG, **pool_config})
+
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=latency_window))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._metrics_lock = threading.Lock()
+
+    def close(self):
+        global _client
+        self.driver.close()
+        # A closed shared client must not be handed out again
+        with _client_lock:
+            if _client is self:
+                _client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def verify_connectivity(self):
+        self.driver.verify_connectivity()
+
+    def session(self, **kwargs):
+        """Raw session (for driver-level helpers such as BulkGraphLoader)"""
+        if self.database and "database" not in kwargs:
+            kwargs["database"] = self.database
+        return self.driver.session(**kwargs)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _record(self, name: str, seconds: float, failed: bool = False):
+        with self._metrics_lock:
+            self._latencies[name].append(seconds * 1000)
+            self._counts[name] += 1
+            if failed:
+                self._errors[name] += 1
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-query count / errors / p50 / p95 / max latency (ms)"""
+        with self._metrics_lock:
+            snapshot = {name: sorted(samples) for name, samples in self._latencies.items()}
+            counts, errors = dict(self._counts), dict(self._errors)
+
+        report = {}
+        for name, samples in snapshot.items():
+            if not samples:
+                continue
+            report[name] = {
+                "count": counts[name],
+                "errors": errors.get(name, 0),
+                "p50_ms": round(samples[len(samples) // 2], 2),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+                "max_ms": round(samples[-1], 2),
+            }
+        return report
+
+    def print_metrics(self):
+        print("\n=== Query Latency ===")
+        for name, m in sorted(self.metrics().items()):
+            print(f"  {name}: n={m['count']} p50={m['p50_ms']}ms p95={m['p95_ms']}ms max={m['max_ms']}ms")
+
+    # ------------------------------------------------------------------
+    # Managed transactions
+    # ------------------------------------------------------------------
+
+    def _execute(self, mode: str, work: Callable, name: str):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with self.session() as session:
+                    runner = session.execute_read if mode == "read" else session.execute_write
+                    result = runner(work)
+                self._record(name, time.perf_counter() - start)
+                return result
+            except RETRYABLE_ERRORS:
+                self._record(name, time.perf_counter() - start, failed=True)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                # Exponential backoff with jitter
+                time.sleep(min(2 ** attempt * 0.1, 2.0) * (0.5 + random.random()))
+
+    @staticmethod
+    def _name(query: str, name: Optional[str]) -> str:
+        return name or " ".join(query.split())[:60]
+
+    def read(self, query: str, name: Optional[str] = None, **params) -> List[Dict]:
+        """Run a read query in a managed transaction; returns rows as dicts"""
+        return self._execute(
+            "read",
+            lambda tx: [record.data() for record in tx.run(query, **params)],
+            self._name(query, name),
+        )
+
+    def write(self, query: str, name: Optional[str] = None, **params) -> List[Dict]:
+        """Run a write query in a managed transaction; returns rows as dicts"""
+        return self._execute(
+            "write",
+            lambda tx: [record.data() for record in tx.run(query, **params)],
+            self._name(query, name),
+        )
+
+    def write_all(self, statements: List[Any], name: str = "write_all") -> None:
+        """
+        Run several write statements in ONE transaction
+
+        Each statement is a Cypher string or a (cypher, params) tuple.
+        """
+        def work(tx):
+            for statement in statements:
+                query, params = statement if isinstance(statement, tuple) else (statement, {})
+                tx.run(query, **params).consume()
+
+        self._execute("write", work, name)
+
+    def autocommit(self, query: str, name: Optional[str] = None, **params) -> Dict[str, int]:
+        """
+        Run an auto-commit statement and return its update counters
+
+        Needed for `CALL { ... } IN TRANSACTIONS`, which cannot run inside a
+        managed transaction. Not retried (the statement may be partially
+        applied).
+        """
+        name = self._name(query, name)
+        start = time.perf_counter()
+        try:
+            with self.session() as session:
+                counters = session.run(query, **params).consume().counters
+        except Exception:
+            self._record(name, time.perf_counter() - start, failed=True)
+            raise
+        self._record(name, time.perf_counter() - start)
+        return {
+            "nodes_created": counters.nodes_created,
+            "nodes_deleted": counters.nodes_deleted,
+            "relationships_created": counters.relationships_created,
+            "relationships_deleted": counters.relationships_deleted,
+            "properties_set": counters.properties_set,
+        }
+
+    def read_tx(self, work: Callable, name: str) -> Any:
+        """Custom managed read transaction function"""
+        return self._execute("read", work, name)
+
+    def write_tx(self, work: Callable, name: str) -> Any:
+        """Custom managed write transaction function"""
+        return self._execute("write", work, name)
+
+    def batch_scalars(self, queries: Dict[str, str], name: str = "batch_scalars", **params) -> Dict[str, Any]:
+        """
+        Run many single-value read queries in a single round-trip
+
+        Each query must end in `RETURN <expression>` without an alias and
+        yield one row (e.g. a count); they are combined into one statement
+        with CALL subqueries.
+        """
+        parts, columns = [], []
+        for key, query in queries.items():
+            column = f"v_{len(columns)}"
+            # Alias the subquery's only column so names never clash
+            parts.append(f"CALL {{ {query.strip()} AS {column} }}")
+            columns.append((key, column))
+        combined = "\n".join(parts) + "\nRETURN " + ", ".join(column for _, column in columns)
+
+        rows = self.read(combined, name=name, **params)
+        row = rows[0] if rows else {}
+        return {key: row.get(column) for key, column in columns}
+
+
+_client: Optional[GraphClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client(**kwargs) -> GraphClient:
+    """Process-wide shared client (created on first use)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GraphClient(**kwargs)
+    return _client
+
+
+def close_client():
+    if _client is not None:
+        _client.close()
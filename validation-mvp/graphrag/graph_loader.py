@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Batched Neo4j Loader
+Sends parameter lists via UNWIND in chunks inside explicit write transactions
+
+One round-trip per chunk instead of one per node/relationship, so a
+million-user graph loads in minutes rather than hours.
+
+Usage:
+    loader = BulkGraphLoader(driver, chunk_size=5000)
+    loader.merge_nodes("User", "id", users)
+    loader.merge_relationships("LIVES_IN", "User", "id", "Location", "grid_cell", lives_in)
+    loader.print_report()
+"""
+
+import re
+import time
+from typing import List, Dict, Iterable, Iterator, Optional
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Labels, relationship types and property keys are interpolated into Cypher
+# (they cannot be parameters), so only plain identifiers are accepted.
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def validate_identifier(name: str) -> str:
+    if not IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid Cypher identifier: {name!r}")
+    return name
+
+
+def chunked(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Yield lists of at most `size` rows without materializing the input"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkGraphLoader:
+    """
+    UNWIND-based bulk writer on top of a Neo4j driver
+
+    Works with any driver-like object exposing `session()` whose sessions
+    implement `execute_write(fn)` (the neo4j 5.x API).
+    """
+
+    def __init__(self, driver, chunk_size: int = DEFAULT_CHUNK_SIZE, database: Optional[str] = None):
+        self.driver = driver
+        self.chunk_size = chunk_size
+        self.database = database
+        self.stats = {
+            "nodes_created": 0,
+            "relationships_created": 0,
+            "properties_set": 0,
+            "batches": 0,
+            "seconds": 0.0,
+        }
+
+    def _session(self):
+        if self.database:
+            return self.driver.session(database=self.database)
+        return self.driver.session()
+
+    @staticmethod
+    def _write_chunk(tx, query: str, rows: List[Dict], returns: Optional[str] = None) -> Dict:
+        result = tx.run(query, rows=rows)
+        returned = [record[returns] for record in result] if returns else []
+        counters = result.consume().counters
+        return {
+            "nodes_created": counters.nodes_created,
+            "relationships_created": counters.relationships_created,
+            "properties_set": counters.properties_set,
+            "returned": returned,
+        }
+
+    def run_unwind(self, query: str, rows: Iterable[Dict], returns: Optional[str] = None) -> Dict:
+        """
+        Run `query` once per chunk with the chunk bound to `$rows`
+
+        The query must start with `UNWIND $rows AS row`. Each chunk is its
+        own explicit transaction (retried by the driver on transient errors).
+        With `returns`, that column of every returned record is collected
+        into totals["returned"] (e.g. the keys a MATCH actually found).
+        """
+        totals = {"nodes_created": 0, "relationships_created": 0, "properties_set": 0}
+        returned = []
+        start = time.perf_counter()
+
+        with self._session() as session:
+            for chunk in chunked(rows, self.chunk_size):
+                counters = session.execute_write(self._write_chunk, query, chunk, returns)
+                for key in totals:
+                    totals[key] += counters[key]
+                returned.extend(counters["returned"])
+                self.stats["batches"] += 1
+
+        self.stats["seconds"] += time.perf_counter() - start
+        for key in totals:
+            self.stats[key] += totals[key]
+        if returns:
+            totals["returned"] = returned
+        return totals
+
+    def merge_nodes(self, label: str, key: str, rows: Iterable[Dict]) -> Dict:
+        """MERGE nodes on `key` and set all other row properties"""
+        label, key = validate_identifier(label), validate_identifier(key)
+        query = f"""
+            UNWIND $rows AS row
+            MERGE (n:{label} {{{key}: row.{key}}})
+            SET n += row
+        """
+        return self.run_unwind(query, rows)
+
+    def create_nodes(self, label: str, rows: Iterable[Dict]) -> Dict:
+        """CREATE nodes (no key lookup; use on an empty graph only)"""
+        label = validate_identifier(label)
+        query = f"""
+            UNWIND $rows AS row
+            CREATE (n:{label})
+            SET n = row
+        """
+        return self.run_unwind(query, rows)
+
+    def merge_relationships(
+        self,
+        rel_type: str,
+        start_label: str,
+        start_key: str,
+        end_label: str,
+        end_key: str,
+        rows: Iterable[Dict]
+    ) -> Dict:
+        """
+        MERGE relationships between existing nodes
+
+        Each row needs `start` and `end` key values and may carry a
+        `props` map that is set on the relationship.
+        """
+        rel_type = validate_identifier(rel_type)
+        start_label, start_key = validate_identifier(start_label), validate_identifier(start_key)
+        end_label, end_key = validate_identifier(end_label), validate_identifier(end_key)
+        query = f"""
+            UNWIND $rows AS row
+            MATCH (a:{start_label} {{{start_key}: row.start}})
+            MATCH (b:{end_label} {{{end_key}: row.end}})
+            MERGE (a)-[r:{rel_type}]->(b)
+            SET r += coalesce(row.props, {{}})
+        """
+        return self.run_unwind(query, rows)
+
+    def report(self) -> Dict:
+        seconds = self.stats["seconds"] or 1e-9
+        return {
+            **self.stats,
+            "seconds": round(self.stats["seconds"], 3),
+            "nodes_per_second": round(self.stats["nodes_created"] / seconds, 1),
+            "relationships_per_second": round(self.stats["relationships_created"] / seconds, 1),
+        }
+
+    def print_report(self):
+        r = self.report()
+        print(f"✓ Bulk load: {r['nodes_created']} nodes, {r['relationships_created']} relationships "
+              f"in {r['seconds']}s ({r['batches']} batches of ≤{self.chunk_size})")
+        print(f"  Throughput: {r['nodes_per_second']:,} nodes/s, {r['relationships_per_second']:,} rels/s")
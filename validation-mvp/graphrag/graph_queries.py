@@ -0,0 +1,402 @@
+"""
+Townin GraphRAG Query Catalogue
+Every named Cypher query the GraphRAG scripts run, with default parameters
+
+Schema management, benchmarks and serving code read queries from here so
+that index coverage and profiling always track what the pipeline executes.
+Queries whose identifiers vary (User id property, labels, relationship
+types) are stored as templates and filled in with `render`.
+"""
+
+from typing import Any, Dict
+
+
+def _templated(template: str, fields: Dict[str, Any], params: Dict, allow_label_scan: bool = False) -> Dict:
+    """Catalogue entry for a template; `cypher` is rendered with the default fields"""
+    return {
+        "cypher": template.format(**fields),
+        "template": template,
+        "fields": fields,
+        "params": params,
+        "allow_label_scan": allow_label_scan,
+    }
+
+
+# name -> {"cypher", "params", "allow_label_scan"} (+ "template", "fields")
+# allow_label_scan marks queries that intentionally read every node of a
+# label (e.g. listing all locations); all others must start from an index.
+QUERY_CATALOG: Dict[str, Dict] = {
+    # --- test_graphrag_pipeline.py -------------------------------------
+    "insurance_recommendation": {
+        "cypher": """
+            MATCH path = (u:User {user_id: $user_id})
+                         -[:LIVES_IN]-> (l:Location)
+                         -[:HAS_RISK]-> (r:RiskFactor)
+                         -[:COVERED_BY]-> (p:InsuranceProduct)
+            RETURN u.user_id as user,
+                   u.age_group as age_group,
+                   l.name as location,
+                   r.type as risk_type,
+                   r.severity as severity,
+                   p.name as product_name,
+                   p.category as category,
+                   p.monthly_premium as premium
+            ORDER BY r.severity DESC, p.monthly_premium ASC
+        """,
+        "params": {"user_id": "user_002"},
+        "allow_label_scan": False,
+    },
+    "multi_hop_reasoning": {
+        "cypher": """
+            MATCH path = (u:User)-[:EXPOSED_TO]->(r:RiskFactor)-[:COVERED_BY]->(p:InsuranceProduct)
+            WHERE u.user_id = $user_id
+            RETURN u.user_id as user,
+                   u.age_group as age_group,
+                   u.family_type as family_type,
+                   r.description as risk_description,
+                   collect({
+                       product: p.name,
+                       category: p.category,
+                       premium: p.monthly_premium,
+                       coverage: p.coverage_amount
+                   }) as recommended_products
+        """,
+        "params": {"user_id": "user_002"},
+        "allow_label_scan": False,
+    },
+    "location_safety": {
+        "cypher": """
+            MATCH (l:Location)
+            OPTIONAL MATCH (l)-[hr:HAS_RISK]->(r:RiskFactor)
+            RETURN l.name as location,
+                   l.safety_score as safety_score,
+                   l.cctv_count as cctv_count,
+                   l.crime_rate as crime_rate,
+                   count(r) as risk_count,
+                   collect({type: r.type, severity: r.severity}) as risks
+            ORDER BY l.safety_score DESC
+        """,
+        "params": {},
+        "allow_label_scan": True,
+    },
+    "location_by_name": {
+        "cypher": "MATCH (l:Location {name: $name}) RETURN l",
+        "params": {"name": "강남구 역삼동"},
+        "allow_label_scan": False,
+    },
+    "risk_by_id": {
+        "cypher": "MATCH (r:RiskFactor {risk_id: $risk_id}) RETURN r",
+        "params": {"risk_id": "health_risk_001"},
+        "allow_label_scan": False,
+    },
+    "product_by_id": {
+        "cypher": "MATCH (p:InsuranceProduct {product_id: $product_id}) RETURN p",
+        "params": {"product_id": "senior_care_001"},
+        "allow_label_scan": False,
+    },
+    # --- recommendation_materializer.py --------------------------------
+    "materialize_recommendations": _templated(
+        """
+        UNWIND $user_ids AS uid
+        MATCH (u:User {{{key}: uid}})
+        OPTIONAL MATCH (u)-[old:RECOMMENDED]->()
+        DELETE old
+        WITH DISTINCT u
+        CALL {{
+            WITH u
+            MATCH (u)-[:LIVES_IN]->(:Location)-[hr:HAS_RISK]->(r:RiskFactor)-[cb:COVERED_BY]->(p:InsuranceProduct)
+            RETURN r, p, coalesce(hr.weight, 1.0) * coalesce(cb.coverage_match, 1.0) AS s, 'location' AS source
+          UNION ALL
+            WITH u
+            MATCH (u)-[ex:EXPOSED_TO]->(r:RiskFactor)-[cb:COVERED_BY]->(p:InsuranceProduct)
+            RETURN r, p, coalesce(ex.inference_confidence, 1.0) * coalesce(cb.coverage_match, 1.0) AS s, 'exposure' AS source
+          UNION ALL
+            WITH u
+            MATCH (u)-[:EXHIBITS]->(:Behavior)-[:INDICATES]->(r:RiskFactor)-[cb:COVERED_BY]->(p:InsuranceProduct)
+            RETURN r, p, $behavior_weight * coalesce(cb.coverage_match, 1.0) AS s, 'behavior' AS source
+          UNION ALL
+            WITH u
+            MATCH (u)-[:HAS_PATTERN]->(iot:IoTPattern)
+            WHERE iot.anomaly_count >= $iot_threshold
+            MATCH (r:RiskFactor {{type: $iot_risk_type}})-[cb:COVERED_BY]->(p:InsuranceProduct)
+            RETURN r, p,
+                   CASE WHEN iot.anomaly_count >= 10 THEN 1.0 ELSE iot.anomaly_count / 10.0 END
+                     * coalesce(cb.coverage_match, 1.0) AS s,
+                   'iot' AS source
+        }}
+        WITH u, p, collect(s) AS scores, collect(DISTINCT source) AS sources, collect(DISTINCT r.type) AS risk_types
+        WITH u, p, 1.0 - reduce(acc = 1.0, x IN scores | acc * (1.0 - x)) AS score, sources, risk_types
+        MERGE (u)-[rec:RECOMMENDED]->(p)
+        SET rec.score = score,
+            rec.sources = sources,
+            rec.risk_types = risk_types,
+            rec.version = $version,
+            rec.computed_at = datetime()
+        RETURN count(rec) AS edges
+        """,
+        fields={"key": "id"},
+        params={"user_ids": ["user_000"], "version": 0, "behavior_weight": 0.5,
+                "iot_threshold": 3, "iot_risk_type": "health_decline"},
+    ),
+    "clear_reco_dirty": _templated(
+        """
+        UNWIND $user_ids AS uid
+        MATCH (u:User {{{key}: uid}})
+        REMOVE u.reco_dirty
+        SET u.reco_refreshed_at = datetime()
+        """,
+        fields={"key": "id"},
+        params={"user_ids": ["user_000"]},
+    ),
+    "mark_reco_dirty": _templated(
+        """
+        UNWIND $user_ids AS uid
+        MATCH (u:User {{{key}: uid}})
+        SET u.reco_dirty = true
+        """,
+        fields={"key": "id"},
+        params={"user_ids": ["user_000"]},
+    ),
+    "user_page": _templated(
+        """
+        MATCH (u:User)
+        WHERE u.{key} > $after
+        RETURN u.{key} AS uid
+        ORDER BY uid
+        LIMIT $limit
+        """,
+        fields={"key": "id"},
+        params={"after": "", "limit": 1000},
+    ),
+    "clear_reco_dirty_nodes": {
+        "cypher": """
+            UNWIND $node_ids AS nid
+            MATCH (u:User)
+            WHERE elementId(u) = nid
+            REMOVE u.reco_dirty
+            SET u.reco_refreshed_at = datetime()
+            RETURN count(u) AS cleared
+        """,
+        "params": {"node_ids": ["4:00000000-0000-0000-0000-000000000000:0"]},
+        "allow_label_scan": False,
+    },
+    "dirty_users": _templated(
+        """
+        MATCH (u:User)
+        WHERE u.reco_dirty = true
+        RETURN elementId(u) AS node_id, u.{key} AS uid
+        LIMIT $limit
+        """,
+        fields={"key": "id"},
+        params={"limit": 1000},
+    ),
+    "recommendation_lookup": _templated(
+        """
+        MATCH (u:User {{{key}: $user_id}})-[rec:RECOMMENDED]->(p:InsuranceProduct)
+        RETURN p.name AS product_name,
+               p.category AS category,
+               p.monthly_premium AS premium,
+               rec.score AS score,
+               rec.sources AS sources,
+               rec.risk_types AS risk_types
+        ORDER BY rec.score DESC
+        LIMIT $limit
+        """,
+        fields={"key": "id"},
+        params={"user_id": "user_000", "limit": 10},
+    ),
+    # --- async_graph.py ------------------------------------------------
+    "recommendation_batch": _templated(
+        """
+        UNWIND $user_ids AS uid
+        MATCH (u:User {{{key}: uid}})-[:LIVES_IN]->(l:Location)-[:HAS_RISK]->(r:RiskFactor)-[:COVERED_BY]->(p:InsuranceProduct)
+        WITH uid, u, l, r, p
+        ORDER BY r.severity DESC, p.monthly_premium ASC
+        RETURN uid, collect({{
+            user: u.{key},
+            age_group: u.age_group,
+            location: l.name,
+            risk_type: r.type,
+            severity: r.severity,
+            product_name: p.name,
+            category: p.category,
+            premium: p.monthly_premium
+        }}) AS rows
+        """,
+        fields={"key": "user_id"},
+        params={"user_ids": ["user_002"]},
+    ),
+    "multi_hop_batch": _templated(
+        """
+        UNWIND $user_ids AS uid
+        MATCH (u:User {{{key}: uid}})-[:EXPOSED_TO]->(r:RiskFactor)-[:COVERED_BY]->(p:InsuranceProduct)
+        WITH uid, u, r, collect({{
+            product: p.name,
+            category: p.category,
+            premium: p.monthly_premium,
+            coverage: p.coverage_amount
+        }}) AS recommended_products
+        RETURN uid, collect({{
+            user: u.{key},
+            age_group: u.age_group,
+            family_type: u.family_type,
+            risk_description: r.description,
+            recommended_products: recommended_products
+        }}) AS rows
+        """,
+        fields={"key": "user_id"},
+        params={"user_ids": ["user_002"]},
+    ),
+    "sample_users": _templated(
+        "MATCH (u:User) RETURN u.{key} AS uid LIMIT $limit",
+        fields={"key": "user_id"},
+        params={"limit": 100},
+        allow_label_scan=True,
+    ),
+    # --- graph_sync.py -------------------------------------------------
+    # predicate is "IS NOT NULL" for the first page, "> $after" afterwards
+    "sync_read_nodes": _templated(
+        """
+        MATCH (n:{label})
+        WHERE n.{key} {predicate}
+        RETURN n.{key} AS key, properties(n) AS props
+        ORDER BY n.{key}
+        LIMIT $limit
+        """,
+        fields={"label": "User", "key": "id", "predicate": "IS NOT NULL"},
+        params={"after": None, "limit": 10000},
+    ),
+    # Pages over start nodes (keyset, like sync_read_nodes) with their edges
+    "sync_read_relationships": _templated(
+        """
+        MATCH (a:{start_label})
+        WHERE a.{start_key} {predicate}
+        WITH a
+        ORDER BY a.{start_key}
+        LIMIT $limit
+        RETURN a.{start_key} AS start,
+               [(a)-[r:{rel_type}]->(b:{end_label}) | {{end: b.{end_key}, props: properties(r)}}] AS rels
+        """,
+        fields={"rel_type": "LIVES_IN", "start_label": "User", "start_key": "id",
+                "end_label": "Location", "end_key": "grid_cell", "predicate": "IS NOT NULL"},
+        params={"after": None, "limit": 10000},
+    ),
+    "sync_delete_relationships": _templated(
+        """
+        UNWIND $rows AS row
+        MATCH (a:{start_label} {{{start_key}: row.start}})-[r:{rel_type}]->(b:{end_label} {{{end_key}: row.end}})
+        DELETE r
+        """,
+        fields={"rel_type": "LIVES_IN", "start_label": "User", "start_key": "id",
+                "end_label": "Location", "end_key": "grid_cell"},
+        params={"rows": [{"start": "user_000", "end": "gangnam_01"}]},
+    ),
+    "sync_delete_nodes": _templated(
+        """
+        UNWIND $rows AS k
+        MATCH (n:{label} {{{key}: k}})
+        DETACH DELETE n
+        """,
+        fields={"label": "User", "key": "id"},
+        params={"rows": ["user_000"]},
+    ),
+    "sync_mark_dirty": _templated(
+        """
+        UNWIND $rows AS uid
+        MATCH (u:{label} {{{key}: uid}})
+        SET u.reco_dirty = true
+        """,
+        fields={"label": "User", "key": "id"},
+        params={"rows": ["user_000"]},
+    ),
+    "batched_delete_relationships": _templated(
+        """
+        MATCH {match}-[r]->()
+        CALL {{ WITH r DELETE r }} IN TRANSACTIONS OF {batch_size} ROWS
+        """,
+        fields={"match": "(n)", "batch_size": 10000},
+        params={},
+        allow_label_scan=True,
+    ),
+    "batched_delete_nodes": _templated(
+        """
+        MATCH {match}
+        CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {batch_size} ROWS
+        """,
+        fields={"match": "(n)", "batch_size": 10000},
+        params={},
+        allow_label_scan=True,
+    ),
+    # --- iot_feed.py ---------------------------------------------------
+    "iot_pattern_upsert": _templated(
+        """
+        UNWIND $rows AS row
+        MATCH (u:User {{{key}: row.user_id}})
+        MERGE (iot:IoTPattern {{id: row.id}})
+        SET iot += row.features,
+            iot.updated_at = datetime()
+        MERGE (u)-[:HAS_PATTERN]->(iot)
+        SET u.reco_dirty = true
+        RETURN row.user_id AS user_id
+        """,
+        fields={"key": "id"},
+        params={"rows": [{"user_id": "user_000", "id": "iot_user_000", "features": {"anomaly_count": 0}}]},
+    ),
+    # --- setup_neo4j.py ------------------------------------------------
+    "user_lookup": {
+        "cypher": "MATCH (u:User {id: $user_id}) RETURN u",
+        "params": {"user_id": "user_000"},
+        "allow_label_scan": False,
+    },
+    "user_location": {
+        "cypher": """
+            MATCH (u:User {id: $user_id})
+            MATCH (l:Location {grid_cell: $grid_cell})
+            RETURN u, l
+        """,
+        "params": {"user_id": "user_000", "grid_cell": "gangnam_01"},
+        "allow_label_scan": False,
+    },
+    "behavior_risk_rule": {
+        "cypher": """
+            MATCH (b:Behavior {category: $behavior})
+            MATCH (r:RiskFactor {type: $risk})
+            RETURN b, r
+        """,
+        "params": {"behavior": "senior_care", "risk": "health_decline"},
+        "allow_label_scan": False,
+    },
+    "risk_coverage_rule": {
+        "cypher": """
+            MATCH (r:RiskFactor {type: $risk})
+            MATCH (p:InsuranceProduct {category: $category})
+            RETURN r, p
+        """,
+        "params": {"risk": "flood", "category": "property"},
+        "allow_label_scan": False,
+    },
+    "flood_zone_users": {
+        "cypher": """
+            MATCH (u:User)-[:LIVES_IN]->(l:Location)-[:HAS_RISK]->(r:RiskFactor {type: 'flood'})
+            RETURN count(u) as count
+        """,
+        "params": {},
+        "allow_label_scan": False,
+    },
+}
+
+
+def get_query(name: str) -> Dict:
+    """Catalogue entry by name (KeyError lists the known names)"""
+    try:
+        return QUERY_CATALOG[name]
+    except KeyError:
+        raise KeyError(f"Unknown query {name!r}; known: {', '.join(sorted(QUERY_CATALOG))}") from None
+
+
+def render(name: str, **fields) -> str:
+    """Cypher of a templated entry with the given fields (defaults for the rest)"""
+    entry = get_query(name)
+    if "template" not in entry:
+        return entry["cypher"]
+    return entry["template"].format(**{**entry["fields"], **fields})
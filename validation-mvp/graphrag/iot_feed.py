@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - IoT Anomaly Feed
+Aggregates AnomalyDetector output per user into IoTPattern features and
+bulk-upserts them into the graph
+
+Inputs:
+  - iot-sensors/results/anomaly_detection_results.json (one household's
+    full detection window; assigned to --user-id)
+  - a JSONL anomaly stream, one anomaly per line with a `user_id` field
+
+Features cover a sliding window of the last `--window-days` days, measured
+back from the newest anomaly seen (stream time, so replayed files age like a
+live feed); older anomalies are dropped from the state before features are
+computed, so a user whose anomalies all expire is pushed back to "high"
+activity.
+
+Only users whose features changed since the last push are written (the
+state file keeps per-user anomalies and the pushed feature fingerprint),
+one UNWIND batch per chunk. Updated users are flagged `reco_dirty` so the
+recommendation materializer picks them up.
+
+Usage:
+    python iot_feed.py --results ../iot-sensors/results/anomaly_detection_results.json --user-id user_000
+    python iot_feed.py --jsonl anomalies.jsonl --chunk-size 5000 --window-days 14
+    python iot_feed.py --jsonl anomalies.jsonl --dry-run
+"""
+
+import json
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from graph_loader import DEFAULT_CHUNK_SIZE, validate_identifier
+from graph_queries import render
+
+DEFAULT_RESULTS = Path(__file__).resolve().parent.parent / "iot-sensors" / "results" / "anomaly_detection_results.json"
+DEFAULT_STATE = DEFAULT_RESULTS.parent / "iot_feed_state.json"
+
+ANOMALY_TYPES = ["long_inactivity", "midnight_wandering", "irregular_sleep"]
+
+
+def anomaly_time(anomaly: Dict) -> Optional[str]:
+    """Start timestamp of an anomaly (field differs by type)"""
+    if anomaly.get("start_time"):
+        return anomaly["start_time"]
+    if anomaly.get("time_range"):
+        return anomaly["time_range"].split(" ~ ")[0]
+    return anomaly.get("wake_time")
+
+
+def compact(anomaly: Dict) -> Dict:
+    """The fields features are computed from (kept in the state file)"""
+    return {
+        "type": anomaly["type"],
+        "severity": anomaly.get("severity"),
+        "day": anomaly.get("day"),
+        "at": anomaly_time(anomaly),
+        "hours": anomaly.get("duration_hours"),
+    }
+
+
+def anomaly_key(anomaly: Dict) -> str:
+    return f"{anomaly['type']}|{anomaly.get('day')}|{anomaly.get('at')}"
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class IoTFeatureAggregator:
+    """
+    Per-user anomaly sets -> IoTPattern feature rows
+
+    Args:
+        state_path: JSON file persisting anomalies and pushed fingerprints
+            between runs (None = in-memory only)
+        window_days: sliding window features are computed over (also the
+            denominator for rates); older anomalies are pruned
+    """
+
+    def __init__(self, state_path: Optional[Path] = DEFAULT_STATE, window_days: int = 7):
+        self.state_path = Path(state_path) if state_path else None
+        self.window_days = window_days
+        self.anomalies: Dict[str, Dict[str, Dict]] = {}
+        self.pushed: Dict[str, str] = {}
+
+        if self.state_path and self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.anomalies = state.get("anomalies", {})
+            self.pushed = state.get("pushed", {})
+
+    def save(self):
+        if not self.state_path:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump({"anomalies": self.anomalies, "pushed": self.pushed}, f, ensure_ascii=False)
+
+    # ------------------------------------------------------------------
+    # Inputs
+    # ------------------------------------------------------------------
+
+    def load_results(self, path: Path, user_id: str) -> int:
+        """Replace one user's anomalies with a full detection results file"""
+        with open(path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+
+        anomalies = [compact(a) for a in results.get("anomalies", [])]
+        self.anomalies[user_id] = {anomaly_key(a): a for a in anomalies}
+        return len(anomalies)
+
+    def add(self, anomaly: Dict, user_id: Optional[str] = None) -> bool:
+        """Add one streamed anomaly (duplicates are ignored)"""
+        user_id = user_id or anomaly["user_id"]
+        record = compact(anomaly)
+        user = self.anomalies.setdefault(user_id, {})
+        key = anomaly_key(record)
+        if key in user:
+            return False
+        user[key] = record
+        return True
+
+    def add_stream(self, records: Iterable[Dict]) -> int:
+        return sum(1 for record in records if self.add(record))
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """
+        Drop anomalies older than `window_days` before `now` (default: the
+        newest anomaly time in the state); returns how many were dropped
+
+        Anomalies without a parseable time cannot age and are kept.
+        """
+        if now is None:
+            times = [parse_time(a["at"]) for user in self.anomalies.values() for a in user.values()]
+            times = [t for t in times if t is not None]
+            if not times:
+                return 0
+            now = max(times)
+        cutoff = now - timedelta(days=self.window_days)
+
+        dropped = 0
+        for anomalies in self.anomalies.values():
+            for key, anomaly in list(anomalies.items()):
+                at = parse_time(anomaly["at"])
+                if at is not None and at < cutoff:
+                    del anomalies[key]
+                    dropped += 1
+        return dropped
+
+    # ------------------------------------------------------------------
+    # Features
+    # ------------------------------------------------------------------
+
+    def features(self, user_id: str) -> Dict:
+        anomalies = list(self.anomalies.get(user_id, {}).values())
+        counts = {t: 0 for t in ANOMALY_TYPES}
+        for a in anomalies:
+            counts[a["type"]] = counts.get(a["type"], 0) + 1
+
+        inactivity_hours = [a["hours"] for a in anomalies if a["type"] == "long_inactivity" and a["hours"]]
+        days = {a["day"] for a in anomalies if a["day"] is not None}
+        times = sorted(a["at"] for a in anomalies if a["at"])
+
+        # Repeated whole-day inactivity reads as low activity
+        inactivity_rate = counts["long_inactivity"] / max(self.window_days, 1)
+        if inactivity_rate >= 0.25 or (inactivity_hours and max(inactivity_hours) >= 12):
+            activity_level = "low"
+        elif anomalies:
+            activity_level = "medium"
+        else:
+            activity_level = "high"
+
+        return {
+            "anomaly_count": len(anomalies),
+            "high_severity_count": sum(1 for a in anomalies if a["severity"] == "high"),
+            **{f"{t}_count": n for t, n in counts.items()},
+            "max_inactivity_hours": max(inactivity_hours) if inactivity_hours else 0.0,
+            "anomaly_days": len(days),
+            "observed_days": self.window_days,
+            "last_anomaly_at": times[-1] if times else None,
+            "activity_level": activity_level,
+            "source": "anomaly_detector",
+        }
+
+    @staticmethod
+    def fingerprint(features: Dict) -> str:
+        return hashlib.sha1(json.dumps(features, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def pending(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Feature rows for users whose windowed features changed since the last push"""
+        self.prune(now)
+        rows = []
+        for user_id in sorted(self.anomalies):
+            features = self.features(user_id)
+            digest = self.fingerprint(features)
+            if self.pushed.get(user_id) != digest:
+                rows.append({"user_id": user_id, "id": f"iot_{user_id}", "features": features, "digest": digest})
+        return rows
+
+    def push(self, loader, user_key: str = "id", dry_run: bool = False, now: Optional[datetime] = None) -> Dict:
+        """
+        Bulk-upsert changed users' IoTPattern nodes via BulkGraphLoader
+
+        Only users the graph actually matched are recorded as pushed; the
+        rest (not loaded yet, or a wrong `user_key`) are retried next run.
+        """
+        rows = self.pending(now)
+        written = 0
+        if rows and not dry_run:
+            query = render("iot_pattern_upsert", key=validate_identifier(user_key))
+            result = loader.run_unwind(
+                query, [{k: r[k] for k in ("user_id", "id", "features")} for r in rows], returns="user_id"
+            )
+            matched = set(result["returned"])
+            for row in rows:
+                if row["user_id"] in matched:
+                    self.pushed[row["user_id"]] = row["digest"]
+            written = len(matched)
+            self.save()
+        return {
+            "users": len(self.anomalies),
+            "changed": len(rows),
+            "written": written,
+            "unmatched": 0 if dry_run else len(rows) - written,
+        }
+
+
+def read_jsonl(path: Path) -> Iterable[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push IoT anomaly features into the Townin graph")
+    parser.add_argument("--results", type=Path, default=None, help="anomaly_detection_results.json")
+    parser.add_argument("--user-id", default="user_000", help="user the --results file belongs to")
+    parser.add_argument("--jsonl", type=Path, default=None, help="anomaly stream, one JSON object per line")
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE)
+    parser.add_argument("--user-key", default="id", help="User id property (id or user_id)")
+    parser.add_argument("--window-days", type=int, default=7, help="sliding window for features")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="window end (ISO time; default: newest anomaly seen)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    aggregator = IoTFeatureAggregator(state_path=args.state, window_days=args.window_days)
+
+    if args.jsonl:
+        added = aggregator.add_stream(read_jsonl(args.jsonl))
+        print(f"✓ Stream: {added} new anomalies")
+    results = args.results or (DEFAULT_RESULTS if not args.jsonl else None)
+    if results:
+        if not results.exists():
+            print(f"❌ Results file not found: {results}")
+            print("   Run iot-sensors/anomaly_detector.py first.")
+            return
+        n = aggregator.load_results(results, args.user_id)
+        print(f"✓ Loaded {n} anomalies for {args.user_id} from {results.name}")
+
+    if args.dry_run:
+        stats = aggregator.push(loader=None, user_key=args.user_key, dry_run=True, now=args.now)
+    else:
+        from graph_client import get_client
+        from graph_loader import BulkGraphLoader
+
+        client = get_client()
+        try:
+            loader = BulkGraphLoader(client.driver, chunk_size=args.chunk_size)
+            stats = aggregator.push(loader, user_key=args.user_key, now=args.now)
+            if stats["written"]:
+                loader.print_report()
+        finally:
+            client.close()
+
+    print(f"✓ IoT features: {stats['users']} users tracked, {stats['changed']} changed, {stats['written']} written")
+    if stats["unmatched"]:
+        print(f"⚠ {stats['unmatched']} users not found in the graph by '{args.user_key}' (kept pending)")
+    for row in aggregator.pending(args.now)[:5] if args.dry_run else []:
+        print(f"  {row['user_id']}: {row['features']}")
+
+
+if __name__ == "__main__":
+    main()
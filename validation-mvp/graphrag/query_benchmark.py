@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Query Benchmark Suite
+Profiles the catalogue queries on synthetic graphs of increasing size and
+flags regressions against stored baselines
+
+For each graph size the suite loads a SyntheticGraphGenerator graph, then
+per query:
+  - Neo4j: one PROFILE run (db hits, rows, page cache hits/misses summed
+    over the plan) plus timed plain runs for wall time
+  - embedded: timed runs of the matching EmbeddedGraph traversal (rows and
+    wall time only; there is no plan to profile)
+
+Results are compared with benchmarks/baseline_<backend>.json; db hits and
+rows are deterministic for a seeded graph, wall time gets a tolerance. A
+query that matches nothing fails the run: its timings would only measure an
+empty index lookup.
+
+The Neo4j backend deletes the target database before every load, so it only
+runs with --reset; point it at a scratch database with --database.
+
+Usage:
+    python query_benchmark.py --backend embedded --sizes 1000,10000,100000
+    python query_benchmark.py --backend neo4j --reset --database bench --sizes 1000,10000 --update-baseline
+    python query_benchmark.py --backend neo4j --reset --database bench --time-tolerance 0.5
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from graph_queries import get_query
+from synthetic_graph import SyntheticGraphGenerator
+
+BASELINE_DIR = Path(__file__).resolve().parent / "benchmarks"
+
+# Catalogue queries on the recommendation paths. Synthetic graphs use the
+# setup_neo4j schema (User.id), so user lookups are re-keyed.
+BENCHMARK_QUERIES = [
+    "insurance_recommendation",
+    "multi_hop_reasoning",
+    "location_safety",
+    "flood_zone_users",
+    "user_lookup",
+]
+
+# Queries answered by EmbeddedGraph: name -> (method, takes a user id)
+EMBEDDED_TRAVERSALS = {
+    "insurance_recommendation": ("insurance_recommendation", True),
+    "multi_hop_reasoning": ("multi_hop_reasoning", True),
+    "location_safety": ("location_safety", False),
+    "flood_zone_users": ("flood_zone_users", False),
+}
+
+USER_ID_PROPERTY_RE = re.compile(r"(?<!\$)\buser_id\b")
+
+
+def rekey(cypher: str, user_key: str) -> str:
+    """Point `user_id` property references (not the $user_id parameter) at user_key"""
+    return USER_ID_PROPERTY_RE.sub(user_key, cypher)
+
+
+def summarize_profile(profile) -> Dict[str, int]:
+    """Sum db hits / page cache counters over a PROFILE plan tree"""
+    totals = {"db_hits": 0, "page_cache_hits": 0, "page_cache_misses": 0}
+
+    def walk(plan):
+        if isinstance(plan, dict):
+            get, children = plan.get, plan.get("children", [])
+        else:
+            get, children = lambda key, default=0: getattr(plan, key, default), getattr(plan, "children", [])
+        totals["db_hits"] += get("dbHits", 0) or get("db_hits", 0) or 0
+        totals["page_cache_hits"] += get("pageCacheHits", 0) or get("page_cache_hits", 0) or 0
+        totals["page_cache_misses"] += get("pageCacheMisses", 0) or get("page_cache_misses", 0) or 0
+        for child in children:
+            walk(child)
+
+    if profile is not None:
+        walk(profile)
+    return totals
+
+
+def _timed(fn: Callable, params_list: List[Dict], repeat: int) -> Dict[str, float]:
+    """p50/p95 over max(repeat, len(params_list)) calls; rows summed over one pass of params_list"""
+    latencies, rows = [], 0
+    for i in range(max(repeat, len(params_list))):
+        start = time.perf_counter()
+        n = fn(params_list[i % len(params_list)])
+        latencies.append((time.perf_counter() - start) * 1000)
+        if i < len(params_list):
+            rows += n
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        "rows": rows,
+    }
+
+
+class Neo4jBackend:
+    """Loads synthetic graphs into Neo4j and profiles catalogue queries"""
+
+    name = "neo4j"
+
+    def __init__(self, client, chunk_size: int = 5000, reset: bool = False):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.reset = reset
+
+    def load(self, generator: SyntheticGraphGenerator) -> float:
+        from graph_loader import BulkGraphLoader
+        from graph_sync import batched_delete
+        from setup_neo4j import TowninGraphSetup
+
+        if not self.reset:
+            raise RuntimeError(
+                f"Refusing to delete database {self.client.database or '(default)'} at {self.client.uri}; "
+                "benchmarking replaces the whole graph (pass reset=True / --reset)"
+            )
+        start = time.perf_counter()
+        batched_delete(self.client)
+        TowninGraphSetup(client=self.client).create_schema()
+        generator.load(BulkGraphLoader(self.client.driver, chunk_size=self.chunk_size, database=self.client.database))
+        return time.perf_counter() - start
+
+    def run(self, name: str, cypher: str, params_list: List[Dict], repeat: int) -> Dict:
+        # Warm the plan cache and page cache before measuring
+        self.client.read(cypher, name=name, **params_list[0])
+
+        with self.client.session() as session:
+            summary = session.run("PROFILE " + cypher, **params_list[0]).consume()
+        result = summarize_profile(summary.profile)
+
+        def execute(params):
+            return len(self.client.read(cypher, name=name, **params))
+
+        timing = _timed(execute, params_list, repeat)
+        result.update(timing)
+        return result
+
+
+class EmbeddedBackend:
+    """Runs the same workloads on the in-process EmbeddedGraph"""
+
+    name = "embedded"
+
+    def __init__(self):
+        self.graph = None
+
+    def load(self, generator: SyntheticGraphGenerator) -> float:
+        from embedded_graph import EmbeddedGraph
+
+        start = time.perf_counter()
+        self.graph = EmbeddedGraph(user_key="id", chunk_size=50_000)
+        generator.load(self.graph)
+        self.graph.freeze()
+        return time.perf_counter() - start
+
+    def run(self, name: str, cypher: str, params_list: List[Dict], repeat: int) -> Optional[Dict]:
+        if name not in EMBEDDED_TRAVERSALS:
+            return None
+        method, takes_user = EMBEDDED_TRAVERSALS[name]
+        fn = getattr(self.graph, method)
+
+        def execute(params):
+            result = fn(params["user_id"]) if takes_user else fn()
+            return len(result) if isinstance(result, list) else 1
+
+        result = {"db_hits": None, "page_cache_hits": None, "page_cache_misses": None}
+        result.update(_timed(execute, params_list, repeat))
+        return result
+
+
+def run_suite(backend, sizes: List[int], repeat: int = 20, seed: int = 42) -> Dict[str, Dict]:
+    """Benchmark every query at every size; keys are '<users>:<query>'"""
+    results = {}
+    for size in sizes:
+        generator = SyntheticGraphGenerator(num_users=size, seed=seed)
+        load_seconds = backend.load(generator)
+        print(f"\n=== {size:,} users ({backend.name}, loaded in {load_seconds:.1f}s) ===")
+
+        rng = random.Random(seed)
+        user_ids = [f"user_{rng.randrange(size):03d}" for _ in range(min(repeat, size))]
+
+        for name in BENCHMARK_QUERIES:
+            entry = get_query(name)
+            cypher = rekey(entry["cypher"], "id")
+            if "user_id" in entry["params"]:
+                params_list = [{**entry["params"], "user_id": uid} for uid in user_ids]
+            else:
+                params_list = [entry["params"]]
+
+            result = backend.run(name, cypher, params_list, repeat)
+            if result is None:
+                continue
+            results[f"{size}:{name}"] = result
+            hits = f" db_hits={result['db_hits']:,}" if result["db_hits"] is not None else ""
+            empty = "  ⚠ no rows" if result["rows"] == 0 else ""
+            print(f"  {name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms rows={result['rows']}{hits}{empty}")
+    return results
+
+
+def empty_results(results: Dict[str, Dict]) -> List[str]:
+    """Keys of measurements that returned no rows"""
+    return sorted(key for key, result in results.items() if result["rows"] == 0)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            time_tolerance: float = 0.25, hits_tolerance: float = 0.05, min_delta_ms: float = 0.5) -> List[Dict]:
+    """Regressions vs baseline: db hits or p50 above tolerance, or changed row counts"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+
+        if current["db_hits"] is not None and base.get("db_hits"):
+            if current["db_hits"] > base["db_hits"] * (1 + hits_tolerance):
+                regressions.append({"key": key, "metric": "db_hits", "baseline": base["db_hits"], "current": current["db_hits"]})
+
+        slower = current["p50_ms"] - base["p50_ms"]
+        if slower > min_delta_ms and current["p50_ms"] > base["p50_ms"] * (1 + time_tolerance):
+            regressions.append({"key": key, "metric": "p50_ms", "baseline": base["p50_ms"], "current": current["p50_ms"]})
+
+        if current["rows"] != base["rows"]:
+            regressions.append({"key": key, "metric": "rows", "baseline": base["rows"], "current": current["rows"]})
+    return regressions
+
+
+def load_baseline(path: Path) -> Dict[str, Dict]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: Path, results: Dict[str, Dict], backend: str, seed: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "backend": backend,
+            "seed": seed,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile GraphRAG queries and check for regressions")
+    parser.add_argument("--backend", choices=["neo4j", "embedded"], default="embedded")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated user counts")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=None, help="default: benchmarks/baseline_<backend>.json")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative p50 slowdown")
+    parser.add_argument("--hits-tolerance", type=float, default=0.05, help="allowed relative db hit increase")
+    parser.add_argument("--reset", action="store_true",
+                        help="allow the neo4j backend to delete the target database before each load")
+    parser.add_argument("--database", default=None, help="neo4j database to benchmark in (default: server default)")
+    parser.add_argument("--allow-empty", action="store_true", help="do not fail on queries that return no rows")
+    args = parser.parse_args()
+
+    if args.backend == "neo4j" and not args.reset:
+        parser.error("--backend neo4j deletes every node in the target database; "
+                     "pass --reset (with --database <scratch db>) to confirm")
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    baseline_path = args.baseline or BASELINE_DIR / f"baseline_{args.backend}.json"
+
+    client = None
+    if args.backend == "neo4j":
+        from graph_client import get_client
+
+        client = get_client(database=args.database)
+        backend = Neo4jBackend(client, reset=args.reset)
+    else:
+        backend = EmbeddedBackend()
+
+    try:
+        results = run_suite(backend, sizes, repeat=args.repeat, seed=args.seed)
+    finally:
+        if client is not None:
+            client.close()
+
+    empty = empty_results(results)
+    if empty and not args.allow_empty:
+        print(f"\n❌ Queries returned no rows: {', '.join(empty)}")
+        print("  The synthetic graph does not exercise them; fix the data or pass --allow-empty")
+        sys.exit(1)
+
+    if args.update_baseline:
+        save_baseline(baseline_path, results, args.backend, args.seed)
+        print(f"\n✓ Baseline written to {baseline_path}")
+        return
+
+    baseline = load_baseline(baseline_path)
+    if not baseline:
+        print(f"\n⚠ No baseline at {baseline_path}; run with --update-baseline first")
+        return
+
+    regressions = compare(results, baseline, args.time_tolerance, args.hits_tolerance)
+    missing = sorted(set(results) - set(baseline))
+    if missing:
+        print(f"\n⚠ Not in baseline: {', '.join(missing)}")
+    if not regressions:
+        print(f"\n✓ No regressions vs {baseline_path.name} ({len(results)} measurements)")
+        return
+
+    print(f"\n❌ {len(regressions)} regression(s) vs {baseline_path.name}:")
+    for r in regressions:
+        print(f"  {r['key']} {r['metric']}: {r['baseline']} -> {r['current']}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
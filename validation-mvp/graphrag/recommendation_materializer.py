@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Recommendation Materializer
+Precomputes scored (User)-[:RECOMMENDED]->(InsuranceProduct) edges
+
+Scores combine every path from a user to a product:
+  - location:  User-LIVES_IN->Location-HAS_RISK->RiskFactor-COVERED_BY->Product
+  - exposure:  User-EXPOSED_TO->RiskFactor-COVERED_BY->Product
+  - behavior:  User-EXHIBITS->Behavior-INDICATES->RiskFactor-COVERED_BY->Product
+  - iot:       User-HAS_PATTERN->IoTPattern (anomalies) => care risk -> Product
+Path scores are merged with noisy-OR: 1 - Π(1 - s).
+
+Online serving then becomes a single indexed lookup (`recommendation_lookup`).
+Users whose location, behaviors or IoT patterns change are flagged with
+`reco_dirty` and refreshed incrementally.
+
+Usage:
+    python recommendation_materializer.py --full
+    python recommendation_materializer.py --dirty
+    python recommendation_materializer.py --user user_002
+    python recommendation_materializer.py --full --user-key user_id   # pipeline test graph
+"""
+
+import time
+import argparse
+from typing import List, Dict, Iterable, Optional
+
+from graph_client import get_client
+from graph_loader import chunked, validate_identifier
+from graph_queries import render
+
+
+class RecommendationMaterializer:
+    """
+    Batch job writing RECOMMENDED edges per user
+
+    Args:
+        driver: neo4j driver
+        user_key: User property holding the id ("id" in the setup_neo4j
+            graph, "user_id" in the pipeline test graph)
+        chunk_size: users per write transaction
+        behavior_weight: score of a Behavior->Risk inference
+        iot_threshold: anomaly count from which IoT implies the care risk
+        iot_risk_type: RiskFactor.type implied by IoT anomalies
+    """
+
+    def __init__(
+        self,
+        driver,
+        user_key: str = "id",
+        chunk_size: int = 1000,
+        behavior_weight: float = 0.5,
+        iot_threshold: int = 3,
+        iot_risk_type: str = "health_decline",
+        database: Optional[str] = None
+    ):
+        self.driver = driver
+        self.user_key = validate_identifier(user_key)
+        self.chunk_size = chunk_size
+        self.database = database
+        self.params = {
+            "behavior_weight": behavior_weight,
+            "iot_threshold": iot_threshold,
+            "iot_risk_type": iot_risk_type,
+        }
+
+    def _session(self):
+        if self.database:
+            return self.driver.session(database=self.database)
+        return self.driver.session()
+
+    def _q(self, name: str) -> str:
+        return render(name, key=self.user_key)
+
+    def _materialize_chunk(self, tx, user_ids: List[str], version: int) -> int:
+        record = tx.run(self._q("materialize_recommendations"), user_ids=user_ids, version=version, **self.params).single()
+        tx.run(self._q("clear_reco_dirty"), user_ids=user_ids).consume()
+        return record["edges"] if record else 0
+
+    def _refresh_dirty_chunk(self, tx, rows: List[Dict], version: int) -> Dict:
+        """Materialize a page of dirty users, then clear their flags by node identity"""
+        user_ids = [row["uid"] for row in rows if row["uid"] is not None]
+        edges = 0
+        if user_ids:
+            record = tx.run(self._q("materialize_recommendations"), user_ids=user_ids, version=version,
+                            **self.params).single()
+            edges = record["edges"] if record else 0
+        # By elementId, so a user whose key property is missing cannot stay dirty forever
+        cleared = tx.run(render("clear_reco_dirty_nodes"), node_ids=[row["node_id"] for row in rows]).single()
+        return {
+            "users": len(user_ids),
+            "edges": edges,
+            "missing_key": len(rows) - len(user_ids),
+            "cleared": cleared["cleared"] if cleared else 0,
+        }
+
+    def refresh_users(self, user_ids: Iterable[str], version: Optional[int] = None) -> Dict:
+        """Recompute RECOMMENDED edges for the given users, chunk by chunk"""
+        version = version if version is not None else int(time.time())
+        stats = {"users": 0, "edges": 0, "seconds": 0.0}
+        start = time.perf_counter()
+
+        with self._session() as session:
+            for chunk in chunked(user_ids, self.chunk_size):
+                stats["edges"] += session.execute_write(self._materialize_chunk, chunk, version)
+                stats["users"] += len(chunk)
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _iter_all_user_ids(self) -> Iterable[str]:
+        """Keyset pagination over user ids (no SKIP)"""
+        after = ""
+        with self._session() as session:
+            while True:
+                page = session.execute_read(
+                    lambda tx: [r["uid"] for r in tx.run(self._q("user_page"), after=after, limit=self.chunk_size)]
+                )
+                if not page:
+                    return
+                yield from page
+                after = page[-1]
+
+    def materialize_all(self) -> Dict:
+        """Full rebuild for every user, streaming ids page by page"""
+        return self.refresh_users(self._iter_all_user_ids())
+
+    def mark_dirty(self, user_ids: Iterable[str]):
+        """Flag users whose location/behaviors/IoT patterns changed"""
+        with self._session() as session:
+            for chunk in chunked(user_ids, self.chunk_size):
+                session.execute_write(lambda tx: tx.run(self._q("mark_reco_dirty"), user_ids=chunk).consume())
+
+    def refresh_dirty(self) -> Dict:
+        """
+        Incremental refresh of flagged users only
+
+        Flagged users without the `user_key` property are unflagged and
+        counted as `missing_key`; a pass that clears no flag stops the loop
+        and leaves the rest counted as `stuck`.
+        """
+        version = int(time.time())
+        totals = {"users": 0, "edges": 0, "missing_key": 0, "stuck": 0, "seconds": 0.0}
+        start = time.perf_counter()
+
+        with self._session() as session:
+            while True:
+                dirty = session.execute_read(
+                    lambda tx: tx.run(self._q("dirty_users"), limit=self.chunk_size).data()
+                )
+                if not dirty:
+                    break
+                stats = session.execute_write(self._refresh_dirty_chunk, dirty, version)
+                for key in ("users", "edges", "missing_key"):
+                    totals[key] += stats[key]
+                if stats["cleared"] == 0:
+                    totals["stuck"] = len(dirty)
+                    break
+
+        totals["seconds"] = round(time.perf_counter() - start, 3)
+        return totals
+
+    def recommendations(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Online lookup: precomputed products for one user, best first"""
+        with self._session() as session:
+            result = session.run(self._q("recommendation_lookup"), user_id=user_id, limit=limit)
+            return [record.data() for record in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize RECOMMENDED edges")
+    parser.add_argument("--full", action="store_true", help="rebuild for all users")
+    parser.add_argument("--dirty", action="store_true", help="refresh users flagged reco_dirty")
+    parser.add_argument("--user", action="append", default=[], help="refresh specific user ids")
+    parser.add_argument("--user-key", default="id", help="User id property (id or user_id)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = get_client()
+    driver = client.driver
+    materializer = RecommendationMaterializer(driver, user_key=args.user_key, chunk_size=args.chunk_size)
+
+    try:
+        if args.full:
+            stats = materializer.materialize_all()
+        elif args.dirty:
+            stats = materializer.refresh_dirty()
+        else:
+            stats = materializer.refresh_users(args.user)
+        print(f"✓ Materialized {stats['edges']} RECOMMENDED edges for {stats['users']} users in {stats['seconds']}s")
+        if stats.get("missing_key"):
+            print(f"⚠ {stats['missing_key']} flagged users have no '{args.user_key}' property (check --user-key)")
+        if stats.get("stuck"):
+            print(f"❌ {stats['stuck']} users stay reco_dirty: their flags could not be cleared")
+
+        for user_id in args.user:
+            print(f"\nRecommendations for {user_id}:")
+            for rec in materializer.recommendations(user_id):
+                print(f"  {rec['product_name']} ({rec['category']}) score={rec['score']:.2f} via {rec['sources']}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG Schema Manager
+Derives index requirements from the query catalogue and enforces them
+
+1. Parse every catalogue query for (Label {prop: ...}) lookups and
+   `WHERE var.prop = ...` predicates
+2. CREATE INDEX ... IF NOT EXISTS for each (Label, prop) not yet covered
+3. Wait until all indexes are ONLINE
+4. EXPLAIN each query and fail if it still starts from a label/all-nodes scan
+
+Usage:
+    python schema_manager.py            # ensure + verify
+    python schema_manager.py --dry-run  # only print required indexes
+"""
+
+import re
+import argparse
+from typing import Dict, List, Set, Tuple, Optional
+
+from graph_client import get_client
+from graph_queries import QUERY_CATALOG
+
+IndexKey = Tuple[str, str]
+
+NODE_PATTERN_RE = re.compile(r"\(\s*(\w*)\s*:\s*(\w+)\s*(?:\{([^}]*)\})?\s*\)")
+MAP_KEY_RE = re.compile(r"(\w+)\s*:")
+WHERE_PREDICATE_RE = re.compile(r"\b(\w+)\.(\w+)\s*(?:=|IN\b|STARTS\s+WITH\b)", re.IGNORECASE)
+# A WHERE clause runs until the next clause keyword (or the end of a subquery);
+# `STARTS WITH` / `ENDS WITH` are operators, not a WITH clause
+WHERE_CLAUSE_RE = re.compile(
+    r"\bWHERE\b(.*?)(?=(?<!STARTS\s)(?<!ENDS\s)\bWITH\b|\b(?:MATCH|OPTIONAL|RETURN|SET|REMOVE|MERGE|CREATE"
+    r"|DELETE|DETACH|UNWIND|CALL|FOREACH|ORDER|SKIP|LIMIT|UNION)\b|}|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Plan operators that mean "read every node (of a label)"
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+
+
+def derive_index_requirements(cypher: str) -> Set[IndexKey]:
+    """(Label, property) pairs a query looks nodes up by"""
+    required: Set[IndexKey] = set()
+    var_labels: Dict[str, str] = {}
+
+    for var, label, props in NODE_PATTERN_RE.findall(cypher):
+        if var:
+            var_labels.setdefault(var, label)
+        if props:
+            for key in MAP_KEY_RE.findall(props):
+                required.add((label, key))
+
+    # Only predicates inside WHERE clauses; `SET u.x = ...` is a write, not a lookup
+    for clause in WHERE_CLAUSE_RE.findall(cypher):
+        for var, prop in WHERE_PREDICATE_RE.findall(clause):
+            if var in var_labels:
+                required.add((var_labels[var], prop))
+
+    return required
+
+
+def _plan_operators(plan) -> List[str]:
+    """Flatten an EXPLAIN/PROFILE plan tree into operator names"""
+    if plan is None:
+        return []
+    if isinstance(plan, dict):
+        operator = plan.get("operatorType", "")
+        children = plan.get("children", [])
+    else:
+        operator = getattr(plan, "operator_type", "")
+        children = getattr(plan, "children", [])
+    # Neo4j 5 suffixes operators with the runtime, e.g. "NodeByLabelScan@neo4j"
+    names = [operator.split("@")[0]]
+    for child in children:
+        names.extend(_plan_operators(child))
+    return names
+
+
+class GraphSchemaManager:
+    """Keeps Neo4j indexes in sync with the query catalogue"""
+
+    def __init__(self, driver, catalog: Optional[Dict[str, Dict]] = None, database: Optional[str] = None):
+        self.driver = driver
+        self.catalog = catalog or QUERY_CATALOG
+        self.database = database
+
+    def _session(self):
+        if self.database:
+            return self.driver.session(database=self.database)
+        return self.driver.session()
+
+    def required_indexes(self) -> Dict[IndexKey, List[str]]:
+        """(Label, prop) -> names of the catalogue queries that need it"""
+        required: Dict[IndexKey, List[str]] = {}
+        for name, entry in self.catalog.items():
+            for key in derive_index_requirements(entry["cypher"]):
+                required.setdefault(key, []).append(name)
+        return dict(sorted(required.items()))
+
+    def existing_indexes(self) -> Dict[IndexKey, str]:
+        """Single-property node indexes (including constraint-backed) -> state"""
+        existing = {}
+        with self._session() as session:
+            result = session.run("""
+                SHOW INDEXES
+                YIELD entityType, labelsOrTypes, properties, state, type
+                WHERE entityType = 'NODE' AND type <> 'LOOKUP'
+                RETURN labelsOrTypes, properties, state
+            """)
+            for record in result:
+                labels, props = record["labelsOrTypes"] or [], record["properties"] or []
+                if len(labels) == 1 and len(props) == 1:
+                    existing[(labels[0], props[0])] = record["state"]
+        return existing
+
+    def ensure_indexes(self) -> List[IndexKey]:
+        """Create missing indexes idempotently; returns the ones created"""
+        existing = self.existing_indexes()
+        created = []
+        with self._session() as session:
+            for label, prop in self.required_indexes():
+                if (label, prop) in existing:
+                    continue
+                index_name = f"idx_{label.lower()}_{prop.lower()}"
+                session.run(f"CREATE INDEX {index_name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})")
+                created.append((label, prop))
+        return created
+
+    def wait_until_online(self, timeout_seconds: int = 300):
+        """Block until every index is ONLINE (raises on timeout/failure)"""
+        with self._session() as session:
+            session.run("CALL db.awaitIndexes($timeout)", timeout=timeout_seconds).consume()
+
+        failed = [key for key, state in self.existing_indexes().items() if state != "ONLINE"]
+        if failed:
+            raise RuntimeError(f"Indexes not online: {failed}")
+
+    def verify_query_plans(self) -> List[Dict]:
+        """EXPLAIN every catalogue query and report label scans"""
+        report = []
+        with self._session() as session:
+            for name, entry in self.catalog.items():
+                summary = session.run("EXPLAIN " + entry["cypher"], **entry["params"]).consume()
+                operators = _plan_operators(summary.plan)
+                scans = [op for op in operators if op in SCAN_OPERATORS]
+                report.append({
+                    "query": name,
+                    "operators": operators,
+                    "label_scans": scans,
+                    "ok": not scans or entry.get("allow_label_scan", False),
+                })
+        return report
+
+    def ensure(self, timeout_seconds: int = 300) -> List[Dict]:
+        """Create indexes, wait for them, verify plans; raises on any scan"""
+        created = self.ensure_indexes()
+        for label, prop in created:
+            print(f"  + index on :{label}({prop})")
+        print(f"✓ Indexes ensured ({len(created)} created)")
+
+        self.wait_until_online(timeout_seconds)
+        print("✓ All indexes online")
+
+        report = self.verify_query_plans()
+        bad = [r for r in report if not r["ok"]]
+        for r in report:
+            mark = "✓" if r["ok"] else "✗"
+            note = f" (label scan: {', '.join(r['label_scans'])})" if r["label_scans"] else ""
+            print(f"  {mark} {r['query']}{note}")
+        if bad:
+            raise RuntimeError(f"Queries still using label scans: {[r['query'] for r in bad]}")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ensure GraphRAG indexes from the query catalogue")
+    parser.add_argument("--dry-run", action="store_true", help="print required indexes only")
+    parser.add_argument("--timeout", type=int, default=300, help="seconds to wait for indexes")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        manager = GraphSchemaManager(driver=None)
+        for (label, prop), queries in manager.required_indexes().items():
+            print(f":{label}({prop})  <- {', '.join(queries)}")
+        return
+
+    client = get_client()
+    try:
+        GraphSchemaManager(client.driver).ensure(args.timeout)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,236 +4,247 @@ Townin GraphRAG Setup - Neo4j Schema & Sample Data
 Creates knowledge graph for insurance inference validation
 
 Usage:
-    python setup_neo4j.py
+    python setup_neo4j.py [--users 100000] [--chunk-size 5000]
+    python setup_neo4j.py --sync --users 100000   # incremental refresh
 """
 
-import os
+import argparse
 import random
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
+from graph_client import GraphClient, get_client
+from graph_loader import BulkGraphLoader, DEFAULT_CHUNK_SIZE
+from graph_sync import GraphSnapshot, GraphSync, batched_delete, print_sync_report
+from schema_manager import GraphSchemaManager
 
 load_dotenv()
 
+# Seoul locations with real characteristics
+SEOUL_LOCATIONS = [
+    {"grid_cell": "gangnam_01", "district": "강남구", "property_value_tier": 5, "flood_risk": False, "crime_rate": "low"},
+    {"grid_cell": "gangnam_02", "district": "강남구", "property_value_tier": 5, "flood_risk": False, "crime_rate": "low"},
+    {"grid_cell": "bundang_01", "district": "분당구", "property_value_tier": 4, "flood_risk": False, "crime_rate": "low"},
+    {"grid_cell": "bundang_02", "district": "분당구", "property_value_tier": 4, "flood_risk": True, "crime_rate": "low"},
+    {"grid_cell": "mapo_01", "district": "마포구", "property_value_tier": 3, "flood_risk": True, "crime_rate": "medium"},
+    {"grid_cell": "songpa_01", "district": "송파구", "property_value_tier": 4, "flood_risk": True, "crime_rate": "low"},
+    {"grid_cell": "gwanak_01", "district": "관악구", "property_value_tier": 2, "flood_risk": False, "crime_rate": "medium"},
+]
+
+# Korean insurance products (real-world examples)
+INSURANCE_PRODUCTS = [
+    {"id": "samsung_property_01", "name": "삼성화재 가정종합보험", "category": "property", "coverage_type": "comprehensive", "target_age": "30-60"},
+    {"id": "kb_health_01", "name": "KB손해보험 실손의료보험", "category": "health", "coverage_type": "medical", "target_age": "20-70"},
+    {"id": "hanwha_care_01", "name": "한화생명 간병보험", "category": "care", "coverage_type": "long_term_care", "target_age": "50-80"},
+    {"id": "samsung_life_01", "name": "삼성생명 종신보험", "category": "life", "coverage_type": "whole_life", "target_age": "30-60"},
+    {"id": "db_auto_01", "name": "DB손해보험 자동차보험", "category": "auto", "coverage_type": "comprehensive", "target_age": "20-70"},
+]
+
+# Risk factors
+RISK_FACTORS = [
+    {"type": "flood", "severity": "high", "description": "홍수 위험 지역"},
+    {"type": "health_decline", "severity": "medium", "description": "건강 악화 징후"},
+    {"type": "property_damage", "severity": "medium", "description": "재산 손실 위험"},
+    {"type": "accident", "severity": "low", "description": "사고 위험"},
+]
+
+# Synthetic user attributes
+AGE_RANGES = ["25-34", "35-44", "45-54", "55-64", "65+"]
+HOUSEHOLD_TYPES = ["single", "couple", "family_young", "family_senior"]
+BEHAVIOR_CATEGORIES = ["grocery", "health", "home_improvement", "senior_care", "auto", "cosmetics"]
+ACTIVITY_LEVELS = ["low", "medium", "high"]
+
+# Inference rules: Behavior -> RiskFactor, RiskFactor -> InsuranceProduct category
+BEHAVIOR_RISK_RULES = [
+    {"behavior": "home_improvement", "risk": "property_damage"},
+    {"behavior": "senior_care", "risk": "health_decline"},
+]
+RISK_COVERAGE_RULES = [
+    {"risk": "flood", "category": "property"},
+    {"risk": "health_decline", "category": "care"},
+    {"risk": "property_damage", "category": "property"},
+]
+
 
 class TowninGraphSetup:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
-            os.getenv("NEO4J_URI"),
-            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
-        )
+    def __init__(self, client: GraphClient = None, store=None):
+        # `store`: an EmbeddedGraph to populate instead of Neo4j (no server needed)
+        self.store = store
+        if store is None:
+            # Shared pooled client (NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD)
+            self.client = client or get_client()
+            self.driver = self.client.driver
+        else:
+            self.client = self.driver = None
 
     def close(self):
-        self.driver.close()
+        if self.client is not None:
+            self.client.close()
 
     def clear_database(self):
         """Clear existing data (for testing)"""
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+        if self.store is not None:
+            self.store.clear()
+        else:
+            # Many small transactions instead of one graph-sized DETACH DELETE
+            batched_delete(self.client)
         print("✓ Database cleared")
 
     def create_schema(self):
         """Create node and relationship constraints"""
-        with self.driver.session() as session:
-            # Constraints for unique IDs
-            session.run("CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE")
-            session.run("CREATE CONSTRAINT location_id IF NOT EXISTS FOR (l:Location) REQUIRE l.grid_cell IS UNIQUE")
-            session.run("CREATE CONSTRAINT product_id IF NOT EXISTS FOR (p:InsuranceProduct) REQUIRE p.id IS UNIQUE")
-
-        print("✓ Schema created")
-
-    def populate_sample_data(self):
-        """Create 100 synthetic users + locations + insurance products"""
-
-        # Seoul locations with real characteristics
-        seoul_locations = [
-            {"grid_cell": "gangnam_01", "district": "강남구", "property_value_tier": 5, "flood_risk": False, "crime_rate": "low"},
-            {"grid_cell": "gangnam_02", "district": "강남구", "property_value_tier": 5, "flood_risk": False, "crime_rate": "low"},
-            {"grid_cell": "bundang_01", "district": "분당구", "property_value_tier": 4, "flood_risk": False, "crime_rate": "low"},
-            {"grid_cell": "bundang_02", "district": "분당구", "property_value_tier": 4, "flood_risk": True, "crime_rate": "low"},
-            {"grid_cell": "mapo_01", "district": "마포구", "property_value_tier": 3, "flood_risk": True, "crime_rate": "medium"},
-            {"grid_cell": "songpa_01", "district": "송파구", "property_value_tier": 4, "flood_risk": True, "crime_rate": "low"},
-            {"grid_cell": "gwanak_01", "district": "관악구", "property_value_tier": 2, "flood_risk": False, "crime_rate": "medium"},
-        ]
-
-        # Korean insurance products (real-world examples)
-        insurance_products = [
-            {"id": "samsung_property_01", "name": "삼성화재 가정종합보험", "category": "property", "coverage_type": "comprehensive", "target_age": "30-60"},
-            {"id": "kb_health_01", "name": "KB손해보험 실손의료보험", "category": "health", "coverage_type": "medical", "target_age": "20-70"},
-            {"id": "hanwha_care_01", "name": "한화생명 간병보험", "category": "care", "coverage_type": "long_term_care", "target_age": "50-80"},
-            {"id": "samsung_life_01", "name": "삼성생명 종신보험", "category": "life", "coverage_type": "whole_life", "target_age": "30-60"},
-            {"id": "db_auto_01", "name": "DB손해보험 자동차보험", "category": "auto", "coverage_type": "comprehensive", "target_age": "20-70"},
-        ]
-
-        # Risk factors
-        risk_factors = [
-            {"type": "flood", "severity": "high", "description": "홍수 위험 지역"},
-            {"type": "health_decline", "severity": "medium", "description": "건강 악화 징후"},
-            {"type": "property_damage", "severity": "medium", "description": "재산 손실 위험"},
-            {"type": "accident", "severity": "low", "description": "사고 위험"},
-        ]
-
-        with self.driver.session() as session:
-            # Create locations
-            for loc in seoul_locations:
-                session.run("""
-                    CREATE (l:Location {
-                        grid_cell: $grid_cell,
-                        district: $district,
-                        property_value_tier: $property_value_tier,
-                        flood_risk: $flood_risk,
-                        crime_rate: $crime_rate
-                    })
-                """, **loc)
-            print(f"✓ Created {len(seoul_locations)} locations")
-
-            # Create insurance products
-            for product in insurance_products:
-                session.run("""
-                    CREATE (p:InsuranceProduct {
-                        id: $id,
-                        name: $name,
-                        category: $category,
-                        coverage_type: $coverage_type,
-                        target_age: $target_age
-                    })
-                """, **product)
-            print(f"✓ Created {len(insurance_products)} insurance products")
-
-            # Create risk factors
-            for risk in risk_factors:
-                session.run("""
-                    CREATE (r:RiskFactor {
-                        type: $type,
-                        severity: $severity,
-                        description: $description
-                    })
-                """, **risk)
-            print(f"✓ Created {len(risk_factors)} risk factors")
-
-            # Create synthetic users
-            age_ranges = ["25-34", "35-44", "45-54", "55-64", "65+"]
-            household_types = ["single", "couple", "family_young", "family_senior"]
-            behavior_categories = ["grocery", "health", "home_improvement", "senior_care", "auto", "cosmetics"]
-
-            for i in range(100):
-                user_id = f"user_{i:03d}"
-                age_range = random.choice(age_ranges)
-                household = random.choice(household_types)
-                location = random.choice(seoul_locations)["grid_cell"]
-
-                # Create user
-                session.run("""
-                    CREATE (u:User {
-                        id: $user_id,
-                        age_range: $age_range,
-                        household_type: $household
-                    })
-                """, user_id=user_id, age_range=age_range, household=household)
-
-                # Connect to location
-                session.run("""
-                    MATCH (u:User {id: $user_id})
-                    MATCH (l:Location {grid_cell: $grid_cell})
-                    CREATE (u)-[:LIVES_IN]->(l)
-                """, user_id=user_id, grid_cell=location)
-
-                # Add behaviors (1-3 random categories)
-                behaviors = random.sample(behavior_categories, k=random.randint(1, 3))
-                for behavior in behaviors:
-                    session.run("""
-                        MATCH (u:User {id: $user_id})
-                        MERGE (b:Behavior {category: $category})
-                        CREATE (u)-[:EXHIBITS]->(b)
-                    """, user_id=user_id, category=behavior)
-
-                # Add IoT patterns (only for 30% of users - those with care needs)
-                if random.random() < 0.3:
-                    anomaly_count = random.randint(0, 10)
-                    session.run("""
-                        MATCH (u:User {id: $user_id})
-                        CREATE (iot:IoTPattern {
-                            activity_level: $activity,
-                            anomaly_count: $anomalies
-                        })
-                        CREATE (u)-[:HAS_PATTERN]->(iot)
-                    """, user_id=user_id, activity=random.choice(["low", "medium", "high"]), anomalies=anomaly_count)
-
-            print(f"✓ Created 100 synthetic users with behaviors")
-
-            # Create relationships: Location -> RiskFactor
-            session.run("""
-                MATCH (l:Location)
-                WHERE l.flood_risk = true
-                MATCH (r:RiskFactor {type: 'flood'})
-                CREATE (l)-[:HAS_RISK]->(r)
-            """)
-
-            # Create relationships: Behavior -> RiskFactor
-            session.run("""
-                MATCH (b:Behavior {category: 'home_improvement'})
-                MATCH (r:RiskFactor {type: 'property_damage'})
-                CREATE (b)-[:INDICATES]->(r)
-            """)
-
-            session.run("""
-                MATCH (b:Behavior {category: 'senior_care'})
-                MATCH (r:RiskFactor {type: 'health_decline'})
-                CREATE (b)-[:INDICATES]->(r)
-            """)
-
-            # Create relationships: RiskFactor -> InsuranceProduct
-            session.run("""
-                MATCH (r:RiskFactor {type: 'flood'})
-                MATCH (p:InsuranceProduct {category: 'property'})
-                CREATE (r)-[:COVERED_BY]->(p)
-            """)
-
-            session.run("""
-                MATCH (r:RiskFactor {type: 'health_decline'})
-                MATCH (p:InsuranceProduct {category: 'care'})
-                CREATE (r)-[:COVERED_BY]->(p)
-            """)
-
-            session.run("""
-                MATCH (r:RiskFactor {type: 'property_damage'})
-                MATCH (p:InsuranceProduct {category: 'property'})
-                CREATE (r)-[:COVERED_BY]->(p)
-            """)
-
-            print("✓ Created relationships (Location->Risk, Behavior->Risk, Risk->Insurance)")
+        if self.store is not None:
+            print("✓ Schema skipped (embedded store indexes properties on first lookup)")
+            return
+
+        # Constraints for unique IDs (schema commands cannot share a transaction)
+        for constraint in [
+            "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+            "CREATE CONSTRAINT location_id IF NOT EXISTS FOR (l:Location) REQUIRE l.grid_cell IS UNIQUE",
+            "CREATE CONSTRAINT product_id IF NOT EXISTS FOR (p:InsuranceProduct) REQUIRE p.id IS UNIQUE",
+            "CREATE CONSTRAINT iot_pattern_id IF NOT EXISTS FOR (i:IoTPattern) REQUIRE i.id IS UNIQUE",
+        ]:
+            self.client.write(constraint, name="create_constraint")
+
+        # Lookup indexes for every property the query catalogue matches on
+        schema = GraphSchemaManager(self.driver)
+        created = schema.ensure_indexes()
+        schema.wait_until_online()
+
+        print(f"✓ Schema created ({len(created)} indexes added)")
+
+    def populate_sample_data(self, num_users: int = 100, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Create synthetic users (default 100) + locations + insurance products"""
+
+        # The embedded store implements the same loader interface
+        loader = self.store if self.store is not None else BulkGraphLoader(self.driver, chunk_size=chunk_size)
+
+        # Reference nodes (one UNWIND per label)
+        loader.merge_nodes("Location", "grid_cell", SEOUL_LOCATIONS)
+        print(f"✓ Created {len(SEOUL_LOCATIONS)} locations")
+
+        loader.merge_nodes("InsuranceProduct", "id", INSURANCE_PRODUCTS)
+        print(f"✓ Created {len(INSURANCE_PRODUCTS)} insurance products")
+
+        loader.merge_nodes("RiskFactor", "type", RISK_FACTORS)
+        print(f"✓ Created {len(RISK_FACTORS)} risk factors")
+
+        # Build synthetic user rows in memory, then send them in chunks
+        users, lives_in, exhibits, iot_patterns, has_pattern = [], [], [], [], []
+        for i in range(num_users):
+            user_id = f"user_{i:03d}"
+            users.append({
+                "id": user_id,
+                "age_range": random.choice(AGE_RANGES),
+                "household_type": random.choice(HOUSEHOLD_TYPES),
+            })
+            lives_in.append({"start": user_id, "end": random.choice(SEOUL_LOCATIONS)["grid_cell"]})
+
+            # Add behaviors (1-3 random categories)
+            for behavior in random.sample(BEHAVIOR_CATEGORIES, k=random.randint(1, 3)):
+                exhibits.append({"start": user_id, "end": behavior})
+
+            # Add IoT patterns (only for 30% of users - those with care needs)
+            if random.random() < 0.3:
+                anomaly_count = random.randint(0, 10)
+                iot_patterns.append({
+                    "id": f"iot_{user_id}",
+                    "activity_level": random.choice(ACTIVITY_LEVELS),
+                    "anomaly_count": anomaly_count,
+                })
+                has_pattern.append({"start": user_id, "end": f"iot_{user_id}"})
+
+        loader.merge_nodes("User", "id", users)
+        loader.merge_relationships("LIVES_IN", "User", "id", "Location", "grid_cell", lives_in)
+        loader.merge_nodes("Behavior", "category", [{"category": c} for c in sorted({e["end"] for e in exhibits})])
+        loader.merge_relationships("EXHIBITS", "User", "id", "Behavior", "category", exhibits)
+        loader.merge_nodes("IoTPattern", "id", iot_patterns)
+        loader.merge_relationships("HAS_PATTERN", "User", "id", "IoTPattern", "id", has_pattern)
+
+        print(f"✓ Created {num_users} synthetic users with behaviors")
+
+        # Create relationships: Location -> RiskFactor
+        loader.merge_relationships("HAS_RISK", "Location", "grid_cell", "RiskFactor", "type",
+                                   [{"start": l["grid_cell"], "end": "flood"} for l in SEOUL_LOCATIONS if l["flood_risk"]])
+
+        # Create relationships: Behavior -> RiskFactor
+        loader.merge_relationships("INDICATES", "Behavior", "category", "RiskFactor", "type",
+                                   [{"start": r["behavior"], "end": r["risk"]} for r in BEHAVIOR_RISK_RULES])
+
+        # Create relationships: RiskFactor -> InsuranceProduct (every product in the category)
+        loader.merge_relationships("COVERED_BY", "RiskFactor", "type", "InsuranceProduct", "category",
+                                   [{"start": r["risk"], "end": r["category"]} for r in RISK_COVERAGE_RULES])
+        loader.print_report()
+
+        print("✓ Created relationships (Location->Risk, Behavior->Risk, Risk->Insurance)")
+
+    def sync_sample_data(self, num_users: int = 100, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         seed: int = 42, dry_run: bool = False):
+        """Apply only the differences between fresh sample data and the graph"""
+        random.seed(seed)  # same seed -> same sample data -> empty delta
+        snapshot = GraphSnapshot(chunk_size=chunk_size)
+        TowninGraphSetup(store=snapshot).populate_sample_data(num_users=num_users)
+
+        report = GraphSync(self.client, chunk_size=chunk_size).apply(snapshot, dry_run=dry_run)
+        print_sync_report(report, dry_run=dry_run)
+        return report
 
     def verify_data(self):
         """Print summary of created data"""
-        with self.driver.session() as session:
-            user_count = session.run("MATCH (u:User) RETURN count(u) as count").single()["count"]
-            location_count = session.run("MATCH (l:Location) RETURN count(l) as count").single()["count"]
-            product_count = session.run("MATCH (p:InsuranceProduct) RETURN count(p) as count").single()["count"]
-            relationship_count = session.run("MATCH ()-[r]->() RETURN count(r) as count").single()["count"]
-
-            print("\n" + "="*60)
-            print("DATABASE SUMMARY")
-            print("="*60)
-            print(f"Users: {user_count}")
-            print(f"Locations: {location_count}")
-            print(f"Insurance Products: {product_count}")
-            print(f"Total Relationships: {relationship_count}")
-            print("="*60)
-
-            # Sample query: Find users in flood zones
-            flood_users = session.run("""
-                MATCH (u:User)-[:LIVES_IN]->(l:Location)-[:HAS_RISK]->(r:RiskFactor {type: 'flood'})
-                RETURN count(u) as count
-            """).single()["count"]
-            print(f"\nSample Query: Users in flood zones = {flood_users}")
+        if self.store is not None:
+            counts = self.store.counts()
+        else:
+            # All five counts in one round-trip
+            counts = self.client.batch_scalars({
+                "users": "MATCH (u:User) RETURN count(u)",
+                "locations": "MATCH (l:Location) RETURN count(l)",
+                "products": "MATCH (p:InsuranceProduct) RETURN count(p)",
+                "relationships": "MATCH ()-[r]->() RETURN count(r)",
+                # Sample query: Find users in flood zones
+                "flood_users": """
+                    MATCH (u:User)-[:LIVES_IN]->(l:Location)-[:HAS_RISK]->(r:RiskFactor {type: 'flood'})
+                    RETURN count(u)
+                """,
+            }, name="verify_data")
+
+        print("\n" + "="*60)
+        print("DATABASE SUMMARY")
+        print("="*60)
+        print(f"Users: {counts['users']}")
+        print(f"Locations: {counts['locations']}")
+        print(f"Insurance Products: {counts['products']}")
+        print(f"Total Relationships: {counts['relationships']}")
+        print("="*60)
+
+        print(f"\nSample Query: Users in flood zones = {counts['flood_users']}")
 
 
 def main():
     """Main setup script"""
-    print("Townin GraphRAG Setup - Neo4j Database\n")
-
-    setup = TowninGraphSetup()
+    parser = argparse.ArgumentParser(description="Townin GraphRAG Neo4j setup")
+    parser.add_argument("--users", type=int, default=100, help="number of synthetic users")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per UNWIND batch")
+    parser.add_argument("--embedded", action="store_true", help="populate the in-process EmbeddedGraph instead of Neo4j")
+    parser.add_argument("--sync", action="store_true", help="apply deltas to the existing graph instead of clear + reload")
+    parser.add_argument("--seed", type=int, default=42, help="sample data seed (used by --sync)")
+    args = parser.parse_args()
+
+    if args.embedded:
+        from embedded_graph import EmbeddedGraph
+
+        print("Townin GraphRAG Setup - Embedded Graph\n")
+        setup = TowninGraphSetup(store=EmbeddedGraph(user_key="id", chunk_size=args.chunk_size))
+    else:
+        print("Townin GraphRAG Setup - Neo4j Database\n")
+        setup = TowninGraphSetup()
 
     try:
+        if args.sync and setup.client is not None:
+            print("[1/3] Creating schema...")
+            setup.create_schema()
+            print("[2/3] Syncing sample data...")
+            setup.sync_sample_data(num_users=args.users, chunk_size=args.chunk_size, seed=args.seed)
+            print("[3/3] Verifying data...")
+            setup.verify_data()
+            return
+
         # Clear existing data (comment out if you want to keep existing data)
         print("[1/4] Clearing existing data...")
         setup.clear_database()
@@ -244,11 +255,13 @@ def main():
 
         # Populate sample data
         print("[3/4] Populating sample data...")
-        setup.populate_sample_data()
+        setup.populate_sample_data(num_users=args.users, chunk_size=args.chunk_size)
 
         # Verify
         print("[4/4] Verifying data...")
         setup.verify_data()
+        if setup.client is not None:
+            setup.client.print_metrics()
 
         print("\n✅ Setup complete! You can now run langchain_integration.py")
 
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Scalable Synthetic Graph Generator
+Streams a deterministic, skewed synthetic graph for load testing
+
+Writes CSV files in the `neo4j-admin database import` header format, or
+streams the same rows into BulkGraphLoader. Nothing is held in memory
+beyond one chunk of users, so 1M+ users are fine.
+
+Usage:
+    python synthetic_graph.py --users 1000000 --cells 2000 --out import/
+    python synthetic_graph.py --users 100000 --load --chunk-size 5000
+"""
+
+import csv
+import math
+import random
+import argparse
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from setup_neo4j import (
+    SEOUL_LOCATIONS, INSURANCE_PRODUCTS, RISK_FACTORS,
+    AGE_RANGES, HOUSEHOLD_TYPES, BEHAVIOR_CATEGORIES, ACTIVITY_LEVELS,
+    BEHAVIOR_RISK_RULES, RISK_COVERAGE_RULES,
+)
+
+# Seoul districts used to name generated grid cells
+SEOUL_DISTRICTS = [
+    ("gangnam", "강남구"), ("seocho", "서초구"), ("songpa", "송파구"), ("gangdong", "강동구"),
+    ("mapo", "마포구"), ("yongsan", "용산구"), ("seongdong", "성동구"), ("gwangjin", "광진구"),
+    ("gwanak", "관악구"), ("dongjak", "동작구"), ("yeongdeungpo", "영등포구"), ("guro", "구로구"),
+    ("nowon", "노원구"), ("dobong", "도봉구"), ("eunpyeong", "은평구"), ("bundang", "분당구"),
+]
+
+# Relative popularity of behaviors (grocery is far more common than senior care)
+BEHAVIOR_WEIGHTS = [0.35, 0.2, 0.12, 0.08, 0.15, 0.1]
+AGE_WEIGHTS = [0.22, 0.24, 0.22, 0.18, 0.14]
+CRIME_RATES = ["low", "medium", "high"]
+
+# Catalogue queries read User.age_group / family_type (pipeline vocabulary)
+AGE_GROUPS = {"25-34": "20s", "35-44": "30s", "45-54": "40s", "55-64": "50s", "65+": "60s"}
+FAMILY_TYPES = {
+    "single": "single",
+    "couple": "couple",
+    "family_young": "couple_with_kids",
+    "family_senior": "elderly_couple",
+}
+
+UserRows = Tuple[Dict, Dict, List[Dict], List[Dict], List[Dict]]
+
+
+class SyntheticGraphGenerator:
+    """
+    Deterministic synthetic Townin graph
+
+    Args:
+        num_users: number of User nodes
+        num_grid_cells: number of Location grid cells (includes the 7 real ones)
+        max_behaviors: each user exhibits 1..max_behaviors behaviors
+        iot_fraction: share of users with IoT patterns (care needs)
+        location_skew: Zipf exponent for cell popularity (0 = uniform)
+        flood_fraction: share of generated cells in flood zones
+        seed: RNG seed; the same seed always yields the same graph
+    """
+
+    def __init__(
+        self,
+        num_users: int = 100_000,
+        num_grid_cells: int = 500,
+        max_behaviors: int = 3,
+        iot_fraction: float = 0.3,
+        location_skew: float = 1.1,
+        flood_fraction: float = 0.2,
+        seed: int = 42
+    ):
+        self.num_users = num_users
+        self.num_grid_cells = max(num_grid_cells, len(SEOUL_LOCATIONS))
+        self.max_behaviors = min(max_behaviors, len(BEHAVIOR_CATEGORIES))
+        self.iot_fraction = iot_fraction
+        self.location_skew = location_skew
+        self.flood_fraction = flood_fraction
+        self.seed = seed
+
+        self._locations = self._generate_locations()
+        weights = [1.0 / math.pow(rank + 1, location_skew) for rank in range(len(self._locations))]
+        self._location_cum = list(accumulate(weights))
+
+    def _rng(self, stream: str) -> random.Random:
+        """Independent RNG per stream so users don't shift when cells change"""
+        return random.Random(f"{self.seed}:{stream}")
+
+    def _generate_locations(self) -> List[Dict]:
+        rng = self._rng("locations")
+        locations = [dict(loc) for loc in SEOUL_LOCATIONS]
+        for i in range(self.num_grid_cells - len(SEOUL_LOCATIONS)):
+            slug, district = SEOUL_DISTRICTS[i % len(SEOUL_DISTRICTS)]
+            locations.append({
+                "grid_cell": f"{slug}_{i // len(SEOUL_DISTRICTS) + 100:04d}",
+                "district": district,
+                "property_value_tier": rng.randint(1, 5),
+                "flood_risk": rng.random() < self.flood_fraction,
+                "crime_rate": rng.choices(CRIME_RATES, weights=[0.6, 0.3, 0.1])[0],
+            })
+        for loc in locations:
+            loc["name"] = f"{loc['district']} {loc['grid_cell']}"
+        # Popularity rank is random, not tied to generation order
+        rng.shuffle(locations)
+        return locations
+
+    def locations(self) -> List[Dict]:
+        return self._locations
+
+    def _pick_location(self, rng: random.Random) -> str:
+        x = rng.random() * self._location_cum[-1]
+        return self._locations[bisect_left(self._location_cum, x)]["grid_cell"]
+
+    def users(self) -> Iterator[UserRows]:
+        """
+        Yield (user, lives_in, exhibits, exposed_to, iot_patterns) per user
+
+        Relationship rows use BulkGraphLoader's {"start", "end", "props"}
+        shape. EXPOSED_TO is the inferred EXHIBITS->INDICATES risk, with an
+        `inference_confidence` drawn from its own stream.
+        """
+        rng = self._rng("users")
+        confidence_rng = self._rng("exposures")
+        risks_by_behavior = {}
+        for rule in BEHAVIOR_RISK_RULES:
+            risks_by_behavior.setdefault(rule["behavior"], []).append(rule["risk"])
+
+        for i in range(self.num_users):
+            user_id = f"user_{i:03d}"
+            age_range = rng.choices(AGE_RANGES, weights=AGE_WEIGHTS)[0]
+            household_type = rng.choice(HOUSEHOLD_TYPES)
+            user = {
+                "id": user_id,
+                "age_range": age_range,
+                "household_type": household_type,
+                "age_group": AGE_GROUPS[age_range],
+                "family_type": FAMILY_TYPES[household_type],
+            }
+            lives_in = {"start": user_id, "end": self._pick_location(rng)}
+
+            behaviors = set()
+            for _ in range(rng.randint(1, self.max_behaviors)):
+                behaviors.add(rng.choices(BEHAVIOR_CATEGORIES, weights=BEHAVIOR_WEIGHTS)[0])
+            exhibits = [{"start": user_id, "end": b} for b in sorted(behaviors)]
+            exposed_to = [
+                {"start": user_id, "end": risk,
+                 "props": {"inference_confidence": round(confidence_rng.uniform(0.5, 0.95), 2)}}
+                for risk in sorted({r for b in behaviors for r in risks_by_behavior.get(b, [])})
+            ]
+
+            iot = []
+            if rng.random() < self.iot_fraction:
+                iot.append({
+                    "id": f"iot_{user_id}",
+                    "user_id": user_id,
+                    "activity_level": rng.choices(ACTIVITY_LEVELS, weights=[0.3, 0.5, 0.2])[0],
+                    # Heavy-tailed: most users have few anomalies, a few have many
+                    "anomaly_count": min(int(rng.expovariate(0.4)), 50),
+                })
+
+            yield user, lives_in, exhibits, exposed_to, iot
+
+    def rule_relationships(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Static Location/Behavior/Risk/Product edges as (start_id, end_id)"""
+        products_by_category = {}
+        for product in INSURANCE_PRODUCTS:
+            products_by_category.setdefault(product["category"], []).append(product["id"])
+        return {
+            "HAS_RISK": [(loc["grid_cell"], "flood") for loc in self._locations if loc["flood_risk"]],
+            "INDICATES": [(r["behavior"], r["risk"]) for r in BEHAVIOR_RISK_RULES],
+            "COVERED_BY": [
+                (r["risk"], product_id)
+                for r in RISK_COVERAGE_RULES
+                for product_id in products_by_category.get(r["category"], [])
+            ],
+        }
+
+    def write_csv(self, out_dir: str) -> Dict[str, int]:
+        """
+        Stream the graph to CSV files for `neo4j-admin database import full`
+
+        Returns:
+            Row counts per file
+        """
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        counts = {}
+
+        def write(name: str, header: List[str], rows) -> None:
+            with open(out / name, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                n = 0
+                for row in rows:
+                    writer.writerow(row)
+                    n += 1
+            counts[name] = n
+
+        write("locations.csv",
+              ["grid_cell:ID(Location)", "name", "district", "property_value_tier:int", "flood_risk:boolean",
+               "crime_rate"],
+              ([l["grid_cell"], l["name"], l["district"], l["property_value_tier"], str(l["flood_risk"]).lower(),
+                l["crime_rate"]]
+               for l in self._locations))
+        write("products.csv",
+              ["id:ID(InsuranceProduct)", "name", "category", "coverage_type", "target_age"],
+              ([p["id"], p["name"], p["category"], p["coverage_type"], p["target_age"]] for p in INSURANCE_PRODUCTS))
+        write("risks.csv",
+              ["type:ID(RiskFactor)", "severity", "description"],
+              ([r["type"], r["severity"], r["description"]] for r in RISK_FACTORS))
+        write("behaviors.csv", ["category:ID(Behavior)"], ([c] for c in BEHAVIOR_CATEGORIES))
+
+        rules = self.rule_relationships()
+        write("has_risk.csv", [":START_ID(Location)", ":END_ID(RiskFactor)"], rules["HAS_RISK"])
+        write("indicates.csv", [":START_ID(Behavior)", ":END_ID(RiskFactor)"], rules["INDICATES"])
+        write("covered_by.csv", [":START_ID(RiskFactor)", ":END_ID(InsuranceProduct)"], rules["COVERED_BY"])
+
+        # Users and their edges in a single pass over the generator
+        files = {
+            "users.csv": ["id:ID(User)", "age_range", "household_type", "age_group", "family_type"],
+            "lives_in.csv": [":START_ID(User)", ":END_ID(Location)"],
+            "exhibits.csv": [":START_ID(User)", ":END_ID(Behavior)"],
+            "exposed_to.csv": [":START_ID(User)", ":END_ID(RiskFactor)", "inference_confidence:float"],
+            "iot_patterns.csv": ["id:ID(IoTPattern)", "activity_level", "anomaly_count:int"],
+            "has_pattern.csv": [":START_ID(User)", ":END_ID(IoTPattern)"],
+        }
+        handles = {name: open(out / name, "w", newline="", encoding="utf-8") for name in files}
+        try:
+            writers = {name: csv.writer(h) for name, h in handles.items()}
+            for name, header in files.items():
+                writers[name].writerow(header)
+                counts[name] = 0
+
+            def emit(name, row):
+                writers[name].writerow(row)
+                counts[name] += 1
+
+            for user, lives_in, exhibits, exposed_to, iot in self.users():
+                emit("users.csv", [user["id"], user["age_range"], user["household_type"],
+                                   user["age_group"], user["family_type"]])
+                emit("lives_in.csv", [lives_in["start"], lives_in["end"]])
+                for e in exhibits:
+                    emit("exhibits.csv", [e["start"], e["end"]])
+                for e in exposed_to:
+                    emit("exposed_to.csv", [e["start"], e["end"], e["props"]["inference_confidence"]])
+                for p in iot:
+                    emit("iot_patterns.csv", [p["id"], p["activity_level"], p["anomaly_count"]])
+                    emit("has_pattern.csv", [p["user_id"], p["id"]])
+        finally:
+            for h in handles.values():
+                h.close()
+
+        return counts
+
+    @staticmethod
+    def import_command(out_dir: str, database: str = "neo4j") -> str:
+        """`neo4j-admin` command line for the files written by write_csv"""
+        d = Path(out_dir)
+        return " ".join([
+            "neo4j-admin database import full",
+            f"--nodes=Location={d / 'locations.csv'}",
+            f"--nodes=InsuranceProduct={d / 'products.csv'}",
+            f"--nodes=RiskFactor={d / 'risks.csv'}",
+            f"--nodes=Behavior={d / 'behaviors.csv'}",
+            f"--nodes=User={d / 'users.csv'}",
+            f"--nodes=IoTPattern={d / 'iot_patterns.csv'}",
+            f"--relationships=LIVES_IN={d / 'lives_in.csv'}",
+            f"--relationships=EXHIBITS={d / 'exhibits.csv'}",
+            f"--relationships=EXPOSED_TO={d / 'exposed_to.csv'}",
+            f"--relationships=HAS_PATTERN={d / 'has_pattern.csv'}",
+            f"--relationships=HAS_RISK={d / 'has_risk.csv'}",
+            f"--relationships=INDICATES={d / 'indicates.csv'}",
+            f"--relationships=COVERED_BY={d / 'covered_by.csv'}",
+            database,
+        ])
+
+    def load(self, loader) -> Dict:
+        """Stream the graph into a BulkGraphLoader (or EmbeddedGraph) one chunk of users at a time"""
+        loader.merge_nodes("Location", "grid_cell", self._locations)
+        loader.merge_nodes("InsuranceProduct", "id", INSURANCE_PRODUCTS)
+        loader.merge_nodes("RiskFactor", "type", RISK_FACTORS)
+        loader.merge_nodes("Behavior", "category", [{"category": c} for c in BEHAVIOR_CATEGORIES])
+
+        rules = self.rule_relationships()
+        loader.merge_relationships("HAS_RISK", "Location", "grid_cell", "RiskFactor", "type",
+                                   [{"start": a, "end": b} for a, b in rules["HAS_RISK"]])
+        loader.merge_relationships("INDICATES", "Behavior", "category", "RiskFactor", "type",
+                                   [{"start": a, "end": b} for a, b in rules["INDICATES"]])
+        loader.merge_relationships("COVERED_BY", "RiskFactor", "type", "InsuranceProduct", "id",
+                                   [{"start": a, "end": b} for a, b in rules["COVERED_BY"]])
+
+        users, lives_in, exhibits, exposed_to, iot = [], [], [], [], []
+
+        def flush():
+            loader.merge_nodes("User", "id", users)
+            loader.merge_relationships("LIVES_IN", "User", "id", "Location", "grid_cell", lives_in)
+            loader.merge_relationships("EXHIBITS", "User", "id", "Behavior", "category", exhibits)
+            loader.merge_relationships("EXPOSED_TO", "User", "id", "RiskFactor", "type", exposed_to)
+            loader.merge_nodes("IoTPattern", "id", [{k: v for k, v in row.items() if k != "user_id"} for row in iot])
+            loader.merge_relationships("HAS_PATTERN", "User", "id", "IoTPattern", "id",
+                                       [{"start": row["user_id"], "end": row["id"]} for row in iot])
+            for rows in (users, lives_in, exhibits, exposed_to, iot):
+                rows.clear()
+
+        for user, home, user_exhibits, user_exposures, user_iot in self.users():
+            users.append(user)
+            lives_in.append(home)
+            exhibits.extend(user_exhibits)
+            exposed_to.extend(user_exposures)
+            iot.extend(user_iot)
+            if len(users) >= loader.chunk_size:
+                flush()
+        if users:
+            flush()
+
+        return loader.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Townin graph")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--cells", type=int, default=500)
+    parser.add_argument("--max-behaviors", type=int, default=3)
+    parser.add_argument("--iot-fraction", type=float, default=0.3)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for location popularity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="import", help="CSV output directory")
+    parser.add_argument("--load", action="store_true", help="load into Neo4j via BulkGraphLoader instead of CSV")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    generator = SyntheticGraphGenerator(
+        num_users=args.users,
+        num_grid_cells=args.cells,
+        max_behaviors=args.max_behaviors,
+        iot_fraction=args.iot_fraction,
+        location_skew=args.skew,
+        seed=args.seed,
+    )
+
+    if args.load:
+        from setup_neo4j import TowninGraphSetup
+        from graph_loader import BulkGraphLoader
+
+        setup = TowninGraphSetup()
+        try:
+            setup.create_schema()
+            loader = BulkGraphLoader(setup.driver, chunk_size=args.chunk_size)
+            generator.load(loader)
+            loader.print_report()
+        finally:
+            setup.close()
+        return
+
+    counts = generator.write_csv(args.out)
+    print(f"✓ Wrote synthetic graph to {args.out}/ (seed={args.seed})")
+    for name, n in counts.items():
+        print(f"  {name}: {n:,} rows")
+    print("\nImport with:")
+    print(f"  {generator.import_command(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
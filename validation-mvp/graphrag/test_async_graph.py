@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Async Graph Test
+Drives the request micro-batcher and the load generator with a fake client:
+concurrent requests share one UNWIND query, duplicates are queried once,
+failures reach every waiter and drain() leaves nothing in flight
+
+Usage:
+    python test_async_graph.py
+    pytest test_async_graph.py
+"""
+
+import asyncio
+
+from async_graph import _MicroBatcher, percentile, run_load
+
+
+class FakeClient:
+    """run_read stand-in answering UNWIND $user_ids queries"""
+
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.calls = []
+        self.fail = fail
+        self.delay = delay
+
+    async def run_read(self, query, user_ids):
+        self.calls.append(list(user_ids))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return [{"uid": uid, "rows": [{"user": uid}]} for uid in user_ids if uid != "missing"]
+
+
+def _batcher(client, window_ms=5.0, max_batch_size=100):
+    return _MicroBatcher(client, "UNWIND $user_ids AS uid ...", window_ms, max_batch_size)
+
+
+def test_concurrent_requests_share_one_query():
+    async def scenario():
+        client = FakeClient()
+        batcher = _batcher(client)
+        results = await asyncio.gather(*(batcher.submit(uid) for uid in ["u1", "u2", "u1", "missing"]))
+        return client, batcher, results
+
+    client, batcher, results = asyncio.run(scenario())
+    assert client.calls == [["u1", "u2", "missing"]]
+    assert results == [[{"user": "u1"}], [{"user": "u2"}], [{"user": "u1"}], []]
+    assert batcher.batches == 1 and batcher.batched_ids == 3
+
+
+def test_full_batch_flushes_without_waiting():
+    async def scenario():
+        client = FakeClient()
+        batcher = _batcher(client, window_ms=10_000, max_batch_size=2)
+        first = await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1)
+        third = batcher.submit("c")
+        await batcher.drain()
+        return client, first, third.result()
+
+    client, first, third = asyncio.run(scenario())
+    assert client.calls == [["a", "b"], ["c"]]
+    assert first == [[{"user": "a"}], [{"user": "b"}]] and third == [{"user": "c"}]
+
+
+def test_failure_reaches_every_waiter():
+    async def scenario():
+        batcher = _batcher(FakeClient(fail=True))
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results), results
+
+
+def test_drain_waits_for_batches_in_flight():
+    async def scenario():
+        batcher = _batcher(FakeClient(delay=0.05), window_ms=0)
+        futures = [batcher.submit(f"u{i}") for i in range(3)]
+        await asyncio.sleep(0.01)  # window closed, query still running
+        await batcher.drain()
+        return futures, batcher
+
+    futures, batcher = asyncio.run(scenario())
+    assert all(f.done() for f in futures)
+    assert not batcher._tasks
+
+
+class _LoadClient:
+    def __init__(self):
+        self.batcher = None
+
+    async def recommendations(self, user_id):
+        if self.batcher is None:
+            self.batcher = _batcher(FakeClient(), window_ms=1)
+        return await self.batcher.submit(user_id)
+
+    def stats(self):
+        b = self.batcher
+        return {"queries": b.batches, "recommendations_avg_batch": round(b.batched_ids / b.batches, 1)}
+
+
+def test_run_load_batches_concurrent_workers():
+    report = asyncio.run(run_load(_LoadClient(), [f"u{i}" for i in range(50)], 400, concurrency=40))
+    assert report["requests"] == 400 and report["errors"] == 0
+    assert report["queries"] < 400 / 5, report
+    assert report["p50_ms"] <= report["p99_ms"] <= report["max_ms"]
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.99) == 4.0
+
+
+def main():
+    tests = [
+        test_concurrent_requests_share_one_query,
+        test_full_batch_flushes_without_waiting,
+        test_failure_reaches_every_waiter,
+        test_drain_waits_for_batches_in_flight,
+        test_run_load_batches_concurrent_workers,
+        test_percentile,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
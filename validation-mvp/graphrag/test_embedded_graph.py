@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Embedded Graph Test
+Loads the pipeline sample graph into EmbeddedGraph and checks that every
+native traversal returns the catalogue query's columns and ordering, plus
+MERGE semantics of the loader interface
+
+Usage:
+    python test_embedded_graph.py
+    pytest test_embedded_graph.py
+"""
+
+import re
+
+from embedded_graph import EmbeddedGraph, _normalize
+from graph_queries import get_query
+from synthetic_graph import SyntheticGraphGenerator
+
+ALIAS_RE = re.compile(r"\bas\s+(\w+)", re.IGNORECASE)
+MAP_KEY_RE = re.compile(r"(\w+)\s*:")
+
+
+def _columns(name: str) -> set:
+    return set(ALIAS_RE.findall(get_query(name)["cypher"]))
+
+
+def _collect_keys(name: str) -> set:
+    cypher = get_query(name)["cypher"]
+    start = cypher.index("collect({")
+    return set(MAP_KEY_RE.findall(cypher[start:cypher.index("})", start)]))
+
+
+def sample_graph() -> EmbeddedGraph:
+    """test_graphrag_pipeline.py's sample graph, through the loader interface"""
+    graph = EmbeddedGraph(user_key="user_id")
+    graph.merge_nodes("Location", "name", [
+        {"name": "강남구 역삼동", "cctv_count": 45, "crime_rate": 0.02, "safety_score": 8.2},
+        {"name": "송파구 잠실동", "cctv_count": 38, "crime_rate": 0.015, "safety_score": 8.5},
+        {"name": "마포구 망원동", "cctv_count": 20, "crime_rate": 0.03, "safety_score": 7.1},
+    ])
+    graph.merge_nodes("User", "user_id", [
+        {"user_id": "user_001", "age_group": "30s", "family_type": "couple_with_kids"},
+        {"user_id": "user_002", "age_group": "60s", "family_type": "elderly_couple"},
+    ])
+    graph.merge_nodes("InsuranceProduct", "product_id", [
+        {"product_id": "cancer_001", "name": "암보험 플러스", "category": "health",
+         "monthly_premium": 50000, "coverage_amount": 100000000},
+        {"product_id": "accident_001", "name": "교통사고 특약", "category": "accident",
+         "monthly_premium": 30000, "coverage_amount": 50000000},
+        {"product_id": "senior_care_001", "name": "시니어케어 보험", "category": "care",
+         "monthly_premium": 80000, "coverage_amount": 150000000},
+    ])
+    graph.merge_nodes("RiskFactor", "risk_id", [
+        {"risk_id": "traffic_risk_001", "type": "traffic", "severity": "medium", "description": "주요 도로 인접 지역"},
+        {"risk_id": "health_risk_001", "type": "health", "severity": "high", "description": "고령 가구 건강 위험"},
+        {"risk_id": "flood_risk_001", "type": "flood", "severity": "high", "description": "홍수 위험 지역"},
+    ])
+    graph.merge_relationships("LIVES_IN", "User", "user_id", "Location", "name", [
+        {"start": "user_001", "end": "강남구 역삼동"}, {"start": "user_002", "end": "송파구 잠실동"},
+    ])
+    graph.merge_relationships("HAS_RISK", "Location", "name", "RiskFactor", "risk_id", [
+        {"start": "강남구 역삼동", "end": "traffic_risk_001", "props": {"weight": 0.6}},
+        {"start": "송파구 잠실동", "end": "traffic_risk_001", "props": {"weight": 0.4}},
+        {"start": "송파구 잠실동", "end": "flood_risk_001"},
+    ])
+    graph.merge_relationships("EXPOSED_TO", "User", "user_id", "RiskFactor", "risk_id", [
+        {"start": "user_002", "end": "health_risk_001", "props": {"inference_confidence": 0.85}},
+    ])
+    graph.merge_relationships("COVERED_BY", "RiskFactor", "risk_id", "InsuranceProduct", "product_id", [
+        {"start": "traffic_risk_001", "end": "accident_001"},
+        {"start": "health_risk_001", "end": "senior_care_001"},
+        {"start": "health_risk_001", "end": "cancer_001"},
+        {"start": "flood_risk_001", "end": "cancer_001"},
+    ])
+    return graph
+
+
+def test_insurance_recommendation_rows():
+    rows = sample_graph().insurance_recommendation("user_002")
+    assert rows and all(set(row) == _columns("insurance_recommendation") for row in rows)
+    # ORDER BY r.severity DESC, p.monthly_premium ASC
+    assert [(r["severity"], r["premium"]) for r in rows] == [("medium", 30000), ("high", 50000)]
+    assert rows[0]["location"] == "송파구 잠실동"
+
+
+def test_multi_hop_rows():
+    rows = sample_graph().multi_hop_reasoning("user_002")
+    assert len(rows) == 1 and set(rows[0]) == _columns("multi_hop_reasoning")
+    products = rows[0]["recommended_products"]
+    assert all(set(p) == _collect_keys("multi_hop_reasoning") for p in products)
+    assert sorted(p["product"] for p in products) == ["시니어케어 보험", "암보험 플러스"]
+    assert sample_graph().multi_hop_reasoning("user_001") == []
+
+
+def test_location_safety_rows():
+    rows = sample_graph().location_safety()
+    assert all(set(row) == _columns("location_safety") for row in rows)
+    assert [row["safety_score"] for row in rows] == [8.5, 8.2, 7.1]
+    assert rows[0]["risk_count"] == 2
+    # OPTIONAL MATCH miss: count 0, one all-null map
+    assert rows[-1]["risk_count"] == 0 and rows[-1]["risks"] == [{"type": None, "severity": None}]
+    assert all(set(r) == _collect_keys("location_safety") for row in rows for r in row["risks"])
+
+
+def test_flood_zone_users():
+    assert _columns("flood_zone_users") == {"count"}
+    assert sample_graph().flood_zone_users() == 1
+
+
+def test_merge_semantics():
+    graph = sample_graph()
+    graph.merge_nodes("User", "user_id", [{"user_id": "user_002", "age_group": "70s"}])
+    graph.merge_relationships("LIVES_IN", "User", "user_id", "Location", "name",
+                              [{"start": "user_002", "end": "송파구 잠실동"}])
+    counts = graph.counts()
+    assert counts["users"] == 2 and counts["locations"] == 3
+    assert graph.multi_hop_reasoning("user_002")[0]["age_group"] == "70s"
+    assert len(graph.insurance_recommendation("user_002")) == 2, "duplicate LIVES_IN was not merged"
+
+
+def test_index_follows_updates():
+    graph = sample_graph()
+    table = graph.table("User")
+    assert table.find("age_group", "60s") == [1]
+    graph.merge_nodes("User", "user_id", [{"user_id": "user_001", "age_group": "60s"}])
+    assert sorted(table.find("age_group", "60s")) == [0, 1]
+    graph.merge_nodes("User", "user_id", [{"user_id": "user_002", "age_group": "70s"}])
+    assert table.find("age_group", "60s") == [0] and table.find("age_group", "70s") == [1]
+
+
+def test_normalize_ignores_collect_order():
+    a = [{"user": "u", "products": [{"p": 1}, {"p": 2}]}]
+    b = [{"user": "u", "products": [{"p": 2}, {"p": 1}]}]
+    assert _normalize(a) == _normalize(b)
+
+
+def test_synthetic_graph_answers_multi_hop():
+    graph = EmbeddedGraph(user_key="id")
+    generator = SyntheticGraphGenerator(num_users=300, num_grid_cells=40, seed=7)
+    generator.load(graph)
+    exposed = [user["id"] for user, _, _, exposed_to, _ in generator.users() if exposed_to]
+    rows = graph.multi_hop_reasoning(exposed[0])
+    assert rows and rows[0]["age_group"] and rows[0]["family_type"], rows
+    assert set(rows[0]) == _columns("multi_hop_reasoning")
+
+
+def main():
+    tests = [
+        test_insurance_recommendation_rows,
+        test_multi_hop_rows,
+        test_location_safety_rows,
+        test_flood_zone_users,
+        test_merge_semantics,
+        test_index_follows_updates,
+        test_normalize_ignores_collect_order,
+        test_synthetic_graph_answers_multi_hop,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
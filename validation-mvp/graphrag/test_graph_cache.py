@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Reference Graph Cache Test
+Serves recommendations from a fake driver and checks the cached hops, the
+catalogue row order, TTL / version invalidation and the per-thread counters
+
+Usage:
+    python test_graph_cache.py
+    pytest test_graph_cache.py
+"""
+
+import threading
+
+from graph_cache import (
+    BUMP_VERSION_QUERY, EDGES_QUERY, NODES_QUERY, VERSION_QUERY, ReferenceGraphCache, bump_reference_version,
+)
+
+NODES = [
+    {"eid": "l1", "label": "Location", "props": {"name": "송파구 잠실동"}},
+    {"eid": "r1", "label": "RiskFactor", "props": {"type": "traffic", "severity": "medium", "description": "도로"}},
+    {"eid": "r2", "label": "RiskFactor", "props": {"type": "health", "severity": "high", "description": "고령 가구"}},
+    {"eid": "p1", "label": "InsuranceProduct", "props": {"name": "교통사고 특약", "monthly_premium": 30000}},
+    {"eid": "p2", "label": "InsuranceProduct", "props": {"name": "시니어케어 보험", "monthly_premium": 80000}},
+    {"eid": "p3", "label": "InsuranceProduct", "props": {"name": "암보험 플러스", "monthly_premium": 50000}},
+]
+EDGES = [
+    {"type": "HAS_RISK", "src": "l1", "dst": "r1", "weight": 0.4},
+    {"type": "HAS_RISK", "src": "l1", "dst": "r2", "weight": 0.2},
+    {"type": "COVERED_BY", "src": "r1", "dst": "p1", "weight": 0.9},
+    {"type": "COVERED_BY", "src": "r2", "dst": "p2", "weight": 0.95},
+    {"type": "COVERED_BY", "src": "r2", "dst": "p3", "weight": 0.8},
+]
+USER = {
+    "user": {"user_id": "user_002", "age_group": "60s", "family_type": "elderly_couple"},
+    "locations": ["l1"],
+    "exposures": [{"risk": "r2", "confidence": 0.85}],
+}
+
+
+class _Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class _Result:
+    def __init__(self, records):
+        self.records = [_Record(r) for r in records]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+
+class FakeDriver:
+    def __init__(self):
+        self.version = 0
+        self.nodes, self.edges = list(NODES), list(EDGES)
+        self.queries = []
+
+    def session(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.queries.append(query)
+        if query == VERSION_QUERY:
+            return _Result([{"version": self.version}])
+        if query == BUMP_VERSION_QUERY:
+            self.version += 1
+            return _Result([{"version": self.version}])
+        if query == NODES_QUERY:
+            return _Result(self.nodes)
+        if query == EDGES_QUERY:
+            return _Result(self.edges)
+        return _Result([USER] if params.get("user_id") == "user_002" else [])
+
+    def count(self, query) -> int:
+        return self.queries.count(query)
+
+
+def test_hops_served_from_snapshot():
+    cache = ReferenceGraphCache(FakeDriver())
+    assert [(r["type"], w) for r, w in cache.risks_for_location("l1")] == [("traffic", 0.4), ("health", 0.2)]
+    assert [p["name"] for p, _ in cache.products_for_risk("r2")] == ["시니어케어 보험", "암보험 플러스"]
+    metrics = cache.metrics()
+    assert metrics["misses"] == 1 and metrics["hits"] == 1 and metrics["reloads"] == 1
+
+
+def test_recommend_by_location_order():
+    rows = ReferenceGraphCache(FakeDriver()).recommend_by_location("user_002")
+    # ORDER BY r.severity DESC, p.monthly_premium ASC
+    assert [(r["severity"], r["premium"]) for r in rows] == [("medium", 30000), ("high", 50000), ("high", 80000)]
+    assert rows[0]["location"] == "송파구 잠실동" and rows[0]["age_group"] == "60s"
+
+
+def test_recommend_by_exposure_groups_products():
+    cache = ReferenceGraphCache(FakeDriver())
+    rows = cache.recommend_by_exposure("user_002")
+    assert len(rows) == 1 and rows[0]["risk_description"] == "고령 가구"
+    assert [p["product"] for p in rows[0]["recommended_products"]] == ["시니어케어 보험", "암보험 플러스"]
+    assert cache.recommend_by_exposure("nobody") == []
+
+
+def test_version_bump_reloads():
+    driver = FakeDriver()
+    cache = ReferenceGraphCache(driver, version_check_seconds=0)
+    cache.snapshot()
+    cache.snapshot()
+    assert driver.count(NODES_QUERY) == 1
+
+    driver.nodes[3] = {**NODES[3], "props": {"name": "교통사고 특약 플러스", "monthly_premium": 30000}}
+    assert bump_reference_version(driver) == 1
+    assert cache.products_for_risk("r1")[0][0]["name"] == "교통사고 특약 플러스"
+    assert driver.count(NODES_QUERY) == 2
+    assert cache.metrics()["version"] == 1
+
+
+def test_ttl_expiry_reloads():
+    driver = FakeDriver()
+    cache = ReferenceGraphCache(driver, ttl_seconds=0)
+    cache.snapshot()
+    cache.snapshot()
+    assert driver.count(NODES_QUERY) == 2
+
+
+def test_unknown_node_triggers_one_reload():
+    driver = FakeDriver()
+    cache = ReferenceGraphCache(driver)
+    cache.snapshot()
+    driver.nodes.append({"eid": "l2", "label": "Location", "props": {"name": "마포구"}})
+    USER["locations"].append("l2")
+    try:
+        cache.recommend_by_location("user_002")
+    finally:
+        USER["locations"].remove("l2")
+    assert driver.count(NODES_QUERY) == 2
+
+
+def test_counters_sum_across_threads():
+    cache = ReferenceGraphCache(FakeDriver())
+    cache.snapshot()
+
+    def work():
+        for _ in range(200):
+            cache.snapshot()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1600 and metrics["misses"] == 1
+    assert metrics["hit_rate"] == round(1600 / 1601, 4)
+
+
+def main():
+    tests = [
+        test_hops_served_from_snapshot,
+        test_recommend_by_location_order,
+        test_recommend_by_exposure_groups_products,
+        test_version_bump_reloads,
+        test_ttl_expiry_reloads,
+        test_unknown_node_triggers_one_reload,
+        test_counters_sum_across_threads,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Graph Loader Test
+Runs BulkGraphLoader against a recording fake driver: rows are sent in
+chunks of at most chunk_size, one write transaction per chunk, counters are
+summed, and identifiers are validated before they reach Cypher
+
+Usage:
+    python test_graph_loader.py
+    pytest test_graph_loader.py
+"""
+
+from graph_loader import BulkGraphLoader, chunked
+
+
+class _Counters:
+    def __init__(self, rows):
+        self.nodes_created = len(rows)
+        self.relationships_created = 0
+        self.properties_set = sum(len(row) for row in rows if isinstance(row, dict))
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+        self.counters = _Counters(rows)
+
+    def __iter__(self):
+        return iter({"key": row.get("id")} for row in self.rows)
+
+    def consume(self):
+        return self
+
+
+class _Session:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, rows):
+        self.driver.calls.append((" ".join(query.split()), rows))
+        return _Result(rows)
+
+    def execute_write(self, fn, *args):
+        self.driver.transactions += 1
+        return fn(self, *args)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+        self.transactions = 0
+        self.databases = []
+
+    def session(self, database=None):
+        self.databases.append(database)
+        return _Session(self)
+
+
+def test_chunked_is_lazy():
+    def rows():
+        for i in range(7):
+            yield {"id": i}
+
+    chunks = chunked(rows(), 3)
+    assert next(chunks) == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert [len(c) for c in chunks] == [3, 1]
+
+
+def test_merge_nodes_one_transaction_per_chunk():
+    driver = FakeDriver()
+    loader = BulkGraphLoader(driver, chunk_size=4)
+    totals = loader.merge_nodes("User", "id", ({"id": f"u{i}", "age": i} for i in range(10)))
+    assert driver.transactions == 3
+    assert [len(rows) for _, rows in driver.calls] == [4, 4, 2]
+    assert driver.calls[0][0].startswith("UNWIND $rows AS row MERGE (n:User {id: row.id})")
+    assert totals == {"nodes_created": 10, "relationships_created": 0, "properties_set": 20}
+    assert loader.report()["batches"] == 3
+
+
+def test_merge_relationships_sets_props():
+    driver = FakeDriver()
+    BulkGraphLoader(driver).merge_relationships(
+        "HAS_RISK", "Location", "grid_cell", "RiskFactor", "type",
+        [{"start": "mapo_01", "end": "flood", "props": {"weight": 0.5}}],
+    )
+    query, rows = driver.calls[0]
+    assert "MERGE (a)-[r:HAS_RISK]->(b)" in query and "SET r += coalesce(row.props, {})" in query
+    assert rows[0]["props"] == {"weight": 0.5}
+
+
+def test_rejects_bad_identifiers_before_writing():
+    driver = FakeDriver()
+    loader = BulkGraphLoader(driver)
+    for label in ("User`) DETACH DELETE (x", "1abc", "a-b", ""):
+        try:
+            loader.merge_nodes(label, "id", [{"id": 1}])
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {label!r}")
+    assert driver.calls == []
+
+
+def test_database_is_passed_to_sessions():
+    driver = FakeDriver()
+    BulkGraphLoader(driver, database="bench").merge_nodes("User", "id", [{"id": "u1"}])
+    assert driver.databases == ["bench"]
+
+
+def test_run_unwind_collects_returned_column():
+    driver = FakeDriver()
+    totals = BulkGraphLoader(driver, chunk_size=2).run_unwind(
+        "UNWIND $rows AS row RETURN row.id AS key", [{"id": i} for i in range(5)], returns="key",
+    )
+    assert totals["returned"] == [0, 1, 2, 3, 4]
+    assert driver.transactions == 3
+
+
+def main():
+    tests = [
+        test_chunked_is_lazy,
+        test_merge_nodes_one_transaction_per_chunk,
+        test_merge_relationships_sets_props,
+        test_rejects_bad_identifiers_before_writing,
+        test_database_is_passed_to_sessions,
+        test_run_unwind_collects_returned_column,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
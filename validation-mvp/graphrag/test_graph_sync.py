@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Graph Sync Test
+Runs GraphSnapshot / GraphSync against an in-memory fake client: the diff
+only contains changed rows, keyset pages are stitched together, and users
+are flagged dirty when their edges or their IoT patterns change
+
+Usage:
+    python test_graph_sync.py
+    pytest test_graph_sync.py
+"""
+
+from graph_sync import GraphSnapshot, GraphSync
+
+HAS_PATTERN = ("HAS_PATTERN", "User", "id", "IoTPattern", "id")
+
+
+class _Result:
+    class _Counters:
+        nodes_created = relationships_created = properties_set = 0
+
+    def __iter__(self):
+        return iter(())
+
+    def consume(self):
+        return self
+
+    counters = _Counters()
+
+
+class _Session:
+    def __init__(self, writes):
+        self.writes = writes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.writes.append((" ".join(query.split()), params))
+        return _Result()
+
+    def execute_write(self, fn, *args):
+        return fn(self, *args)
+
+
+class _Driver:
+    def __init__(self):
+        self.writes = []
+
+    def session(self, **kwargs):
+        return _Session(self.writes)
+
+
+class FakeClient:
+    """GraphClient stand-in holding nodes (label -> key -> props) and edges (type -> start -> [rel])"""
+
+    database = None
+
+    def __init__(self, nodes, rels):
+        self.nodes, self.rels = nodes, rels
+        self.driver = _Driver()
+        self.writes = []
+        self.reads = 0
+
+    def read(self, query, name=None, after=None, limit=10000):
+        self.reads += 1
+        kind = name[len("sync_read_"):]
+        if kind in self.nodes:
+            rows = [{"key": k, "props": p} for k, p in sorted(self.nodes[kind].items())]
+            key = "key"
+        else:
+            rows = [{"start": s, "rels": r} for s, r in sorted(self.rels.get(kind, {}).items())]
+            key = "start"
+        return [row for row in rows if after is None or row[key] > after][:limit]
+
+    def write(self, query, name=None, rows=None):
+        self.writes.append((name, rows))
+        return []
+
+    def marked_dirty(self):
+        return sorted(uid for name, rows in self.writes if name == "sync_mark_dirty" for uid in rows)
+
+
+def _graph():
+    return FakeClient(
+        nodes={
+            "User": {f"user_{i}": {"id": f"user_{i}", "age_range": "35-44"} for i in range(5)},
+            "IoTPattern": {"iot_user_1": {"id": "iot_user_1", "anomaly_count": 2},
+                           "iot_user_3": {"id": "iot_user_3", "anomaly_count": 0}},
+        },
+        rels={"HAS_PATTERN": {"user_1": [{"end": "iot_user_1", "props": {}}],
+                              "user_3": [{"end": "iot_user_3", "props": {}}]}},
+    )
+
+
+def _snapshot(anomalies=None, users=5):
+    anomalies = {"iot_user_1": 2, "iot_user_3": 0, **(anomalies or {})}
+    snapshot = GraphSnapshot()
+    snapshot.merge_nodes("User", "id", [{"id": f"user_{i}", "age_range": "35-44"} for i in range(users)])
+    snapshot.merge_nodes("IoTPattern", "id", [{"id": k, "anomaly_count": v} for k, v in anomalies.items()])
+    snapshot.merge_relationships("HAS_PATTERN", "User", "id", "IoTPattern", "id",
+                                 [{"start": k[len("iot_"):], "end": k} for k in anomalies])
+    return snapshot
+
+
+def test_snapshot_merges_rows():
+    snapshot = GraphSnapshot()
+    snapshot.merge_nodes("User", "id", [{"id": "u1", "a": 1}])
+    snapshot.merge_nodes("User", "id", [{"id": "u1", "b": 2}])
+    snapshot.merge_relationships(*HAS_PATTERN, [{"start": "u1", "end": "p1", "props": {"w": 1}}])
+    snapshot.merge_relationships(*HAS_PATTERN, [{"start": "u1", "end": "p1"}])
+    assert snapshot.nodes[("User", "id")] == {"u1": {"id": "u1", "a": 1, "b": 2}}
+    assert snapshot.relationships[HAS_PATTERN] == {("u1", "p1"): {"w": 1}}
+    assert snapshot.report() == {"nodes": 1, "relationships": 1}
+
+
+def test_unchanged_graph_has_empty_diff():
+    plan = GraphSync(_graph()).diff(_snapshot())
+    for deltas in plan.values():
+        for delta in deltas.values():
+            assert not delta["upsert"] and not delta["delete"], delta
+
+
+def test_diff_pages_through_current_state():
+    client = _graph()
+    plan = GraphSync(client, chunk_size=2).diff(_snapshot(users=4))
+    users = plan["nodes"][("User", "id")]
+    assert users["delete"] == ["user_4"] and users["unchanged"] == 4
+    assert client.reads > 3  # User needed several keyset pages
+
+
+def test_keep_missing_never_deletes():
+    plan = GraphSync(_graph(), delete_missing=False).diff(_snapshot(users=2))
+    assert plan["nodes"][("User", "id")]["delete"] == []
+
+
+def test_changed_pattern_marks_owner_dirty():
+    client = _graph()
+    report = GraphSync(client).apply(_snapshot(anomalies={"iot_user_3": 4}))
+    assert report["nodes"]["IoTPattern"]["upserted"] == 1
+    assert report["relationships"]["HAS_PATTERN"]["upserted"] == 0
+    assert client.marked_dirty() == ["user_3"], client.writes
+    assert not report["reference_changed"]
+
+
+def test_new_pattern_and_deleted_edge_mark_owners():
+    client = _graph()
+    snapshot = _snapshot(anomalies={"iot_user_2": 7})
+    del snapshot.relationships[HAS_PATTERN][("user_1", "iot_user_1")]
+    report = GraphSync(client).apply(snapshot)
+    assert report["dirty"] == 2
+    assert client.marked_dirty() == ["user_1", "user_2"]
+
+
+def test_deleted_users_are_not_marked():
+    client = _graph()
+    GraphSync(client).apply(_snapshot(anomalies={"iot_user_3": 4}, users=3))
+    assert client.marked_dirty() == []
+    assert ("sync_delete_User", ["user_3", "user_4"]) in client.writes
+
+
+def test_dry_run_writes_nothing():
+    client = _graph()
+    report = GraphSync(client).apply(_snapshot(anomalies={"iot_user_3": 4}), dry_run=True)
+    assert report["nodes"]["IoTPattern"]["upserted"] == 1
+    assert client.writes == [] and client.driver.writes == []
+
+
+def main():
+    tests = [
+        test_snapshot_merges_rows,
+        test_unchanged_graph_has_empty_diff,
+        test_diff_pages_through_current_state,
+        test_keep_missing_never_deletes,
+        test_changed_pattern_marks_owner_dirty,
+        test_new_pattern_and_deleted_edge_mark_owners,
+        test_deleted_users_are_not_marked,
+        test_dry_run_writes_nothing,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
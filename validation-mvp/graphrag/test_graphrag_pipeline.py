@@ -3,285 +3,305 @@ Townin GraphRAG Pipeline Test
 Tests the complete GraphRAG pipeline from document processing to querying
 """
 
-from neo4j import GraphDatabase
 import time
-
-# Neo4j connection settings
-URI = "bolt://localhost:7687"
-AUTH = ("neo4j", "test1234")
-
-def clear_database(driver):
+from graph_client import get_client, close_client
+from graph_queries import get_query
+from graph_sync import batched_delete
+from schema_manager import GraphSchemaManager
+from recommendation_materializer import RecommendationMaterializer
+from graph_cache import ReferenceGraphCache
+from embedded_graph import EmbeddedGraph, compare_with_neo4j
+from vector_index import GraphRetriever, Neo4jSource
+
+def clear_database(client):
     """Clear all existing data"""
-    with driver.session() as session:
-        session.run("MATCH (n) DETACH DELETE n")
-        print("✓ Database cleared")
-
-def create_sample_graph(driver):
-    """Create sample insurance knowledge graph"""
-    with driver.session() as session:
-        # Create Location nodes
-        session.run("""
-            CREATE (l1:Location {
-                name: '강남구 역삼동',
-                type: 'neighborhood',
-                cctv_count: 45,
-                crime_rate: 0.02,
-                parking_score: 7.5,
-                safety_score: 8.2
-            })
-        """)
-
-        session.run("""
-            CREATE (l2:Location {
-                name: '송파구 잠실동',
-                type: 'neighborhood',
-                cctv_count: 38,
-                crime_rate: 0.015,
-                parking_score: 6.8,
-                safety_score: 8.5
-            })
-        """)
-
-        # Create User nodes (anonymous)
-        session.run("""
-            CREATE (u1:User {
-                user_id: 'user_001',
-                age_group: '30s',
-                family_type: 'couple_with_kids',
-                activity_pattern: 'high'
-            })
-        """)
-
-        session.run("""
-            CREATE (u2:User {
-                user_id: 'user_002',
-                age_group: '60s',
-                family_type: 'elderly_couple',
-                activity_pattern: 'low'
-            })
-        """)
-
-        # Create Insurance Product nodes
-        session.run("""
-            CREATE (p1:InsuranceProduct {
-                product_id: 'cancer_001',
-                name: '암보험 플러스',
-                category: 'health',
-                coverage_type: 'cancer',
-                monthly_premium: 50000,
-                coverage_amount: 100000000,
-                age_limit: 70
-            })
-        """)
-
-        session.run("""
-            CREATE (p2:InsuranceProduct {
-                product_id: 'accident_001',
-                name: '교통사고 특약',
-                category: 'accident',
-                coverage_type: 'traffic_accident',
-                monthly_premium: 30000,
-                coverage_amount: 50000000,
-                age_limit: 75
-            })
-        """)
-
-        session.run("""
-            CREATE (p3:InsuranceProduct {
-                product_id: 'senior_care_001',
-                name: '시니어케어 보험',
-                category: 'care',
-                coverage_type: 'long_term_care',
-                monthly_premium: 80000,
-                coverage_amount: 150000000,
-                age_limit: 80
-            })
-        """)
-
-        # Create Risk Factor nodes
-        session.run("""
-            CREATE (r1:RiskFactor {
-                risk_id: 'traffic_risk_001',
-                type: 'traffic',
-                severity: 'medium',
-                description: '주요 도로 인접 지역'
-            })
-        """)
-
-        session.run("""
-            CREATE (r2:RiskFactor {
-                risk_id: 'health_risk_001',
-                type: 'health',
-                severity: 'high',
-                description: '고령 가구 건강 위험'
-            })
-        """)
-
-        # Create relationships
-        # User -> Location
-        session.run("""
-            MATCH (u:User {user_id: 'user_001'}), (l:Location {name: '강남구 역삼동'})
-            CREATE (u)-[:LIVES_IN {hub_type: 'residence', since: date('2023-01-01')}]->(l)
-        """)
-
-        session.run("""
-            MATCH (u:User {user_id: 'user_002'}), (l:Location {name: '송파구 잠실동'})
-            CREATE (u)-[:LIVES_IN {hub_type: 'residence', since: date('2020-06-15')}]->(l)
-        """)
-
-        # Location -> Risk
-        session.run("""
-            MATCH (l:Location {name: '강남구 역삼동'}), (r:RiskFactor {risk_id: 'traffic_risk_001'})
-            CREATE (l)-[:HAS_RISK {weight: 0.6}]->(r)
-        """)
-
-        session.run("""
-            MATCH (l:Location {name: '송파구 잠실동'}), (r:RiskFactor {risk_id: 'traffic_risk_001'})
-            CREATE (l)-[:HAS_RISK {weight: 0.4}]->(r)
-        """)
-
-        # User -> Risk (inferred from age/family type)
-        session.run("""
-            MATCH (u:User {user_id: 'user_002'}), (r:RiskFactor {risk_id: 'health_risk_001'})
-            CREATE (u)-[:EXPOSED_TO {inference_confidence: 0.85}]->(r)
-        """)
-
-        # Risk -> Insurance Product
-        session.run("""
-            MATCH (r:RiskFactor {risk_id: 'traffic_risk_001'}), (p:InsuranceProduct {product_id: 'accident_001'})
-            CREATE (r)-[:COVERED_BY {coverage_match: 0.9}]->(p)
-        """)
-
-        session.run("""
-            MATCH (r:RiskFactor {risk_id: 'health_risk_001'}), (p:InsuranceProduct {product_id: 'senior_care_001'})
-            CREATE (r)-[:COVERED_BY {coverage_match: 0.95}]->(p)
-        """)
-
-        session.run("""
-            MATCH (r:RiskFactor {risk_id: 'health_risk_001'}), (p:InsuranceProduct {product_id: 'cancer_001'})
-            CREATE (r)-[:COVERED_BY {coverage_match: 0.8}]->(p)
-        """)
-
-        print("✓ Sample graph created")
-
-def verify_graph_structure(driver):
+    batched_delete(client)
+    print("✓ Database cleared")
+
+def create_sample_graph(client):
+    """Create sample insurance knowledge graph (one write transaction)"""
+    statements = []
+    # Create Location nodes
+    statements.append("""
+        CREATE (l1:Location {
+            name: '강남구 역삼동',
+            type: 'neighborhood',
+            cctv_count: 45,
+            crime_rate: 0.02,
+            parking_score: 7.5,
+            safety_score: 8.2
+        })
+    """)
+
+    statements.append("""
+        CREATE (l2:Location {
+            name: '송파구 잠실동',
+            type: 'neighborhood',
+            cctv_count: 38,
+            crime_rate: 0.015,
+            parking_score: 6.8,
+            safety_score: 8.5
+        })
+    """)
+
+    # Create User nodes (anonymous)
+    statements.append("""
+        CREATE (u1:User {
+            user_id: 'user_001',
+            age_group: '30s',
+            family_type: 'couple_with_kids',
+            activity_pattern: 'high'
+        })
+    """)
+
+    statements.append("""
+        CREATE (u2:User {
+            user_id: 'user_002',
+            age_group: '60s',
+            family_type: 'elderly_couple',
+            activity_pattern: 'low'
+        })
+    """)
+
+    # Create Insurance Product nodes
+    statements.append("""
+        CREATE (p1:InsuranceProduct {
+            product_id: 'cancer_001',
+            name: '암보험 플러스',
+            category: 'health',
+            coverage_type: 'cancer',
+            monthly_premium: 50000,
+            coverage_amount: 100000000,
+            age_limit: 70
+        })
+    """)
+
+    statements.append("""
+        CREATE (p2:InsuranceProduct {
+            product_id: 'accident_001',
+            name: '교통사고 특약',
+            category: 'accident',
+            coverage_type: 'traffic_accident',
+            monthly_premium: 30000,
+            coverage_amount: 50000000,
+            age_limit: 75
+        })
+    """)
+
+    statements.append("""
+        CREATE (p3:InsuranceProduct {
+            product_id: 'senior_care_001',
+            name: '시니어케어 보험',
+            category: 'care',
+            coverage_type: 'long_term_care',
+            monthly_premium: 80000,
+            coverage_amount: 150000000,
+            age_limit: 80
+        })
+    """)
+
+    # Create Risk Factor nodes
+    statements.append("""
+        CREATE (r1:RiskFactor {
+            risk_id: 'traffic_risk_001',
+            type: 'traffic',
+            severity: 'medium',
+            description: '주요 도로 인접 지역'
+        })
+    """)
+
+    statements.append("""
+        CREATE (r2:RiskFactor {
+            risk_id: 'health_risk_001',
+            type: 'health',
+            severity: 'high',
+            description: '고령 가구 건강 위험'
+        })
+    """)
+
+    # Create relationships
+    # User -> Location
+    statements.append("""
+        MATCH (u:User {user_id: 'user_001'}), (l:Location {name: '강남구 역삼동'})
+        CREATE (u)-[:LIVES_IN {hub_type: 'residence', since: date('2023-01-01')}]->(l)
+    """)
+
+    statements.append("""
+        MATCH (u:User {user_id: 'user_002'}), (l:Location {name: '송파구 잠실동'})
+        CREATE (u)-[:LIVES_IN {hub_type: 'residence', since: date('2020-06-15')}]->(l)
+    """)
+
+    # Location -> Risk
+    statements.append("""
+        MATCH (l:Location {name: '강남구 역삼동'}), (r:RiskFactor {risk_id: 'traffic_risk_001'})
+        CREATE (l)-[:HAS_RISK {weight: 0.6}]->(r)
+    """)
+
+    statements.append("""
+        MATCH (l:Location {name: '송파구 잠실동'}), (r:RiskFactor {risk_id: 'traffic_risk_001'})
+        CREATE (l)-[:HAS_RISK {weight: 0.4}]->(r)
+    """)
+
+    # User -> Risk (inferred from age/family type)
+    statements.append("""
+        MATCH (u:User {user_id: 'user_002'}), (r:RiskFactor {risk_id: 'health_risk_001'})
+        CREATE (u)-[:EXPOSED_TO {inference_confidence: 0.85}]->(r)
+    """)
+
+    # Risk -> Insurance Product
+    statements.append("""
+        MATCH (r:RiskFactor {risk_id: 'traffic_risk_001'}), (p:InsuranceProduct {product_id: 'accident_001'})
+        CREATE (r)-[:COVERED_BY {coverage_match: 0.9}]->(p)
+    """)
+
+    statements.append("""
+        MATCH (r:RiskFactor {risk_id: 'health_risk_001'}), (p:InsuranceProduct {product_id: 'senior_care_001'})
+        CREATE (r)-[:COVERED_BY {coverage_match: 0.95}]->(p)
+    """)
+
+    statements.append("""
+        MATCH (r:RiskFactor {risk_id: 'health_risk_001'}), (p:InsuranceProduct {product_id: 'cancer_001'})
+        CREATE (r)-[:COVERED_BY {coverage_match: 0.8}]->(p)
+    """)
+
+    client.write_all(statements, name="create_sample_graph")
+    print("✓ Sample graph created")
+
+def verify_graph_structure(client):
     """Verify the graph structure"""
-    with driver.session() as session:
-        # Count nodes by type
-        result = session.run("MATCH (n) RETURN labels(n)[0] as label, count(n) as count")
-        print("\n=== Node Counts ===")
-        for record in result:
-            print(f"  {record['label']}: {record['count']}")
-
-        # Count relationships
-        result = session.run("MATCH ()-[r]->() RETURN type(r) as rel_type, count(r) as count")
-        print("\n=== Relationship Counts ===")
-        for record in result:
-            print(f"  {record['rel_type']}: {record['count']}")
-
-def test_insurance_recommendation_query(driver):
+    # Count nodes by type
+    result = client.read("MATCH (n) RETURN labels(n)[0] as label, count(n) as count", name="node_counts")
+    print("\n=== Node Counts ===")
+    for record in result:
+        print(f"  {record['label']}: {record['count']}")
+
+    # Count relationships
+    result = client.read("MATCH ()-[r]->() RETURN type(r) as rel_type, count(r) as count", name="relationship_counts")
+    print("\n=== Relationship Counts ===")
+    for record in result:
+        print(f"  {record['rel_type']}: {record['count']}")
+
+def test_insurance_recommendation_query(client):
     """Test GraphRAG query for insurance recommendation"""
     print("\n=== Test Query: Insurance Recommendation for user_002 ===")
 
-    query = """
-    MATCH path = (u:User {user_id: 'user_002'})
-                 -[:LIVES_IN]-> (l:Location)
-                 -[:HAS_RISK]-> (r:RiskFactor)
-                 -[:COVERED_BY]-> (p:InsuranceProduct)
-    RETURN u.user_id as user,
-           u.age_group as age_group,
-           l.name as location,
-           r.type as risk_type,
-           r.severity as severity,
-           p.name as product_name,
-           p.category as category,
-           p.monthly_premium as premium
-    ORDER BY r.severity DESC, p.monthly_premium ASC
-    """
-
-    with driver.session() as session:
-        result = session.run(query)
-        records = list(result)
-
-        if records:
-            print(f"\nFound {len(records)} recommendation(s):\n")
-            for i, record in enumerate(records, 1):
-                print(f"{i}. User: {record['user']} ({record['age_group']})")
-                print(f"   Location: {record['location']}")
-                print(f"   Risk: {record['risk_type']} (severity: {record['severity']})")
-                print(f"   Recommended: {record['product_name']} ({record['category']})")
-                print(f"   Premium: {record['premium']:,}원/월\n")
-        else:
-            print("No recommendations found")
-
-def test_multi_hop_reasoning(driver):
+    query = get_query("insurance_recommendation")
+    records = client.read(query["cypher"], name="insurance_recommendation", **query["params"])
+
+    if records:
+        print(f"\nFound {len(records)} recommendation(s):\n")
+        for i, record in enumerate(records, 1):
+            print(f"{i}. User: {record['user']} ({record['age_group']})")
+            print(f"   Location: {record['location']}")
+            print(f"   Risk: {record['risk_type']} (severity: {record['severity']})")
+            print(f"   Recommended: {record['product_name']} ({record['category']})")
+            print(f"   Premium: {record['premium']:,}원/월\n")
+    else:
+        print("No recommendations found")
+
+def test_multi_hop_reasoning(client):
     """Test multi-hop reasoning through graph"""
     print("\n=== Test Query: Multi-hop Reasoning (User -> Risk -> Products) ===")
 
-    query = """
-    MATCH path = (u:User)-[:EXPOSED_TO]->(r:RiskFactor)-[:COVERED_BY]->(p:InsuranceProduct)
-    WHERE u.user_id = 'user_002'
-    RETURN u.user_id as user,
-           u.age_group as age_group,
-           u.family_type as family_type,
-           r.description as risk_description,
-           collect({
-               product: p.name,
-               category: p.category,
-               premium: p.monthly_premium,
-               coverage: p.coverage_amount
-           }) as recommended_products
-    """
-
-    with driver.session() as session:
-        result = session.run(query)
-        records = list(result)
-
-        if records:
-            for record in records:
-                print(f"User: {record['user']}")
-                print(f"  Age Group: {record['age_group']}")
-                print(f"  Family Type: {record['family_type']}")
-                print(f"  Risk: {record['risk_description']}")
-                print(f"\n  Recommended Products:")
-                for product in record['recommended_products']:
-                    print(f"    - {product['product']} ({product['category']})")
-                    print(f"      Premium: {product['premium']:,}원/월")
-                    print(f"      Coverage: {product['coverage']:,}원")
-        else:
-            print("No multi-hop path found")
-
-def test_location_safety_analysis(driver):
+    query = get_query("multi_hop_reasoning")
+    records = client.read(query["cypher"], name="multi_hop_reasoning", **query["params"])
+
+    if records:
+        for record in records:
+            print(f"User: {record['user']}")
+            print(f"  Age Group: {record['age_group']}")
+            print(f"  Family Type: {record['family_type']}")
+            print(f"  Risk: {record['risk_description']}")
+            print(f"\n  Recommended Products:")
+            for product in record['recommended_products']:
+                print(f"    - {product['product']} ({product['category']})")
+                print(f"      Premium: {product['premium']:,}원/월")
+                print(f"      Coverage: {product['coverage']:,}원")
+    else:
+        print("No multi-hop path found")
+
+def test_location_safety_analysis(client):
     """Test location safety score analysis"""
     print("\n=== Test Query: Location Safety Analysis ===")
 
-    query = """
-    MATCH (l:Location)
-    OPTIONAL MATCH (l)-[hr:HAS_RISK]->(r:RiskFactor)
-    RETURN l.name as location,
-           l.safety_score as safety_score,
-           l.cctv_count as cctv_count,
-           l.crime_rate as crime_rate,
-           count(r) as risk_count,
-           collect({type: r.type, severity: r.severity}) as risks
-    ORDER BY l.safety_score DESC
-    """
-
-    with driver.session() as session:
-        result = session.run(query)
-        records = list(result)
-
+    query = get_query("location_safety")
+    records = client.read(query["cypher"], name="location_safety", **query["params"])
+
+    print("")
+    for record in records:
+        print(f"Location: {record['location']}")
+        print(f"  Safety Score: {record['safety_score']}/10")
+        print(f"  CCTV Count: {record['cctv_count']}")
+        print(f"  Crime Rate: {record['crime_rate']}")
+        print(f"  Risk Factors: {record['risk_count']}")
+        if record['risks'][0]:
+            for risk in record['risks']:
+                print(f"    - {risk['type']} (severity: {risk['severity']})")
         print("")
-        for record in records:
-            print(f"Location: {record['location']}")
-            print(f"  Safety Score: {record['safety_score']}/10")
-            print(f"  CCTV Count: {record['cctv_count']}")
-            print(f"  Crime Rate: {record['crime_rate']}")
-            print(f"  Risk Factors: {record['risk_count']}")
-            if record['risks'][0]:
-                for risk in record['risks']:
-                    print(f"    - {risk['type']} (severity: {risk['severity']})")
-            print("")
+
+def test_materialized_recommendations(client):
+    """Test precomputed RECOMMENDED edges (single-lookup serving path)"""
+    print("\n=== Test Query: Materialized Recommendations for user_002 ===")
+
+    materializer = RecommendationMaterializer(client.driver, user_key="user_id")
+    stats = materializer.materialize_all()
+    print(f"\n✓ Materialized {stats['edges']} edges for {stats['users']} users in {stats['seconds']}s")
+
+    start = time.perf_counter()
+    recommendations = materializer.recommendations("user_002")
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    for i, rec in enumerate(recommendations, 1):
+        print(f"{i}. {rec['product_name']} ({rec['category']}) - score {rec['score']:.2f} via {', '.join(rec['sources'])}")
+    print(f"\nLookup latency: {lookup_ms:.1f}ms")
+
+def test_cached_recommendations(client):
+    """Test cache-served hops against the direct Cypher query"""
+    print("\n=== Test Query: Cached Reference Graph (Location->Risk->Product) ===")
+
+    cache = ReferenceGraphCache(client.driver, user_key="user_id")
+    query = get_query("insurance_recommendation")
+
+    expected = client.read(query["cypher"], name="insurance_recommendation", **query["params"])
+
+    start = time.perf_counter()
+    for _ in range(100):
+        cached = cache.recommend_by_location(query["params"]["user_id"])
+    avg_ms = (time.perf_counter() - start) * 1000 / 100
+
+    print(f"\nCached rows match direct query: {sorted(cached, key=repr) == sorted(expected, key=repr)}")
+    print(f"Avg cached request: {avg_ms:.2f}ms (1 Neo4j round-trip for per-user edges)")
+    print(f"Cache metrics: {cache.metrics()}")
+
+def test_embedded_engine(client):
+    """Test the in-process graph engine against Neo4j on the same data"""
+    print("\n=== Test: Embedded Graph Engine vs Neo4j ===")
+
+    graph = EmbeddedGraph.from_neo4j(client, user_key="user_id")
+    report = compare_with_neo4j(graph, client, ["user_001", "user_002"])
+
+    print("")
+    for name, result in report.items():
+        print(f"{name}: {result['checked']} checked, mismatches: {result['mismatches'] or 'none'}")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        graph.insurance_recommendation("user_002")
+    print(f"\nEmbedded recommendation: {(time.perf_counter() - start) * 1000:.3f}µs avg (1000 runs)")
+
+def test_vector_retrieval(client):
+    """Test free-text retrieval with graph-neighbourhood expansion"""
+    print("\n=== Test: Vector Retrieval + Graph Expansion for user_002 ===")
+
+    retriever = GraphRetriever(Neo4jSource(client, user_key="user_id"))
+    question = "부모님 건강 간병 보험 추천"
+    results = retriever.retrieve(question, user_id="user_002", k=5)
+
+    print(f"\nQ: {question}")
+    for i, r in enumerate(results, 1):
+        marker = "◆" if r["in_graph"] else " "
+        print(f"{i}. {marker} [{r['label']}] {r['text']} (score {r['score']:.3f})")
+    print(f"\nRetrieval latency: {retriever.last_latency_ms:.2f}ms (◆ = reachable from user)")
 
 def main():
     """Main test execution"""
@@ -290,27 +310,33 @@ def main():
     print("=" * 60)
 
     try:
-        # Connect to Neo4j
-        driver = GraphDatabase.driver(URI, auth=AUTH)
-        driver.verify_connectivity()
+        # Connect to Neo4j (shared pooled client; NEO4J_* env vars or local defaults)
+        client = get_client()
+        client.verify_connectivity()
         print("\n✓ Connected to Neo4j")
 
         # Clear and setup
-        clear_database(driver)
-        create_sample_graph(driver)
-        verify_graph_structure(driver)
+        clear_database(client)
+        create_sample_graph(client)
+        GraphSchemaManager(client.driver).ensure()
+        verify_graph_structure(client)
 
         # Run test queries
-        test_insurance_recommendation_query(driver)
-        test_multi_hop_reasoning(driver)
-        test_location_safety_analysis(driver)
+        test_insurance_recommendation_query(client)
+        test_multi_hop_reasoning(client)
+        test_location_safety_analysis(client)
+        test_materialized_recommendations(client)
+        test_cached_recommendations(client)
+        test_embedded_engine(client)
+        test_vector_retrieval(client)
+        client.print_metrics()
 
         print("\n" + "=" * 60)
         print("✓ All tests completed successfully!")
         print("=" * 60)
 
         # Close connection
-        driver.close()
+        close_client()
 
     except Exception as e:
         print(f"\n✗ Error: {e}")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+IoT Feed Test
+Checks IoTFeatureAggregator: duplicate anomalies are ignored, features only
+cover the sliding window, unchanged users are not re-pushed and only users
+the graph matched are recorded as pushed
+
+Usage:
+    python test_iot_feed.py
+    pytest test_iot_feed.py
+"""
+
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from iot_feed import DEFAULT_RESULTS, IoTFeatureAggregator
+
+
+def _anomaly(user_id: str, day: int, kind: str = "long_inactivity", hours: float = 3.0, severity: str = "medium"):
+    return {
+        "user_id": user_id,
+        "type": kind,
+        "severity": severity,
+        "day": day,
+        "start_time": f"2024-12-{day:02d}T13:00:00",
+        "duration_hours": hours,
+    }
+
+
+class FakeLoader:
+    """run_unwind stand-in; the graph only knows `known` users"""
+
+    def __init__(self, known):
+        self.known = set(known)
+        self.batches = []
+
+    def run_unwind(self, query, rows, returns=None):
+        rows = list(rows)
+        self.batches.append(rows)
+        return {"returned": [row["user_id"] for row in rows if row["user_id"] in self.known]}
+
+
+def test_duplicates_ignored():
+    aggregator = IoTFeatureAggregator(state_path=None)
+    assert aggregator.add(_anomaly("u1", 3))
+    assert not aggregator.add(_anomaly("u1", 3))
+    assert aggregator.add_stream([_anomaly("u1", 3), _anomaly("u1", 4), _anomaly("u2", 4)]) == 2
+    assert aggregator.features("u1")["anomaly_count"] == 2
+
+
+def test_window_drops_old_anomalies():
+    aggregator = IoTFeatureAggregator(state_path=None, window_days=7)
+    aggregator.add_stream([_anomaly("u1", day) for day in (1, 2, 9, 10)])
+    assert aggregator.prune() == 2  # measured back from Dec 10
+    features = aggregator.features("u1")
+    assert features["anomaly_count"] == 2 and features["observed_days"] == 7
+    assert features["last_anomaly_at"] == "2024-12-10T13:00:00"
+
+
+def test_expired_user_returns_to_high_activity():
+    aggregator = IoTFeatureAggregator(state_path=None, window_days=7)
+    aggregator.add_stream([_anomaly("u1", 1, hours=14.0, severity="high")])
+    loader = FakeLoader(["u1"])
+    aggregator.push(loader)
+    assert loader.batches[0][0]["features"]["activity_level"] == "low"
+
+    stats = aggregator.push(loader, now=datetime(2024, 12, 20))
+    assert stats["changed"] == 1
+    features = loader.batches[1][0]["features"]
+    assert features["anomaly_count"] == 0 and features["activity_level"] == "high"
+
+
+def test_unchanged_users_not_pushed():
+    aggregator = IoTFeatureAggregator(state_path=None)
+    aggregator.add_stream([_anomaly("u1", 3), _anomaly("u2", 3)])
+    loader = FakeLoader(["u1", "u2"])
+    assert aggregator.push(loader)["written"] == 2
+    assert aggregator.push(loader)["changed"] == 0
+    aggregator.add(_anomaly("u2", 4))
+    assert [row["user_id"] for row in aggregator.pending()] == ["u2"]
+
+
+def test_unmatched_users_stay_pending():
+    aggregator = IoTFeatureAggregator(state_path=None)
+    aggregator.add_stream([_anomaly("u1", 3), _anomaly("ghost", 3)])
+    stats = aggregator.push(FakeLoader(["u1"]))
+    assert stats["written"] == 1 and stats["unmatched"] == 1
+    assert [row["user_id"] for row in aggregator.pending()] == ["ghost"]
+
+
+def test_dry_run_records_nothing():
+    aggregator = IoTFeatureAggregator(state_path=None)
+    aggregator.add(_anomaly("u1", 3))
+    assert aggregator.push(loader=None, dry_run=True) == {"users": 1, "changed": 1, "written": 0, "unmatched": 0}
+    assert aggregator.pushed == {}
+
+
+def test_state_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        state = Path(tmp, "state.json")
+        aggregator = IoTFeatureAggregator(state_path=state)
+        aggregator.add(_anomaly("u1", 3))
+        aggregator.push(FakeLoader(["u1"]))
+        restored = IoTFeatureAggregator(state_path=state)
+        assert restored.anomalies == json.loads(json.dumps(aggregator.anomalies))
+        assert restored.pending() == []
+
+
+def test_detector_results_file():
+    if not DEFAULT_RESULTS.exists():
+        return
+    aggregator = IoTFeatureAggregator(state_path=None)
+    n = aggregator.load_results(DEFAULT_RESULTS, "user_000")
+    features = aggregator.features("user_000")
+    assert features["anomaly_count"] == n > 0
+    assert sum(features[f"{t}_count"] for t in ("long_inactivity", "midnight_wandering", "irregular_sleep")) == n
+
+
+def main():
+    tests = [
+        test_duplicates_ignored,
+        test_window_drops_old_anomalies,
+        test_expired_user_returns_to_high_activity,
+        test_unchanged_users_not_pushed,
+        test_unmatched_users_stay_pending,
+        test_dry_run_records_nothing,
+        test_state_round_trip,
+        test_detector_results_file,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
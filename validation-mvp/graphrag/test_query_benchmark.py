@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Query Benchmark Test
+Checks regression detection against a baseline, PROFILE summaries, the
+empty-result check and the Neo4j backend's refusal to wipe a graph without
+--reset
+
+Usage:
+    python test_query_benchmark.py
+    pytest test_query_benchmark.py
+"""
+
+from query_benchmark import (
+    EmbeddedBackend, Neo4jBackend, compare, empty_results, rekey, run_suite, summarize_profile,
+)
+from synthetic_graph import SyntheticGraphGenerator
+
+BASE = {"db_hits": 1000, "p50_ms": 2.0, "p95_ms": 3.0, "rows": 12}
+
+
+def _metrics(regressions):
+    return sorted(r["metric"] for r in regressions)
+
+
+def test_compare_within_tolerance():
+    current = {**BASE, "db_hits": 1040, "p50_ms": 2.4}
+    assert compare({"1000:q": current}, {"1000:q": BASE}) == []
+
+
+def test_compare_flags_hits_time_and_rows():
+    current = {"db_hits": 1100, "p50_ms": 3.0, "p95_ms": 4.0, "rows": 11}
+    regressions = compare({"1000:q": current}, {"1000:q": BASE})
+    assert _metrics(regressions) == ["db_hits", "p50_ms", "rows"], regressions
+    assert all(r["key"] == "1000:q" for r in regressions)
+
+
+def test_compare_ignores_tiny_slowdowns_and_unknown_keys():
+    base = {**BASE, "p50_ms": 0.1}
+    current = {**BASE, "p50_ms": 0.4}  # 4x slower but under min_delta_ms
+    assert compare({"1000:q": current, "1000:new": current}, {"1000:q": base}) == []
+
+
+def test_compare_skips_hits_for_embedded_results():
+    current = {**BASE, "db_hits": None}
+    assert compare({"1000:q": current}, {"1000:q": BASE}) == []
+
+
+def test_summarize_profile_sums_plan_tree():
+    plan = {
+        "dbHits": 5, "pageCacheHits": 2,
+        "children": [{"dbHits": 7, "pageCacheMisses": 1, "children": []}],
+    }
+    assert summarize_profile(plan) == {"db_hits": 12, "page_cache_hits": 2, "page_cache_misses": 1}
+    assert summarize_profile(None)["db_hits"] == 0
+
+
+def test_rekey_keeps_parameter():
+    assert rekey("MATCH (u:User) WHERE u.user_id = $user_id", "id") == "MATCH (u:User) WHERE u.id = $user_id"
+
+
+def test_empty_results():
+    results = {"1000:a": {**BASE, "rows": 0}, "1000:b": BASE}
+    assert empty_results(results) == ["1000:a"]
+
+
+class _UntouchableClient:
+    uri = "bolt://prod:7687"
+    database = None
+
+    def autocommit(self, *args, **kwargs):
+        raise AssertionError("graph was deleted")
+
+
+def test_neo4j_backend_requires_reset():
+    backend = Neo4jBackend(_UntouchableClient())
+    try:
+        backend.load(SyntheticGraphGenerator(num_users=10, seed=1))
+    except RuntimeError as e:
+        assert "bolt://prod:7687" in str(e)
+    else:
+        raise AssertionError("load() ran without reset")
+
+
+def test_embedded_suite_has_rows_for_every_query():
+    results = run_suite(EmbeddedBackend(), [500], repeat=20, seed=42)
+    assert set(results) == {
+        "500:insurance_recommendation", "500:multi_hop_reasoning", "500:location_safety", "500:flood_zone_users",
+    }
+    assert empty_results(results) == [], results
+    assert compare(results, results) == []
+
+
+def main():
+    tests = [
+        test_compare_within_tolerance,
+        test_compare_flags_hits_time_and_rows,
+        test_compare_ignores_tiny_slowdowns_and_unknown_keys,
+        test_compare_skips_hits_for_embedded_results,
+        test_summarize_profile_sums_plan_tree,
+        test_rekey_keeps_parameter,
+        test_empty_results,
+        test_neo4j_backend_requires_reset,
+        test_embedded_suite_has_rows_for_every_query,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Schema Manager Test
+Checks index derivation from Cypher text: inline map lookups and WHERE
+predicates count, writes in SET/REMOVE clauses after a WHERE do not
+
+Usage:
+    python test_schema_manager.py
+    pytest test_schema_manager.py
+"""
+
+from schema_manager import GraphSchemaManager, derive_index_requirements, _plan_operators
+
+
+def test_inline_map_lookup():
+    cypher = "MATCH (u:User {user_id: $user_id})-[:LIVES_IN]->(l:Location) RETURN l"
+    assert derive_index_requirements(cypher) == {("User", "user_id")}
+
+
+def test_where_predicates():
+    cypher = """
+        MATCH (u:User)-[:LIVES_IN]->(l:Location)
+        WHERE u.id IN $ids AND l.name STARTS WITH $prefix
+        RETURN u, l
+    """
+    assert derive_index_requirements(cypher) == {("User", "id"), ("Location", "name")}
+
+
+def test_set_after_where_is_not_a_lookup():
+    cypher = """
+        MATCH (u:User)
+        WHERE u.reco_dirty = true
+        REMOVE u.reco_dirty
+        SET u.reco_refreshed_at = datetime()
+    """
+    assert derive_index_requirements(cypher) == {("User", "reco_dirty")}
+
+
+def test_where_ends_at_next_clause():
+    cypher = """
+        MATCH (u:User) WHERE u.id = $id
+        WITH u
+        MATCH (u)-[:HAS_PATTERN]->(iot:IoTPattern)
+        SET iot.anomaly_count = $count
+        RETURN iot.id = $id AS same
+    """
+    assert derive_index_requirements(cypher) == {("User", "id")}
+
+
+def test_every_where_clause_is_scanned():
+    cypher = """
+        MATCH (u:User) WHERE u.id = $id
+        MATCH (r:RiskFactor) WHERE r.type = $risk
+        MERGE (u)-[:EXPOSED_TO]->(r)
+    """
+    assert derive_index_requirements(cypher) == {("User", "id"), ("RiskFactor", "type")}
+
+
+def test_catalogue_has_no_write_only_properties():
+    required = GraphSchemaManager(driver=None).required_indexes()
+    assert ("User", "reco_refreshed_at") not in required
+    assert ("User", "user_id") in required
+
+
+def test_plan_operators_strip_runtime_suffix():
+    plan = {
+        "operatorType": "ProduceResults@neo4j",
+        "children": [{"operatorType": "NodeIndexSeek@neo4j", "children": []}],
+    }
+    assert _plan_operators(plan) == ["ProduceResults", "NodeIndexSeek"]
+    assert _plan_operators(None) == []
+
+
+def main():
+    tests = [
+        test_inline_map_lookup,
+        test_where_predicates,
+        test_set_after_where_is_not_a_lookup,
+        test_where_ends_at_next_clause,
+        test_every_where_clause_is_scanned,
+        test_catalogue_has_no_write_only_properties,
+        test_plan_operators_strip_runtime_suffix,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
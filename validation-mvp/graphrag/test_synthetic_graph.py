@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Synthetic Graph Test
+Checks that a seed always yields the same graph, that users carry the
+properties the catalogue queries read, and that EXPOSED_TO edges follow
+the EXHIBITS -> INDICATES rules
+
+Usage:
+    python test_synthetic_graph.py
+    pytest test_synthetic_graph.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from setup_neo4j import BEHAVIOR_RISK_RULES
+from synthetic_graph import SyntheticGraphGenerator
+
+
+def _generator(seed: int = 7) -> SyntheticGraphGenerator:
+    return SyntheticGraphGenerator(num_users=300, num_grid_cells=40, seed=seed)
+
+
+def test_same_seed_same_graph():
+    a, b = _generator(), _generator()
+    assert a.locations() == b.locations()
+    assert list(a.users()) == list(b.users())
+    assert list(a.users()) != list(_generator(seed=8).users())
+
+
+def test_users_carry_queried_properties():
+    for user, lives_in, _, _, _ in _generator().users():
+        assert user["age_group"] and user["family_type"], user
+        assert lives_in["start"] == user["id"]
+    assert all(loc["name"] for loc in _generator().locations())
+
+
+def test_exposures_follow_behavior_rules():
+    rules = {(r["behavior"], r["risk"]) for r in BEHAVIOR_RISK_RULES}
+    exposures = 0
+    for _, _, exhibits, exposed_to, _ in _generator().users():
+        behaviors = {e["end"] for e in exhibits}
+        expected = {risk for behavior, risk in rules if behavior in behaviors}
+        assert {e["end"] for e in exposed_to} == expected
+        for e in exposed_to:
+            assert 0.5 <= e["props"]["inference_confidence"] <= 0.95
+        exposures += len(exposed_to)
+    assert exposures > 0
+
+
+def test_csv_counts_match_generator():
+    generator = _generator()
+    with tempfile.TemporaryDirectory() as tmp:
+        counts = generator.write_csv(tmp)
+        header = Path(tmp, "exposed_to.csv").read_text(encoding="utf-8").splitlines()[0]
+    assert counts["users.csv"] == 300
+    assert counts["exposed_to.csv"] == sum(len(row[3]) for row in generator.users())
+    assert header.endswith("inference_confidence:float")
+
+
+def main():
+    tests = [
+        test_same_seed_same_graph,
+        test_users_carry_queried_properties,
+        test_exposures_follow_behavior_rules,
+        test_csv_counts_match_generator,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Vector Index Test
+Checks exact and IVF search against each other, IDF weighting of the
+hashing embedder, and that graph expansion re-ranks without overriding a
+clearly better text match
+
+Usage:
+    python test_vector_index.py
+    pytest test_vector_index.py
+"""
+
+import io
+import random
+import contextlib
+
+import numpy as np
+
+from embedded_graph import EmbeddedGraph
+from setup_neo4j import TowninGraphSetup
+from vector_index import (
+    BruteForceIndex, EmbeddedSource, GraphRetriever, HashingEmbedder, IVFIndex, clustered_vectors,
+)
+
+CARE_QUESTION = "부모님 간병 보험"
+
+
+def _sample_retriever(num_users: int = 200) -> GraphRetriever:
+    random.seed(42)
+    graph = EmbeddedGraph(user_key="id")
+    with contextlib.redirect_stdout(io.StringIO()):
+        TowninGraphSetup(store=graph).populate_sample_data(num_users=num_users)
+    return GraphRetriever(EmbeddedSource(graph))
+
+
+def test_brute_force_finds_itself():
+    vectors = clustered_vectors(2000, 64, clusters=20)
+    index = BruteForceIndex(vectors)
+    hits = index.search(vectors[123], k=5)
+    assert hits[0][0] == 123 and abs(hits[0][1] - 1.0) < 1e-5
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+def test_ivf_recall_grows_with_nprobe():
+    vectors = clustered_vectors(5000, 64, clusters=50)
+    exact, ivf = BruteForceIndex(vectors), IVFIndex(vectors, nlist=64, seed=1)
+    queries = vectors[np.random.default_rng(3).choice(len(vectors), 50, replace=False)]
+
+    def recall(nprobe):
+        return np.mean([
+            len({i for i, _ in ivf.search(q, 10, nprobe=nprobe)} & {i for i, _ in exact.search(q, 10)}) / 10
+            for q in queries
+        ])
+
+    assert recall(64) == 1.0  # probing every cell is exact
+    assert recall(1) <= recall(8) <= recall(64)
+    assert sum(len(cell) for cell in ivf.lists) == len(vectors)
+
+
+def test_idf_downweights_shared_words():
+    texts = ["보험 상품 간병보험", "보험 상품 자동차보험", "보험 상품 종신보험"]
+    plain, fitted = HashingEmbedder(), HashingEmbedder().fit(texts)
+    assert fitted.idf["보험"] < fitted.idf["간병보험"]
+
+    def best(embedder):
+        return int(np.argmax(embedder(texts) @ embedder(["간병 보험"])[0]))
+
+    assert best(fitted) == 0
+    assert not fitted(["완전히 새로운 단어"]).any(), "unseen features should not be hashed in"
+    assert plain(["완전히 새로운 단어"]).any()
+
+
+def test_care_product_tops_care_question():
+    retriever = _sample_retriever()
+    top = retriever.retrieve(CARE_QUESTION, k=3)[0]
+    assert "간병보험" in top["text"], top
+
+
+def test_graph_boost_keeps_best_match_for_every_user():
+    retriever = _sample_retriever()
+    assert "간병보험" in retriever.retrieve(CARE_QUESTION, user_id="user_002", k=3)[0]["text"]
+    for user in retriever.source.graph.table("User").rows:
+        results = retriever.retrieve(CARE_QUESTION, user_id=user["id"], k=5)
+        assert "간병보험" in results[0]["text"], (user["id"], results[0])
+        for r in results:
+            assert (r["score"] > r["similarity"]) == r["in_graph"], r
+
+
+def test_flood_question_finds_flood_locations():
+    top = _sample_retriever().retrieve("침수 위험 지역", k=3)
+    assert all(r["label"] == "Location" and "침수" in r["text"] for r in top), top
+
+
+def main():
+    tests = [
+        test_brute_force_finds_itself,
+        test_ivf_recall_grows_with_nprobe,
+        test_idf_downweights_shared_words,
+        test_care_product_tops_care_question,
+        test_graph_boost_keeps_best_match_for_every_user,
+        test_flood_question_finds_flood_locations,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Townin GraphRAG - Vector Retrieval
+Embedding index over product / risk / location descriptions, combined with
+graph-neighbourhood expansion from the user node
+
+Retrieval = cosine top-k from the index, re-ranked with a boost for nodes
+reachable from the user (LIVES_IN, HAS_RISK, EXPOSED_TO, INDICATES,
+COVERED_BY). Two index modes:
+  - BruteForceIndex: exact, one matrix-vector product
+  - IVFIndex: spherical k-means cells, searches `nprobe` nearest cells
+
+The default embedder hashes words and Hangul character n-grams into a fixed
+vector (no model download), weighted by IDF over the indexed documents so
+that words every product shares ("보험") do not outrank the distinctive ones
+("간병"); any callable `texts -> (n, dim) array` can be passed instead.
+
+Usage:
+    python vector_index.py --question "부모님 간병 보험" --user user_002
+    python vector_index.py --question "침수 위험 지역" --embedded --users 1000
+    python vector_index.py --bench --docs 200000 --dim 256
+"""
+
+import re
+import math
+import time
+import zlib
+import argparse
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from graph_loader import validate_identifier
+
+WORD_RE = re.compile(r"[0-9a-z]+|[가-힣]+")
+
+# Extra words so attribute flags are searchable in natural language
+LABEL_HINTS = {
+    "InsuranceProduct": "보험 상품",
+    "RiskFactor": "위험 요인",
+    "Location": "지역 동네",
+}
+FLAG_HINTS = {
+    "flood_risk": "홍수 침수 위험",
+}
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of words + character n-grams, L2-normalized
+
+    Deterministic across processes (crc32, not Python's salted hash).
+    After `fit(corpus)` features are IDF-weighted, and features the corpus
+    never contains are dropped: they cannot match a document, only collide
+    with one in the hashed space.
+    """
+
+    def __init__(self, dim: int = 256, ngrams: Tuple[int, ...] = (2, 3)):
+        self.dim = dim
+        self.ngrams = ngrams
+        self.idf: Optional[Dict[str, float]] = None
+
+    def features(self, text: str) -> List[str]:
+        features = []
+        for word in WORD_RE.findall(text.lower()):
+            features.append(word)
+            padded = f"<{word}>"
+            for n in self.ngrams:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def fit(self, texts: Sequence[str]) -> "HashingEmbedder":
+        """Learn smoothed IDF weights from the documents to be indexed"""
+        df = Counter()
+        for text in texts:
+            df.update(set(self.features(text)))
+        n = len(texts)
+        self.idf = {feature: math.log((1 + n) / (1 + count)) + 1.0 for feature, count in df.items()}
+        return self
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                weight = 1.0 if self.idf is None else self.idf.get(feature, 0.0)
+                if not weight:
+                    continue
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += weight if (h >> 16) & 1 else -weight
+        return normalize(matrix)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class BruteForceIndex:
+    """Exact cosine search over normalized vectors"""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = normalize(np.asarray(vectors, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        scores = self.vectors @ query
+        top = _top_k(scores, k)
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors bucketed by nearest k-means centroid
+
+    Args:
+        nlist: number of cells (≈ sqrt(n) is a good start)
+        nprobe: cells scanned per query (recall/latency knob)
+        train_size: vectors sampled for k-means
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        nlist: int = 256,
+        nprobe: int = 8,
+        iterations: int = 10,
+        train_size: int = 50_000,
+        seed: int = 42
+    ):
+        self.vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        self.nlist = max(1, min(nlist, len(self.vectors)))
+        self.nprobe = nprobe
+        rng = np.random.default_rng(seed)
+
+        sample = self.vectors
+        if len(sample) > train_size:
+            sample = sample[rng.choice(len(sample), train_size, replace=False)]
+        self.centroids = self._kmeans(sample, iterations, rng)
+
+        assignment = self._assign(self.vectors)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(self.nlist + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(self.nlist)]
+
+    def _assign(self, vectors: np.ndarray, block: int = 65_536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + block] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), block)
+        ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+    def _kmeans(self, sample: np.ndarray, iterations: int, rng) -> np.ndarray:
+        """Spherical k-means (cosine), empty cells reseeded from random points"""
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self.centroids = centroids
+            labels = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+        return centroids
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        cells = _top_k(self.centroids @ query, nprobe or self.nprobe)
+        candidates = np.concatenate([self.lists[c] for c in cells])
+        if not len(candidates):
+            return []
+        scores = self.vectors[candidates] @ query
+        top = _top_k(scores, k)
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+
+# ----------------------------------------------------------------------
+# Graph sources
+# ----------------------------------------------------------------------
+
+# Explicit label: labels(n)[0] is arbitrary for nodes carrying extra labels
+DOCS_QUERY = """
+MATCH (n)
+WHERE n:InsuranceProduct OR n:RiskFactor OR n:Location
+RETURN elementId(n) AS eid,
+       CASE WHEN n:InsuranceProduct THEN 'InsuranceProduct'
+            WHEN n:RiskFactor THEN 'RiskFactor'
+            ELSE 'Location' END AS label,
+       properties(n) AS props
+"""
+
+NEIGHBOURHOOD_QUERY = """
+MATCH (u:User {{{key}: $user_id}})
+WITH [(u)-[:LIVES_IN]->(l:Location) | l] AS locations,
+     [(u)-[:LIVES_IN]->(:Location)-[:HAS_RISK]->(r:RiskFactor) | r]
+       + [(u)-[:EXPOSED_TO]->(r:RiskFactor) | r]
+       + [(u)-[:EXHIBITS]->(:Behavior)-[:INDICATES]->(r:RiskFactor) | r] AS risks
+RETURN [l IN locations | elementId(l)] AS locations,
+       [r IN risks | elementId(r)] AS risks,
+       [r IN risks | [(r)-[:COVERED_BY]->(p:InsuranceProduct) | elementId(p)]] AS products
+"""
+
+
+def document_text(label: str, props: Dict) -> str:
+    """Searchable text for one node: string properties + label/flag hints"""
+    parts = [LABEL_HINTS.get(label, "")]
+    for key, value in props.items():
+        if isinstance(value, str):
+            parts.append(value.replace("_", " "))
+        elif value is True and key in FLAG_HINTS:
+            parts.append(FLAG_HINTS[key])
+    return " ".join(p for p in parts if p)
+
+
+class Neo4jSource:
+    """Documents and user neighbourhoods from a live graph (GraphClient)"""
+
+    def __init__(self, client, user_key: str = "user_id"):
+        self.client = client
+        self.user_key = validate_identifier(user_key)
+
+    def documents(self) -> List[Dict]:
+        return [
+            {"id": f"{row['label']}:{row['eid']}", "label": row["label"], "props": row["props"]}
+            for row in self.client.read(DOCS_QUERY, name="vector_documents")
+        ]
+
+    def neighbourhood(self, user_id: str) -> Set[str]:
+        rows = self.client.read(
+            NEIGHBOURHOOD_QUERY.format(key=self.user_key), name="vector_neighbourhood", user_id=user_id
+        )
+        if not rows:
+            return set()
+        row = rows[0]
+        ids = {f"Location:{eid}" for eid in row["locations"]}
+        ids |= {f"RiskFactor:{eid}" for eid in row["risks"]}
+        ids |= {f"InsuranceProduct:{eid}" for products in row["products"] for eid in products}
+        return ids
+
+
+class EmbeddedSource:
+    """Documents and user neighbourhoods from an EmbeddedGraph"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def documents(self) -> List[Dict]:
+        return [
+            {"id": f"{label}:{i}", "label": label, "props": props}
+            for label in ("InsuranceProduct", "RiskFactor", "Location")
+            for i, props in enumerate(self.graph.table(label).rows)
+        ]
+
+    def neighbourhood(self, user_id: str) -> Set[str]:
+        g = self.graph
+        ids = set()
+        for u in g.table("User").find(g.user_key, user_id):
+            risks = set()
+            for li in g.out("LIVES_IN", "User", u, "Location"):
+                ids.add(f"Location:{li}")
+                risks.update(g.out("HAS_RISK", "Location", li, "RiskFactor"))
+            risks.update(g.out("EXPOSED_TO", "User", u, "RiskFactor"))
+            for bi in g.out("EXHIBITS", "User", u, "Behavior"):
+                risks.update(g.out("INDICATES", "Behavior", bi, "RiskFactor"))
+            for ri in risks:
+                ids.add(f"RiskFactor:{ri}")
+                ids.update(f"InsuranceProduct:{pi}" for pi in g.out("COVERED_BY", "RiskFactor", ri, "InsuranceProduct"))
+        return ids
+
+
+class GraphRetriever:
+    """
+    Free-text retrieval over graph nodes with user-neighbourhood expansion
+
+    Args:
+        source: Neo4jSource or EmbeddedSource
+        embedder: texts -> normalized (n, dim) array (default: a
+            HashingEmbedder fitted on the documents)
+        index_factory: vectors -> index (BruteForceIndex below ~50k docs)
+        graph_boost: share of the candidates' cosine spread (best - worst)
+            added to nodes near the user; a fixed bonus would swamp the
+            small similarities hashed embeddings produce
+    """
+
+    def __init__(
+        self,
+        source,
+        embedder: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+        index_factory: Callable[[np.ndarray], object] = BruteForceIndex,
+        graph_boost: float = 0.2
+    ):
+        self.source = source
+        self.graph_boost = graph_boost
+
+        self.docs = source.documents()
+        for doc in self.docs:
+            doc["text"] = document_text(doc["label"], doc["props"])
+        texts = [doc["text"] for doc in self.docs]
+        self.embedder = embedder or HashingEmbedder().fit(texts)
+        self.positions = {doc["id"]: i for i, doc in enumerate(self.docs)}
+        self.vectors = self.embedder(texts)
+        self.index = index_factory(self.vectors)
+
+    def retrieve(self, question: str, user_id: Optional[str] = None, k: int = 5) -> List[Dict]:
+        start = time.perf_counter()
+        query = self.embedder([question])[0]
+
+        scores = dict(self.index.search(query, k * 4))
+        nearby = self.source.neighbourhood(user_id) if user_id else set()
+        for doc_id in nearby:
+            i = self.positions.get(doc_id)
+            if i is not None and i not in scores:
+                scores[i] = float(self.vectors[i] @ query)
+
+        boost = self.graph_boost * (max(scores.values()) - min(scores.values())) if scores else 0.0
+        results = []
+        for i, similarity in scores.items():
+            doc = self.docs[i]
+            in_graph = doc["id"] in nearby
+            results.append({
+                "id": doc["id"],
+                "label": doc["label"],
+                "text": doc["text"],
+                "similarity": round(similarity, 4),
+                "score": round(similarity + (boost if in_graph else 0.0), 4),
+                "in_graph": in_graph,
+            })
+        results.sort(key=lambda r: r["score"], reverse=True)
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        return results[:k]
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+
+def clustered_vectors(n: int, dim: int, clusters: int = 500, noise: float = 2.0, seed: int = 42) -> np.ndarray:
+    """Synthetic corpus with topic structure (uniform random vectors have none)"""
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.standard_normal((clusters, dim)).astype(np.float32))
+    points = centres[rng.integers(0, clusters, n)] + noise * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize(points)
+
+
+def benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    nlist: Optional[int] = None,
+    nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32)
+) -> List[Dict]:
+    """recall@k vs latency for brute force and IVF at several nprobe values"""
+
+    def run(search) -> Tuple[List[List[int]], List[float]]:
+        results, latencies = [], []
+        for q in queries:
+            start = time.perf_counter()
+            results.append([i for i, _ in search(q)])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return results, sorted(latencies)
+
+    def summary(name: str, results, latencies, truth, build_s=0.0) -> Dict:
+        recall = np.mean([len(set(r) & set(t)) / k for r, t in zip(results, truth)])
+        return {
+            "index": name,
+            f"recall@{k}": round(float(recall), 4),
+            "avg_ms": round(sum(latencies) / len(latencies), 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+            "build_s": round(build_s, 2),
+        }
+
+    exact = BruteForceIndex(vectors)
+    truth, latencies = run(lambda q: exact.search(q, k))
+    rows = [summary("brute_force", truth, latencies, truth)]
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors, nlist=nlist or max(1, int(np.sqrt(len(vectors)))))
+    build_s = time.perf_counter() - start
+    for nprobe in nprobes:
+        results, latencies = run(lambda q: ivf.search(q, k, nprobe=nprobe))
+        rows.append(summary(f"ivf(nlist={ivf.nlist},nprobe={nprobe})", results, latencies, truth, build_s))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GraphRAG vector retrieval")
+    parser.add_argument("--question", default="부모님 간병 보험")
+    parser.add_argument("--user", default=None, help="user id for neighbourhood expansion")
+    parser.add_argument("--user-key", default="user_id")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--embedded", action="store_true", help="use an EmbeddedGraph built by TowninGraphSetup")
+    parser.add_argument("--users", type=int, default=1000, help="users for --embedded")
+    parser.add_argument("--bench", action="store_true", help="recall@k vs latency benchmark")
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.bench:
+        vectors = clustered_vectors(args.docs, args.dim)
+        rng = np.random.default_rng(7)
+        queries = normalize(vectors[rng.choice(len(vectors), args.queries)]
+                            + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32) / np.sqrt(args.dim))
+        print(f"\n=== Vector benchmark: {args.docs:,} docs x {args.dim} dims, {args.queries} queries ===")
+        for row in benchmark(vectors, queries, k=args.k):
+            print(f"  {row['index']:<32} recall@{args.k}={row[f'recall@{args.k}']:.3f}  "
+                  f"avg={row['avg_ms']:.3f}ms  p99={row['p99_ms']:.3f}ms  build={row['build_s']}s")
+        return
+
+    client = None
+    if args.embedded:
+        from embedded_graph import EmbeddedGraph
+        from setup_neo4j import TowninGraphSetup
+
+        graph = EmbeddedGraph(user_key="id")
+        TowninGraphSetup(store=graph).populate_sample_data(num_users=args.users)
+        source = EmbeddedSource(graph)
+    else:
+        from graph_client import get_client
+
+        client = get_client()
+        source = Neo4jSource(client, user_key=args.user_key)
+
+    try:
+        retriever = GraphRetriever(source)
+        results = retriever.retrieve(args.question, user_id=args.user, k=args.k)
+    finally:
+        if client is not None:
+            client.close()
+
+    print(f"\nQ: {args.question}" + (f"  (user {args.user})" if args.user else ""))
+    for i, r in enumerate(results, 1):
+        marker = "◆" if r["in_graph"] else " "
+        print(f"  {i}. {marker} [{r['label']}] {r['text']}  score={r['score']:.3f} (cos {r['similarity']:.3f})")
+    print(f"\nRetrieval latency: {retriever.last_latency_ms:.2f}ms over {len(retriever.docs)} documents")
+
+
+if __name__ == "__main__":
+    main()
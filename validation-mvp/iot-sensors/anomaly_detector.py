@@ -9,16 +9,29 @@ Anomaly Types:
 3. Irregular Sleep (불규칙한 수면) - 건강 이상 신호
 """
 
+import sys
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Tuple
 from collections import defaultdict
+from contextlib import nullcontext
+
+# span_tracer ships with flyer-ai/ (shared by the validation pipelines)
+FLYER_AI_DIR = Path(__file__).resolve().parent.parent / "flyer-ai"
+if str(FLYER_AI_DIR) not in sys.path:
+    sys.path.append(str(FLYER_AI_DIR))
+
+try:
+    from span_tracer import get_tracer
+except ImportError:  # tracing is optional here
+    get_tracer = None
 
 class AnomalyDetector:
-    def __init__(self, config: Dict = None):
+    def __init__(self, config: Dict = None, tracer=None):
         """
         Initialize anomaly detector with configurable thresholds
+        (tracer: span_tracer.Tracer for per-stage latency; default shared tracer)
         """
         self.config = config or {
             "long_inactivity_hours": 6,  # 6시간 이상 활동 없으면 이상
@@ -31,6 +44,10 @@ class AnomalyDetector:
         }
 
         self.anomalies = []
+        self.tracer = tracer or (get_tracer() if get_tracer else None)
+
+    def _span(self, name: str):
+        return self.tracer.span(name) if self.tracer else nullcontext()
 
     def load_sensor_data(self, file_path: str) -> Dict:
         """Load sensor data from JSON"""
@@ -46,26 +63,31 @@ class AnomalyDetector:
         print("이상 감지 알고리즘 실행 중...")
         print("=" * 70)
 
-        # Group events by day
-        events_by_day = self._group_events_by_day(events)
-
-        # 1. Detect long inactivity
-        print("\n[1/3] 장시간 활동 없음 감지...")
-        long_inactivity = self.detect_long_inactivity(events_by_day)
-        self.anomalies.extend(long_inactivity)
-        print(f"  → {len(long_inactivity)} 건 발견")
-
-        # 2. Detect midnight wandering
-        print("\n[2/3] 야간 배회 감지...")
-        midnight_wandering = self.detect_midnight_wandering(events_by_day)
-        self.anomalies.extend(midnight_wandering)
-        print(f"  → {len(midnight_wandering)} 건 발견")
-
-        # 3. Detect irregular sleep
-        print("\n[3/3] 불규칙한 수면 패턴 감지...")
-        irregular_sleep = self.detect_irregular_sleep(events_by_day)
-        self.anomalies.extend(irregular_sleep)
-        print(f"  → {len(irregular_sleep)} 건 발견")
+        with self._span("iot_detect"):
+            # Group events by day
+            with self._span("group_by_day"):
+                events_by_day = self._group_events_by_day(events)
+
+            # 1. Detect long inactivity
+            print("\n[1/3] 장시간 활동 없음 감지...")
+            with self._span("long_inactivity"):
+                long_inactivity = self.detect_long_inactivity(events_by_day)
+            self.anomalies.extend(long_inactivity)
+            print(f"  → {len(long_inactivity)} 건 발견")
+
+            # 2. Detect midnight wandering
+            print("\n[2/3] 야간 배회 감지...")
+            with self._span("midnight_wandering"):
+                midnight_wandering = self.detect_midnight_wandering(events_by_day)
+            self.anomalies.extend(midnight_wandering)
+            print(f"  → {len(midnight_wandering)} 건 발견")
+
+            # 3. Detect irregular sleep
+            print("\n[3/3] 불규칙한 수면 패턴 감지...")
+            with self._span("irregular_sleep"):
+                irregular_sleep = self.detect_irregular_sleep(events_by_day)
+            self.anomalies.extend(irregular_sleep)
+            print(f"  → {len(irregular_sleep)} 건 발견")
 
         return self.anomalies
 
@@ -348,6 +370,8 @@ def main():
         }, f, ensure_ascii=False, indent=2)
 
     print(f"\n📄 결과 저장: {output_file}")
+    if detector.tracer:
+        detector.tracer.print_report()
     print("=" * 70)
 
 
@@ -7,13 +7,27 @@ Note: This is a template-based version (no API required)
 For production, use LLM (Claude/GPT) for more natural messages
 """
 
+import sys
 import json
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict
+from contextlib import nullcontext
+
+# span_tracer ships with flyer-ai/ (shared by the validation pipelines)
+FLYER_AI_DIR = Path(__file__).resolve().parent.parent / "flyer-ai"
+if str(FLYER_AI_DIR) not in sys.path:
+    sys.path.append(str(FLYER_AI_DIR))
+
+try:
+    from span_tracer import get_tracer
+except ImportError:  # tracing is optional here
+    get_tracer = None
 
 class MessageGenerator:
-    def __init__(self):
+    def __init__(self, tracer=None):
+        self.tracer = tracer or (get_tracer() if get_tracer else None)
+
         # Template-based messages (API 없이 동작)
         self.templates = {
             "long_inactivity": {
@@ -147,9 +161,10 @@ class MessageGenerator:
     def generate_all_messages(self, anomalies: List[Dict], tone: str = "family") -> List[Dict]:
         """Generate messages for all anomalies"""
         messages = []
-        for anomaly in anomalies:
-            message = self.generate_message(anomaly, tone)
-            messages.append(message)
+        with self.tracer.span(f"iot_messages_{tone}") if self.tracer else nullcontext():
+            for anomaly in anomalies:
+                message = self.generate_message(anomaly, tone)
+                messages.append(message)
         return messages
 
 
@@ -209,6 +224,8 @@ def main():
         }, f, ensure_ascii=False, indent=2)
 
     print(f"\n📄 메시지 저장: {output_file}")
+    if generator.tracer:
+        generator.tracer.print_report()
 
     # Message quality evaluation (subjective, manual review needed)
     print("\n" + "=" * 70)